@@ -0,0 +1,270 @@
+"""
+Benchmark of the agent's read paths before and after archiving history.
+
+Seeds a SQLite database with a large appointment history (past bookings plus
+mostly cancelled and modified rows, as a busy clinic accumulates over a few
+years) and a small hot set of upcoming bookings, then times the queries the
+agent runs on every call. The archival job is run next and the same queries
+are timed again against the trimmed table.
+
+Usage:
+    uv run python -m benchmarks.bench_archival --rows 1000000
+    uv run python -m benchmarks.bench_archival --rows 200000 --json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.archival import archive_appointments
+from src.database import DatabaseManager
+from src.storage import SQLiteBackend
+
+SLOT_TIMES = [f"{h:02d}:{m:02d}:00" for h in range(9, 17) for m in (0, 30)]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+# ==================== SEEDING ====================
+
+
+def seed(
+    backend: SQLiteBackend,
+    rows: int,
+    users: int,
+    years: int,
+    upcoming_days: int,
+    rng: random.Random,
+) -> Dict[str, int]:
+    """
+    Bulk-load profiles, historical appointments and upcoming bookings.
+
+    Each past slot holds at most one active (attended) booking, as enforced
+    by the unique active-slot index; the remaining history is cancelled or
+    modified rows spread over the same period.
+    """
+    today = date.today()
+    contacts = [f"555{i:07d}" for i in range(users)]
+    now = datetime.now(timezone.utc)
+    conn = backend.conn
+
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO user_profiles (contact_number, name, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?)",
+        [(c, f"Caller {c[-4:]}", now.isoformat(), now.isoformat()) for c in contacts],
+    )
+
+    past_days = years * 365
+    past_slots = [
+        (str(today - timedelta(days=d)), t)
+        for d in range(1, past_days + 1)
+        for t in SLOT_TIMES
+    ]
+    attended = past_slots[: min(len(past_slots), rows // 20)]
+
+    def history_row(appt_date: str, appt_time: str, status: str) -> tuple:
+        stamp = (
+            datetime.fromisoformat(appt_date).replace(tzinfo=timezone.utc)
+            - timedelta(days=rng.randint(0, 14))
+        ).isoformat()
+        contact = rng.choice(contacts)
+        return (
+            str(uuid.uuid4()),
+            contact,
+            f"Caller {contact[-4:]}",
+            appt_date,
+            appt_time,
+            status,
+            None,
+            stamp,
+            stamp,
+        )
+
+    batch: List[tuple] = [history_row(d, t, "active") for d, t in attended]
+    for _ in range(rows - len(attended)):
+        d, t = rng.choice(past_slots)
+        batch.append(history_row(d, t, rng.choice(("cancelled", "modified"))))
+
+    upcoming = [
+        (str(today + timedelta(days=d)), t)
+        for d in range(upcoming_days)
+        for t in SLOT_TIMES
+        if rng.random() < 0.6
+    ]
+    for d, t in upcoming:
+        contact = rng.choice(contacts)
+        batch.append(
+            (
+                str(uuid.uuid4()),
+                contact,
+                f"Caller {contact[-4:]}",
+                d,
+                t,
+                "active",
+                None,
+                now.isoformat(),
+                now.isoformat(),
+            )
+        )
+
+    conn.executemany(
+        "INSERT INTO appointments (id, contact_number, user_name, appointment_date, "
+        "appointment_time, status, notes, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        batch,
+    )
+    conn.execute("COMMIT")
+    conn.execute("ANALYZE")
+    return {"history": rows, "upcoming": len(upcoming), "users": users}
+
+
+# ==================== MEASUREMENT ====================
+
+
+async def time_op(
+    op: Callable[[], Awaitable[Any]], iterations: int
+) -> Dict[str, float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await op()
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return {
+        "p50_us": round(percentile(samples, 50), 1),
+        "p95_us": round(percentile(samples, 95), 1),
+    }
+
+
+async def measure(
+    db: DatabaseManager, contacts: List[str], iterations: int, rng: random.Random
+) -> Dict[str, Dict[str, float]]:
+    """Time each read path the agent (or a history view) runs."""
+    today = date.today()
+    window_end = today + timedelta(days=14)
+
+    def caller() -> str:
+        return rng.choice(contacts)
+
+    ops: Dict[str, Callable[[], Awaitable[Any]]] = {
+        "upcoming (agent tools)": lambda: db.get_user_appointments(
+            caller(), from_date=today
+        ),
+        "active, all dates": lambda: db.get_user_appointments(caller()),
+        "full history": lambda: db.get_user_appointments(
+            caller(), include_cancelled=True
+        ),
+        "booked slots, 14 days": lambda: db.get_booked_slots(today, window_end),
+        "slot availability": lambda: db.check_slot_available(
+            today + timedelta(days=rng.randint(0, 13)),
+            datetime.strptime(rng.choice(SLOT_TIMES), "%H:%M:%S").time(),
+        ),
+    }
+    return {name: await time_op(op, iterations) for name, op in ops.items()}
+
+
+def table_sizes(backend: SQLiteBackend) -> Dict[str, int]:
+    return {
+        table: backend.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ("appointments", "appointments_archive")
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    path = args.path or os.path.join(tempfile.mkdtemp(), "bench_archival.db")
+    backend = SQLiteBackend(path)
+    db = DatabaseManager(backend)
+
+    start = time.perf_counter()
+    seeded = seed(backend, args.rows, args.users, args.years, args.upcoming_days, rng)
+    seed_seconds = time.perf_counter() - start
+    contacts = [f"555{i:07d}" for i in range(args.users)]
+
+    report: Dict[str, Any] = {
+        "seeded": {**seeded, "seconds": round(seed_seconds, 1)},
+        "tables_before": table_sizes(backend),
+        "before": await measure(db, contacts, args.iterations, rng),
+    }
+
+    result = await archive_appointments(
+        db, grace_days=args.grace_days, batch_size=args.batch_size
+    )
+    backend.conn.execute("ANALYZE")
+    report["archival"] = {
+        "moved": result.moved,
+        "batches": result.batches,
+        "seconds": round(result.seconds, 2),
+        "rows_per_second": round(result.rows_per_second),
+    }
+    report["tables_after"] = table_sizes(backend)
+    report["after"] = await measure(db, contacts, args.iterations, rng)
+    report["path"] = path
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    seeded = report["seeded"]
+    print(
+        f"Seeded {seeded['history']:,} historical + {seeded['upcoming']:,} upcoming "
+        f"appointments for {seeded['users']:,} callers in {seeded['seconds']}s"
+    )
+    archival = report["archival"]
+    print(
+        f"Archived {archival['moved']:,} rows in {archival['batches']} batches, "
+        f"{archival['seconds']}s ({archival['rows_per_second']:,} rows/s)"
+    )
+    print(
+        f"appointments: {report['tables_before']['appointments']:,} -> "
+        f"{report['tables_after']['appointments']:,} rows; "
+        f"archive: {report['tables_after']['appointments_archive']:,} rows\n"
+    )
+    print(f"{'read path':<26}{'before p50':>12}{'p95':>10}{'after p50':>12}{'p95':>10}")
+    for name, before in report["before"].items():
+        after = report["after"][name]
+        print(
+            f"{name:<26}{before['p50_us']:>10.0f}us{before['p95_us']:>8.0f}us"
+            f"{after['p50_us']:>10.0f}us{after['p95_us']:>8.0f}us"
+        )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--upcoming-days", type=int, default=30)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--grace-days", type=int, default=1)
+    parser.add_argument("--path", help="SQLite file (default: a temporary file)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the raw report")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
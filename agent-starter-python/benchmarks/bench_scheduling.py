@@ -0,0 +1,280 @@
+"""
+Availability benchmark: many resources over a long booking horizon.
+
+Seeds a SQLite database with bookings of mixed lengths (30, 60 and 90
+minutes) for every resource on every business day of the range, then answers
+"which N-minute windows are free" three ways:
+
+    per-candidate   one check_slot_available query per candidate start and
+                    resource, the way availability was checked before the
+                    scheduling engine (timed on a few days, extrapolated)
+    linear scan     one range query, then every candidate checked against
+                    every booking of the resource
+    engine          one range query, loaded into a SchedulingEngine and
+                    answered with one merge pass per resource
+
+Usage:
+    uv run python -m benchmarks.bench_scheduling --resources 50 --days 90
+    uv run python -m benchmarks.bench_scheduling --occupancy 0.8 --json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from src.config import AppConfig
+from src.database import DatabaseManager
+from src.scheduling import Booking, SchedulingEngine, to_minute
+from src.storage import SQLiteBackend
+
+DURATIONS = (30, 60, 90)
+
+
+# ==================== SEEDING ====================
+
+
+def seed(
+    backend: SQLiteBackend,
+    resources: List[str],
+    start: date,
+    days: int,
+    occupancy: float,
+    rng: random.Random,
+) -> int:
+    """
+    Fill each resource's business days with back-to-back or spaced bookings.
+
+    Walks each day from opening in 30-minute steps; at each step a booking of
+    a random length starts with probability ``occupancy`` (and the walk skips
+    past it), so no two bookings of a resource overlap.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    conn = backend.conn
+    conn.execute("BEGIN")
+    conn.execute(
+        "INSERT INTO user_profiles (contact_number, name, created_at, updated_at) "
+        "VALUES ('5550000000', 'Bench', ?, ?)",
+        (now, now),
+    )
+    rows = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+        for resource in resources:
+            minute = 9 * 60
+            while minute < 17 * 60:
+                duration = rng.choice(DURATIONS)
+                if minute + duration <= 17 * 60 and rng.random() < occupancy:
+                    rows.append(
+                        (
+                            str(uuid.uuid4()),
+                            str(day),
+                            f"{minute // 60:02d}:{minute % 60:02d}:00",
+                            resource,
+                            duration,
+                        )
+                    )
+                    minute += duration
+                else:
+                    minute += 30
+    conn.executemany(
+        "INSERT INTO appointments (id, contact_number, user_name, appointment_date, "
+        "appointment_time, resource_id, duration_minutes, status, created_at, "
+        "updated_at) VALUES (?, '5550000000', 'Bench', ?, ?, ?, ?, 'active', ?, ?)",
+        [(*row, now, now) for row in rows],
+    )
+    conn.execute("COMMIT")
+    return len(rows)
+
+
+# ==================== STRATEGIES ====================
+
+
+def linear_scan(
+    bookings: List[Booking],
+    starts: List[datetime],
+    resources: List[str],
+    duration: int,
+) -> int:
+    """Check every candidate against every booking of the resource."""
+    by_resource: Dict[str, List[tuple]] = {r: [] for r in resources}
+    for b in bookings:
+        if b.resource_id in by_resource:
+            begin = to_minute(b.start)
+            by_resource[b.resource_id].append((begin, begin + b.duration_minutes))
+    free = 0
+    for resource in resources:
+        intervals = by_resource[resource]
+        for start in starts:
+            s = to_minute(start)
+            if s + duration > to_minute(start.replace(hour=17, minute=0)):
+                continue
+            if all(e <= s or b >= s + duration for b, e in intervals):
+                free += 1
+    return free
+
+
+async def per_candidate(
+    db: DatabaseManager,
+    starts: List[datetime],
+    resources: List[str],
+    duration: int,
+) -> int:
+    """One check_slot_available query per candidate and resource."""
+    free = 0
+    for start in starts:
+        if start + timedelta(minutes=duration) > start.replace(hour=17, minute=0):
+            continue
+        for resource in resources:
+            available, _ = await db.check_slot_available(
+                start.date(), start.time(), duration, [resource]
+            )
+            free += available
+    return free
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    config = AppConfig()
+    config.resources = [{"id": f"r{i:02d}"} for i in range(args.resources)]
+    resources = config.resource_ids
+    start_day = date.today() + timedelta(days=1)
+    end_day = start_day + timedelta(days=args.days - 1)
+    slots = config.get_available_slots(
+        datetime.combine(start_day, datetime.min.time()), args.days
+    )
+    starts = [datetime.combine(s.slot_date, s.slot_time) for s in slots]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteBackend(os.path.join(tmp, "bench.db"))
+        seeded = seed(backend, resources, start_day, args.days, args.occupancy, rng)
+        db = DatabaseManager(backend)
+        subset = resources[: args.subset]
+        result: Dict[str, Any] = {
+            "resources": args.resources,
+            "days": args.days,
+            "candidate_starts": len(starts),
+            "bookings": seeded,
+        }
+
+        began = time.perf_counter()
+        bookings = await db.get_bookings(start_day, end_day)
+        result["range_query_ms"] = round((time.perf_counter() - began) * 1000, 1)
+
+        began = time.perf_counter()
+        engine = SchedulingEngine.from_config(config)
+        engine.load(bookings)
+        result["engine_load_ms"] = round((time.perf_counter() - began) * 1000, 1)
+
+        for duration in args.durations:
+            for label, resource_set in (("all", resources), ("subset", subset)):
+                began = time.perf_counter()
+                windows = engine.free_windows(starts, duration, resource_set)
+                engine_ms = (time.perf_counter() - began) * 1000
+
+                began = time.perf_counter()
+                scanned = linear_scan(bookings, starts, resource_set, duration)
+                scan_ms = (time.perf_counter() - began) * 1000
+                assert scanned == len(windows), (scanned, len(windows))
+
+                key = f"{duration}min_{label}"
+                result[f"{key}_free_windows"] = len(windows)
+                result[f"{key}_engine_ms"] = round(engine_ms, 1)
+                result[f"{key}_linear_scan_ms"] = round(scan_ms, 1)
+
+        # The per-candidate path is far too slow for the whole range; time a
+        # few days of it and extrapolate
+        sample_end = start_day + timedelta(days=args.baseline_days)
+        sample = [s for s in starts if s.date() < sample_end]
+        duration = args.durations[0]
+        began = time.perf_counter()
+        await per_candidate(db, sample, resources, duration)
+        sample_ms = (time.perf_counter() - began) * 1000
+        scale = len(starts) / max(1, len(sample))
+        result["per_candidate_queries"] = round(len(sample) * len(resources) * scale)
+        result[f"{duration}min_all_per_candidate_ms"] = round(sample_ms * scale, 1)
+
+    return result
+
+
+# ==================== REPORT ====================
+
+
+def print_report(result: Dict[str, Any], args: argparse.Namespace):
+    print(
+        f"{result['resources']} resources x {result['days']} days: "
+        f"{result['candidate_starts']} candidate starts, "
+        f"{result['bookings']} bookings seeded (occupancy {args.occupancy})\n"
+    )
+    print(
+        f"range query {result['range_query_ms']}ms, "
+        f"engine load {result['engine_load_ms']}ms\n"
+    )
+    print(f"{'query':<16}{'free':>8}{'engine ms':>12}{'scan ms':>12}")
+    for duration in args.durations:
+        for label in ("all", "subset"):
+            key = f"{duration}min_{label}"
+            name = f"{duration}min {label if label == 'all' else args.subset}"
+            print(
+                f"{name:<16}{result[f'{key}_free_windows']:>8}"
+                f"{result[f'{key}_engine_ms']:>12.1f}"
+                f"{result[f'{key}_linear_scan_ms']:>12.1f}"
+            )
+    duration = args.durations[0]
+    print(
+        f"\nper-candidate checks ({duration}min, all resources, extrapolated from "
+        f"{args.baseline_days} days): {result['per_candidate_queries']} queries, "
+        f"{result[f'{duration}min_all_per_candidate_ms']:.0f}ms"
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--resources", type=int, default=50)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument(
+        "--occupancy",
+        type=float,
+        default=0.6,
+        help="Chance a booking starts at each free half hour",
+    )
+    parser.add_argument(
+        "--durations", type=int, nargs="+", default=[30, 60], help="Window lengths"
+    )
+    parser.add_argument(
+        "--subset", type=int, default=5, help="Size of the smaller resource set"
+    )
+    parser.add_argument(
+        "--baseline-days",
+        type=int,
+        default=3,
+        help="Days of per-candidate checks to time before extrapolating",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the raw report")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.CRITICAL)
+    args = parse_args(argv)
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Contention benchmark: many callers wanting the same morning slots.
+
+Every simulated caller fetches slots, spends a turn hearing the options,
+picks one of the first few morning slots offered on the first day, spends a
+confirmation round (reading the slot back, confirming name and phone) and
+then books. When the booking fails because someone else got the slot first,
+the caller starts over with a new fetch and another confirmation round.
+
+Each run is repeated with three hold stores:
+    none      no holds; callers race for the slot at book time
+    memory    worker-memory holds (SLOT_HOLD_STORE=memory)
+    database  holds in the storage backend (SLOT_HOLD_STORE=database)
+
+With holds a caller calls hold_slot as soon as it picks a slot, before
+confirming, so a lost race costs one cheap tool call instead of a wasted
+confirmation round.
+
+Usage:
+    uv run python -m benchmarks.bench_slot_contention --callers 100
+    uv run python -m benchmarks.bench_slot_contention --confirm-ms 2000 --json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from datetime import date
+from datetime import time as dt_time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.loadtest import LatencyBackend, LoadTestAssistant, percentile
+from src.database import DatabaseManager
+from src.holds import DatabaseSlotHolds, LocalSlotHolds, SlotHolds, SlotKey
+from src.models import UserProfile
+from src.storage import InMemoryBackend
+
+HOLD_STORES = ("none", "memory", "database")
+
+
+class NoSlotHolds(SlotHolds):
+    """Baseline without holds: every acquire succeeds and nothing is hidden."""
+
+    async def acquire(
+        self, slot_date: date, slot_time: dt_time, holder: str, seats: int = 1
+    ) -> bool:
+        return True
+
+    async def release(self, slot_date: date, slot_time: dt_time, holder: str):
+        pass
+
+    async def held_by_others(
+        self, start_date: date, end_date: date, holder: str
+    ) -> Dict[SlotKey, int]:
+        return {}
+
+
+def make_holds(kind: str, db: DatabaseManager) -> SlotHolds:
+    if kind == "memory":
+        return LocalSlotHolds()
+    if kind == "database":
+        return DatabaseSlotHolds(db)
+    return NoSlotHolds()
+
+
+# ==================== CALLER ====================
+
+
+async def run_caller(
+    index: int,
+    db: DatabaseManager,
+    holds: SlotHolds,
+    args: argparse.Namespace,
+    rng: random.Random,
+) -> Dict[str, Any]:
+    """One caller's fetch / pick / confirm / book loop until booked or out of slots."""
+    assistant = LoadTestAssistant(db, session_id=f"contention-{index}")
+    assistant.holds = holds
+    assistant.current_user = UserProfile(contact_number=f"555{index:07d}", is_new=True)
+    use_holds = args.store != "none"
+    outcome = {"booked": False, "fetches": 0, "confirm_rounds": 0, "lost": 0}
+    started = time.perf_counter()
+
+    # Callers arrive spread over the first confirmation round
+    await asyncio.sleep(rng.uniform(0, args.confirm_ms / 1000))
+
+    for _ in range(args.max_attempts):
+        outcome["fetches"] += 1
+        offered = (await assistant.fetch_slots(None)).get("slots") or []
+        if not offered:
+            break
+        await asyncio.sleep(args.turn_ms / 1000)
+        day = offered[0]["date"]
+        morning = [s for s in offered if s["date"] == day and s["time"] < "12:00"]
+        slot = rng.choice((morning or offered)[: args.choices])
+
+        if use_holds:
+            held = await assistant.hold_slot(None, slot["date"], slot["time"])
+            if not held["success"]:
+                outcome["lost"] += 1
+                continue
+
+        outcome["confirm_rounds"] += 1
+        await asyncio.sleep(args.confirm_ms / 1000)
+
+        booked = await assistant.book_appointment(
+            None, slot["date"], slot["time"], f"Caller {index}"
+        )
+        if booked["success"]:
+            outcome["booked"] = True
+            break
+        outcome["lost"] += 1
+
+    outcome["seconds"] = time.perf_counter() - started
+    return outcome
+
+
+async def run_store(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every caller concurrently against one fresh database."""
+    rng = random.Random(args.seed)
+    backend = LatencyBackend(InMemoryBackend(), latency=args.db_latency_ms / 1000)
+    db = DatabaseManager(backend)
+    holds = make_holds(args.store, db)
+
+    outcomes = await asyncio.gather(
+        *(
+            run_caller(i, db, holds, args, random.Random(rng.random()))
+            for i in range(args.callers)
+        )
+    )
+
+    booked = [o for o in outcomes if o["booked"]]
+    seconds = [o["seconds"] for o in booked]
+    rounds = sum(o["confirm_rounds"] for o in outcomes)
+    return {
+        "store": args.store,
+        "booked": len(booked),
+        "fetches": sum(o["fetches"] for o in outcomes),
+        "confirm_rounds": rounds,
+        "wasted_confirm_rounds": rounds - len(booked),
+        "lost_races": sum(o["lost"] for o in outcomes),
+        "time_to_book_p50_s": round(percentile(seconds, 50), 2),
+        "time_to_book_p95_s": round(percentile(seconds, 95), 2),
+        "db_calls": backend.calls,
+    }
+
+
+# ==================== REPORT ====================
+
+
+def print_report(results: List[Dict[str, Any]], args: argparse.Namespace):
+    print(
+        f"{args.callers} callers, {args.choices} preferred morning slots each, "
+        f"{args.turn_ms}ms to pick, {args.confirm_ms}ms per confirmation round, "
+        f"{args.db_latency_ms}ms DB latency\n"
+    )
+    header = (
+        f"{'holds':<10}{'booked':>8}{'fetches':>9}{'confirms':>10}"
+        f"{'wasted':>8}{'p50 s':>8}{'p95 s':>8}{'DB calls':>10}"
+    )
+    print(header)
+    for r in results:
+        print(
+            f"{r['store']:<10}{r['booked']:>8}{r['fetches']:>9}"
+            f"{r['confirm_rounds']:>10}{r['wasted_confirm_rounds']:>8}"
+            f"{r['time_to_book_p50_s']:>8.2f}{r['time_to_book_p95_s']:>8.2f}"
+            f"{r['db_calls']:>10}"
+        )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--callers", type=int, default=100)
+    parser.add_argument(
+        "--choices", type=int, default=3, help="Morning slots each caller picks from"
+    )
+    parser.add_argument(
+        "--confirm-ms",
+        type=float,
+        default=500,
+        help="Time from picking a slot to booking it (read-back and confirmation)",
+    )
+    parser.add_argument(
+        "--turn-ms",
+        type=float,
+        default=150,
+        help="Time to hear the offered slots and pick one",
+    )
+    parser.add_argument("--db-latency-ms", type=float, default=20)
+    parser.add_argument("--max-attempts", type=int, default=50)
+    parser.add_argument(
+        "--stores", nargs="+", choices=HOLD_STORES, default=list(HOLD_STORES)
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the raw report")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.CRITICAL)
+    args = parse_args(argv)
+    results = []
+    for store in args.stores:
+        args.store = store
+        results.append(asyncio.run(run_store(args)))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Slot generation benchmark: per-slot loops against the SlotMatrix.
+
+Builds the fetch_slots pipeline for a long horizon and a fine grid (by
+default 180 days of 15-minute slots across 50 resources with bookings of
+mixed lengths) and times it two ways:
+
+    loop     a Slot record for every candidate, built day by day, then
+             SchedulingEngine.available and a per-slot hold filter, as
+             fetch_slots did before the slot matrix
+    matrix   AppConfig.slot_matrix, apply_bookings and remove_keys on numpy
+             masks, turning only the 20 slots returned into records
+
+Usage:
+    uv run python -m benchmarks.bench_slot_matrix
+    uv run python -m benchmarks.bench_slot_matrix --days 365 --resources 100 --json
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from benchmarks.loadtest import percentile
+from src.config import AppConfig
+from src.models import Slot
+from src.scheduling import Booking, SchedulingEngine
+
+DURATIONS = (15, 30, 60, 90)
+
+
+def make_config(args: argparse.Namespace) -> AppConfig:
+    config = AppConfig()
+    step = args.granularity
+    config.available_times = [
+        f"{m // 60:02d}:{m % 60:02d}" for m in range(9 * 60, 17 * 60, step)
+    ]
+    config.resources = [{"id": f"r{i:03d}"} for i in range(args.resources)]
+    return config
+
+
+def make_bookings(
+    config: AppConfig,
+    start: date,
+    days: int,
+    step: int,
+    occupancy: float,
+    rng: random.Random,
+) -> List[Booking]:
+    """Bookings of random lengths; each free step starts one with ``occupancy``."""
+    bookings = []
+    for offset in range(days):
+        day = datetime.combine(start + timedelta(days=offset), datetime.min.time())
+        if day.weekday() in config.excluded_weekdays:
+            continue
+        for resource in config.resource_ids:
+            minute = 9 * 60
+            while minute < 17 * 60:
+                length = rng.choice(DURATIONS)
+                if minute + length <= 17 * 60 and rng.random() < occupancy:
+                    bookings.append(
+                        Booking(resource, day + timedelta(minutes=minute), length)
+                    )
+                    minute += length
+                else:
+                    minute += step
+    return bookings
+
+
+def loop_slots(config: AppConfig, from_date: datetime, days: int) -> List[Slot]:
+    """Slot generation as a nested loop over days and times."""
+    times = [datetime.strptime(t, "%H:%M").time() for t in config.available_times]
+    slots = []
+    for offset in range(days):
+        day = from_date.date() + timedelta(days=offset)
+        if day.weekday() in config.excluded_weekdays:
+            continue
+        for slot_time in times:
+            slots.append(Slot(day, slot_time))
+    return slots
+
+
+def time_ms(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    samples, result = [], None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - began) * 1000)
+    return percentile(samples, 50), result
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    config = make_config(args)
+    start = date.today() + timedelta(days=1)
+    from_date = datetime.combine(start, datetime.min.time())
+    engine = SchedulingEngine.from_config(config)
+    engine.load(
+        make_bookings(config, start, args.days, args.granularity, args.occupancy, rng)
+    )
+    held: Set[Tuple[str, str]] = {
+        (str(start + timedelta(days=rng.randrange(args.days))), t)
+        for t in rng.sample(config.available_times, 4)
+    }
+    duration = args.duration
+
+    def loop() -> List[Slot]:
+        candidates = loop_slots(config, from_date, args.days)
+        free = engine.available(candidates, duration)
+        return [slot for slot in free if slot.key not in held]
+
+    def matrix() -> Tuple[int, List[Slot]]:
+        grid = config.slot_matrix(from_date, args.days)
+        grid.apply_bookings(engine, duration)
+        grid.remove_keys(held)
+        return grid.count(), grid.slots(20)
+
+    loop_ms, looped = time_ms(loop, args.repeat)
+    matrix_ms, (count, top) = time_ms(matrix, args.repeat)
+    assert count == len(looped) and top == looped[:20], "results differ"
+
+    return {
+        "days": args.days,
+        "granularity_minutes": args.granularity,
+        "resources": args.resources,
+        "grid_cells": args.days * len(config.available_times),
+        "bookings": sum(len(c) for c in engine.calendars.values()),
+        "free_slots": count,
+        "loop_ms": round(loop_ms, 1),
+        "matrix_ms": round(matrix_ms, 1),
+        "speedup": round(loop_ms / matrix_ms, 1) if matrix_ms else None,
+    }
+
+
+def print_report(result: Dict[str, Any]):
+    print(
+        f"{result['days']} days x {result['granularity_minutes']}-minute slots x "
+        f"{result['resources']} resources: {result['grid_cells']} grid cells, "
+        f"{result['bookings']} bookings, {result['free_slots']} free\n"
+    )
+    print(f"{'pipeline':<10}{'p50 ms':>10}")
+    print(f"{'loop':<10}{result['loop_ms']:>10.1f}")
+    print(f"{'matrix':<10}{result['matrix_ms']:>10.1f}")
+    print(f"\nspeedup: {result['speedup']}x")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--granularity", type=int, default=15, help="Slot minutes")
+    parser.add_argument("--resources", type=int, default=50)
+    parser.add_argument("--duration", type=int, default=30, help="Appointment length")
+    parser.add_argument("--occupancy", type=float, default=0.6)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the raw report")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.CRITICAL)
+    args = parse_args(argv)
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
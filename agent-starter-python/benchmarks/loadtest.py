@@ -0,0 +1,531 @@
+"""
+Load-test harness simulating many concurrent callers in one worker process.
+
+Every simulated caller runs the typical booking conversation (identify, fetch
+slots, book, list, end) against its own AppointmentAssistant. The database is
+the real DatabaseManager on the in-memory (or SQLite) storage backend, with
+injectable latency added to every round trip, so the numbers reflect the
+agent's own overhead rather than the network.
+
+Two modes are available:
+    tools    Call the assistant's tools directly, with a fixed think time per
+             turn standing in for STT, LLM and TTS.
+    session  Drive a real AgentSession with a scripted fake LLM that emits the
+             same tool calls. Turns are fed as text, so STT and TTS are
+             simulated by the per-turn think time as well.
+
+Usage:
+    uv run python -m benchmarks.loadtest --sessions 200 --db-latency-ms 20
+    uv run python -m benchmarks.loadtest --mode session --sessions 50 --json
+
+Pass --db-stall-rate to make a fraction of database calls stall for
+--db-stall-ms, and --resilient to route calls through resilience.GuardedBackend
+(deadlines, hedged reads, jittered retries, circuit breaker, coalesced reads) and compare the
+tail latencies.
+
+Pass --max-p95-ms to exit non-zero when any tool's p95 latency exceeds the
+threshold, which makes the harness usable as a regression check in CI.
+"""
+
+import argparse
+import ast
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import psutil
+from livekit.agents import AgentSession, llm, metrics
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS
+
+from src.agent import AppointmentAssistant
+from src.database import DatabaseManager
+from src.load_monitor import LoopLagMonitor
+from src.pricing import CostAttribution
+from src.resilience import CircuitBreaker, GuardedBackend
+from src.singleflight import SingleFlight
+from src.storage import InMemoryBackend, SQLiteBackend, StorageBackend
+
+logger = logging.getLogger("loadtest")
+
+
+# ==================== DATABASE ====================
+
+
+class LatencyBackend:
+    """Wraps a storage backend and delays every call to mimic a remote database."""
+
+    def __init__(
+        self,
+        inner: StorageBackend,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        stall_rate: float = 0.0,
+        stall: float = 0.0,
+    ):
+        """
+        Args:
+            inner: Backend that actually stores the data
+            latency: Base delay in seconds added to every call
+            jitter: Maximum extra random delay in seconds
+            stall_rate: Fraction of calls delayed by ``stall`` on top
+            stall: Extra delay of a stalled call, in seconds
+        """
+        self.inner = inner
+        self.name = f"{inner.name}+latency"
+        self.latency = latency
+        self.jitter = jitter
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.calls = 0
+
+    def __getattr__(self, name: str):
+        method = getattr(self.inner, name)
+
+        async def delayed(*args, **kwargs):
+            self.calls += 1
+            delay = self.latency + random.uniform(0, self.jitter)
+            if random.random() < self.stall_rate:
+                delay += self.stall
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return await method(*args, **kwargs)
+
+        return delayed
+
+
+class LoadTestAssistant(AppointmentAssistant):
+    """AppointmentAssistant that records frontend events instead of sending RPCs."""
+
+    def __init__(self, db: DatabaseManager, session_id: str):
+        super().__init__(db=db)
+        self.session_id = session_id
+        self.frontend_events: List[str] = []
+        self.usage_collector = metrics.UsageCollector()
+
+    def _get_session_id(self) -> str:
+        return self.session_id
+
+    async def _send_to_frontend(self, event_type: str, data: dict):
+        json.dumps(data)  # keep the serialization cost of the real RPC path
+        self.frontend_events.append(event_type)
+
+
+# ==================== SCRIPTED LLM ====================
+
+TOOL_DIRECTIVE = "__tool__"
+
+
+class ScriptedLLM(llm.LLM):
+    """
+    Fake LLM that turns directive user messages into tool calls.
+
+    A user message of the form ``__tool__ <name> <json args>`` yields a single
+    call to that tool; a tool result yields a short spoken reply. Token usage
+    is reported from message lengths so cost tracking sees realistic volumes.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+
+    @property
+    def model(self) -> str:
+        return "scripted"
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: Optional[List[llm.Tool]] = None,
+        conn_options=DEFAULT_API_CONNECT_OPTIONS,
+        **kwargs,
+    ) -> llm.LLMStream:
+        return ScriptedLLMStream(
+            self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options
+        )
+
+
+class ScriptedLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        if self._llm.latency > 0:
+            await asyncio.sleep(self._llm.latency)
+
+        last = self._chat_ctx.items[-1]
+        prompt_tokens = sum(len(str(item)) for item in self._chat_ctx.items) // 4
+        delta = llm.ChoiceDelta(role="assistant", content="Okay, done.")
+
+        if last.type == "message" and (last.text_content or "").startswith(
+            TOOL_DIRECTIVE
+        ):
+            _, name, arguments = last.text_content.split(" ", 2)
+            delta = llm.ChoiceDelta(
+                role="assistant",
+                tool_calls=[
+                    llm.FunctionToolCall(
+                        name=name, arguments=arguments, call_id=uuid.uuid4().hex
+                    )
+                ],
+            )
+
+        self._event_ch.send_nowait(
+            llm.ChatChunk(
+                id=uuid.uuid4().hex,
+                delta=delta,
+                usage=llm.CompletionUsage(
+                    completion_tokens=20,
+                    prompt_tokens=prompt_tokens,
+                    total_tokens=prompt_tokens + 20,
+                ),
+            )
+        )
+
+
+# ==================== MEASUREMENT ====================
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LoadStats:
+    """Collects per-tool latencies and outcomes across all simulated callers."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.failures: Dict[str, int] = defaultdict(int)
+        self.completed_sessions = 0
+        self.costs = CostAttribution()
+
+    def record(self, tool: str, duration: float, result: Any):
+        self.latencies[tool].append(duration)
+        if isinstance(result, dict) and not result.get("success", True):
+            self.failures[tool] += 1
+
+    def tool_report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            tool: {
+                "calls": len(values),
+                "failures": self.failures[tool],
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(max(values) * 1000, 2),
+            }
+            for tool, values in sorted(self.latencies.items())
+        }
+
+
+# ==================== CALLER SCENARIOS ====================
+
+
+def caller_plan(caller_index: int) -> List[tuple[str, Dict[str, Any]]]:
+    """The tool calls one simulated caller makes, in order."""
+    return [
+        ("identify_user", {"phone_number": f"555{caller_index:07d}"}),
+        ("fetch_slots", {"preferred_date": ""}),
+        ("book_appointment", {}),  # filled from the fetch_slots result
+        ("retrieve_appointments", {}),
+        ("end_conversation", {}),
+    ]
+
+
+def booking_args(caller_index: int, slots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Pick one of the offered slots; early slots are shared, so callers contend."""
+    slot = random.choice(slots) if slots else {"date": "", "time": ""}
+    return {
+        "appointment_date": slot["date"],
+        "appointment_time": slot["time"],
+        "user_name": f"Caller {caller_index}",
+    }
+
+
+async def run_caller_tools(
+    caller_index: int, db: DatabaseManager, stats: LoadStats, think_time: float
+):
+    """Run one caller by invoking the assistant's tools directly."""
+    assistant = LoadTestAssistant(db, session_id=f"load-{caller_index}")
+    slots: List[Dict[str, Any]] = []
+
+    for tool, args in caller_plan(caller_index):
+        await asyncio.sleep(think_time * random.uniform(0.5, 1.5))
+        if tool == "book_appointment":
+            args = booking_args(caller_index, slots)
+
+        start = time.perf_counter()
+        result = await getattr(assistant, tool)(None, **args)
+        stats.record(tool, time.perf_counter() - start, result)
+
+        if tool == "fetch_slots" and isinstance(result, dict):
+            slots = result.get("slots", [])
+
+    stats.completed_sessions += 1
+
+
+async def run_caller_session(
+    caller_index: int,
+    db: DatabaseManager,
+    stats: LoadStats,
+    think_time: float,
+    llm_latency: float,
+):
+    """Run one caller through a real AgentSession driven by the scripted LLM."""
+    assistant = LoadTestAssistant(db, session_id=f"load-{caller_index}")
+    slots: List[Dict[str, Any]] = []
+
+    async with (
+        ScriptedLLM(latency=llm_latency) as scripted_llm,
+        AgentSession(llm=scripted_llm) as session,
+    ):
+
+        @session.on("metrics_collected")
+        def _on_metrics(ev):
+            assistant.usage_collector.collect(ev.metrics)
+            assistant.cost_tracker.collect(ev.metrics)
+
+        await session.start(assistant)
+
+        for tool, args in caller_plan(caller_index):
+            await asyncio.sleep(think_time * random.uniform(0.5, 1.5))
+            if tool == "book_appointment":
+                args = booking_args(caller_index, slots)
+
+            start = time.perf_counter()
+            result = await session.run(
+                user_input=f"{TOOL_DIRECTIVE} {tool} {json.dumps(args)}"
+            )
+            duration = time.perf_counter() - start
+
+            output = None
+            for event in result.events:
+                if event.type == "function_call_output":
+                    output = event.item.output
+            try:
+                # Tool results reach the chat context as repr'd dicts
+                parsed = ast.literal_eval(output) if output else None
+            except (ValueError, SyntaxError):
+                parsed = None
+            stats.record(tool, duration, parsed)
+
+            if tool == "fetch_slots" and isinstance(parsed, dict):
+                slots = parsed.get("slots", [])
+
+    stats.costs.merge(assistant.cost_tracker)
+    stats.completed_sessions += 1
+
+
+async def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the configured number of callers and return the report."""
+    inner = SQLiteBackend() if args.backend == "sqlite" else InMemoryBackend()
+    backend = LatencyBackend(
+        inner,
+        latency=args.db_latency_ms / 1000,
+        jitter=args.db_jitter_ms / 1000,
+        stall_rate=args.db_stall_rate,
+        stall=args.db_stall_ms / 1000,
+    )
+    guarded = (
+        GuardedBackend(backend, CircuitBreaker(), flights=SingleFlight())
+        if args.resilient
+        else None
+    )
+    db = DatabaseManager(backend=guarded or backend)
+    stats = LoadStats()
+    sampler = LoopLagMonitor(interval=0.05, window=1_000_000, warn_ms=float("inf"))
+    process = psutil.Process()
+
+    rss_before = process.memory_info().rss
+    cpu_before = process.cpu_times()
+    wall_start = time.perf_counter()
+    sampler.start()
+
+    async def caller(index: int):
+        # Stagger arrivals over the ramp-up window
+        await asyncio.sleep(random.uniform(0, args.ramp_up))
+        if args.mode == "session":
+            await run_caller_session(
+                index, db, stats, args.think_ms / 1000, args.llm_latency_ms / 1000
+            )
+        else:
+            await run_caller_tools(index, db, stats, args.think_ms / 1000)
+
+    results = await asyncio.gather(
+        *(caller(i) for i in range(args.sessions)), return_exceptions=True
+    )
+    errors = [r for r in results if isinstance(r, Exception)]
+    for error in errors[:5]:
+        logger.error(f"Caller failed: {error!r}")
+
+    wall = time.perf_counter() - wall_start
+    await sampler.stop()
+    cpu_after = process.cpu_times()
+    rss_after = process.memory_info().rss
+
+    cpu_seconds = (cpu_after.user - cpu_before.user) + (
+        cpu_after.system - cpu_before.system
+    )
+    sessions = max(1, stats.completed_sessions)
+    tool_calls = sum(len(v) for v in stats.latencies.values())
+
+    return {
+        "mode": args.mode,
+        "sessions": args.sessions,
+        "completed_sessions": stats.completed_sessions,
+        "errors": len(errors),
+        "wall_seconds": round(wall, 3),
+        "throughput": {
+            "sessions_per_sec": round(stats.completed_sessions / wall, 2),
+            "tool_calls_per_sec": round(tool_calls / wall, 2),
+        },
+        "db_calls": backend.calls,
+        "tools": stats.tool_report(),
+        "resilience": guarded.snapshot() if guarded else None,
+        "tool_costs": stats.costs.report(),
+        "loop_lag_ms": {
+            "p50": round(percentile(list(sampler.samples), 50) * 1000, 2),
+            "p99": round(percentile(list(sampler.samples), 99) * 1000, 2),
+            "max": round(max(sampler.samples, default=0.0) * 1000, 2),
+        },
+        "cpu": {
+            "total_seconds": round(cpu_seconds, 3),
+            "ms_per_session": round(cpu_seconds / sessions * 1000, 3),
+            "utilization": round(cpu_seconds / wall, 3),
+        },
+        "rss_mb": {
+            "before": round(rss_before / 2**20, 1),
+            "after": round(rss_after / 2**20, 1),
+            "per_session_kb": round((rss_after - rss_before) / sessions / 1024, 1),
+        },
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """Print the report as a human readable table."""
+    print(
+        f"\n{report['completed_sessions']}/{report['sessions']} sessions "
+        f"({report['mode']} mode) in {report['wall_seconds']}s, "
+        f"{report['errors']} errors, {report['db_calls']} DB calls"
+    )
+    print(
+        f"Throughput: {report['throughput']['sessions_per_sec']} sessions/s, "
+        f"{report['throughput']['tool_calls_per_sec']} tool calls/s"
+    )
+    print(f"\n{'tool':<24}{'calls':>7}{'fail':>6}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for tool, row in report["tools"].items():
+        print(
+            f"{tool:<24}{row['calls']:>7}{row['failures']:>6}"
+            f"{row['p50_ms']:>9.1f}ms{row['p95_ms']:>8.1f}ms{row['p99_ms']:>8.1f}ms"
+        )
+    if report["mode"] == "session" and report["tool_costs"]:
+        print(
+            f"\n{'attributed to':<24}{'prompt':>9}{'compl':>7}{'llm':>10}{'cost':>12}"
+        )
+        for label, row in report["tool_costs"].items():
+            print(
+                f"{label:<24}{row['prompt_tokens']:>9}{row['completion_tokens']:>7}"
+                f"{row['llm_ms']:>8.1f}ms{row['cost']:>12.6f}"
+            )
+    if report["resilience"]:
+        methods = report["resilience"]["methods"].values()
+        totals = {
+            key: sum(row[key] for row in methods)
+            for key in ("timeouts", "retries", "hedges", "hedge_wins", "rejected")
+        }
+        print(
+            f"\nResilience: {totals['hedges']} hedges ({totals['hedge_wins']} won), "
+            f"{totals['retries']} retries, {totals['timeouts']} timeouts, "
+            f"{totals['rejected']} rejected, "
+            f"breaker {report['resilience']['breaker']['state']}"
+        )
+        coalescing = report["resilience"]["coalescing"]
+        print(
+            f"Coalescing: {coalescing['calls']} reads sent as "
+            f"{coalescing['executions']} queries ({coalescing['ratio']}x)"
+        )
+    lag = report["loop_lag_ms"]
+    print(
+        f"\nEvent-loop lag: p50 {lag['p50']}ms, p99 {lag['p99']}ms, max {lag['max']}ms"
+    )
+    cpu = report["cpu"]
+    print(
+        f"CPU: {cpu['total_seconds']}s total, {cpu['ms_per_session']}ms/session, "
+        f"{cpu['utilization'] * 100:.0f}% of one core"
+    )
+    rss = report["rss_mb"]
+    print(
+        f"RSS: {rss['before']}MB -> {rss['after']}MB "
+        f"({rss['per_session_kb']}KB/session)"
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--mode", choices=["tools", "session"], default="tools")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--db-latency-ms", type=float, default=20.0)
+    parser.add_argument("--db-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--db-stall-rate", type=float, default=0.0)
+    parser.add_argument("--db-stall-ms", type=float, default=1000.0)
+    parser.add_argument(
+        "--resilient",
+        action="store_true",
+        help="Call the database through resilience.GuardedBackend",
+    )
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--think-ms",
+        type=float,
+        default=50.0,
+        help="Simulated STT + LLM + TTS time between tool calls",
+    )
+    parser.add_argument(
+        "--ramp-up", type=float, default=1.0, help="Seconds over which callers arrive"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the raw report")
+    parser.add_argument(
+        "--max-p95-ms",
+        type=float,
+        default=None,
+        help="Exit with status 1 if any tool's p95 latency exceeds this",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    random.seed(args.seed)
+    logging.basicConfig(level=logging.WARNING)
+
+    report = asyncio.run(run_load_test(args))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if args.max_p95_ms is not None:
+        slow = {
+            tool: row["p95_ms"]
+            for tool, row in report["tools"].items()
+            if row["p95_ms"] > args.max_p95_ms
+        }
+        if slow:
+            print(f"\np95 budget of {args.max_p95_ms}ms exceeded: {slow}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,10 @@
+import asyncio
 import json
 import logging
 import os
-from datetime import datetime
+import uuid
+from dataclasses import replace
+from datetime import date, datetime, time, timedelta
 
 from dotenv import load_dotenv
 
@@ -9,7 +12,6 @@ from dotenv import load_dotenv
 AGENT_VERSION = (
     "v1.2.0-cost-tracking"  # Updated: Added real-time cost tracking with UsageCollector
 )
-from livekit import rtc
 from livekit.agents import (
     Agent,
     AgentServer,
@@ -25,43 +27,86 @@ from livekit.agents import (
     metrics,
     room_io,
 )
-from livekit.plugins import noise_cancellation, silero, tavus
+from livekit.plugins import silero, tavus
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
 try:
     # Try relative imports first (when running as module)
     from .config import AppConfig
     from .database import DatabaseManager
+    from .holds import SlotHolds, create_slot_holds
+    from .idempotency import IdempotencyCache, request_key
+    from .instrumentation import tracked_tool
+    from .journal import create_database, serve_worker_reads, serve_worker_shard
+    from .load_monitor import (
+        JobLagBoard,
+        LoopLagMonitor,
+        WorkerLoadMonitor,
+        worker_state_dir,
+    )
+    from .models import Appointment, UserProfile, display_date, display_time
+    from .noise_policy import NoiseCancellationPolicy, NoiseDecision, SessionCpuMeter
+    from .pricing import CostAttribution, get_pricing_registry
+    from .recurrence import Series, build_rule
+    from .resolver import AppointmentResolver, Resolution
+    from .scheduling import SchedulingEngine
+    from .telemetry import TelemetryStream
     from .utils import (
         calculate_costs,
-        format_appointment_display,
         format_phone_number,
         parse_date,
         parse_time,
         validate_phone_number,
     )
+    from .waitlist import WaitlistEntry, freed_starts
 except ImportError:
     # Fall back to absolute imports (when running directly)
     from config import AppConfig
     from database import DatabaseManager
+    from holds import SlotHolds, create_slot_holds
+    from idempotency import IdempotencyCache, request_key
+    from instrumentation import tracked_tool
+    from journal import create_database, serve_worker_reads, serve_worker_shard
+    from load_monitor import (
+        JobLagBoard,
+        LoopLagMonitor,
+        WorkerLoadMonitor,
+        worker_state_dir,
+    )
+    from models import Appointment, UserProfile, display_date, display_time
+    from noise_policy import NoiseCancellationPolicy, NoiseDecision, SessionCpuMeter
+    from pricing import CostAttribution, get_pricing_registry
+    from recurrence import Series, build_rule
+    from resolver import AppointmentResolver, Resolution
+    from scheduling import SchedulingEngine
+    from telemetry import TelemetryStream
     from utils import (
         calculate_costs,
-        format_appointment_display,
         format_phone_number,
         parse_date,
         parse_time,
         validate_phone_number,
     )
+    from waitlist import WaitlistEntry, freed_starts
 
 logger = logging.getLogger(__name__)
 
+# Models used by the voice pipeline; also recorded with each cost breakdown
+LLM_MODEL = "openai/gpt-4o-mini"
+STT_MODEL = "deepgram/nova-2"
+TTS_MODEL = "cartesia/sonic-3"
+TTS_VOICE = "9626c31c-bec5-4cca-baa8-f8ba9e84c8bc"
+PIPELINE_MODELS = {"llm": LLM_MODEL, "stt": STT_MODEL, "tts": TTS_MODEL}
+
 load_dotenv(".env.local")
 
 
 class AppointmentAssistant(Agent):
     """AI Voice Agent for booking and managing appointments."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self, db: DatabaseManager | None = None, holds: SlotHolds | None = None
+    ) -> None:
         super().__init__(
             instructions="""You are a friendly and professional appointment booking assistant named Alex.
 
@@ -78,8 +123,10 @@ Important guidelines:
    - First, identify the user by asking for their phone number
    - Understand their preferred date and time
    - Check availability
+   - As soon as the user picks a slot, hold it with hold_slot while you confirm
    - Confirm ALL details (name, date, time, phone) before finalizing
    - Provide clear confirmation after booking
+   - For a repeating appointment (e.g. "every Tuesday at 10 for six weeks"), use book_recurring_appointment once instead of booking each date
 
 2. Communication style:
    - You're speaking, not writing - avoid complex punctuation, emojis, or special formatting
@@ -89,20 +136,28 @@ Important guidelines:
 
 3. Error handling:
    - If a slot is unavailable, offer alternatives
+   - If nothing suitable is free, offer to put them on the waitlist with join_waitlist; they are booked automatically when a matching slot frees up
    - If you don't understand something, ask for clarification
    - Be apologetic but helpful when issues arise
 
 Remember: Your goal is to make appointment booking easy and pleasant for users.""",
         )
-        self.db = DatabaseManager()
+        self.db = db or create_database()
         self.config = AppConfig()
         self.conversation_history = []
-        self.current_user = None
+        self.current_user: UserProfile | None = None
         self.usage_collector: metrics.UsageCollector | None = (
             None  # Will be set when session starts
         )
+        self.noise_decision: NoiseDecision | None = None  # Set by the NC selector
+        self.cpu_meter: SessionCpuMeter | None = None
+        self.cost_tracker = CostAttribution(models=PIPELINE_MODELS)
+        self.idempotency = IdempotencyCache()  # Replays repeated write tool calls
+        self.holds = holds or create_slot_holds(self.db)
+        self.hold_id = uuid.uuid4().hex  # Identifies this session's slot holds
 
     @function_tool()
+    @tracked_tool
     async def identify_user(
         self,
         context: RunContext,
@@ -135,29 +190,22 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
 
             if profile:
                 # Existing user
-                self.current_user = {
-                    "contact_number": formatted_phone,
-                    "name": profile.get("name"),
-                    "email": profile.get("email"),
-                    "is_new": False,
-                }
+                self.current_user = profile
 
                 return {
                     "success": True,
-                    "user": self.current_user,
-                    "message": f"Welcome back, {profile.get('name', 'valued customer')}! How can I help you today?",
+                    "user": profile.to_dict(),
+                    "message": f"Welcome back, {profile.name or 'valued customer'}! How can I help you today?",
                 }
             else:
                 # New user
-                self.current_user = {
-                    "contact_number": formatted_phone,
-                    "name": None,
-                    "is_new": True,
-                }
+                self.current_user = UserProfile(
+                    contact_number=formatted_phone, is_new=True
+                )
 
                 return {
                     "success": True,
-                    "user": self.current_user,
+                    "user": self.current_user.to_dict(),
                     "message": "I don't have your information yet. May I have your name please?",
                 }
 
@@ -170,10 +218,13 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
             }
 
     @function_tool()
+    @tracked_tool
     async def fetch_slots(
         self,
         context: RunContext,
         preferred_date: str = "",
+        appointment_type: str = "",
+        provider: str = "",
     ) -> dict:
         """Fetch available appointment slots.
 
@@ -181,71 +232,75 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
 
         Args:
             preferred_date: Optional preferred date (e.g., "tomorrow", "next Monday", "January 25")
+            appointment_type: Optional kind of appointment (e.g., "consultation"); sets its length
+            provider: Optional provider or room the user asked for
         """
         try:
             logger.info(f"Fetching slots for date: {preferred_date}")
 
-            # Get all available slots from config
-            all_slots = self.config.get_available_slots()
-
-            # Filter out already booked slots by checking database
-            available_slots = []
-            for slot in all_slots:
-                slot_date = datetime.strptime(slot["date"], "%Y-%m-%d").date()
-                slot_time = datetime.strptime(slot["time"], "%H:%M").time()
-                is_available, _ = await self.db.check_slot_available(
-                    slot_date, slot_time
+            resources = self.config.find_resources(provider)
+            if not resources:
+                return self._unknown_provider_response(provider)
+            duration = self.config.duration_for(appointment_type)
+
+            # Grid of candidate slots from config, as a day x time mask
+            matrix = self.config.slot_matrix()
+
+            # Keep slots where some resource is free for the whole appointment
+            # and other callers' holds leave a place, with a single range
+            # query each; only the slots returned become records
+            span = matrix.date_range()
+            if span:
+                first, last = span
+                bookings, held = await asyncio.gather(
+                    self.db.get_bookings(first, last),
+                    self.holds.held_by_others(first, last, self.hold_id),
                 )
-                if is_available:
-                    available_slots.append(slot)
+                engine = SchedulingEngine.from_config(self.config)
+                engine.load(bookings)
+                matrix.apply_bookings(engine, duration, resources)
+                matrix.remove_held(held)
 
-            logger.info(
-                f"After filtering booked slots: {len(available_slots)} available"
-            )
+            logger.info(f"After filtering booked slots: {matrix.count()} available")
 
             # Filter by preferred date if provided
-            filtered_slots = available_slots
+            wanted = None
             if preferred_date and preferred_date.strip():
                 parsed_date = parse_date(preferred_date)
                 if parsed_date:
-                    date_str = parsed_date.strftime("%Y-%m-%d")
-                    filtered_slots = [
-                        s for s in available_slots if s["date"] == date_str
-                    ]
+                    wanted = parsed_date.date()
                     logger.info(
-                        f"Filtered to {len(filtered_slots)} slots for date {date_str}"
+                        f"Filtered to {matrix.count(wanted)} slots for date {wanted}"
                     )
 
+            # Return up to 20 slots for better availability
+            total = matrix.count(wanted)
+            filtered_slots = matrix.slots(20, on=wanted)
+
             # If no slots found for specific date, return next available slots
             if not filtered_slots:
                 if preferred_date:
                     logger.warning(
                         f"No slots found for {preferred_date}, returning next available"
                     )
-                    filtered_slots = available_slots[:15]  # Return next 15 slots
+                    filtered_slots = matrix.slots(15)  # Return next 15 slots
+                    total = len(filtered_slots)
                 else:
                     return {
                         "success": False,
                         "message": "I don't have any available slots at the moment. Please check back later.",
                     }
 
-            # Format slots for voice response - return up to 20 slots
-            slot_list = []
-            for slot in filtered_slots[
-                :20
-            ]:  # Return up to 20 slots for better availability
-                slot_list.append(
-                    {
-                        "date": slot["date"],
-                        "time": slot["time"],
-                        "display": f"{slot['display_date']} at {slot['display_time']}",
-                    }
-                )
+            # Format slots for voice response, with the places left at each
+            slot_list = [slot.to_dict() for slot in filtered_slots]
+            if span:
+                for slot, remaining in zip(slot_list, matrix.remaining(filtered_slots)):
+                    slot["remaining"] = remaining
 
             return {
                 "success": True,
                 "slots": slot_list,
-                "total_available": len(filtered_slots),
+                "total_available": total,
                 "message": f"I have {len(slot_list)} available slots to show you. Here are the options:",
             }
 
@@ -258,12 +313,92 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
             }
 
     @function_tool()
+    @tracked_tool
+    async def hold_slot(
+        self,
+        context: RunContext,
+        appointment_date: str,
+        appointment_time: str,
+        appointment_type: str = "",
+    ) -> dict:
+        """Hold a slot for the user for a couple of minutes while you confirm their details.
+
+        Call this as soon as the user picks a slot, before confirming the booking,
+        so other callers are not offered it. book_appointment turns the hold into
+        the booking.
+
+        Args:
+            appointment_date: Date of the slot (e.g., "2026-01-25", "tomorrow")
+            appointment_time: Time of the slot (e.g., "2pm", "14:00")
+            appointment_type: Optional kind of appointment (e.g., "consultation")
+        """
+        try:
+            logger.info(f"Holding slot {appointment_date} at {appointment_time}")
+
+            parsed_date = parse_date(appointment_date)
+            parsed_time = parse_time(appointment_time)
+            if not parsed_date or not parsed_time:
+                return {
+                    "success": False,
+                    "error": "Invalid date or time",
+                    "message": "I couldn't understand that date and time. Could you say it again?",
+                }
+
+            date_str = parsed_date.strftime("%Y-%m-%d")
+            if not self.config.is_valid_slot(date_str, parsed_time):
+                return {
+                    "success": False,
+                    "error": "Invalid slot",
+                    "message": "That time slot isn't available in our system. Would you like to hear available times?",
+                }
+
+            appt_date = parsed_date.date()
+            appt_time = datetime.strptime(parsed_time, "%H:%M").time()
+            places = await self._free_places(
+                appt_date,
+                appt_time,
+                self.config.duration_for(appointment_type),
+                self.config.resource_ids,
+            )
+            if not places:
+                return {
+                    "success": False,
+                    "error": "Slot booked",
+                    "message": "Sorry, that time slot was just booked. Would you like to choose a different time?",
+                }
+
+            if not await self.holds.acquire(
+                appt_date, appt_time, self.hold_id, seats=places
+            ):
+                return self._slot_held_response()
+
+            minutes = max(1, round(self.holds.ttl / 60))
+            return {
+                "success": True,
+                "date": date_str,
+                "time": parsed_time,
+                "hold_seconds": self.holds.ttl,
+                "message": f"I'm holding that slot for you for the next {minutes} minutes while we confirm your details.",
+            }
+
+        except Exception as e:
+            logger.error(f"Error holding slot: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "message": "I couldn't hold that slot, but we can still try to book it.",
+            }
+
+    @function_tool()
+    @tracked_tool
     async def book_appointment(
         self,
         context: RunContext,
         appointment_date: str,
         appointment_time: str,
         user_name: str,
+        appointment_type: str = "",
+        provider: str = "",
     ) -> dict:
         """Book an appointment for the user.
 
@@ -274,6 +409,8 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
             appointment_date: Date for appointment (e.g., "2026-01-25", "tomorrow", "next Monday")
             appointment_time: Time for appointment (e.g., "2pm", "14:00", "2:30 PM")
             user_name: User's full name
+            appointment_type: Optional kind of appointment (e.g., "consultation"); sets its length
+            provider: Optional provider or room the user asked for; any free one otherwise
         """
         try:
             logger.info(
@@ -281,7 +418,7 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
             )
 
             # Check if user is identified
-            if not self.current_user or not self.current_user.get("contact_number"):
+            if not self.current_user:
                 return {
                     "success": False,
                     "error": "User not identified",
@@ -314,39 +451,80 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
                     "message": "That time slot isn't available in our system. Would you like to hear available times?",
                 }
 
-            # Create appointment
-            contact_num = self.current_user["contact_number"]
-            if not contact_num:
-                raise ValueError("Contact number is required")
-
-            appointment = await self.db.create_appointment(
-                contact_number=contact_num,
+            resources = self.config.find_resources(provider)
+            if not resources:
+                return self._unknown_provider_response(provider)
+
+            appt_date = parsed_date.date()
+            appt_time = datetime.strptime(parsed_time, "%H:%M").time()
+            duration = self.config.duration_for(appointment_type)
+            if not SchedulingEngine.from_config(self.config).fits(
+                datetime.combine(appt_date, appt_time), duration
+            ):
+                return self._past_closing_response()
+
+            # A repeated call (e.g. an LLM retry) gets the first result back
+            request = request_key(
+                "book_appointment",
+                contact_number=self.current_user.contact_number,
+                appointment_date=date_str,
+                appointment_time=parsed_time,
                 user_name=user_name,
-                appt_date=parsed_date.date(),
-                appt_time=datetime.strptime(parsed_time, "%H:%M").time(),
+                duration_minutes=duration,
+                resources=",".join(resources),
             )
 
-            # Update current user name if it's a new user
-            if self.current_user.get("is_new"):
-                self.current_user["name"] = user_name
+            async def book() -> dict:
+                # Take (or keep) a hold on one of the places, unless other
+                # callers mid-booking hold every place bookings left free
+                places = await self._free_places(
+                    appt_date, appt_time, duration, resources
+                )
+                if places and not await self.holds.acquire(
+                    appt_date, appt_time, self.hold_id, seats=places
+                ):
+                    return self._slot_held_response()
+
+                # Create appointment
+                appointment = await self.db.create_appointment(
+                    contact_number=self.current_user.contact_number,
+                    user_name=user_name,
+                    appt_date=appt_date,
+                    appt_time=appt_time,
+                    idempotency_key=request,
+                    duration_minutes=duration,
+                    resource_ids=resources,
+                    capacities=self.config.capacities,
+                )
 
-            # Send notification to frontend via RPC
-            await self._send_to_frontend(
-                "appointment_booked",
-                {
-                    "appointment_id": str(appointment["id"]),
-                    "user_name": user_name,
-                    "date": date_str,
-                    "time": parsed_time,
-                    "display": format_appointment_display(appointment),
-                },
-            )
+                # The booking now blocks the slot; the hold is done
+                await self.holds.release(appt_date, appt_time, self.hold_id)
 
-            return {
-                "success": True,
-                "appointment": appointment,
-                "message": f"Perfect! I've booked your appointment for {format_appointment_display(appointment)}. You'll receive a confirmation shortly.",
-            }
+                # Update current user name if it's a new user
+                if self.current_user.is_new:
+                    self.current_user = replace(self.current_user, name=user_name)
+
+                # Send notification to frontend via RPC
+                await self._send_to_frontend(
+                    "appointment_booked",
+                    {
+                        "appointment_id": appointment.id,
+                        "user_name": user_name,
+                        "date": date_str,
+                        "time": parsed_time,
+                        "display": appointment.display,
+                    },
+                )
+
+                return {
+                    "success": True,
+                    "appointment": appointment.to_dict(),
+                    "message": f"Perfect! I've booked your appointment for {appointment.display}. You'll receive a confirmation shortly.",
+                }
+
+            return await self.idempotency.run(
+                request, book, cache_if=lambda result: result["success"]
+            )
 
         except ValueError as ve:
             # This catches slot unavailability from database
@@ -365,6 +543,306 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
             }
 
     @function_tool()
+    @tracked_tool
+    async def book_recurring_appointment(
+        self,
+        context: RunContext,
+        start_date: str,
+        appointment_time: str,
+        user_name: str,
+        frequency: str = "weekly",
+        occurrences: int = 0,
+        until: str = "",
+        appointment_type: str = "",
+        provider: str = "",
+        skip_taken: bool = False,
+    ) -> dict:
+        """Book a repeating appointment, such as every Tuesday at 10 for six weeks.
+
+        Use this instead of booking each date separately. Confirm the details with the user first.
+        IMPORTANT: Make sure the user is identified (phone number collected) before booking.
+
+        Args:
+            start_date: Date of the first appointment (e.g., "next Tuesday", "2026-01-27")
+            appointment_time: Time of every appointment (e.g., "10am", "14:00")
+            user_name: User's full name
+            frequency: "daily", "weekly", "biweekly" or "monthly"
+            occurrences: How many appointments in total (e.g., 6); or give until instead
+            until: Date of the last possible appointment (e.g., "end of March")
+            appointment_type: Optional kind of appointment (e.g., "consultation"); sets its length
+            provider: Optional provider or room the user asked for
+            skip_taken: Book the free dates even if some are taken (only after the user agreed)
+        """
+        try:
+            logger.info(
+                f"Booking {frequency} series for {user_name} from {start_date} at {appointment_time}"
+            )
+
+            if not self.current_user:
+                return {
+                    "success": False,
+                    "error": "User not identified",
+                    "message": "I need your phone number first before I can book an appointment. Could you provide that?",
+                }
+
+            parsed_date = parse_date(start_date)
+            parsed_time = parse_time(appointment_time)
+            if not parsed_date or not parsed_time:
+                return {
+                    "success": False,
+                    "error": "Invalid date or time",
+                    "message": "I couldn't understand that date and time. Could you say it again?",
+                }
+
+            date_str = parsed_date.strftime("%Y-%m-%d")
+            if not self.config.is_valid_slot(date_str, parsed_time):
+                return {
+                    "success": False,
+                    "error": "Invalid slot",
+                    "message": "That time slot isn't available in our system. Would you like to hear available times?",
+                }
+
+            resources = self.config.find_resources(provider)
+            if not resources:
+                return self._unknown_provider_response(provider)
+
+            start = datetime.combine(
+                parsed_date.date(), datetime.strptime(parsed_time, "%H:%M").time()
+            )
+            duration = self.config.duration_for(appointment_type)
+            if not SchedulingEngine.from_config(self.config).fits(start, duration):
+                return self._past_closing_response()
+
+            until_date = parse_date(until) if until else None
+            open_days = [d for d in range(7) if d not in self.config.excluded_weekdays]
+            try:
+                rule = build_rule(
+                    frequency,
+                    start,
+                    count=occurrences or None,
+                    until=until_date.date() if until_date else None,
+                    weekdays=open_days,
+                )
+            except ValueError as ve:
+                return {
+                    "success": False,
+                    "error": str(ve),
+                    "message": "How often should it repeat, and how many times or until when?",
+                }
+
+            series = Series(
+                id=None,
+                contact_number=self.current_user.contact_number,
+                user_name=user_name,
+                rule=rule,
+                start=start,
+                duration_minutes=duration,
+                resource_id=resources[0] if provider else None,
+            )
+            horizon = date.today() + timedelta(days=self.config.days_ahead)
+
+            request = request_key(
+                "book_recurring_appointment",
+                contact_number=self.current_user.contact_number,
+                start=start.isoformat(),
+                rule=rule,
+                user_name=user_name,
+                duration_minutes=duration,
+                resources=",".join(resources),
+                skip_taken=skip_taken,
+            )
+
+            async def book() -> dict:
+                result = await self.db.create_series(
+                    series,
+                    horizon,
+                    resource_ids=resources,
+                    capacities=self.config.capacities,
+                    skip_conflicts=skip_taken,
+                    valid_slot=self.config.is_valid_slot,
+                )
+                taken = [
+                    f"{display_date(start.date())} at {display_time(start.time())}"
+                    for start in result.conflicts
+                ]
+                if not result.saved:
+                    return {
+                        "success": False,
+                        "error": "Dates taken",
+                        "taken": taken,
+                        "message": f"Some of those dates are already booked or we're closed then: {', '.join(taken)}. Would you like me to book the other dates anyway, or try a different time?",
+                    }
+
+                if self.current_user.is_new:
+                    self.current_user = replace(self.current_user, name=user_name)
+
+                stored = result.series
+                # The frontend lists appointments, so each occurrence is one
+                await asyncio.gather(
+                    *(
+                        self._send_to_frontend(
+                            "appointment_booked",
+                            {
+                                "appointment_id": a.id,
+                                "user_name": a.user_name,
+                                "date": a.appointment_date.isoformat(),
+                                "time": a.appointment_time.strftime("%H:%M"),
+                                "display": a.display,
+                            },
+                        )
+                        for a in result.booked
+                    )
+                )
+
+                # Occurrences past the horizon are booked later by the daily job
+                total = sum(1 for _ in stored.occurrences())
+                later = total - len(result.booked) - len(taken)
+                message = f"Done! I've booked you {stored.describe()}."
+                if result.booked:
+                    message += f" The first one is {result.booked[0].display}."
+                if later > 0:
+                    message += f" The remaining {later} will be added to your calendar as they come up."
+                if taken:
+                    message += (
+                        f" I skipped {', '.join(taken)}, which were already booked"
+                        " or fall when we're closed."
+                    )
+                return {
+                    "success": True,
+                    "series": stored.to_dict(upcoming=6),
+                    "appointments": [a.to_dict() for a in result.booked],
+                    "taken": taken,
+                    "message": message,
+                }
+
+            return await self.idempotency.run(
+                request, book, cache_if=lambda result: result["success"]
+            )
+
+        except ValueError as ve:
+            logger.warning(f"Series not available: {ve}")
+            return {
+                "success": False,
+                "error": str(ve),
+                "message": "Sorry, one of those times was just booked. Would you like to try again or pick a different time?",
+            }
+        except Exception as e:
+            logger.error(f"Error booking recurring appointment: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "message": "I had trouble booking those appointments. Could you try again?",
+            }
+
+    @function_tool()
+    @tracked_tool
+    async def join_waitlist(
+        self,
+        context: RunContext,
+        earliest_date: str,
+        user_name: str,
+        latest_date: str = "",
+        earliest_time: str = "",
+        latest_time: str = "",
+        appointment_type: str = "",
+        provider: str = "",
+    ) -> dict:
+        """Put the user on the waitlist when no suitable slot is free.
+
+        Use this when the user would rather wait for a slot to open up than
+        pick another time. When an appointment within their dates and times
+        is cancelled or moved, they are booked into it automatically.
+
+        Args:
+            earliest_date: First date that works for the user
+            user_name: User's full name
+            latest_date: Last date that works (empty: the same day)
+            earliest_time: Earliest start time that works (empty: any)
+            latest_time: Latest start time that works (empty: any)
+            appointment_type: Kind of appointment, e.g. "consultation" (empty: standard)
+            provider: Provider or room the user asked for (empty: any)
+        """
+        try:
+            logger.info(
+                f"Adding {user_name} to the waitlist from {earliest_date} to {latest_date}"
+            )
+
+            # Check if user is identified
+            if not self.current_user:
+                return {
+                    "success": False,
+                    "error": "User not identified",
+                    "message": "I need your phone number first. What's your phone number?",
+                }
+
+            first = parse_date(earliest_date)
+            last = parse_date(latest_date) if latest_date else first
+            opens = parse_time(earliest_time) if earliest_time else None
+            closes = parse_time(latest_time) if latest_time else None
+            if (
+                not first
+                or not last
+                or (earliest_time and not opens)
+                or (latest_time and not closes)
+            ):
+                return {
+                    "success": False,
+                    "error": "Invalid date or time",
+                    "message": "I couldn't understand those dates or times. Could you say them again?",
+                }
+            # "Between Friday and Wednesday" means the same range
+            if last < first:
+                first, last = last, first
+            if opens and closes and closes < opens:
+                opens, closes = closes, opens
+
+            resources = self.config.find_resources(provider)
+            if not resources:
+                return self._unknown_provider_response(provider)
+
+            entry = WaitlistEntry(
+                id=None,
+                contact_number=self.current_user.contact_number,
+                user_name=user_name,
+                earliest_date=first.date(),
+                latest_date=last.date(),
+                earliest_time=time.fromisoformat(opens) if opens else None,
+                latest_time=time.fromisoformat(closes) if closes else None,
+                duration_minutes=self.config.duration_for(appointment_type),
+                resource_id=resources[0] if provider else None,
+            )
+
+            request = request_key(
+                "join_waitlist",
+                contact_number=self.current_user.contact_number,
+                **entry.to_row(),
+            )
+
+            async def join() -> dict:
+                stored = await self.db.join_waitlist(entry)
+                if self.current_user.is_new:
+                    self.current_user = replace(self.current_user, name=user_name)
+
+                return {
+                    "success": True,
+                    "waitlist": stored.to_dict(),
+                    "message": f"You're on the waitlist for {stored.describe()}. If a matching slot opens up, I'll book it for you automatically.",
+                }
+
+            return await self.idempotency.run(
+                request, join, cache_if=lambda result: result["success"]
+            )
+
+        except Exception as e:
+            logger.error(f"Error joining waitlist: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "message": "I had trouble adding you to the waitlist. Could you try again?",
+            }
+
+    @function_tool()
+    @tracked_tool
     async def retrieve_appointments(
         self,
         context: RunContext,
@@ -377,7 +855,7 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
             logger.info("Retrieving appointments for current user")
 
             # Check if user is identified
-            if not self.current_user or not self.current_user.get("contact_number"):
+            if not self.current_user:
                 return {
                     "success": False,
                     "error": "User not identified",
@@ -386,7 +864,7 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
 
             # Get appointments from database
             appointments = await self.db.get_user_appointments(
-                self.current_user["contact_number"]
+                self.current_user.contact_number, from_date=date.today()
             )
 
             if not appointments:
@@ -397,16 +875,15 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
                 }
 
             # Format appointments for voice response
-            appt_list = []
-            for appt in appointments:
-                appt_list.append(
-                    {
-                        "id": str(appt["id"]),
-                        "date": appt["appointment_date"],
-                        "time": appt["appointment_time"],
-                        "display": format_appointment_display(appt),
-                    }
-                )
+            appt_list = [
+                {
+                    "id": appt.id,
+                    "date": appt.appointment_date.isoformat(),
+                    "time": appt.appointment_time.isoformat(),
+                    "display": appt.display,
+                }
+                for appt in appointments
+            ]
 
             return {
                 "success": True,
@@ -423,6 +900,7 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
             }
 
     @function_tool()
+    @tracked_tool
     async def cancel_appointment(
         self,
         context: RunContext,
@@ -431,16 +909,17 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
         """Cancel a specific appointment.
 
         Use this when the user wants to cancel an appointment.
-        The appointment can be identified by its ID, date, or time.
+        The appointment can be identified by its ID, date, weekday, time or
+        position, e.g. "the 2pm one", "Monday's" or "the second one".
 
         Args:
-            appointment_identifier: The appointment ID, date, or description to cancel
+            appointment_identifier: The appointment ID, or the user's description of it
         """
         try:
             logger.info(f"Cancelling appointment: {appointment_identifier}")
 
             # Check if user is identified
-            if not self.current_user or not self.current_user.get("contact_number"):
+            if not self.current_user:
                 return {
                     "success": False,
                     "error": "User not identified",
@@ -449,7 +928,7 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
 
             # Get user's appointments
             appointments = await self.db.get_user_appointments(
-                self.current_user["contact_number"]
+                self.current_user.contact_number, from_date=date.today()
             )
 
             if not appointments:
@@ -458,52 +937,33 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
                     "message": "You don't have any appointments to cancel.",
                 }
 
-            # Try to find matching appointment
-            target_appointment = None
-
-            # First, try exact ID match
-            for appt in appointments:
-                if str(appt["id"]) == appointment_identifier:
-                    target_appointment = appt
-                    break
+            # Resolve "the 2pm one", "the second one", a date or an ID
+            resolution = AppointmentResolver(appointments).resolve(
+                appointment_identifier
+            )
+            target_appointment = resolution.match
 
-            # If not found, try date matching
             if not target_appointment:
-                parsed_date = parse_date(appointment_identifier)
-                if parsed_date:
-                    date_str = parsed_date.strftime("%Y-%m-%d")
-                    for appt in appointments:
-                        if appt["appointment_date"] == date_str:
-                            target_appointment = appt
-                            break
-
-            # If still not found and only one appointment, assume it's that one
-            if not target_appointment and len(appointments) == 1:
-                target_appointment = appointments[0]
-
-            if not target_appointment:
-                return {
-                    "success": False,
-                    "message": "I couldn't find that appointment. Could you specify which one you'd like to cancel?",
-                }
+                return self._unresolved_appointment(resolution, "cancel")
 
             # Cancel the appointment
-            success = await self.db.cancel_appointment(str(target_appointment["id"]))
+            success = await self.db.cancel_appointment(target_appointment.id)
 
             if success:
                 # Notify frontend
                 await self._send_to_frontend(
                     "appointment_cancelled",
                     {
-                        "appointment_id": str(target_appointment["id"]),
-                        "date": target_appointment["appointment_date"],
-                        "time": target_appointment["appointment_time"],
+                        "appointment_id": target_appointment.id,
+                        "date": target_appointment.appointment_date.isoformat(),
+                        "time": target_appointment.appointment_time.isoformat(),
                     },
                 )
+                await self._offer_to_waitlist(target_appointment)
 
                 return {
                     "success": True,
-                    "message": f"I've cancelled your appointment for {format_appointment_display(target_appointment)}.",
+                    "message": f"I've cancelled your appointment for {target_appointment.display}.",
                 }
             else:
                 return {
@@ -520,6 +980,7 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
             }
 
     @function_tool()
+    @tracked_tool
     async def modify_appointment(
         self,
         context: RunContext,
@@ -532,7 +993,7 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
         Use this when the user wants to reschedule an appointment.
 
         Args:
-            appointment_identifier: The appointment ID, date, or description to modify
+            appointment_identifier: The appointment ID, or the user's description of it
             new_date: New date for the appointment
             new_time: New time for the appointment
         """
@@ -542,40 +1003,13 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
             )
 
             # Check if user is identified
-            if not self.current_user or not self.current_user.get("contact_number"):
+            if not self.current_user:
                 return {
                     "success": False,
                     "error": "User not identified",
                     "message": "I need your phone number first. What's your phone number?",
                 }
 
-            # Get user's appointments
-            appointments = await self.db.get_user_appointments(
-                self.current_user["contact_number"]
-            )
-
-            if not appointments:
-                return {
-                    "success": False,
-                    "message": "You don't have any appointments to modify.",
-                }
-
-            # Find target appointment (similar logic to cancel)
-            target_appointment = None
-            for appt in appointments:
-                if str(appt["id"]) == appointment_identifier:
-                    target_appointment = appt
-                    break
-
-            if not target_appointment and len(appointments) == 1:
-                target_appointment = appointments[0]
-
-            if not target_appointment:
-                return {
-                    "success": False,
-                    "message": "I couldn't find that appointment. Could you specify which one you'd like to modify?",
-                }
-
             # Parse new date and time
             parsed_date = parse_date(new_date)
             if not parsed_date:
@@ -602,31 +1036,87 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
                     "message": "That time slot isn't available. Would you like to hear available times?",
                 }
 
-            # Modify appointment
-            updated = await self.db.modify_appointment(
-                str(target_appointment["id"]),
-                parsed_date.date(),
-                datetime.strptime(parsed_time, "%H:%M").time(),
+            # A repeated call (e.g. an LLM retry) gets the first result back
+            request = request_key(
+                "modify_appointment",
+                contact_number=self.current_user.contact_number,
+                appointment_identifier=appointment_identifier,
+                new_date=date_str,
+                new_time=parsed_time,
             )
 
-            # Notify frontend
-            await self._send_to_frontend(
-                "appointment_modified",
-                {
-                    "appointment_id": str(updated["id"]),
-                    "old_date": target_appointment["appointment_date"],
-                    "old_time": target_appointment["appointment_time"],
-                    "new_date": date_str,
-                    "new_time": parsed_time,
-                    "display": format_appointment_display(updated),
-                },
-            )
+            async def modify() -> dict:
+                # Get user's appointments
+                appointments = await self.db.get_user_appointments(
+                    self.current_user.contact_number, from_date=date.today()
+                )
 
-            return {
-                "success": True,
-                "appointment": updated,
-                "message": f"Great! I've rescheduled your appointment to {format_appointment_display(updated)}.",
-            }
+                if not appointments:
+                    return {
+                        "success": False,
+                        "message": "You don't have any appointments to modify.",
+                    }
+
+                # Find target appointment (same resolution as cancel)
+                resolution = AppointmentResolver(appointments).resolve(
+                    appointment_identifier
+                )
+                target_appointment = resolution.match
+
+                if not target_appointment:
+                    return self._unresolved_appointment(resolution, "modify")
+
+                new_start = datetime.combine(
+                    parsed_date.date(), datetime.strptime(parsed_time, "%H:%M").time()
+                )
+                duration = target_appointment.duration_minutes
+                if not SchedulingEngine.from_config(self.config).fits(
+                    new_start, duration
+                ):
+                    return self._past_closing_response()
+
+                # Modify appointment, keeping its resource if that one is free
+                updated = await self.db.modify_appointment(
+                    target_appointment.id,
+                    new_start.date(),
+                    new_start.time(),
+                    duration_minutes=duration,
+                    resource_ids=list(
+                        dict.fromkeys(
+                            [target_appointment.resource_id, *self.config.resource_ids]
+                        )
+                    ),
+                    capacities=self.config.capacities,
+                )
+                if updated is None:
+                    return {
+                        "success": False,
+                        "message": "I couldn't find that appointment anymore. Could you check which one you'd like to modify?",
+                    }
+
+                # Notify frontend
+                await self._send_to_frontend(
+                    "appointment_modified",
+                    {
+                        "appointment_id": updated.id,
+                        "old_date": target_appointment.appointment_date.isoformat(),
+                        "old_time": target_appointment.appointment_time.isoformat(),
+                        "new_date": date_str,
+                        "new_time": parsed_time,
+                        "display": updated.display,
+                    },
+                )
+                await self._offer_to_waitlist(target_appointment)
+
+                return {
+                    "success": True,
+                    "appointment": updated.to_dict(),
+                    "message": f"Great! I've rescheduled your appointment to {updated.display}.",
+                }
+
+            return await self.idempotency.run(
+                request, modify, cache_if=lambda result: result["success"]
+            )
 
         except ValueError as ve:
             logger.warning(f"New slot not available: {ve}")
@@ -644,6 +1134,7 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
             }
 
     @function_tool()
+    @tracked_tool
     async def end_conversation(
         self,
         context: RunContext,
@@ -657,63 +1148,39 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
             logger.info("Ending conversation and generating summary")
 
             # Get appointments discussed in this session
-            appointments_discussed = []
-            if self.current_user and self.current_user.get("contact_number"):
-                recent_appointments = await self.db.get_user_appointments(
-                    self.current_user["contact_number"]
+            recent_appointments = []
+            if self.current_user:
+                # Only the next 3 appointments are shown, so only 3 are read
+                recent_appointments = list(
+                    await self.db.get_appointment_page(
+                        self.current_user.contact_number,
+                        from_date=date.today(),
+                        limit=3,
+                    )
                 )
-                # Send complete appointment data to frontend
-                appointments_discussed = [
-                    {
-                        "id": str(appt["id"]),
-                        "user_name": appt["user_name"],
-                        "contact_number": appt["contact_number"],
-                        "appointment_date": appt["appointment_date"],
-                        "appointment_time": appt["appointment_time"],
-                        "status": appt["status"],
-                        "created_at": str(appt.get("created_at", "")),
-                        "updated_at": str(appt.get("updated_at", "")),
-                        "notes": appt.get("notes", ""),
-                    }
-                    for appt in recent_appointments[:3]  # Last 3 appointments
-                ]
+            # Send complete appointment data to frontend
+            appointments_discussed = [appt.to_dict() for appt in recent_appointments]
 
             # Generate conversation summary
             user_name_display = "the user"
-            if self.current_user:
-                user_name = self.current_user.get("name")
-                if user_name:
-                    user_name_display = user_name
+            if self.current_user and self.current_user.name:
+                user_name_display = self.current_user.name
 
             # Build detailed summary based on appointments
             summary = "Thank you for using our appointment booking service. "
 
             if self.current_user:
                 # Count appointment types
-                active_appts = [
-                    a for a in appointments_discussed if a["status"] == "active"
-                ]
+                active_appts = [a for a in recent_appointments if a.status == "active"]
                 cancelled_appts = [
-                    a for a in appointments_discussed if a["status"] == "cancelled"
+                    a for a in recent_appointments if a.status == "cancelled"
                 ]
 
                 if active_appts:
                     # Format appointment details
                     appt_count = len(active_appts)
                     if appt_count == 1:
-                        appt = active_appts[0]
-                        from datetime import datetime
-
-                        try:
-                            date_obj = datetime.strptime(appt["date"], "%Y-%m-%d")
-                            time_obj = datetime.strptime(appt["time"], "%H:%M")
-                            formatted_date = date_obj.strftime("%A, %B %d, %Y")
-                            formatted_time = time_obj.strftime("%I:%M %p").lstrip("0")
-                            summary += f"We helped {user_name_display} book 1 appointment for {formatted_date} at {formatted_time}. "
-                        except:
-                            summary += (
-                                f"We helped {user_name_display} book 1 appointment. "
-                            )
+                        summary += f"We helped {user_name_display} book 1 appointment for {active_appts[0].display}. "
                     else:
                         summary += f"We helped {user_name_display} manage {appt_count} appointment(s). "
                 elif cancelled_appts:
@@ -736,48 +1203,27 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
                 usage_summary = self.usage_collector.get_summary()
                 logger.info(f"Usage summary: {usage_summary}")
 
-                # Calculate costs based on actual usage
-                # OpenAI GPT-4o-mini: $0.150/1M input tokens, $0.600/1M output tokens
-                prompt_tokens = usage_summary.llm_prompt_tokens
-                completion_tokens = usage_summary.llm_completion_tokens
-                total_tokens = prompt_tokens + completion_tokens
-                llm_cost = (prompt_tokens * 0.15 / 1_000_000) + (
-                    completion_tokens * 0.60 / 1_000_000
+                # Price actual usage with the rates in pricing_config.json
+                costs = get_pricing_registry().costs_from_usage(
+                    usage_summary, models=PIPELINE_MODELS
                 )
-
-                # Cartesia TTS: ~$0.015/1K characters
-                tts_chars = usage_summary.tts_characters_count
-                tts_cost = tts_chars * 0.015 / 1000
-
-                # Deepgram STT: ~$0.0043/minute
-                stt_audio_duration = usage_summary.stt_audio_duration  # in seconds
-                stt_cost = (stt_audio_duration / 60) * 0.0043
-
-                costs = {
-                    "llm_cost": round(llm_cost, 6),
-                    "tts_cost": round(tts_cost, 6),
-                    "stt_cost": round(stt_cost, 6),
-                    "total_cost": round(llm_cost + tts_cost + stt_cost, 6),
-                    "completion_tokens": completion_tokens,
-                    "prompt_tokens": prompt_tokens,
-                    "prompt_cached_tokens": usage_summary.llm_prompt_cached_tokens,
-                    "total_tokens": total_tokens,
-                    "tts_characters": tts_chars,
-                    "tts_audio_duration": round(usage_summary.tts_audio_duration, 2),
-                    "stt_audio_duration": round(stt_audio_duration, 2),
-                }
+                costs["tools"] = self.cost_tracker.report()
             else:
                 logger.warning("Usage collector not available, costs will be zero")
 
+            # Record which noise cancellation mode the load policy chose
+            if self.noise_decision:
+                if self.cpu_meter:
+                    self.noise_decision.cpu_ms_per_s = self.cpu_meter.cpu_ms_per_s()
+                costs["noise_cancellation"] = self.noise_decision.as_dict()
+
             # Save summary to database
-            session_id = get_job_context().room.name
+            session_id = self._get_session_id()
             await self.db.save_conversation_summary(
                 session_id=session_id,
                 summary=summary,
                 contact_number=(
-                    self.current_user.get("contact_number")
-                    if self.current_user
-                    else None
+                    self.current_user.contact_number if self.current_user else None
                 ),
                 appointments=appointments_discussed,
                 cost_breakdown=costs,
@@ -790,7 +1236,7 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
                     "summary": summary,
                     "appointments": appointments_discussed,
                     "costs": costs,
-                    "user": self.current_user,
+                    "user": self.current_user.to_dict() if self.current_user else None,
                 },
             )
 
@@ -800,6 +1246,106 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
             logger.error(f"Error ending conversation: {e}")
             # Don't raise - try to end gracefully anyway
 
+    async def _offer_to_waitlist(self, freed: Appointment):
+        """
+        Book waiting callers into the starts a cancelled or moved appointment freed.
+
+        Each caller booked is told through a conversation summary stored
+        under their number. Failures are only logged, so the cancellation
+        itself still succeeds.
+
+        Args:
+            freed: The appointment as it was before it was cancelled or moved
+        """
+        try:
+            booked = await self.db.fill_from_waitlist(
+                freed_starts(
+                    freed.appointment_date,
+                    freed.appointment_time,
+                    freed.duration_minutes,
+                    self.config.available_times,
+                ),
+                resource_ids=self.config.resource_ids,
+                capacities=self.config.capacities,
+                business_hours=self.config.hours,
+            )
+            for entry, appointment in booked:
+                # Not sent to this room's frontend: that is the cancelling
+                # caller's, and the booking is someone else's
+                await self.db.save_conversation_summary(
+                    session_id=f"waitlist-{entry.id}",
+                    summary=f"A slot opened up, so {entry.user_name} was booked from the waitlist for {appointment.display}.",
+                    contact_number=entry.contact_number,
+                    appointments=[appointment.to_dict()],
+                )
+        except Exception as e:
+            logger.error(f"Error offering freed slot to the waitlist: {e}")
+
+    def _get_session_id(self) -> str:
+        """Return the identifier under which this session's summary is stored."""
+        return get_job_context().room.name
+
+    async def _free_places(
+        self,
+        appt_date: date,
+        appt_time: time,
+        duration_minutes: int,
+        resource_ids: list[str],
+    ) -> int:
+        """Seats free for a whole appointment at a start, across resources."""
+        engine = SchedulingEngine.from_config(self.config)
+        engine.load(await self.db.get_bookings(appt_date, appt_date))
+        start = datetime.combine(appt_date, appt_time)
+        return sum(
+            len(engine.free_seats(resource_id, start, duration_minutes))
+            for resource_id in resource_ids
+        )
+
+    def _slot_held_response(self) -> dict:
+        """Tool response when another caller holds the requested slot."""
+        return {
+            "success": False,
+            "error": "Slot held",
+            "message": "Someone else is booking that time slot right now. Would you like to choose a different time?",
+        }
+
+    def _unknown_provider_response(self, provider: str) -> dict:
+        """Tool response when no configured resource matches the provider asked for."""
+        names = ", ".join(r.get("name", r["id"]) for r in self.config.resources)
+        return {
+            "success": False,
+            "error": "Unknown provider",
+            "message": f"I couldn't find {provider}. We have {names}. Which would you like?",
+        }
+
+    def _past_closing_response(self) -> dict:
+        """Tool response when the appointment would not end within business hours."""
+        return {
+            "success": False,
+            "error": "Outside business hours",
+            "message": "That appointment would run past our closing time. Would an earlier time work?",
+        }
+
+    def _unresolved_appointment(self, resolution: Resolution, action: str) -> dict:
+        """
+        Tool response when an appointment reference did not pick out one appointment.
+
+        Args:
+            resolution: Result of AppointmentResolver.resolve
+            action: Verb for the prompt ("cancel" or "modify")
+        """
+        if resolution.is_ambiguous:
+            return {
+                "success": False,
+                "error": "Ambiguous appointment",
+                "candidates": [appt.to_dict() for appt in resolution.candidates],
+                "message": f"Which appointment would you like to {action}: {resolution.choices()}?",
+            }
+        return {
+            "success": False,
+            "message": f"I couldn't find that appointment. Could you specify which one you'd like to {action}?",
+        }
+
     async def _send_to_frontend(self, event_type: str, data: dict):
         """
         Send data to frontend via RPC.
@@ -832,12 +1378,42 @@ Remember: Your goal is to make appointment booking easy and pleasant for users."
             # Don't raise - this shouldn't block the main flow
 
 
-server = AgentServer()
+# Report CPU, event-loop lag and session count as the worker's load so a
+# saturated worker stops accepting new rooms (see load_monitor.py); job
+# processes publish their loop lag to the worker through job_lag
+job_lag = JobLagBoard(worker_state_dir())
+load_monitor = WorkerLoadMonitor(job_lag=job_lag)
+server_options = {}
+if os.getenv("WORKER_LOAD_THRESHOLD"):
+    server_options["load_threshold"] = load_monitor.thresholds.load_threshold
+server = AgentServer(load_fnc=load_monitor, **server_options)
+
+
+@server.on("worker_started")
+def _on_worker_started():
+    load_monitor.start()
+    # Job processes send their storage reads here, so the sessions of this
+    # worker coalesce identical reads and share the read cache (see
+    # shared_reads.py)
+    serve_worker_reads()
+    # The worker, not its short-lived job processes, owns calendars in the
+    # SHARD_DIR ring (see sharding.py)
+    serve_worker_shard()
+
+
+# Downgrade noise cancellation for new sessions when CPU is high (see
+# noise_policy.py); job processes sample CPU with their own load_monitor and
+# share the per-mode CPU cost averages through the worker's state directory
+noise_policy = NoiseCancellationPolicy(
+    cpu_source=lambda: load_monitor.cpu,
+    state_path=os.path.join(worker_state_dir(), "noise_costs.json"),
+)
 
 
 def prewarm(proc: JobProcess):
     """Prewarm resources before agent starts."""
     proc.userdata["vad"] = silero.VAD.load()
+    load_monitor.start_cpu_sampling()
 
 
 server.setup_fnc = prewarm
@@ -855,16 +1431,25 @@ async def my_agent(ctx: JobContext):
         f"🚀 Starting appointment assistant agent {AGENT_VERSION} for room {ctx.room.name}"
     )
 
+    # Watch this job's own event loop for blocking work and report it to the
+    # worker's load function
+    lag_monitor = LoopLagMonitor(
+        warn_ms=load_monitor.thresholds.lag_warn_ms, board=job_lag
+    )
+    lag_monitor.start()
+    ctx.add_shutdown_callback(lag_monitor.stop)
+
+    # Measure this session's CPU cost for the noise cancellation policy
+    cpu_meter = SessionCpuMeter()
+
     # Set up voice AI pipeline
     session = AgentSession(
         # Use Deepgram for STT
-        stt=inference.STT(model="deepgram/nova-2", language="en"),
+        stt=inference.STT(model=STT_MODEL, language="en"),
         # Use OpenAI for LLM
-        llm=inference.LLM(model="openai/gpt-4o-mini"),
+        llm=inference.LLM(model=LLM_MODEL),
         # Use Cartesia for TTS
-        tts=inference.TTS(
-            model="cartesia/sonic-3", voice="9626c31c-bec5-4cca-baa8-f8ba9e84c8bc"
-        ),
+        tts=inference.TTS(model=TTS_MODEL, voice=TTS_VOICE),
         # VAD and turn detection
         turn_detection=MultilingualModel(),
         vad=ctx.proc.userdata["vad"],
@@ -897,11 +1482,35 @@ async def my_agent(ctx: JobContext):
     # Create agent instance
     assistant = AppointmentAssistant()
     assistant.usage_collector = usage_collector  # Pass usage collector to agent
+    assistant.cpu_meter = cpu_meter
+
+    def _on_noise_decision(decision: NoiseDecision):
+        assistant.noise_decision = decision
+
+    async def _record_noise_cost():
+        if assistant.noise_decision:
+            noise_policy.record_session(
+                assistant.noise_decision.mode, *cpu_meter.elapsed()
+            )
+
+    ctx.add_shutdown_callback(_record_noise_cost)
+
+    # Push live cost and turn latency to the frontend (at most every 2s)
+    telemetry = TelemetryStream(
+        assistant._send_to_frontend,
+        usage_collector=usage_collector,
+        models=PIPELINE_MODELS,
+        min_interval=float(os.getenv("TELEMETRY_INTERVAL", "2.0")),
+        slow_turn_ms=float(os.getenv("TELEMETRY_SLOW_TURN_MS", "2000")),
+    )
+    ctx.add_shutdown_callback(telemetry.stop)
 
     # Subscribe to metrics events for cost tracking
     @session.on("metrics_collected")
     def _on_metrics_collected(ev: MetricsCollectedEvent):
         usage_collector.collect(ev.metrics)
+        assistant.cost_tracker.collect(ev.metrics)
+        telemetry.collect(ev.metrics)
         logger.debug(f"Collected metrics: {ev.metrics}")
 
     # Start the session
@@ -910,9 +1519,7 @@ async def my_agent(ctx: JobContext):
         room=ctx.room,
         room_options=room_io.RoomOptions(
             audio_input=room_io.AudioInputOptions(
-                noise_cancellation=lambda params: noise_cancellation.BVCTelephony()
-                if params.participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_SIP
-                else noise_cancellation.BVC(),
+                noise_cancellation=noise_policy.selector(_on_noise_decision),
             ),
         ),
     )
@@ -921,6 +1528,7 @@ async def my_agent(ctx: JobContext):
     await ctx.connect()
 
     logger.info("Agent connected and ready")
+    telemetry.start()
 
     # Greet the user when they join
     await session.generate_reply(
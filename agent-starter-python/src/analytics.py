@@ -0,0 +1,271 @@
+"""
+Cost rollups over conversation_summaries for finance dashboards.
+
+Summaries are streamed in keyset-paginated pages, the JSON cost breakdown of
+each page is unpacked into numpy columns once, and the columns are summed per
+day, per caller and per LLM model with vectorized group-by. Results go to the
+cost_rollup_* tables, or to Parquet (requires pyarrow) or JSON files.
+
+Usage:
+    python -m src.analytics --output db
+    python -m src.analytics --output parquet --out-dir rollups/
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: pip install "agent-starter-python[analytics]"
+    pa = None
+    pq = None
+
+try:
+    from .database import DatabaseManager
+    from .storage import ROLLUP_TABLES, create_backend
+except ImportError:
+    from database import DatabaseManager
+    from storage import ROLLUP_TABLES, create_backend
+
+logger = logging.getLogger(__name__)
+
+# Numeric cost_breakdown fields summed by every rollup
+METRICS = (
+    "llm_cost",
+    "tts_cost",
+    "stt_cost",
+    "total_cost",
+    "prompt_tokens",
+    "completion_tokens",
+    "tts_characters",
+    "stt_audio_duration",
+)
+_INTEGER_METRICS = {"prompt_tokens", "completion_tokens", "tts_characters"}
+
+# Only the columns the rollups need are read from the table
+SUMMARY_COLUMNS = ("created_at", "id", "contact_number", "cost_breakdown")
+
+ANONYMOUS = "anonymous"
+UNKNOWN_MODEL = "unknown"
+
+
+def summary_columns(rows: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Unpack a page of summary rows into columnar arrays.
+
+    Returns:
+        Dict with "day", "caller" and "model" string arrays and a float64
+        "metrics" matrix with one column per entry of METRICS
+    """
+    n = len(rows)
+    days = np.empty(n, dtype=object)
+    callers = np.empty(n, dtype=object)
+    models = np.empty(n, dtype=object)
+    values = np.zeros((n, len(METRICS)), dtype=np.float64)
+
+    for i, row in enumerate(rows):
+        costs = row.get("cost_breakdown") or {}
+        if isinstance(costs, str):
+            costs = json.loads(costs)
+        days[i] = str(row.get("created_at") or "")[:10]
+        callers[i] = row.get("contact_number") or ANONYMOUS
+        models[i] = (costs.get("models") or {}).get("llm") or UNKNOWN_MODEL
+        values[i] = [costs.get(metric) or 0.0 for metric in METRICS]
+
+    return {"day": days, "caller": callers, "model": models, "metrics": values}
+
+
+class Rollup:
+    """Running sums of METRICS (and a session count) grouped by one key."""
+
+    def __init__(self, table: str, key_column: str):
+        """
+        Args:
+            table: Destination table in ROLLUP_TABLES
+            key_column: Name of the group key column in that table
+        """
+        self.table = table
+        self.key_column = key_column
+        self.sums: Dict[str, np.ndarray] = {}
+
+    def add(self, keys: np.ndarray, values: np.ndarray):
+        """
+        Fold one page into the running sums.
+
+        Args:
+            keys: Group key per row
+            values: (rows x METRICS) matrix
+        """
+        if len(keys) == 0:
+            return
+        groups, inverse = np.unique(keys.astype(str), return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(groups))
+        sums = np.column_stack(
+            [
+                np.bincount(inverse, weights=values[:, j], minlength=len(groups))
+                for j in range(values.shape[1])
+            ]
+        )
+        page = np.column_stack([counts, sums])
+        for group, row in zip(groups.tolist(), page):
+            if group in self.sums:
+                self.sums[group] += row
+            else:
+                self.sums[group] = row.copy()
+
+    def rows(self, updated_at: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Rollup rows ready for upsert_rows or file export, ordered by key."""
+        updated_at = updated_at or datetime.now(timezone.utc).isoformat()
+        result = []
+        for group in sorted(self.sums):
+            sessions, *totals = self.sums[group].tolist()
+            row: Dict[str, Any] = {self.key_column: group, "sessions": int(sessions)}
+            for metric, total in zip(METRICS, totals):
+                row[metric] = (
+                    int(total) if metric in _INTEGER_METRICS else round(total, 6)
+                )
+            row["updated_at"] = updated_at
+            result.append(row)
+        return result
+
+
+class CostRollups:
+    """Daily, per-caller and per-model cost rollups built from summary pages."""
+
+    def __init__(self):
+        self.daily = Rollup("cost_rollup_daily", "day")
+        self.caller = Rollup("cost_rollup_caller", "contact_number")
+        self.model = Rollup("cost_rollup_model", "model")
+        self.sessions = 0
+
+    def consume(self, rows: List[Dict[str, Any]]):
+        """Add one page of conversation summary rows."""
+        columns = summary_columns(rows)
+        self.daily.add(columns["day"], columns["metrics"])
+        self.caller.add(columns["caller"], columns["metrics"])
+        self.model.add(columns["model"], columns["metrics"])
+        self.sessions += len(rows)
+
+    def tables(self) -> Dict[str, List[Dict[str, Any]]]:
+        """All rollups keyed by destination table."""
+        updated_at = datetime.now(timezone.utc).isoformat()
+        return {
+            r.table: r.rows(updated_at) for r in (self.daily, self.caller, self.model)
+        }
+
+
+async def build_rollups(db: DatabaseManager, page_size: int = 1000) -> CostRollups:
+    """
+    Scan every conversation summary once and aggregate its costs.
+
+    Args:
+        db: Database manager to read from
+        page_size: Rows per keyset page (bounds memory use)
+
+    Returns:
+        Populated CostRollups
+    """
+    rollups = CostRollups()
+    async for page in db.iter_pages(
+        "conversation_summaries", page_size=page_size, columns=SUMMARY_COLUMNS
+    ):
+        rollups.consume(page)
+    logger.info(f"Aggregated costs of {rollups.sessions} conversation summaries")
+    return rollups
+
+
+# ==================== OUTPUT ====================
+
+
+async def write_tables(db: DatabaseManager, tables: Dict[str, List[Dict[str, Any]]]):
+    """Upsert rollups into the cost_rollup_* tables."""
+    for table, rows in tables.items():
+        await db.upsert_rollup(table, rows)
+
+
+def write_parquet(tables: Dict[str, List[Dict[str, Any]]], out_dir: Path) -> List[Path]:
+    """
+    Write each rollup to <out_dir>/<table>.parquet.
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    if pa is None:
+        raise RuntimeError(
+            'Parquet output requires pyarrow: pip install "agent-starter-python[analytics]"'
+        )
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for table, rows in tables.items():
+        path = out_dir / f"{table}.parquet"
+        pq.write_table(pa.Table.from_pylist(rows), path, compression="zstd")
+        paths.append(path)
+    return paths
+
+
+def write_json(tables: Dict[str, List[Dict[str, Any]]], out_dir: Path) -> List[Path]:
+    """Write each rollup to <out_dir>/<table>.json."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for table, rows in tables.items():
+        path = out_dir / f"{table}.json"
+        path.write_text(json.dumps(rows, indent=2))
+        paths.append(path)
+    return paths
+
+
+# ==================== CLI ====================
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--backend", help="supabase, sqlite or memory (default: STORAGE_BACKEND)"
+    )
+    parser.add_argument("--output", choices=["db", "parquet", "json"], default="db")
+    parser.add_argument("--out-dir", type=Path, default=Path("rollups"))
+    parser.add_argument("--page-size", type=int, default=1000)
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, List[Dict[str, Any]]]:
+    """Build the rollups and write them to the selected output."""
+    db = DatabaseManager(create_backend(args.backend))
+    tables = (await build_rollups(db, args.page_size)).tables()
+
+    if args.output == "db":
+        await write_tables(db, tables)
+    elif args.output == "parquet":
+        for path in write_parquet(tables, args.out_dir):
+            logger.info(f"Wrote {path}")
+    else:
+        for path in write_json(tables, args.out_dir):
+            logger.info(f"Wrote {path}")
+    return tables
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    args = parse_args(argv)
+    try:
+        tables = asyncio.run(run(args))
+    except Exception as e:
+        logger.error(f"Cost rollup failed: {e}")
+        return 1
+
+    for table in ROLLUP_TABLES:
+        logger.info(f"{table}: {len(tables.get(table, []))} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
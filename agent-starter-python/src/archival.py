@@ -0,0 +1,135 @@
+"""
+Archival of past and cancelled appointments.
+
+The agent only ever reads a caller's upcoming active appointments and the
+active slots of the next few days, so everything else in the appointments
+table is dead weight for its indexes and cache. This job moves, in batches:
+
+- appointments dated before today (the cutoff), whatever their status
+- cancelled or modified appointments not touched for ``grace_days``
+
+to appointments_archive, where full history reads still find them. Each
+batch is one atomic move, so the job can be interrupted and rerun at any
+time and runs alongside live sessions.
+
+Usage:
+    python -m src.archival
+    python -m src.archival --grace-days 7 --batch-size 10000
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+try:
+    from .database import DatabaseManager
+    from .storage import create_backend
+except ImportError:
+    from database import DatabaseManager
+    from storage import create_backend
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ArchivalResult:
+    """Outcome of an archival run."""
+
+    moved: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.moved / self.seconds if self.seconds else 0.0
+
+
+async def archive_appointments(
+    db: DatabaseManager,
+    today: Optional[date] = None,
+    grace_days: int = 1,
+    batch_size: int = 5000,
+    max_batches: Optional[int] = None,
+    pause: float = 0.0,
+) -> ArchivalResult:
+    """
+    Move archivable appointments batch by batch until none are left.
+
+    Args:
+        db: Database manager to archive through
+        today: Appointments before this date are archived (default: today)
+        grace_days: Days a cancelled/modified appointment stays in the hot table
+        batch_size: Rows moved per transaction
+        max_batches: Stop after this many batches (None for no limit)
+        pause: Seconds to sleep between batches to spread the write load
+
+    Returns:
+        ArchivalResult with the number of rows and batches moved
+    """
+    cutoff = today or date.today()
+    cancelled_before = datetime.now(timezone.utc) - timedelta(days=grace_days)
+    result = ArchivalResult()
+    started = time.perf_counter()
+
+    while max_batches is None or result.batches < max_batches:
+        moved = await db.archive_appointments(cutoff, cancelled_before, batch_size)
+        if moved == 0:
+            break
+        result.moved += moved
+        result.batches += 1
+        if moved < batch_size:
+            break
+        if pause:
+            await asyncio.sleep(pause)
+
+    result.seconds = time.perf_counter() - started
+    logger.info(
+        f"Archived {result.moved} appointments in {result.batches} batches "
+        f"({result.seconds:.2f}s, {result.rows_per_second:.0f} rows/s)"
+    )
+    return result
+
+
+# ==================== CLI ====================
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--backend", help="supabase, sqlite or memory (default: STORAGE_BACKEND)"
+    )
+    parser.add_argument("--grace-days", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--max-batches", type=int)
+    parser.add_argument(
+        "--pause", type=float, default=0.0, help="Seconds to sleep between batches"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    args = parse_args(argv)
+    try:
+        asyncio.run(
+            archive_appointments(
+                DatabaseManager(create_backend(args.backend)),
+                grace_days=args.grace_days,
+                batch_size=args.batch_size,
+                max_batches=args.max_batches,
+                pause=args.pause,
+            )
+        )
+    except Exception as e:
+        logger.error(f"Archival failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,12 +3,22 @@
 import json
 import logging
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .models import DEFAULT_RESOURCE, Slot
+    from .slot_matrix import SlotMatrix
+except ImportError:
+    from models import DEFAULT_RESOURCE, Slot
+    from slot_matrix import SlotMatrix
 
 logger = logging.getLogger(__name__)
 
+# A single calendar, as before resources were configurable
+DEFAULT_RESOURCES = [{"id": DEFAULT_RESOURCE, "name": "Main office"}]
+
 
 class AppConfig:
     """Manages application configuration including appointment slots."""
@@ -16,6 +26,8 @@ class AppConfig:
     def __init__(self):
         """Initialize configuration."""
         self.config_file = Path(__file__).parent / "slots_config.json"
+        # Slots are immutable, so each one is built (and formatted) only once
+        self._slots: Dict[Tuple[date, time], Slot] = {}
         self.load_slots_config()
         logger.info("App configuration loaded successfully")
 
@@ -48,6 +60,7 @@ class AppConfig:
                     self.business_hours = config.get(
                         "business_hours", {"start": "09:00", "end": "17:00"}
                     )
+                    self._load_resources(config)
                 logger.info(f"Configuration loaded from {self.config_file}")
             else:
                 # Use defaults
@@ -69,6 +82,7 @@ class AppConfig:
                 self.excluded_weekdays = [5, 6]  # Saturday, Sunday
                 self.duration_minutes = 30
                 self.business_hours = {"start": "09:00", "end": "17:00"}
+                self._load_resources({})
                 logger.warning(
                     f"Config file not found at {self.config_file}, using defaults"
                 )
@@ -94,59 +108,132 @@ class AppConfig:
             self.excluded_weekdays = [5, 6]
             self.duration_minutes = 30
             self.business_hours = {"start": "09:00", "end": "17:00"}
+            self._load_resources({})
 
-    def get_available_slots(
+    def _load_resources(self, config: Dict[str, Any]):
+        """
+        Resources (providers or rooms), how many people each can see at once,
+        and appointment types with their lengths.
+        """
+        self.resources = config.get("resources") or DEFAULT_RESOURCES
+        self.slot_capacity = int(config.get("slot_capacity", 1))
+        self.appointment_types = config.get(
+            "appointment_types", {"standard": self.duration_minutes}
+        )
+
+    @property
+    def resource_ids(self) -> List[str]:
+        """Resource ids in order of preference when assigning a booking."""
+        return [resource["id"] for resource in self.resources]
+
+    @property
+    def capacities(self) -> Dict[str, int]:
+        """
+        Concurrent bookings each resource takes per slot.
+
+        A resource's own "capacity" wins over the top-level "slot_capacity".
+        """
+        return {
+            resource["id"]: int(resource.get("capacity", self.slot_capacity))
+            for resource in self.resources
+        }
+
+    @property
+    def hours(self) -> Tuple[time, time]:
+        """Business hours as (opens, closes); bookings must fit inside them."""
+        return (
+            time.fromisoformat(self.business_hours["start"]),
+            time.fromisoformat(self.business_hours["end"]),
+        )
+
+    def duration_for(self, appointment_type: Optional[str] = None) -> int:
+        """
+        Length in minutes of an appointment type.
+
+        Unknown or missing types get the default duration_minutes.
+        """
+        key = (appointment_type or "").strip().lower()
+        return int(self.appointment_types.get(key, self.duration_minutes))
+
+    def find_resources(self, provider: Optional[str] = None) -> List[str]:
+        """
+        Resource ids matching a provider or room the caller asked for.
+
+        Args:
+            provider: Resource id or (part of) its name; empty for any resource
+
+        Returns:
+            Matching ids, or every resource id if nothing was asked for
+        """
+        wanted = (provider or "").strip().lower()
+        if not wanted:
+            return self.resource_ids
+        return [
+            resource["id"]
+            for resource in self.resources
+            if wanted == resource["id"].lower()
+            or wanted in resource.get("name", "").lower()
+        ]
+
+    def _slot(self, slot_date: date, slot_time: time) -> Slot:
+        slot = self._slots.get((slot_date, slot_time))
+        if slot is None:
+            slot = self._slots[(slot_date, slot_time)] = Slot(slot_date, slot_time)
+        return slot
+
+    def slot_matrix(
         self, from_date: datetime | None = None, days: int | None = None
-    ) -> List[Dict[str, str]]:
+    ) -> SlotMatrix:
         """
-        Generate available slots for next N days.
+        Build the grid of candidate slots for the next N days.
+
+        Excluded weekdays and slots less than an hour away are already
+        cleared; apply bookings and holds to the returned matrix.
 
         Args:
             from_date: Starting date (defaults to today)
             days: Number of days to generate slots for (defaults to self.days_ahead)
 
         Returns:
-            List of slot dictionaries with 'date', 'time', and 'datetime' fields
+            SlotMatrix whose slots are shared with this config's cache
         """
         # Set defaults
         actual_from_date = from_date if from_date is not None else datetime.now()
         actual_days = days if days is not None else self.days_ahead
 
-        slots = []
-        current_date = actual_from_date.date()
-        current_time = actual_from_date.time()
         today = datetime.now().date()
+        times = [datetime.strptime(t, "%H:%M").time() for t in self.available_times]
+        if len(self._slots) > 4 * actual_days * len(times):
+            # Drop slots of past days so the cache stays bounded
+            self._slots = {k: v for k, v in self._slots.items() if k[0] >= today}
+
+        matrix = SlotMatrix(
+            actual_from_date.date(),
+            actual_days,
+            times,
+            self.excluded_weekdays,
+            slot_factory=self._slot,
+        )
+        # Skip slots that have already passed, with a buffer of 1 hour for booking
+        matrix.not_before(
+            datetime.combine(today, actual_from_date.time()) + timedelta(hours=1)
+        )
+        return matrix
 
-        for day_offset in range(actual_days):
-            check_date = current_date + timedelta(days=day_offset)
-
-            # Skip excluded weekdays (0=Monday, 6=Sunday)
-            if check_date.weekday() in self.excluded_weekdays:
-                continue
-
-            # Add all available time slots for this day
-            for time_str in self.available_times:
-                # If this is today, skip slots that have already passed
-                if check_date == today:
-                    slot_time = datetime.strptime(time_str, "%H:%M").time()
-                    # Add buffer of 1 hour for booking
-                    current_hour_plus_buffer = (
-                        datetime.combine(today, current_time) + timedelta(hours=1)
-                    ).time()
-                    if slot_time < current_hour_plus_buffer:
-                        logger.debug(f"Skipping past slot: {time_str} on {check_date}")
-                        continue
-
-                slots.append(
-                    {
-                        "date": check_date.strftime("%Y-%m-%d"),
-                        "time": time_str,
-                        "datetime": f"{check_date.strftime('%Y-%m-%d')} {time_str}",
-                        "display_date": check_date.strftime("%A, %B %d, %Y"),
-                        "display_time": self._format_time_12hr(time_str),
-                    }
-                )
+    def get_available_slots(
+        self, from_date: datetime | None = None, days: int | None = None
+    ) -> List[Slot]:
+        """
+        Generate available slots for next N days.
 
+        Args:
+            from_date: Starting date (defaults to today)
+            days: Number of days to generate slots for (defaults to self.days_ahead)
+
+        Returns:
+            List of Slot records in date and time order
+        """
+        slots = self.slot_matrix(from_date, days).slots()
         logger.info(f"Generated {len(slots)} available slots (filtered out past times)")
         return slots
 
@@ -204,9 +291,7 @@ class AppConfig:
         except Exception:
             return time_24hr
 
-    def get_slot_suggestions(
-        self, preferred_date: str | None = None
-    ) -> List[Dict[str, str]]:
+    def get_slot_suggestions(self, preferred_date: str | None = None) -> List[Slot]:
         """
         Get suggested slots, optionally filtered by preferred date.
 
@@ -214,7 +299,7 @@ class AppConfig:
             preferred_date: Optional date to filter by (YYYY-MM-DD or natural language)
 
         Returns:
-            List of suggested slot dictionaries
+            List of suggested slots
         """
         all_slots = self.get_available_slots()
 
@@ -232,7 +317,7 @@ class AppConfig:
 
                 # Filter slots by date
                 filtered_slots = [
-                    slot for slot in all_slots if slot["date"] == str(target_date)
+                    slot for slot in all_slots if slot.slot_date == target_date
                 ]
                 logger.info(f"Found {len(filtered_slots)} slots for {target_date}")
                 # Return filtered slots if found, otherwise return next 20 available
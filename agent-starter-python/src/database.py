@@ -1,34 +1,77 @@
-"""Database operations for Supabase integration."""
+"""Database operations on top of a pluggable storage backend."""
 
 import logging
-import os
 from datetime import date, datetime, time
-from typing import Any, Dict, List, Optional
-
-from supabase import Client, create_client
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+try:
+    from .instrumentation import instrumented, timed_query
+    from .models import (
+        APPOINTMENT_COLUMNS,
+        DEFAULT_DURATION_MINUTES,
+        DEFAULT_RESOURCE,
+        Appointment,
+        AppointmentCursor,
+        AppointmentPage,
+        UserProfile,
+    )
+    from .recurrence import Series, SeriesBooking, horizon_end
+    from .scheduling import Booking, SchedulingEngine
+    from .storage import PAGE_KEY, SCAN_KEYS, StorageBackend, create_backend
+    from .waitlist import WaitlistEntry, WaitlistMatcher
+except ImportError:
+    from instrumentation import instrumented, timed_query
+    from models import (
+        APPOINTMENT_COLUMNS,
+        DEFAULT_DURATION_MINUTES,
+        DEFAULT_RESOURCE,
+        Appointment,
+        AppointmentCursor,
+        AppointmentPage,
+        UserProfile,
+    )
+    from recurrence import Series, SeriesBooking, horizon_end
+    from scheduling import Booking, SchedulingEngine
+    from storage import PAGE_KEY, SCAN_KEYS, StorageBackend, create_backend
+    from waitlist import WaitlistEntry, WaitlistMatcher
 
 logger = logging.getLogger(__name__)
 
 
 class DatabaseManager:
-    """Manages all database operations with Supabase."""
+    """
+    Manages all database operations for the agent.
 
-    def __init__(self):
-        """Initialize Supabase client."""
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_KEY")
+    Profiles and appointments are returned as the frozen records in models.py,
+    parsed once here; bulk scans and summaries stay plain dicts.
+    """
 
-        if not supabase_url or not supabase_key:
-            raise ValueError(
-                "SUPABASE_URL and SUPABASE_KEY must be set in environment variables"
-            )
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        """
+        Initialize the storage backend.
 
-        self.supabase: Client = create_client(supabase_url, supabase_key)
-        logger.info("Database manager initialized successfully")
+        Args:
+            backend: Storage backend to use; defaults to the one selected by the
+                STORAGE_BACKEND environment variable (Supabase unless set)
+        """
+        self.backend = backend or create_backend()
+        logger.info(
+            f"Database manager initialized successfully ({self.backend.name} backend)"
+        )
 
     # ==================== USER PROFILE METHODS ====================
 
-    async def get_user_profile(self, contact_number: str) -> Optional[Dict[str, Any]]:
+    @instrumented
+    async def get_user_profile(self, contact_number: str) -> Optional[UserProfile]:
         """
         Fetch user profile by phone number.
 
@@ -36,19 +79,14 @@ class DatabaseManager:
             contact_number: User's phone number
 
         Returns:
-            User profile dict or None if not found
+            UserProfile or None if not found
         """
         try:
-            response = (
-                self.supabase.table("user_profiles")
-                .select("*")
-                .eq("contact_number", contact_number)
-                .execute()
-            )
+            profile = await timed_query(self.backend.get_user_profile(contact_number))
 
-            if response.data and len(response.data) > 0:
+            if profile:
                 logger.info(f"User profile found for {contact_number}")
-                return response.data[0]
+                return UserProfile.from_row(profile)
             else:
                 logger.info(f"No user profile found for {contact_number}")
                 return None
@@ -57,9 +95,10 @@ class DatabaseManager:
             logger.error(f"Error fetching user profile: {e}")
             return None
 
+    @instrumented
     async def create_user_profile(
         self, contact_number: str, name: str, email: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> UserProfile:
         """
         Create new user profile.
 
@@ -69,25 +108,26 @@ class DatabaseManager:
             email: User's email (optional)
 
         Returns:
-            Created user profile dict
+            Created UserProfile
         """
         try:
             data = {"contact_number": contact_number, "name": name}
             if email:
                 data["email"] = email
 
-            response = self.supabase.table("user_profiles").insert(data).execute()
+            profile = await timed_query(self.backend.insert_user_profile(data))
 
             logger.info(f"User profile created for {contact_number}")
-            return response.data[0] if response.data else data
+            return UserProfile.from_row(profile)
 
         except Exception as e:
             logger.error(f"Error creating user profile: {e}")
             raise
 
+    @instrumented
     async def update_user_profile(
         self, contact_number: str, updates: Dict[str, Any]
-    ) -> Dict[str, Any]:
+    ) -> Optional[UserProfile]:
         """
         Update existing user profile.
 
@@ -96,18 +136,15 @@ class DatabaseManager:
             updates: Dictionary of fields to update
 
         Returns:
-            Updated user profile dict
+            Updated UserProfile, or None if there is no such profile
         """
         try:
-            response = (
-                self.supabase.table("user_profiles")
-                .update(updates)
-                .eq("contact_number", contact_number)
-                .execute()
+            profile = await timed_query(
+                self.backend.update_user_profile(contact_number, updates)
             )
 
             logger.info(f"User profile updated for {contact_number}")
-            return response.data[0] if response.data else {}
+            return UserProfile.from_row(profile) if profile else None
 
         except Exception as e:
             logger.error(f"Error updating user profile: {e}")
@@ -115,8 +152,15 @@ class DatabaseManager:
 
     # ==================== APPOINTMENT METHODS ====================
 
+    @instrumented
     async def check_slot_available(
-        self, appt_date: date, appt_time: time
+        self,
+        appt_date: date,
+        appt_time: time,
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        resource_ids: Optional[Sequence[str]] = None,
+        exclude_id: Optional[str] = None,
+        capacities: Optional[Dict[str, int]] = None,
     ) -> tuple[bool, Optional[str]]:
         """
         Check if appointment slot is available.
@@ -124,22 +168,25 @@ class DatabaseManager:
         Args:
             appt_date: Appointment date
             appt_time: Appointment time
+            duration_minutes: Length of the appointment
+            resource_ids: Resources that could take it (the default resource if None)
+            exclude_id: Appointment to disregard, e.g. the one being moved
+            capacities: Concurrent bookings per resource (1 if not listed)
 
         Returns:
             Tuple of (is_available, error_message)
         """
         try:
-            # Check for active appointments at this slot
-            response = (
-                self.supabase.table("appointments")
-                .select("id, user_name")
-                .eq("appointment_date", str(appt_date))
-                .eq("appointment_time", str(appt_time))
-                .eq("status", "active")
-                .execute()
+            free = await self._free_seats(
+                appt_date,
+                appt_time,
+                duration_minutes,
+                resource_ids,
+                exclude_id,
+                capacities,
             )
 
-            if response.data and len(response.data) > 0:
+            if not free:
                 logger.info(f"Slot {appt_date} {appt_time} is already booked")
                 return False, "This time slot is already booked"
             else:
@@ -150,6 +197,116 @@ class DatabaseManager:
             logger.error(f"Error checking slot availability: {e}")
             return False, f"Error checking availability: {str(e)}"
 
+    async def _free_seats(
+        self,
+        appt_date: date,
+        appt_time: time,
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        resource_ids: Optional[Sequence[str]] = None,
+        exclude_id: Optional[str] = None,
+        capacities: Optional[Dict[str, int]] = None,
+    ) -> List[Tuple[str, int]]:
+        """
+        The resources free for a whole appointment, found with a single query.
+
+        The day's bookings are loaded into a SchedulingEngine and every seat
+        is checked for overlap with [start, start + duration), so appointments
+        of different lengths on the same seat can never overlap.
+
+        Args:
+            appt_date: Appointment date
+            appt_time: Appointment time
+            duration_minutes: Length of the appointment
+            resource_ids: Resources in order of preference (the default
+                resource if None)
+            exclude_id: Appointment to disregard, e.g. the one being moved
+            capacities: Concurrent bookings per resource (1 if not listed)
+
+        Returns:
+            (resource, lowest free seat) of each free resource, in the given order
+        """
+        try:
+            rows = await timed_query(
+                self.backend.list_booked_slots(str(appt_date), str(appt_date))
+            )
+            engine = SchedulingEngine(
+                resource_ids or [DEFAULT_RESOURCE], capacities=capacities
+            )
+            engine.load(Booking.from_row(row) for row in rows)
+
+            # Business hours are the config's concern; only overlaps count here
+            start = datetime.combine(appt_date, appt_time)
+            free = []
+            for resource_id in engine.resource_ids:
+                seats = engine.free_seats(
+                    resource_id, start, duration_minutes, exclude_id
+                )
+                if seats:
+                    free.append((resource_id, seats[0]))
+            return free
+
+        except Exception as e:
+            logger.error(f"Error finding free resources: {e}")
+            raise
+
+    @instrumented
+    async def get_bookings(self, start_date: date, end_date: date) -> List[Booking]:
+        """
+        Fetch every active booking in a date range as intervals, with one query.
+
+        Args:
+            start_date: First date of the range (inclusive)
+            end_date: Last date of the range (inclusive)
+
+        Returns:
+            Booking intervals, to load into a SchedulingEngine
+        """
+        try:
+            rows = await timed_query(
+                self.backend.list_booked_slots(str(start_date), str(end_date))
+            )
+            bookings = [Booking.from_row(row) for row in rows]
+            logger.info(
+                f"Found {len(bookings)} bookings between {start_date} and {end_date}"
+            )
+            return bookings
+
+        except Exception as e:
+            logger.error(f"Error fetching bookings: {e}")
+            raise
+
+    @instrumented
+    async def get_booked_slots(
+        self, start_date: date, end_date: date
+    ) -> set[tuple[str, str]]:
+        """
+        Fetch every active booking in a date range with a single query.
+
+        Args:
+            start_date: First date of the range (inclusive)
+            end_date: Last date of the range (inclusive)
+
+        Returns:
+            Set of (YYYY-MM-DD, HH:MM) tuples that are already booked
+        """
+        try:
+            rows = await timed_query(
+                self.backend.list_booked_slots(str(start_date), str(end_date))
+            )
+
+            booked = {
+                (row["appointment_date"], row["appointment_time"][:5]) for row in rows
+            }
+            logger.info(
+                f"Found {len(booked)} booked slots between {start_date} and {end_date}"
+            )
+            return booked
+
+        except Exception as e:
+            logger.error(f"Error fetching booked slots: {e}")
+            raise
+
+    @instrumented
     async def create_appointment(
         self,
         contact_number: str,
@@ -157,25 +314,50 @@ class DatabaseManager:
         appt_date: date,
         appt_time: time,
         notes: Optional[str] = None,
-    ) -> Dict[str, Any]:
+        idempotency_key: Optional[str] = None,
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        resource_ids: Optional[Sequence[str]] = None,
+        capacities: Optional[Dict[str, int]] = None,
+    ) -> Appointment:
         """
         Create new appointment.
 
+        The appointment goes to the first of ``resource_ids`` with a seat free
+        for its whole duration. The seat is claimed by a conditional insert
+        (insert_appointment_if_free), so concurrent bookings never exceed a
+        resource's capacity. With an idempotency key, a repeat of a booking
+        that already went through returns the original appointment instead of
+        failing on its own slot.
+
         Args:
             contact_number: User's phone number
             user_name: User's full name
             appt_date: Appointment date
             appt_time: Appointment time
             notes: Optional appointment notes
+            idempotency_key: Key of the booking request (idempotency.request_key)
+            duration_minutes: Length of the appointment
+            resource_ids: Resources in order of preference (the default
+                resource if None)
+            capacities: Concurrent bookings per resource (1 if not listed)
 
         Returns:
-            Created appointment dict
+            Created (or previously created) Appointment
         """
         try:
-            # First check if slot is available
-            is_available, error = await self.check_slot_available(appt_date, appt_time)
-            if not is_available:
-                raise ValueError(error or "Slot not available")
+            # First find the resources with a seat free for the whole appointment
+            free = await self._free_seats(
+                appt_date,
+                appt_time,
+                duration_minutes,
+                resource_ids,
+                capacities=capacities,
+            )
+            if not free:
+                original = await self._booked_with_key(idempotency_key)
+                if original:
+                    return original
+                raise ValueError("This time slot is already booked")
 
             # Ensure user profile exists
             profile = await self.get_user_profile(contact_number)
@@ -189,49 +371,115 @@ class DatabaseManager:
                 "appointment_date": str(appt_date),
                 "appointment_time": str(appt_time),
                 "status": "active",
+                "duration_minutes": duration_minutes,
             }
             if notes:
                 data["notes"] = notes
-
-            response = self.supabase.table("appointments").insert(data).execute()
+            if idempotency_key:
+                data["idempotency_key"] = idempotency_key
+
+            # Claim a seat atomically; a resource filled up by concurrent
+            # bookings since the check returns None and the next one is tried
+            appointment = None
+            try:
+                for resource_id, _ in free:
+                    appointment = await self._claim_seat(
+                        data, resource_id, (capacities or {}).get(resource_id, 1)
+                    )
+                    if appointment:
+                        break
+            except ValueError:
+                appointment = None
+            if not appointment:
+                # Lost a race, possibly to a concurrent repeat of this request
+                original = await self._booked_with_key(idempotency_key)
+                if original:
+                    return original
+                raise ValueError("This time slot is already booked")
 
             logger.info(
                 f"Appointment created for {user_name} on {appt_date} at {appt_time}"
             )
-            return response.data[0] if response.data else data
+            return Appointment.from_row(appointment)
 
         except Exception as e:
             logger.error(f"Error creating appointment: {e}")
             raise
 
+    async def _claim_seat(
+        self, data: Dict[str, Any], resource_id: str, capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Book the lowest free seat of one resource with a conditional insert.
+
+        Args:
+            data: Appointment row without its resource
+            resource_id: Resource to book
+            capacity: Seats of the resource
+
+        Returns:
+            The inserted row, or None if every seat is taken
+        """
+        return await timed_query(
+            self.backend.insert_appointment_if_free(
+                {**data, "resource_id": resource_id}, capacity
+            )
+        )
+
+    async def _booked_with_key(
+        self, idempotency_key: Optional[str]
+    ) -> Optional[Appointment]:
+        """The active appointment created by an earlier request with this key."""
+        if not idempotency_key:
+            return None
+        row = await timed_query(
+            self.backend.get_appointment_by_idempotency_key(idempotency_key)
+        )
+        if row:
+            logger.info(f"Returning appointment {row['id']} for repeated request")
+            return Appointment.from_row(row)
+        return None
+
+    @instrumented
     async def get_user_appointments(
-        self, contact_number: str, include_cancelled: bool = False
-    ) -> List[Dict[str, Any]]:
+        self,
+        contact_number: str,
+        include_cancelled: bool = False,
+        from_date: Optional[date] = None,
+    ) -> List[Appointment]:
         """
         Retrieve appointments for a user.
 
+        The default (active appointments) only reads the hot appointments
+        table. Asking for cancelled appointments returns the full history,
+        so archived rows are read as well.
+
         Args:
             contact_number: User's phone number
-            include_cancelled: Whether to include cancelled appointments
+            include_cancelled: Whether to include cancelled and archived appointments
+            from_date: Only return appointments on or after this date
 
         Returns:
-            List of appointment dicts
+            List of Appointment records ordered by date and time
         """
         try:
-            query = (
-                self.supabase.table("appointments")
-                .select("*")
-                .eq("contact_number", contact_number)
-                .order("appointment_date", desc=False)
-                .order("appointment_time", desc=False)
+            since = str(from_date) if from_date else None
+            rows = await timed_query(
+                self.backend.list_user_appointments(
+                    contact_number, include_cancelled, since
+                )
             )
-
-            if not include_cancelled:
-                query = query.eq("status", "active")
-
-            response = query.execute()
-
-            appointments = response.data if response.data else []
+            appointments = [Appointment.from_row(row) for row in rows]
+            if include_cancelled:
+                archived = await timed_query(
+                    self.backend.list_archived_appointments(contact_number)
+                )
+                appointments += [
+                    a
+                    for a in map(Appointment.from_row, archived)
+                    if from_date is None or a.appointment_date >= from_date
+                ]
+                appointments.sort(key=lambda a: a.cursor)
             logger.info(
                 f"Retrieved {len(appointments)} appointments for {contact_number}"
             )
@@ -241,34 +489,95 @@ class DatabaseManager:
             logger.error(f"Error retrieving appointments: {e}")
             return []
 
-    async def get_appointment_by_id(
-        self, appointment_id: str
-    ) -> Optional[Dict[str, Any]]:
+    @instrumented
+    async def get_appointment_page(
+        self,
+        contact_number: str,
+        include_cancelled: bool = False,
+        from_date: Optional[date] = None,
+        after: Optional[AppointmentCursor] = None,
+        limit: int = 20,
+    ) -> AppointmentPage:
         """
-        Get appointment by ID.
+        Fetch one page of a user's appointments as compact records.
+
+        Only APPOINTMENT_COLUMNS are read, and pages are keyset-paginated on
+        (date, time, id), so a caller with a long history costs one bounded
+        range scan per page instead of loading every row. With
+        ``include_cancelled`` the archive is paged alongside the hot table and
+        the two are merged.
 
         Args:
-            appointment_id: UUID of the appointment
+            contact_number: User's phone number
+            include_cancelled: Whether to include cancelled and archived appointments
+            from_date: Only return appointments on or after this date
+            after: ``next_cursor`` of the previous page, or None for the first
+            limit: Page size
 
         Returns:
-            Appointment dict or None
+            AppointmentPage; ``next_cursor`` is None on the last page
         """
         try:
-            response = (
-                self.supabase.table("appointments")
-                .select("*")
-                .eq("id", appointment_id)
-                .execute()
+            since = str(from_date) if from_date else None
+            # One extra row tells whether another page follows
+            rows = await timed_query(
+                self.backend.page_user_appointments(
+                    contact_number,
+                    include_cancelled,
+                    since,
+                    after,
+                    limit + 1,
+                    APPOINTMENT_COLUMNS,
+                )
+            )
+            if include_cancelled:
+                archived = await timed_query(
+                    self.backend.page_user_appointments(
+                        contact_number,
+                        include_cancelled,
+                        since,
+                        after,
+                        limit + 1,
+                        APPOINTMENT_COLUMNS,
+                        archived=True,
+                    )
+                )
+                # A new list: coalesced reads hand every caller the same one
+                rows = sorted(
+                    [*rows, *archived],
+                    key=lambda r: tuple(str(r[c]) for c in PAGE_KEY),
+                )
+
+            items = tuple(
+                Appointment.from_row(row, contact_number) for row in rows[:limit]
             )
+            next_cursor = items[-1].cursor if len(rows) > limit else None
+            return AppointmentPage(items=items, next_cursor=next_cursor)
 
-            if response.data and len(response.data) > 0:
-                return response.data[0]
-            return None
+        except Exception as e:
+            logger.error(f"Error retrieving appointment page: {e}")
+            return AppointmentPage()
+
+    @instrumented
+    async def get_appointment_by_id(self, appointment_id: str) -> Optional[Appointment]:
+        """
+        Get appointment by ID.
+
+        Args:
+            appointment_id: UUID of the appointment
+
+        Returns:
+            Appointment or None
+        """
+        try:
+            row = await timed_query(self.backend.get_appointment(appointment_id))
+            return Appointment.from_row(row) if row else None
 
         except Exception as e:
             logger.error(f"Error fetching appointment: {e}")
             return None
 
+    @instrumented
     async def cancel_appointment(self, appointment_id: str) -> bool:
         """
         Cancel an appointment.
@@ -280,14 +589,11 @@ class DatabaseManager:
             True if successful, False otherwise
         """
         try:
-            response = (
-                self.supabase.table("appointments")
-                .update({"status": "cancelled"})
-                .eq("id", appointment_id)
-                .execute()
+            updated = await timed_query(
+                self.backend.update_appointment(appointment_id, {"status": "cancelled"})
             )
 
-            if response.data:
+            if updated:
                 logger.info(f"Appointment {appointment_id} cancelled")
                 return True
             return False
@@ -296,51 +602,601 @@ class DatabaseManager:
             logger.error(f"Error cancelling appointment: {e}")
             return False
 
+    @instrumented
     async def modify_appointment(
-        self, appointment_id: str, new_date: date, new_time: time
-    ) -> Dict[str, Any]:
+        self,
+        appointment_id: str,
+        new_date: date,
+        new_time: time,
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        resource_ids: Optional[Sequence[str]] = None,
+        capacities: Optional[Dict[str, int]] = None,
+    ) -> Optional[Appointment]:
         """
         Modify appointment date/time.
 
+        The appointment itself is disregarded when checking the new slot, so
+        it can move to a start that overlaps its current interval.
+
         Args:
             appointment_id: UUID of the appointment
             new_date: New appointment date
             new_time: New appointment time
+            duration_minutes: Length of the appointment
+            resource_ids: Resources in order of preference, usually its
+                current resource first (the default resource if None)
+            capacities: Concurrent bookings per resource (1 if not listed)
 
         Returns:
-            Updated appointment dict
+            Updated Appointment, or None if it does not exist or is no
+            longer active
         """
         try:
             # Check if new slot is available
-            is_available, error = await self.check_slot_available(new_date, new_time)
-            if not is_available:
-                raise ValueError(error or "New slot not available")
-
-            # Update appointment
-            response = (
-                self.supabase.table("appointments")
-                .update(
+            free = await self._free_seats(
+                new_date,
+                new_time,
+                duration_minutes,
+                resource_ids,
+                appointment_id,
+                capacities,
+            )
+
+            # Claim a seat atomically, as create_appointment does; a resource
+            # filled up by concurrent bookings since the check is skipped
+            updated = None
+            for resource_id, _ in free:
+                updated = await timed_query(
+                    self.backend.update_appointment_if_free(
+                        appointment_id,
+                        {
+                            "appointment_date": str(new_date),
+                            "appointment_time": str(new_time),
+                            "resource_id": resource_id,
+                            "duration_minutes": duration_minutes,
+                        },
+                        (capacities or {}).get(resource_id, 1),
+                    )
+                )
+                if updated:
+                    break
+            if not updated:
+                # A repeated request finds the appointment already moved there
+                current = await timed_query(
+                    self.backend.get_appointment(appointment_id)
+                )
+                if current is None or current["status"] != "active":
+                    return None
+                appointment = Appointment.from_row(current)
+                if appointment.slot_key == (
+                    new_date.isoformat(),
+                    new_time.strftime("%H:%M"),
+                ):
+                    return appointment
+                raise ValueError("This time slot is already booked")
+
+            logger.info(
+                f"Appointment {appointment_id} modified to {new_date} at {new_time}"
+            )
+            return Appointment.from_row(updated)
+
+        except Exception as e:
+            logger.error(f"Error modifying appointment: {e}")
+            raise
+
+    @instrumented
+    async def archive_appointments(
+        self, cutoff_date: date, cancelled_before: datetime, batch_size: int = 5000
+    ) -> int:
+        """
+        Move one batch of past or long-cancelled appointments to the archive.
+
+        Args:
+            cutoff_date: Appointments dated before this are archived
+            cancelled_before: Cancelled or modified appointments last updated
+                before this are archived whatever their date
+            batch_size: Maximum rows moved in this call
+
+        Returns:
+            Number of rows moved; 0 when nothing is left to archive
+        """
+        try:
+            return await timed_query(
+                self.backend.archive_appointments(
+                    str(cutoff_date), cancelled_before.isoformat(), batch_size
+                )
+            )
+
+        except Exception as e:
+            logger.error(f"Error archiving appointments: {e}")
+            raise
+
+    # ==================== RECURRING SERIES METHODS ====================
+
+    @instrumented
+    async def create_series(
+        self,
+        series: Series,
+        horizon: date,
+        resource_ids: Optional[Sequence[str]] = None,
+        capacities: Optional[Dict[str, int]] = None,
+        skip_conflicts: bool = False,
+        valid_slot: Optional[Callable[[str, str], bool]] = None,
+    ) -> SeriesBooking:
+        """
+        Store a recurring series and book its occurrences up to ``horizon``.
+
+        The occurrences within the horizon are checked against availability
+        with one range query and inserted in one batch. Later ones are only
+        booked by materialize_series, as the horizon moves forward.
+
+        Args:
+            series: Series to store (its id is ignored)
+            horizon: Last date to book occurrences for now (today + days_ahead)
+            resource_ids: Resources in order of preference, for a series
+                without a resource of its own (the default resource if None)
+            capacities: Concurrent bookings per resource (1 if not listed)
+            skip_conflicts: Book the free occurrences even if others are
+                taken; otherwise nothing is stored when one is
+            valid_slot: Whether a (YYYY-MM-DD, HH:MM) slot can be booked at
+                all, e.g. AppConfig.is_valid_slot; occurrences on closed days
+                count as taken
+
+        Returns:
+            SeriesBooking with the stored series, its booked appointments and
+            the starts that were taken or closed (the series is not stored,
+            and has no id, if nothing was booked)
+        """
+        try:
+            starts = list(series.occurrences(before=horizon_end(horizon)))
+            rows, conflicts = await self._plan_occurrences(
+                [(series, starts)], resource_ids, capacities, valid_slot
+            )
+            taken = tuple(start for _, start in conflicts)
+            if (taken and not skip_conflicts) or (starts and not rows):
+                logger.info(f"{len(taken)} occurrences of the series are taken")
+                return SeriesBooking(series, (), taken)
+
+            # Ensure user profile exists
+            profile = await self.get_user_profile(series.contact_number)
+            if not profile:
+                await self.create_user_profile(series.contact_number, series.user_name)
+
+            stored = Series.from_row(
+                await timed_query(
+                    self.backend.insert_series(
+                        {**series.to_row(), "materialized_until": str(horizon)}
+                    )
+                )
+            )
+            try:
+                booked = await timed_query(
+                    self.backend.insert_appointments(
+                        [{**row, "series_id": stored.id} for row in rows]
+                    )
+                )
+            except ValueError:
+                # An occurrence was booked by someone else since the check
+                await timed_query(
+                    self.backend.update_series(stored.id, {"status": "cancelled"})
+                )
+                raise
+
+            logger.info(
+                f"Series {stored.id} created for {series.user_name} with "
+                f"{len(booked)} appointments booked up to {horizon}"
+            )
+            return SeriesBooking(
+                stored, tuple(Appointment.from_row(row) for row in booked), taken
+            )
+
+        except Exception as e:
+            logger.error(f"Error creating series: {e}")
+            raise
+
+    @instrumented
+    async def get_user_series(self, contact_number: str) -> List[Series]:
+        """
+        Get a caller's active recurring series.
+
+        Args:
+            contact_number: User's phone number
+
+        Returns:
+            Series ordered by first start
+        """
+        try:
+            rows = await timed_query(
+                self.backend.list_series(contact_number=contact_number)
+            )
+            return [Series.from_row(row) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Error fetching series: {e}")
+            return []
+
+    @instrumented
+    async def materialize_series(
+        self,
+        horizon: date,
+        resource_ids: Optional[Sequence[str]] = None,
+        capacities: Optional[Dict[str, int]] = None,
+        batch_size: int = 500,
+        valid_slot: Optional[Callable[[str, str], bool]] = None,
+    ) -> int:
+        """
+        Book the occurrences of every active series that fall up to ``horizon``.
+
+        Occurrences of all due series are checked with one range query.
+        Occurrences that are taken or closed are skipped and logged; the
+        series keeps going. A series without occurrences after the horizon
+        is marked completed, so later runs no longer load it.
+
+        Args:
+            horizon: Last date to book occurrences for (today + days_ahead)
+            resource_ids: Resources in order of preference, for series
+                without a resource of their own
+            capacities: Concurrent bookings per resource (1 if not listed)
+            batch_size: Appointment rows per insert
+            valid_slot: Whether a (YYYY-MM-DD, HH:MM) slot can be booked at
+                all, e.g. AppConfig.is_valid_slot
+
+        Returns:
+            Number of appointments booked
+        """
+        try:
+            due = [
+                Series.from_row(row)
+                for row in await timed_query(
+                    self.backend.list_series(materialized_before=str(horizon))
+                )
+            ]
+            items = [
+                (
+                    series,
+                    list(
+                        series.occurrences(
+                            after=horizon_end(series.materialized_until)
+                            if series.materialized_until
+                            else None,
+                            before=horizon_end(horizon),
+                        )
+                    ),
+                )
+                for series in due
+            ]
+            rows, conflicts = await self._plan_occurrences(
+                items, resource_ids, capacities, valid_slot
+            )
+            for series, start in conflicts:
+                logger.warning(
+                    f"Series {series.id}: {start} is taken or closed, skipping it"
+                )
+
+            booked = 0
+            for i in range(0, len(rows), batch_size):
+                booked += await self._insert_occurrences(
+                    rows[i : i + batch_size], capacities
+                )
+            for series in due:
+                updates = {"materialized_until": str(horizon)}
+                if next(series.occurrences(after=horizon_end(horizon)), None) is None:
+                    updates["status"] = "completed"
+                await timed_query(self.backend.update_series(series.id, updates))
+
+            logger.info(
+                f"Booked {booked} occurrences of {len(due)} series up to {horizon}"
+            )
+            return booked
+
+        except Exception as e:
+            logger.error(f"Error materializing series: {e}")
+            raise
+
+    async def _plan_occurrences(
+        self,
+        items: Sequence[Tuple[Series, Sequence[datetime]]],
+        resource_ids: Optional[Sequence[str]] = None,
+        capacities: Optional[Dict[str, int]] = None,
+        valid_slot: Optional[Callable[[str, str], bool]] = None,
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[Series, datetime]]]:
+        """
+        Assign a free resource seat to every occurrence, with a single query.
+
+        Args:
+            items: Series with the occurrence starts to book
+            resource_ids: Resources for series without one of their own
+            capacities: Concurrent bookings per resource (1 if not listed)
+            valid_slot: Whether a (YYYY-MM-DD, HH:MM) slot can be booked at
+                all; occurrences failing it are reported with the taken ones
+
+        Returns:
+            (appointment rows to insert, (series, start) pairs that are taken
+            or closed)
+        """
+        starts = [start for _, occurrences in items for start in occurrences]
+        if not starts:
+            return [], []
+
+        rows = await timed_query(
+            self.backend.list_booked_slots(
+                str(min(starts).date()), str(max(starts).date())
+            )
+        )
+        default_resources = list(resource_ids or [DEFAULT_RESOURCE])
+        engine = SchedulingEngine(default_resources, capacities=capacities)
+        engine.load(Booking.from_row(row) for row in rows)
+
+        planned: List[Dict[str, Any]] = []
+        conflicts: List[Tuple[Series, datetime]] = []
+        for series, occurrences in items:
+            resources = (
+                [series.resource_id] if series.resource_id else default_resources
+            )
+            for start in occurrences:
+                if valid_slot and not valid_slot(
+                    start.date().isoformat(), start.strftime("%H:%M")
+                ):
+                    conflicts.append((series, start))
+                    continue
+                choice = None
+                for resource_id in resources:
+                    seats = engine.free_seats(
+                        resource_id, start, series.duration_minutes
+                    )
+                    if seats:
+                        choice = (resource_id, seats[0])
+                        break
+                if choice is None:
+                    conflicts.append((series, start))
+                    continue
+                resource_id, seat = choice
+                engine.book(
+                    Booking(resource_id, start, series.duration_minutes, seat=seat)
+                )
+                planned.append(
                     {
-                        "appointment_date": str(new_date),
-                        "appointment_time": str(new_time),
+                        "contact_number": series.contact_number,
+                        "user_name": series.user_name,
+                        "appointment_date": str(start.date()),
+                        "appointment_time": str(start.time()),
                         "status": "active",
+                        "notes": series.notes,
+                        "resource_id": resource_id,
+                        "seat": seat,
+                        "duration_minutes": series.duration_minutes,
+                        "series_id": series.id,
                     }
                 )
-                .eq("id", appointment_id)
-                .execute()
+        return planned, conflicts
+
+    async def _insert_occurrences(
+        self,
+        rows: List[Dict[str, Any]],
+        capacities: Optional[Dict[str, int]] = None,
+    ) -> int:
+        """
+        Insert a batch, falling back to row by row if one was taken meanwhile.
+
+        Each row of the fallback claims a seat of its resource like
+        create_appointment, as its planned seat may be the one taken.
+        """
+        try:
+            return len(await timed_query(self.backend.insert_appointments(rows)))
+        except ValueError:
+            booked = 0
+            for row in rows:
+                resource_id = row["resource_id"]
+                data = {
+                    k: v for k, v in row.items() if k not in ("resource_id", "seat")
+                }
+                try:
+                    claimed = await self._claim_seat(
+                        data, resource_id, (capacities or {}).get(resource_id, 1)
+                    )
+                except ValueError:
+                    claimed = None
+                if claimed:
+                    booked += 1
+                else:
+                    logger.warning(
+                        f"Series {row['series_id']}: {row['appointment_date']} "
+                        f"{row['appointment_time']} was just taken, skipping it"
+                    )
+            return booked
+
+    # ==================== WAITLIST METHODS ====================
+
+    @instrumented
+    async def join_waitlist(self, entry: WaitlistEntry) -> WaitlistEntry:
+        """
+        Put a caller on the waitlist.
+
+        Args:
+            entry: Entry to store (its id and status are ignored)
+
+        Returns:
+            The stored WaitlistEntry
+        """
+        try:
+            # Ensure user profile exists
+            profile = await self.get_user_profile(entry.contact_number)
+            if not profile:
+                await self.create_user_profile(entry.contact_number, entry.user_name)
+
+            row = await timed_query(
+                self.backend.insert_waitlist_entry(
+                    {**entry.to_row(), "status": "waiting"}
+                )
             )
+            logger.info(f"{entry.user_name} joined the waitlist for {entry.describe()}")
+            return WaitlistEntry.from_row(row)
 
-            logger.info(
-                f"Appointment {appointment_id} modified to {new_date} at {new_time}"
+        except Exception as e:
+            logger.error(f"Error joining waitlist: {e}")
+            raise
+
+    @instrumented
+    async def fill_from_waitlist(
+        self,
+        starts: Sequence[datetime],
+        resource_ids: Optional[Sequence[str]] = None,
+        capacities: Optional[Dict[str, int]] = None,
+        business_hours: Tuple[time, time] = (time(9, 0), time(17, 0)),
+    ) -> List[Tuple[WaitlistEntry, Appointment]]:
+        """
+        Book waiting callers into freed starts, e.g. after a cancellation.
+
+        The waiting entries and bookings of the day are read with one query
+        each and matched in memory (WaitlistMatcher). Each match is then
+        booked with one atomic claim; a match that lost a race to another
+        booking or worker is skipped, and its entry keeps waiting.
+
+        Args:
+            starts: Freed starts, all on the same day (waitlist.freed_starts)
+            resource_ids: Resources in order of preference, for entries
+                without a resource of their own (the default resource if None)
+            capacities: Concurrent bookings per resource (1 if not listed)
+            business_hours: (opens, closes); a match must fit inside them
+
+        Returns:
+            (entry, booked appointment) of every caller booked
+        """
+        try:
+            if not starts:
+                return []
+            day = str(min(starts).date())
+            rows = await timed_query(self.backend.list_waitlist(day))
+            if not rows:
+                return []
+
+            engine = SchedulingEngine(
+                resource_ids or [DEFAULT_RESOURCE], business_hours, capacities
+            )
+            engine.load(
+                Booking.from_row(row)
+                for row in await timed_query(
+                    self.backend.list_booked_slots(day, str(max(starts).date()))
+                )
             )
-            return response.data[0] if response.data else {}
+            matcher = WaitlistMatcher(engine)
+            for row in rows:
+                matcher.add(WaitlistEntry.from_row(row), starts)
+
+            booked = []
+            for match in matcher.match():
+                entry = match.entry
+                appointment = await timed_query(
+                    self.backend.claim_waitlist_entry(
+                        entry.id,
+                        {
+                            "contact_number": entry.contact_number,
+                            "user_name": entry.user_name,
+                            "appointment_date": str(match.start.date()),
+                            "appointment_time": str(match.start.time()),
+                            "status": "active",
+                            "notes": "Booked from the waitlist",
+                            "resource_id": match.resource_id,
+                            "duration_minutes": entry.duration_minutes,
+                        },
+                        engine.capacity(match.resource_id),
+                    )
+                )
+                if appointment is None:
+                    logger.info(f"Waitlist entry {entry.id} lost {match.start}")
+                    continue
+                logger.info(f"Waitlist entry {entry.id} booked for {match.start}")
+                booked.append((entry, Appointment.from_row(appointment)))
+            return booked
 
         except Exception as e:
-            logger.error(f"Error modifying appointment: {e}")
+            logger.error(f"Error filling slots from the waitlist: {e}")
+            raise
+
+    # ==================== SLOT HOLD METHODS ====================
+
+    @instrumented
+    async def hold_slot(
+        self,
+        appt_date: date,
+        appt_time: time,
+        holder: str,
+        ttl_seconds: float,
+        seats: int = 1,
+    ) -> bool:
+        """
+        Hold one of a slot's places for a caller while they confirm the booking.
+
+        Args:
+            appt_date: Slot date
+            appt_time: Slot time
+            holder: Identifier of the holding session
+            ttl_seconds: How long the hold lasts unless renewed
+            seats: Places of the slot not taken by bookings
+
+        Returns:
+            True if the holder now holds a place, False if others hold them all
+        """
+        try:
+            return await timed_query(
+                self.backend.acquire_slot_hold(
+                    str(appt_date), str(appt_time), holder, ttl_seconds, seats
+                )
+            )
+        except Exception as e:
+            logger.error(f"Error holding slot {appt_date} {appt_time}: {e}")
+            raise
+
+    @instrumented
+    async def get_held_slots(
+        self, start_date: date, end_date: date, exclude_holder: Optional[str] = None
+    ) -> Dict[tuple[str, str], int]:
+        """
+        Count the unexpired holds in a date range with a single query.
+
+        Args:
+            start_date: First date of the range (inclusive)
+            end_date: Last date of the range (inclusive)
+            exclude_holder: Leave out this holder's own holds
+
+        Returns:
+            Number of places held per (YYYY-MM-DD, HH:MM)
+        """
+        try:
+            rows = await timed_query(
+                self.backend.list_slot_holds(str(start_date), str(end_date))
+            )
+            held: Dict[tuple[str, str], int] = {}
+            for row in rows:
+                if row["holder"] != exclude_holder:
+                    key = (str(row["slot_date"]), row["slot_time"][:5])
+                    held[key] = held.get(key, 0) + 1
+            return held
+        except Exception as e:
+            logger.error(f"Error fetching slot holds: {e}")
+            raise
+
+    @instrumented
+    async def release_slot_hold(self, appt_date: date, appt_time: time, holder: str):
+        """
+        Release a holder's hold on a slot (no-op if it holds none).
+
+        Args:
+            appt_date: Slot date
+            appt_time: Slot time
+            holder: Identifier of the holding session
+        """
+        try:
+            await timed_query(
+                self.backend.release_slot_hold(str(appt_date), str(appt_time), holder)
+            )
+        except Exception as e:
+            logger.error(f"Error releasing slot hold: {e}")
             raise
 
     # ==================== CONVERSATION SUMMARY METHODS ====================
 
+    @instrumented
     async def save_conversation_summary(
         self,
         session_id: str,
@@ -374,17 +1230,16 @@ class DatabaseManager:
                 "cost_breakdown": cost_breakdown or {},
             }
 
-            response = (
-                self.supabase.table("conversation_summaries").insert(data).execute()
-            )
+            saved = await timed_query(self.backend.insert_conversation_summary(data))
 
             logger.info(f"Conversation summary saved for session {session_id}")
-            return response.data[0] if response.data else data
+            return saved
 
         except Exception as e:
             logger.error(f"Error saving conversation summary: {e}")
             raise
 
+    @instrumented
     async def get_conversation_summary(
         self, session_id: str
     ) -> Optional[Dict[str, Any]]:
@@ -398,17 +1253,89 @@ class DatabaseManager:
             Summary dict or None
         """
         try:
-            response = (
-                self.supabase.table("conversation_summaries")
-                .select("*")
-                .eq("session_id", session_id)
-                .execute()
-            )
-
-            if response.data and len(response.data) > 0:
-                return response.data[0]
-            return None
+            return await timed_query(self.backend.get_conversation_summary(session_id))
 
         except Exception as e:
             logger.error(f"Error fetching conversation summary: {e}")
             return None
+
+    # ==================== BULK READ METHODS ====================
+
+    @instrumented
+    async def scan_page(
+        self,
+        table: str,
+        order_column: str = "created_at",
+        after: Optional[Tuple[Any, Any]] = None,
+        limit: int = 1000,
+        columns: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch one keyset-paginated page of a table (see StorageBackend.scan_rows).
+
+        Args:
+            table: Table to scan
+            order_column: "created_at" or "updated_at"
+            after: (order value, key) of the last row already read
+            limit: Page size
+            columns: Columns to project; None for all
+
+        Returns:
+            Up to ``limit`` rows
+        """
+        try:
+            return await timed_query(
+                self.backend.scan_rows(table, order_column, after, limit, columns)
+            )
+
+        except Exception as e:
+            logger.error(f"Error scanning {table}: {e}")
+            raise
+
+    async def iter_pages(
+        self,
+        table: str,
+        order_column: str = "created_at",
+        after: Optional[Tuple[Any, Any]] = None,
+        page_size: int = 1000,
+        columns: Optional[Sequence[str]] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream a whole table (or everything after a cursor) page by page.
+
+        Only one page is held in memory at a time, and each page costs one
+        index range scan regardless of how far into the table it starts.
+
+        Yields:
+            Lists of up to ``page_size`` rows in (order_column, key) order
+        """
+        key = SCAN_KEYS[table]
+        while True:
+            page = await self.scan_page(table, order_column, after, page_size, columns)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after = (page[-1][order_column], page[-1][key])
+
+    @instrumented
+    async def upsert_rollup(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        """
+        Write precomputed aggregate rows, replacing existing rows by key.
+
+        Args:
+            table: One of the cost_rollup_* tables
+            rows: Rows to insert or replace
+
+        Returns:
+            Number of rows written
+        """
+        try:
+            written = await timed_query(self.backend.upsert_rows(table, rows))
+            logger.info(f"Wrote {written} rows to {table}")
+            return written
+
+        except Exception as e:
+            logger.error(f"Error writing {table}: {e}")
+            raise
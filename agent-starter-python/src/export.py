@@ -0,0 +1,408 @@
+"""
+Incremental columnar export of appointments and conversation summaries.
+
+Rows are streamed with keyset pagination, converted page by page into Arrow
+record batches with a fixed schema and appended to one Parquet (or Arrow IPC)
+file per table and run, so memory use is bounded by the page size. After a
+file is complete the table's watermark, the (order value, id) of the last row
+exported, is saved to a small JSON state file, and the next run only reads
+rows after it.
+
+appointments are exported by updated_at, so a modified or cancelled row is
+exported again; downstream readers keep the latest row per id.
+conversation_summaries are immutable and exported by created_at.
+
+Usage:
+    python -m src.export --out-dir exports/
+    python -m src.export --tables appointments --full
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime, time, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: pip install "agent-starter-python[analytics]"
+    pa = None
+    pq = None
+
+try:
+    from .database import DatabaseManager
+    from .storage import SCAN_KEYS, create_backend
+except ImportError:
+    from database import DatabaseManager
+    from storage import SCAN_KEYS, create_backend
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== VALUE CONVERSION ====================
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    parsed = datetime.fromisoformat(str(value))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _date(value: Any) -> Optional[date]:
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def _time(value: Any) -> Optional[time]:
+    if value is None or isinstance(value, time):
+        return value
+    return time.fromisoformat(str(value))
+
+
+def _optional_str(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _json(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(",", ":"))
+
+
+def _total_cost(row: Dict[str, Any]) -> Optional[float]:
+    costs = row.get("cost_breakdown")
+    if isinstance(costs, str):
+        costs = json.loads(costs)
+    return (costs or {}).get("total_cost")
+
+
+def _string():
+    return pa.string()
+
+
+def _int():
+    return pa.int32()
+
+
+def _float():
+    return pa.float64()
+
+
+def _date_type():
+    return pa.date32()
+
+
+def _time_type():
+    return pa.time32("s")
+
+
+def _ts_type():
+    return pa.timestamp("us", tz="UTC")
+
+
+def _status_type():
+    return pa.dictionary(pa.int8(), pa.string())
+
+
+def _col(name: str, convert: Callable[[Any], Any] = lambda v: v):
+    return lambda row: convert(row.get(name))
+
+
+@dataclass
+class ExportSpec:
+    """How one table is read and laid out in Arrow."""
+
+    table: str
+    order_column: str
+    source: Tuple[str, ...]  # table columns projected by the scan
+    # output column -> (arrow type factory, converter from a source row)
+    columns: Dict[str, Tuple[Callable[[], Any], Callable[[Dict[str, Any]], Any]]]
+
+    def schema(self) -> Any:
+        return pa.schema(
+            [(name, factory()) for name, (factory, _) in self.columns.items()]
+        )
+
+    def to_batch(self, rows: List[Dict[str, Any]]) -> Any:
+        """Convert a page of rows into a RecordBatch with this spec's schema."""
+        arrays = [
+            pa.array([convert(row) for row in rows], type=factory())
+            for factory, convert in self.columns.values()
+        ]
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema())
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "appointments": ExportSpec(
+        table="appointments",
+        order_column="updated_at",
+        source=(
+            "id",
+            "contact_number",
+            "user_name",
+            "appointment_date",
+            "appointment_time",
+            "status",
+            "notes",
+            "resource_id",
+            "duration_minutes",
+            "seat",
+            "series_id",
+            "idempotency_key",
+            "created_at",
+            "updated_at",
+        ),
+        columns={
+            "id": (_string, _col("id", str)),
+            "contact_number": (_string, _col("contact_number")),
+            "user_name": (_string, _col("user_name")),
+            "appointment_date": (_date_type, _col("appointment_date", _date)),
+            "appointment_time": (_time_type, _col("appointment_time", _time)),
+            "status": (_status_type, _col("status")),
+            "notes": (_string, _col("notes")),
+            "resource_id": (_string, _col("resource_id")),
+            "duration_minutes": (_int, _col("duration_minutes")),
+            "seat": (_int, _col("seat")),
+            "series_id": (_string, _col("series_id", _optional_str)),
+            "idempotency_key": (_string, _col("idempotency_key")),
+            "created_at": (_ts_type, _col("created_at", _timestamp)),
+            "updated_at": (_ts_type, _col("updated_at", _timestamp)),
+        },
+    ),
+    "conversation_summaries": ExportSpec(
+        table="conversation_summaries",
+        order_column="created_at",
+        source=(
+            "id",
+            "session_id",
+            "contact_number",
+            "summary",
+            "appointments_mentioned",
+            "user_preferences",
+            "cost_breakdown",
+            "created_at",
+        ),
+        columns={
+            "id": (_string, _col("id", str)),
+            "session_id": (_string, _col("session_id")),
+            "contact_number": (_string, _col("contact_number")),
+            "summary": (_string, _col("summary")),
+            "appointments_mentioned": (_string, _col("appointments_mentioned", _json)),
+            "user_preferences": (_string, _col("user_preferences")),
+            "cost_breakdown": (_string, _col("cost_breakdown", _json)),
+            "total_cost": (_float, _total_cost),
+            "created_at": (_ts_type, _col("created_at", _timestamp)),
+        },
+    ),
+}
+
+
+# ==================== WATERMARKS ====================
+
+
+class WatermarkStore:
+    """Per-table export cursors persisted as JSON."""
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: State file; created on first save
+        """
+        self.path = path
+        self.state: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            self.state = json.loads(path.read_text())
+
+    def cursor(self, table: str) -> Optional[Tuple[Any, Any]]:
+        """(order value, key) of the last exported row, or None."""
+        entry = self.state.get(table)
+        return (entry["order_value"], entry["key"]) if entry else None
+
+    def advance(self, table: str, cursor: Tuple[Any, Any], rows: int):
+        """Record a completed export and save the state atomically."""
+        previous = self.state.get(table, {})
+        self.state[table] = {
+            "order_value": cursor[0],
+            "key": cursor[1],
+            "rows_exported": previous.get("rows_exported", 0) + rows,
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2))
+        os.replace(tmp, self.path)
+
+
+# ==================== EXPORT ====================
+
+
+@dataclass
+class ExportResult:
+    """Outcome of exporting one table."""
+
+    table: str
+    rows: int = 0
+    batches: int = 0
+    path: Optional[Path] = None
+    cursor: Optional[Tuple[Any, Any]] = None
+    seconds: float = 0.0
+
+
+class _BatchWriter:
+    """Writes record batches to a Parquet or Arrow IPC file."""
+
+    def __init__(self, path: Path, schema: Any, fmt: str):
+        self.path = path
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(str(path), schema)
+
+    def write(self, batch: Any):
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+
+
+async def export_table(
+    db: DatabaseManager,
+    table: str,
+    out_dir: Path,
+    watermarks: WatermarkStore,
+    page_size: int = 5000,
+    fmt: str = "parquet",
+    full: bool = False,
+) -> ExportResult:
+    """
+    Export rows added or changed since the table's watermark.
+
+    The output is written to a temporary file and renamed when complete, and
+    the watermark only advances after that, so an interrupted run is simply
+    repeated next time.
+
+    Args:
+        db: Database manager to read from
+        table: Key of EXPORTS
+        out_dir: Directory receiving <table>/<run>.parquet (or .arrow)
+        watermarks: Cursor store for incremental runs
+        page_size: Rows per page and per record batch
+        fmt: "parquet" or "arrow"
+        full: Ignore the watermark and export everything
+
+    Returns:
+        ExportResult; ``path`` is None when there was nothing new
+    """
+    if pa is None:
+        raise RuntimeError(
+            'Exports require pyarrow: pip install "agent-starter-python[analytics]"'
+        )
+
+    spec = EXPORTS[table]
+    key = SCAN_KEYS[table]
+    after = None if full else watermarks.cursor(table)
+    result = ExportResult(table=table, cursor=after)
+    started = datetime.now(timezone.utc)
+
+    table_dir = out_dir / table
+    table_dir.mkdir(parents=True, exist_ok=True)
+    suffix = "parquet" if fmt == "parquet" else "arrow"
+    final_path = table_dir / f"{started.strftime('%Y%m%dT%H%M%S%fZ')}.{suffix}"
+    tmp_path = final_path.with_suffix(f".{suffix}.tmp")
+
+    writer: Optional[_BatchWriter] = None
+    try:
+        async for page in db.iter_pages(
+            table,
+            order_column=spec.order_column,
+            after=after,
+            page_size=page_size,
+            columns=spec.source,
+        ):
+            if writer is None:
+                writer = _BatchWriter(tmp_path, spec.schema(), fmt)
+            writer.write(spec.to_batch(page))
+            result.rows += len(page)
+            result.batches += 1
+            result.cursor = (page[-1][spec.order_column], page[-1][key])
+    except Exception:
+        if writer is not None:
+            writer.close()
+            tmp_path.unlink(missing_ok=True)
+        raise
+
+    if writer is not None:
+        writer.close()
+        os.replace(tmp_path, final_path)
+        result.path = final_path
+        watermarks.advance(table, result.cursor, result.rows)
+
+    result.seconds = (datetime.now(timezone.utc) - started).total_seconds()
+    logger.info(
+        f"Exported {result.rows} {table} rows in {result.batches} batches "
+        f"({result.seconds:.2f}s) to {result.path or 'nothing new'}"
+    )
+    return result
+
+
+# ==================== CLI ====================
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--backend", help="supabase, sqlite or memory (default: STORAGE_BACKEND)"
+    )
+    parser.add_argument(
+        "--tables", nargs="+", choices=sorted(EXPORTS), default=sorted(EXPORTS)
+    )
+    parser.add_argument("--out-dir", type=Path, default=Path("exports"))
+    parser.add_argument(
+        "--state", type=Path, help="Watermark file (default: <out-dir>/watermarks.json)"
+    )
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--page-size", type=int, default=5000)
+    parser.add_argument(
+        "--full", action="store_true", help="Ignore watermarks and export everything"
+    )
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> List[ExportResult]:
+    """Export each selected table in turn."""
+    db = DatabaseManager(create_backend(args.backend))
+    watermarks = WatermarkStore(args.state or args.out_dir / "watermarks.json")
+    return [
+        await export_table(
+            db,
+            table,
+            args.out_dir,
+            watermarks,
+            page_size=args.page_size,
+            fmt=args.format,
+            full=args.full,
+        )
+        for table in args.tables
+    ]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    try:
+        asyncio.run(run(parse_args(argv)))
+    except Exception as e:
+        logger.error(f"Export failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Short-lived slot holds while a caller confirms a booking.
+
+Between fetch_slots and book_appointment the agent reads options back and
+confirms the caller's details, which takes several turns. Without holds two
+callers offered the same slot both confirm it, and the one who books second
+has to start over. With holds, the caller picking a slot holds one of its
+places for a couple of minutes, and book_appointment turns the hold into the
+booking. A slot with several places (more resources, or a resource with
+capacity) stays on offer until holds and bookings take all of them.
+
+Holds are kept in the database's slot_holds table by default
+(SLOT_HOLD_STORE=database). Each call runs in its own job process, so this is
+the store every session sees, on this worker and on others.
+SLOT_HOLD_STORE=memory keeps them in process memory instead, which saves the
+round trips but only works where all sessions share one process (the thread
+job executor, benchmarks and tests). Holds expire on their own, so a caller
+who hangs up never blocks a slot for longer than the TTL.
+"""
+
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import date
+from datetime import time as dt_time
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    from .database import DatabaseManager
+except ImportError:
+    from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Long enough for a read-back and confirmation, short enough that a slot an
+# abandoned call picked is offered again quickly
+DEFAULT_HOLD_TTL = 120.0
+
+SlotKey = Tuple[str, str]  # (YYYY-MM-DD, HH:MM), as Slot.key
+
+
+def slot_key(slot_date: date, slot_time: dt_time) -> SlotKey:
+    return (slot_date.isoformat(), slot_time.strftime("%H:%M"))
+
+
+class SlotHolds(ABC):
+    """Where holds are kept; each holder holds one place of a slot."""
+
+    def __init__(self, ttl: float = DEFAULT_HOLD_TTL):
+        """
+        Args:
+            ttl: Seconds a hold lasts unless renewed
+        """
+        self.ttl = ttl
+
+    @abstractmethod
+    async def acquire(
+        self, slot_date: date, slot_time: dt_time, holder: str, seats: int = 1
+    ) -> bool:
+        """
+        Hold one of a slot's free places, renewing the holder's own hold.
+
+        Args:
+            slot_date: Slot date
+            slot_time: Slot time
+            holder: Identifier of the holding session
+            seats: Places of the slot not taken by bookings
+
+        Returns:
+            False if other holders' unexpired holds take every place
+        """
+
+    @abstractmethod
+    async def release(self, slot_date: date, slot_time: dt_time, holder: str):
+        """Drop the holder's hold on a slot, if it has one."""
+
+    @abstractmethod
+    async def held_by_others(
+        self, start_date: date, end_date: date, holder: str
+    ) -> Dict[SlotKey, int]:
+        """Places held by anyone but ``holder``, per slot of a date range."""
+
+
+class LocalSlotHolds(SlotHolds):
+    """Holds in this process's memory, seen only by sessions running in it."""
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_HOLD_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            ttl: Seconds a hold lasts unless renewed
+            clock: Monotonic time source (injectable for tests)
+        """
+        super().__init__(ttl)
+        self._clock = clock
+        # Expiry of each holder's hold, per slot
+        self._holds: Dict[SlotKey, Dict[str, float]] = {}
+
+    def _prune(self, now: float):
+        for key in list(self._holds):
+            holders = self._holds[key]
+            for owner in [o for o, expires in holders.items() if expires <= now]:
+                del holders[owner]
+            if not holders:
+                del self._holds[key]
+
+    async def acquire(
+        self, slot_date: date, slot_time: dt_time, holder: str, seats: int = 1
+    ) -> bool:
+        key = slot_key(slot_date, slot_time)
+        now = self._clock()
+        holders = {
+            owner: expires
+            for owner, expires in self._holds.get(key, {}).items()
+            if expires > now
+        }
+        if holder not in holders and len(holders) >= seats:
+            return False
+        holders[holder] = now + self.ttl
+        self._holds[key] = holders
+        return True
+
+    async def release(self, slot_date: date, slot_time: dt_time, holder: str):
+        key = slot_key(slot_date, slot_time)
+        holders = self._holds.get(key)
+        if holders and holders.pop(holder, None) is not None and not holders:
+            del self._holds[key]
+
+    async def held_by_others(
+        self, start_date: date, end_date: date, holder: str
+    ) -> Dict[SlotKey, int]:
+        self._prune(self._clock())
+        start, end = start_date.isoformat(), end_date.isoformat()
+        held = {
+            key: len(holders) - (holder in holders)
+            for key, holders in self._holds.items()
+            if start <= key[0] <= end
+        }
+        return {key: places for key, places in held.items() if places}
+
+
+class DatabaseSlotHolds(SlotHolds):
+    """Holds in the slot_holds table, shared by every worker."""
+
+    def __init__(self, db: DatabaseManager, ttl: float = DEFAULT_HOLD_TTL):
+        """
+        Args:
+            db: Database manager to keep the holds in
+            ttl: Seconds a hold lasts unless renewed
+        """
+        super().__init__(ttl)
+        self.db = db
+
+    async def acquire(
+        self, slot_date: date, slot_time: dt_time, holder: str, seats: int = 1
+    ) -> bool:
+        return await self.db.hold_slot(slot_date, slot_time, holder, self.ttl, seats)
+
+    async def release(self, slot_date: date, slot_time: dt_time, holder: str):
+        await self.db.release_slot_hold(slot_date, slot_time, holder)
+
+    async def held_by_others(
+        self, start_date: date, end_date: date, holder: str
+    ) -> Dict[SlotKey, int]:
+        return await self.db.get_held_slots(start_date, end_date, exclude_holder=holder)
+
+
+_worker_holds: Optional[LocalSlotHolds] = None
+
+
+def create_slot_holds(db: DatabaseManager, kind: Optional[str] = None) -> SlotHolds:
+    """
+    Create the hold store selected by SLOT_HOLD_STORE.
+
+    The database store is the default, since sessions run in separate job
+    processes. The memory store is one instance per process, so it only
+    coordinates sessions that share that process.
+
+    Args:
+        db: Session's database manager (used by the database store)
+        kind: "database" (default) or "memory"; overrides the env var
+
+    Returns:
+        Configured SlotHolds
+    """
+    global _worker_holds
+    kind = (kind or os.getenv("SLOT_HOLD_STORE", "database")).lower()
+    ttl = float(os.getenv("SLOT_HOLD_TTL", DEFAULT_HOLD_TTL))
+
+    if kind == "memory":
+        if _worker_holds is None:
+            _worker_holds = LocalSlotHolds(ttl)
+        return _worker_holds
+    if kind == "database":
+        return DatabaseSlotHolds(db, ttl)
+
+    raise ValueError(f"Unknown SLOT_HOLD_STORE '{kind}'")
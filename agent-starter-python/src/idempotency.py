@@ -0,0 +1,159 @@
+"""
+Deduplication of repeated write tool calls within a session.
+
+The LLM sometimes repeats a function call: a retry after a slow response, or
+the same call issued twice in one turn. Without deduplication the second
+book_appointment runs a full slot check and insert and then reports the
+caller's own booking as "already booked".
+
+Write tools key each call by a hash of the tool name and its normalized
+arguments. The first successful result is kept for a short TTL, and a repeat
+within that window gets the same result back without a database round trip.
+A repeat that arrives while the first call is still running waits for it.
+The same key is stored with the appointment (appointments.idempotency_key),
+so a repeat arriving after the TTL, or on another worker, is still answered
+with the original booking.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import date
+from datetime import time as dt_time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Long enough to cover LLM retries within a turn, short enough that a caller
+# deliberately repeating a request a minute later is served fresh
+DEFAULT_TTL = 60.0
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, (date, dt_time)):
+        return value.isoformat()
+    return value
+
+
+def request_key(tool: str, **args: Any) -> str:
+    """
+    Stable key for a tool call: a hash of the tool name and normalized args.
+
+    Strings are compared case- and whitespace-insensitively, so "Ada  Lovelace"
+    and "ada lovelace" are the same request. Pass parsed dates and times rather
+    than the caller's wording, so "tomorrow at 2pm" and "2026-03-02 14:00"
+    collide as well.
+
+    Args:
+        tool: Tool name
+        **args: Arguments identifying the request
+
+    Returns:
+        32 hex character key
+    """
+    payload = json.dumps(
+        [tool, {name: _normalize(value) for name, value in args.items()}],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class IdempotencyCache:
+    """Per-session TTL cache of write tool results, keyed by request_key."""
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = 64,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            ttl: Seconds a result is replayed for
+            max_entries: Results kept at most; the oldest are dropped first
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._results: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored result for a key, or None if absent or expired."""
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at <= self._clock():
+            del self._results[key]
+            return None
+        return result
+
+    def put(self, key: str, result: Any):
+        """Store a result for ``ttl`` seconds."""
+        self._results[key] = (self._clock() + self.ttl, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    async def run(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[T]],
+        cache_if: Callable[[T], bool] = lambda result: True,
+    ) -> T:
+        """
+        Run a call once per key and replay its result to repeats.
+
+        Args:
+            key: request_key of the call
+            call: Coroutine function performing the write
+            cache_if: Whether a result may be replayed; failures usually
+                should not be, so that a genuine retry runs again
+
+        Returns:
+            The result of ``call``, or of the earlier call with the same key
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            logger.info(f"Replaying result of duplicate request {key}")
+            return cached
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            logger.info(f"Waiting for in-flight duplicate request {key}")
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            result = await call()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved: a waiter is optional
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            if cache_if(result):
+                self.put(key, result)
+            future.set_result(result)
+            return result
+        finally:
+            self._pending.pop(key, None)
@@ -0,0 +1,222 @@
+"""Query instrumentation for database calls made on behalf of agent tools."""
+
+import contextvars
+import functools
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of database queries a single call of each tool may issue.
+# Exceeding a budget logs a warning in production and fails assert_query_budget
+# in tests.
+QUERY_BUDGETS: Dict[str, int] = {
+    "identify_user": 1,
+    # Slot holds cost a query each, none with SLOT_HOLD_STORE=memory
+    "fetch_slots": 2,  # booked slots, held slots
+    "hold_slot": 2,  # slot check, hold
+    "book_appointment": 6,  # hold, slot check, profile lookup/create, insert, release
+    # booked slots, profile lookup/create, series insert, batch insert
+    "book_recurring_appointment": 5,
+    "join_waitlist": 3,  # profile lookup/create, insert
+    "retrieve_appointments": 1,
+    # Both free a slot, which adds waitlist, booked slots, then a claim and a
+    # summary per caller booked from the waitlist (one, typically)
+    # list appointments, update, waitlist, booked slots, claim, summary
+    "cancel_appointment": 6,
+    # list appointments, slot check, move, waitlist, booked slots, claim, summary
+    "modify_appointment": 7,
+    "end_conversation": 2,  # list appointments, save summary
+}
+
+
+@dataclass
+class CallStats:
+    """Query counts and timings collected while a scope is active."""
+
+    name: str
+    queries: int = 0
+    query_time: float = 0.0
+    methods: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def describe(self) -> str:
+        """Human readable per-method breakdown."""
+        breakdown = ", ".join(f"{m}={n}" for m, n in sorted(self.methods.items()))
+        return f"{self.queries} queries in {self.query_time * 1000:.1f}ms ({breakdown})"
+
+
+@dataclass
+class TimingStats:
+    """Aggregated call count and latency for a method or tool."""
+
+    calls: int = 0
+    queries: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+    def add(self, duration: float, queries: int = 0):
+        self.calls += 1
+        self.queries += queries
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+
+    def as_dict(self) -> Dict[str, float]:
+        avg = self.total_time / self.calls if self.calls else 0.0
+        return {
+            "calls": self.calls,
+            "queries": self.queries,
+            "avg_ms": round(avg * 1000, 3),
+            "max_ms": round(self.max_time * 1000, 3),
+        }
+
+
+_active_scopes: contextvars.ContextVar[Tuple[CallStats, ...]] = contextvars.ContextVar(
+    "db_active_scopes", default=()
+)
+_current_method: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "db_current_method", default=None
+)
+
+
+class QueryTracker:
+    """Process-wide aggregation of database queries per method and per tool."""
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self.reset()
+
+    def reset(self):
+        """Clear all collected statistics."""
+        self.methods: Dict[str, TimingStats] = defaultdict(TimingStats)
+        self.tools: Dict[str, TimingStats] = defaultdict(TimingStats)
+        self.budget_violations: Dict[str, int] = defaultdict(int)
+
+    def record_query(self, duration: float):
+        """
+        Record a single round trip to the database.
+
+        The query is attributed to the innermost instrumented method and to
+        every scope (tool call or budget assertion) currently active.
+        """
+        method = _current_method.get() or "unknown"
+        for scope in _active_scopes.get():
+            scope.queries += 1
+            scope.query_time += duration
+            scope.methods[method] += 1
+
+    @contextmanager
+    def scope(self, name: str) -> Iterator[CallStats]:
+        """Collect the queries issued inside the block into a CallStats."""
+        stats = CallStats(name=name)
+        token = _active_scopes.set((*_active_scopes.get(), stats))
+        try:
+            yield stats
+        finally:
+            _active_scopes.reset(token)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serialisable view of the collected statistics."""
+        return {
+            "methods": {k: v.as_dict() for k, v in self.methods.items()},
+            "tools": {k: v.as_dict() for k, v in self.tools.items()},
+            "budget_violations": dict(self.budget_violations),
+        }
+
+
+query_tracker = QueryTracker()
+
+
+async def timed_query(query: Awaitable[Any]) -> Any:
+    """
+    Await a single storage round trip and record it.
+
+    Args:
+        query: Awaitable issuing exactly one query (e.g. a backend method call)
+
+    Returns:
+        The query result
+    """
+    start = time.perf_counter()
+    try:
+        return await query
+    finally:
+        query_tracker.record_query(time.perf_counter() - start)
+
+
+def instrumented(func: Callable) -> Callable:
+    """Decorator timing a DatabaseManager coroutine and counting its queries."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = _current_method.set(name)
+        start = time.perf_counter()
+        with query_tracker.scope(name) as stats:
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                query_tracker.methods[name].add(
+                    time.perf_counter() - start, stats.queries
+                )
+                _current_method.reset(token)
+
+    return wrapper
+
+
+def tracked_tool(func: Callable) -> Callable:
+    """
+    Decorator attributing database queries to the agent tool that caused them.
+
+    Apply below ``@function_tool()`` so the tool schema is still derived from
+    the original signature and docstring. Calls that exceed the tool's entry
+    in QUERY_BUDGETS are logged as warnings. If the agent has a
+    ``cost_tracker`` (pricing.CostAttribution), the call is also reported to
+    it so follow-up LLM and TTS usage is charged to the tool.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        with query_tracker.scope(name) as stats:
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                query_tracker.tools[name].add(duration, stats.queries)
+                cost_tracker = getattr(args[0], "cost_tracker", None) if args else None
+                if cost_tracker is not None:
+                    cost_tracker.record_tool(name, duration, stats.queries)
+                budget = QUERY_BUDGETS.get(name)
+                if budget is not None and stats.queries > budget:
+                    query_tracker.budget_violations[name] += 1
+                    logger.warning(
+                        f"Tool {name} exceeded its query budget of {budget}: "
+                        f"{stats.describe()}"
+                    )
+
+    return wrapper
+
+
+@contextmanager
+def assert_query_budget(max_queries: int, label: str = "block") -> Iterator[CallStats]:
+    """
+    Test helper asserting that a block issues at most ``max_queries`` queries.
+
+    Example:
+        with assert_query_budget(1, "fetch_slots"):
+            await assistant.fetch_slots(context)
+
+    Raises:
+        AssertionError: If the block issued more queries than allowed
+    """
+    with query_tracker.scope(label) as stats:
+        yield stats
+    if stats.queries > max_queries:
+        raise AssertionError(
+            f"{label} exceeded query budget of {max_queries}: {stats.describe()}"
+        )
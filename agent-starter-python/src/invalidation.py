@@ -0,0 +1,535 @@
+"""
+Per-worker read cache kept coherent across workers by an invalidation bus.
+
+A worker may cache profiles, a caller's appointments and the booked slots of
+a date window only if it learns when another worker changes them. In
+Postgres, triggers on user_profiles and appointments (see supabase_setup.sql)
+send a compact change event with NOTIFY on commit: the table, the callers
+and the dates a row change touched. Each worker LISTENs once per process
+(PostgresBus, requires asyncpg) and every CachedBackend of the process drops
+the entries the event covers.
+
+Each call runs in its own job process, so the cache lives in the worker
+process, in front of the backend its ReadService reads from, and the job
+processes read through it (see shared_reads.py). Writes made through a
+CachedBackend are published on the bus as well, and job processes announce
+theirs to the worker with change_of(), so the process that wrote never waits
+for its own notification. InvalidationBus alone delivers events within the
+process: it is what the SQLite and in-memory backends use, and it stands in
+for NOTIFY in tests.
+
+Entries also expire after a TTL, as a bound on staleness should an event
+ever be lost. While PostgresBus is disconnected the cache is bypassed, and
+it is cleared whenever the connection is (re)established.
+"""
+
+import asyncio
+import contextlib
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+try:
+    import asyncpg
+except ImportError:  # optional: pip install "agent-starter-python[cache]"
+    asyncpg = None
+
+try:
+    from .resilience import READ_PREFIXES, retry_delay
+    from .singleflight import signature
+except ImportError:
+    from resilience import READ_PREFIXES, retry_delay
+    from singleflight import signature
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "superbryn_changes"
+USER_PROFILES = "user_profiles"
+APPOINTMENTS = "appointments"
+
+
+# ==================== CHANGE EVENTS ====================
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """
+    Rows of a table changed for some callers on some dates.
+
+    None stands for "any": an event whose callers or dates are unknown
+    drops everything of its table that they could cover.
+    """
+
+    table: str
+    contact_numbers: Optional[Tuple[str, ...]] = None
+    dates: Optional[Tuple[str, ...]] = None
+
+    def to_payload(self) -> str:
+        """JSON payload, as sent by the notify_cache_change() trigger."""
+        return json.dumps(
+            {
+                "table": self.table,
+                "contacts": self.contact_numbers and list(self.contact_numbers),
+                "dates": self.dates and list(self.dates),
+            },
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_payload(cls, payload: str) -> "ChangeEvent":
+        data = json.loads(payload)
+        contacts = data.get("contacts")
+        dates = data.get("dates")
+        return cls(
+            data["table"],
+            tuple(c for c in contacts if c) if contacts is not None else None,
+            tuple(d for d in dates if d) if dates is not None else None,
+        )
+
+
+def _appointment_change(rows: Iterable[Optional[Dict[str, Any]]]) -> ChangeEvent:
+    rows = [row for row in rows if row]
+    return ChangeEvent(
+        APPOINTMENTS,
+        tuple({str(row["contact_number"]) for row in rows}),
+        tuple({str(row["appointment_date"]) for row in rows}),
+    )
+
+
+def change_of(
+    name: str, arguments: Dict[str, Any], result: Any, failed: bool
+) -> Optional[ChangeEvent]:
+    """
+    What a backend write may have changed in the cached tables, or None.
+
+    A write that failed may still have landed (a timeout, say), so it is
+    published too; update_appointment only names its row once it returns it.
+    """
+    if name == "insert_user_profile":
+        return ChangeEvent(USER_PROFILES, (arguments["data"]["contact_number"],))
+    if name == "update_user_profile":
+        return ChangeEvent(USER_PROFILES, (arguments["contact_number"],))
+    if name in ("insert_appointment", "insert_appointment_if_free"):
+        return _appointment_change([arguments["data"]])
+    if name == "claim_waitlist_entry":
+        return _appointment_change([arguments["data"]])
+    if name == "insert_appointments":
+        return _appointment_change(arguments["rows"])
+    if name == "update_appointment":
+        if failed or "appointment_date" in arguments["updates"]:
+            return ChangeEvent(APPOINTMENTS)
+        return _appointment_change([result]) if result else None
+    if name in ("update_appointment_if_free", "archive_appointments"):
+        return ChangeEvent(APPOINTMENTS)
+    return None
+
+
+# ==================== BUSES ====================
+
+
+class InvalidationBus:
+    """
+    Delivers change events to the caches of this process.
+
+    Publishing only reaches local subscribers; in a fleet the database
+    triggers reach the other workers (see PostgresBus).
+    """
+
+    def __init__(self):
+        self._subscribers: List[Tuple[Callable, Optional[Callable]]] = []
+
+    @property
+    def live(self) -> bool:
+        """Whether every change is being delivered, so caching is safe."""
+        return True
+
+    def subscribe(
+        self,
+        on_change: Callable[[ChangeEvent], None],
+        on_reset: Optional[Callable[[], None]] = None,
+    ):
+        """
+        Args:
+            on_change: Called with every event
+            on_reset: Called when events may have been missed
+        """
+        self._subscribers.append((on_change, on_reset))
+
+    def publish(self, event: ChangeEvent):
+        """Deliver an event to every subscriber of this process."""
+        for on_change, _ in self._subscribers:
+            try:
+                on_change(event)
+            except Exception as e:
+                logger.error(f"Invalidation of {event} failed: {e}")
+
+    def reset(self):
+        """Tell every subscriber that events may have been missed."""
+        for _, on_reset in self._subscribers:
+            if on_reset is not None:
+                on_reset()
+
+    def start(self):
+        """Start receiving events from other processes (nothing to do here)."""
+
+    async def stop(self):
+        """Stop receiving events from other processes."""
+
+
+class PostgresBus(InvalidationBus):
+    """
+    Receives the change events of every worker through LISTEN.
+
+    One connection per process, reconnected with backoff when it drops and
+    probed every ``keepalive`` seconds so a silently dead socket is noticed.
+    Subscribers are reset on every (re)connect, and the bus is not live in
+    between.
+    """
+
+    def __init__(self, dsn: str, channel: str = CHANNEL, keepalive: float = 30.0):
+        """
+        Args:
+            dsn: Postgres connection string (Supabase's direct connection)
+            channel: Channel the triggers notify
+            keepalive: Seconds between liveness probes of the connection
+
+        Raises:
+            RuntimeError: If asyncpg is not installed
+        """
+        if asyncpg is None:
+            raise RuntimeError(
+                'The invalidation bus requires asyncpg: pip install "agent-starter-python[cache]"'
+            )
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self.keepalive = keepalive
+        self.connects = 0
+        self._connected = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def live(self) -> bool:
+        return self._connected
+
+    def _notified(self, connection: Any, pid: int, channel: str, payload: str):
+        try:
+            event = ChangeEvent.from_payload(payload)
+        except (ValueError, KeyError) as e:
+            logger.error(f"Dropping malformed change event {payload!r}: {e}")
+            self.reset()
+            return
+        self.publish(event)
+
+    async def _listen(self):
+        connection = await asyncpg.connect(self.dsn)
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        try:
+            await connection.add_listener(self.channel, self._notified)
+            self._connected = True
+            self.connects += 1
+            self.reset()  # anything cached before may have missed changes
+            logger.info(f"Listening for cache invalidations on {self.channel}")
+            while not lost.is_set():
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(lost.wait(), self.keepalive)
+                if not lost.is_set():
+                    await asyncio.wait_for(connection.fetchval("SELECT 1"), 5)
+        finally:
+            self._connected = False
+            self.reset()
+            with contextlib.suppress(Exception):
+                await connection.close(timeout=1)
+
+    async def _run(self):
+        attempt = 0
+        while True:
+            try:
+                await self._listen()
+                attempt = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                attempt += 1
+                logger.warning(f"Invalidation listener disconnected: {e}")
+            await asyncio.sleep(retry_delay(attempt + 1, base=0.5, cap=30.0))
+
+    def start(self):
+        """Start listening on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop listening."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+def create_bus(kind: Optional[str] = None) -> InvalidationBus:
+    """
+    Create the invalidation bus for the backend selected by STORAGE_BACKEND.
+
+    Supabase workers listen with PostgresBus on DATABASE_URL; the SQLite and
+    in-memory backends only see their own process's writes.
+
+    Args:
+        kind: "supabase" (default), "sqlite" or "memory"; overrides the env var
+
+    Raises:
+        RuntimeError: If a Supabase worker has no DATABASE_URL or no asyncpg
+    """
+    kind = (kind or os.getenv("STORAGE_BACKEND", "supabase")).lower()
+    if kind != "supabase":
+        return InvalidationBus()
+    dsn = os.getenv("DATABASE_URL")
+    if not dsn:
+        raise RuntimeError("DATABASE_URL must be set to cache reads with Supabase")
+    return PostgresBus(dsn)
+
+
+# ==================== CACHE ====================
+
+
+@dataclass
+class CacheStats:
+    """Reads answered from the cache, and entries dropped by invalidation."""
+
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    invalidated: int = 0
+    resets: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        reads = self.hits + self.misses
+        return self.hits / reads if reads else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "invalidated": self.invalidated,
+            "resets": self.resets,
+            "hit_ratio": round(self.hit_ratio, 3),
+        }
+
+
+# Backend reads that are cached, and the table each reads
+CACHED_READS = {
+    "get_user_profile": USER_PROFILES,
+    "list_user_appointments": APPOINTMENTS,
+    "list_booked_slots": APPOINTMENTS,
+}
+
+
+class _Entry:
+    """A cached read, or one in flight (``stale`` once an event covers it)."""
+
+    __slots__ = ("contact", "expires", "span", "stale", "table", "value")
+
+    def __init__(self, key: Hashable):
+        name, arguments = key[0], dict(key[1])
+        self.table = CACHED_READS[name]
+        self.contact: Optional[str] = arguments.get("contact_number")
+        self.span: Optional[Tuple[str, str]] = None
+        if name == "list_booked_slots":
+            self.span = (arguments["start_date"], arguments["end_date"])
+        self.expires = 0.0
+        self.stale = False
+        self.value: Any = None
+
+    def covered_by(self, event: ChangeEvent) -> bool:
+        if event.table != self.table:
+            return False
+        if self.contact is not None:
+            return (
+                event.contact_numbers is None or self.contact in event.contact_numbers
+            )
+        start, end = self.span
+        return event.dates is None or any(start <= d <= end for d in event.dates)
+
+
+class CachedBackend:
+    """
+    Caches a backend's profile, appointment and booked-slot reads.
+
+    Entries are keyed by the read's normalized signature and dropped by the
+    events of ``bus``. A read that an event covers while it is in flight is
+    returned but not cached. Cached rows are shared between sessions: treat
+    them as read-only. Every other attribute is the backend's.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        bus: InvalidationBus,
+        ttl: float = 30.0,
+        max_entries: int = 4096,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            backend: Backend to cache (usually a GuardedBackend)
+            bus: Bus whose events invalidate entries
+            ttl: Seconds an entry is served at most
+            max_entries: Entries kept, least recently used dropped first
+            clock: Monotonic time source in seconds
+        """
+        self.backend = backend
+        self.name = backend.name
+        self.bus = bus
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.stats = CacheStats()
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._by_contact: Dict[str, Set[Hashable]] = defaultdict(set)
+        self._spans: Set[Hashable] = set()
+        self._reading: Set[_Entry] = set()
+        bus.subscribe(self.invalidate, self.clear)
+
+    @property
+    def size(self) -> int:
+        """Entries currently cached."""
+        return len(self._entries)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The wrapped backend's snapshot, if any, plus the cache counters."""
+        inner = getattr(self.backend, "snapshot", None)
+        snapshot = inner() if callable(inner) else {}
+        return {**snapshot, "cache": {**self.stats.as_dict(), "entries": self.size}}
+
+    # ==================== INVALIDATION ====================
+
+    def invalidate(self, event: ChangeEvent):
+        """Drop the entries an event covers."""
+        for entry in self._reading:
+            if entry.covered_by(event):
+                entry.stale = True
+        if event.contact_numbers is None:
+            keys = [k for k, e in self._entries.items() if e.contact is not None]
+        else:
+            keys = [
+                k for c in event.contact_numbers for k in self._by_contact.get(c, ())
+            ]
+        if event.table == APPOINTMENTS:
+            keys += self._spans
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None and entry.covered_by(event):
+                self._drop(key)
+                self.stats.invalidated += 1
+
+    def clear(self):
+        """Drop every entry, including the reads in flight."""
+        for entry in self._reading:
+            entry.stale = True
+        self._entries.clear()
+        self._by_contact.clear()
+        self._spans.clear()
+        self.stats.resets += 1
+
+    def _drop(self, key: Hashable):
+        entry = self._entries.pop(key)
+        if entry.span is not None:
+            self._spans.discard(key)
+        else:
+            keys = self._by_contact[entry.contact]
+            keys.discard(key)
+            if not keys:
+                del self._by_contact[entry.contact]
+
+    def _store(self, key: Hashable, entry: _Entry):
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = entry
+        if entry.span is not None:
+            self._spans.add(key)
+        else:
+            self._by_contact[entry.contact].add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    # ==================== CALLS ====================
+
+    async def _read(self, name: str, attr: Callable, args: tuple, kwargs: dict):
+        if not self.bus.live:
+            self.stats.bypassed += 1
+            return await attr(*args, **kwargs)
+        key = signature(name, attr, args, kwargs)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires > self.clock():
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry.value
+
+        self.stats.misses += 1
+        entry = _Entry(key)
+        self._reading.add(entry)
+        try:
+            entry.value = await attr(*args, **kwargs)
+        finally:
+            self._reading.discard(entry)
+        if not entry.stale and self.bus.live:
+            entry.expires = self.clock() + self.ttl
+            self._store(key, entry)
+        return entry.value
+
+    async def _write(self, name: str, attr: Callable, args: tuple, kwargs: dict):
+        result = None
+        failed = True
+        try:
+            result = await attr(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            try:
+                arguments = inspect.signature(attr).bind(*args, **kwargs).arguments
+                event = change_of(name, arguments, result, failed)
+            except (TypeError, KeyError) as e:
+                logger.warning(f"Clearing the cache after {name}: {e}")
+                event = None
+                self.clear()
+            if event is not None:
+                self.bus.publish(event)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.backend, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+        if name in CACHED_READS:
+            call = self._read
+        elif name.startswith(READ_PREFIXES):
+            return attr
+        else:
+            call = self._write
+
+        @functools.wraps(attr)
+        async def cached(*args, **kwargs):
+            return await call(name, attr, args, kwargs)
+
+        # Later lookups find the wrapper without going through __getattr__
+        setattr(self, name, cached)
+        return cached
@@ -0,0 +1,983 @@
+"""
+Degraded mode: keep taking bookings while the database is down.
+
+When Supabase stalls, JournaledDatabase keeps the agent answering instead
+of failing every tool:
+
+    - every backend call goes through a CircuitBreaker (resilience.py); once
+      it opens, calls fail at once instead of waiting for their timeouts
+    - reads that hit an outage are served from a snapshot of the last good
+      reads (profiles, a caller's appointments, the bookings of each day),
+      with the journaled writes applied on top
+    - bookings, cancellations and summaries that hit an outage are appended
+      to a local WriteJournal and confirmed to the caller; a booking is still
+      checked against the snapshot, so one worker never double-books a slot
+    - a JournalReplayer applies the journal once the circuit lets calls
+      through again; bookings that lost their slot to another worker in the
+      meantime (caught by the conditional insert and the unique slot index)
+      are reported to the caller through a conversation summary
+
+The journal is append-only JSON lines, one file per worker process. Appends
+are group-committed: concurrent appends are written and fsynced together
+once per ``flush_interval``, so a burst of sessions costs one fsync instead
+of one each. A journal left by a worker that died is adopted and replayed by
+another worker sharing the directory.
+"""
+
+import asyncio
+import contextlib
+import fcntl
+import glob
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+try:
+    from .database import DatabaseManager
+    from .invalidation import CachedBackend, create_bus
+    from .models import (
+        DEFAULT_DURATION_MINUTES,
+        DEFAULT_RESOURCE,
+        Appointment,
+        UserProfile,
+    )
+    from .resilience import (
+        DEFAULT_READ_POLICY,
+        DEFAULT_WRITE_POLICY,
+        OPEN,
+        CallPolicy,
+        CircuitBreaker,
+        GuardedBackend,
+    )
+    from .scheduling import Booking, SchedulingEngine
+    from .sharding import CalendarShard, ShardedDatabase, ShardNode
+    from .shared_reads import ReadService, SharedReads, read_socket_path
+    from .singleflight import SingleFlight
+    from .storage import StorageBackend, create_backend
+except ImportError:
+    from database import DatabaseManager
+    from invalidation import CachedBackend, create_bus
+    from models import (
+        DEFAULT_DURATION_MINUTES,
+        DEFAULT_RESOURCE,
+        Appointment,
+        UserProfile,
+    )
+    from resilience import (
+        DEFAULT_READ_POLICY,
+        DEFAULT_WRITE_POLICY,
+        OPEN,
+        CallPolicy,
+        CircuitBreaker,
+        GuardedBackend,
+    )
+    from scheduling import Booking, SchedulingEngine
+    from sharding import CalendarShard, ShardedDatabase, ShardNode
+    from shared_reads import ReadService, SharedReads, read_socket_path
+    from singleflight import SingleFlight
+    from storage import StorageBackend, create_backend
+
+logger = logging.getLogger(__name__)
+
+CREATE = "create_appointment"
+CANCEL = "cancel_appointment"
+SUMMARY = "save_conversation_summary"
+
+# Prefix of the ids given to journaled bookings until they are replayed
+LOCAL_PREFIX = "journal-"
+
+
+@dataclass(frozen=True, slots=True)
+class JournalEntry:
+    """One journaled write, in the order it was accepted."""
+
+    seq: int
+    id: str
+    op: str
+    args: Dict[str, Any]
+    at: str
+
+
+class WriteJournal:
+    """Append-only JSONL file of writes waiting for the database."""
+
+    def __init__(self, path: str, flush_interval: float = 0.002, max_batch: int = 256):
+        """
+        Args:
+            path: Journal file; ``<path>.done`` holds the last replayed seq
+            flush_interval: Seconds appends wait to share one write and fsync
+            max_batch: Appends that trigger a write without waiting
+        """
+        self.path = path
+        self.checkpoint_path = f"{path}.done"
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.batches = 0
+        self.fsyncs = 0
+        self._seq = 0
+        self._pending: Dict[int, JournalEntry] = {}
+        self._batch: List[Tuple[JournalEntry, asyncio.Future]] = []
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._load()
+
+    def _load(self):
+        done = 0
+        with (
+            contextlib.suppress(FileNotFoundError, ValueError),
+            open(self.checkpoint_path) as f,
+        ):
+            done = int(f.read().strip() or 0)
+        self._seq = done
+        with contextlib.suppress(FileNotFoundError), open(self.path) as f:
+            for line in f:
+                try:
+                    entry = JournalEntry(**json.loads(line))
+                except (ValueError, TypeError):
+                    # A write torn by a crash; nothing after it was acked
+                    logger.warning(f"Ignoring torn tail of journal {self.path}")
+                    break
+                self._seq = max(self._seq, entry.seq)
+                if entry.seq > done:
+                    self._pending[entry.seq] = entry
+        if self._pending:
+            logger.info(f"Journal {self.path} has {len(self._pending)} pending writes")
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def pending(self) -> List[JournalEntry]:
+        """Entries not replayed yet, oldest first."""
+        return list(self._pending.values())
+
+    async def append(self, op: str, args: Dict[str, Any]) -> JournalEntry:
+        """
+        Journal one write; returns once it is on disk.
+
+        The entry is pending (and visible to pending()) as soon as this is
+        called, so a check-then-append without an await in between is atomic
+        within the process.
+
+        Raises:
+            OSError: If the batch could not be written (the entry is dropped)
+        """
+        self._seq += 1
+        entry = JournalEntry(
+            seq=self._seq,
+            id=uuid.uuid4().hex,
+            op=op,
+            args=args,
+            at=datetime.now(timezone.utc).isoformat(),
+        )
+        self._pending[entry.seq] = entry
+        future = asyncio.get_running_loop().create_future()
+        self._batch.append((entry, future))
+        if len(self._batch) >= self.max_batch:
+            self._full.set()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_soon())
+        await future
+        return entry
+
+    async def _flush_soon(self):
+        while self._batch:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Write and fsync every batched append."""
+        async with self._lock:
+            batch, self._batch = self._batch, []
+            self._full.clear()
+            if not batch:
+                return
+            lines = "".join(
+                json.dumps(asdict(entry), default=str) + "\n" for entry, _ in batch
+            )
+            try:
+                await asyncio.to_thread(self._write, lines)
+            except Exception as e:
+                logger.error(f"Error writing journal {self.path}: {e}")
+                for entry, future in batch:
+                    self._pending.pop(entry.seq, None)
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            self.batches += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    def _write(self, lines: str):
+        with open(self.path, "a") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self.fsyncs += 1
+
+    async def mark_replayed(self, seq: int):
+        """Record that every entry up to ``seq`` has reached the database."""
+        for done in [s for s in self._pending if s <= seq]:
+            del self._pending[done]
+        await asyncio.to_thread(self._write_checkpoint, seq)
+
+    def _write_checkpoint(self, seq: int):
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    async def compact(self) -> bool:
+        """
+        Empty the file once everything in it was replayed.
+
+        Returns:
+            True if the file was truncated
+        """
+        async with self._lock:
+            if self._pending or self._batch:
+                return False
+            # Sequence numbers continue from the checkpoint
+            await asyncio.to_thread(self._truncate)
+            return True
+
+    def _truncate(self):
+        with open(self.path, "w") as f:
+            os.fsync(f.fileno())
+
+    def discard(self):
+        """Delete the journal and its checkpoint (an adopted, fully replayed one)."""
+        for path in (self.path, self.checkpoint_path):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+
+@dataclass
+class ReplayReport:
+    """Outcome of one replay pass."""
+
+    replayed: int = 0
+    conflicts: List[JournalEntry] = field(default_factory=list)
+    remaining: int = 0
+
+
+class ReadSnapshot:
+    """The last good reads, served while the database is unavailable."""
+
+    def __init__(self, max_callers: int = 10_000, max_days: int = 400):
+        """
+        Args:
+            max_callers: Callers whose profile and appointments are kept (LRU)
+            max_days: Days whose bookings are kept (LRU)
+        """
+        self.max_callers = max_callers
+        self.max_days = max_days
+        self.profiles: OrderedDict[str, Optional[UserProfile]] = OrderedDict()
+        self.appointments: OrderedDict[str, List[Appointment]] = OrderedDict()
+        self.bookings: OrderedDict[date, List[Booking]] = OrderedDict()
+
+    @staticmethod
+    def _put(cache: OrderedDict, key: Any, value: Any, limit: int):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+    def put_profile(self, contact_number: str, profile: Optional[UserProfile]):
+        self._put(self.profiles, contact_number, profile, self.max_callers)
+
+    def put_appointments(self, contact_number: str, appointments: List[Appointment]):
+        self._put(self.appointments, contact_number, appointments, self.max_callers)
+
+    def put_bookings(self, start: date, end: date, bookings: List[Booking]):
+        by_day: Dict[date, List[Booking]] = {}
+        day = start
+        while day <= end:
+            by_day[day] = []
+            day += timedelta(days=1)
+        for booking in bookings:
+            by_day.setdefault(booking.start.date(), []).append(booking)
+        for day, day_bookings in by_day.items():
+            self._put(self.bookings, day, day_bookings, self.max_days)
+
+    def day_bookings(self, start: date, end: date) -> List[Booking]:
+        """Known bookings in a date range; days never read count as empty."""
+        return [
+            booking
+            for day, bookings in self.bookings.items()
+            if start <= day <= end
+            for booking in bookings
+        ]
+
+
+class JournaledDatabase(DatabaseManager):
+    """
+    DatabaseManager that falls back to a snapshot and a journal in an outage.
+
+    Only outages (breaker failures) switch to degraded mode; rejected writes
+    such as a taken slot raise as before. Modifications, series, waitlist and
+    holds are not journaled and fail as usual while the database is down.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[StorageBackend] = None,
+        journal: Optional[WriteJournal] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        snapshot: Optional[ReadSnapshot] = None,
+        replay_interval: float = 5.0,
+    ):
+        """
+        Args:
+            backend: Storage backend (selected by STORAGE_BACKEND if None);
+                a GuardedBackend, or a CachedBackend over one, is used as is,
+                with its breaker
+            journal: Journal for writes (a per-process file in DB_JOURNAL_DIR,
+                or the working directory, if None)
+            breaker: Breaker around the backend
+            snapshot: Cache of the last good reads
+            replay_interval: Seconds between the replayer's checks
+        """
+        backend = backend or create_backend()
+        if not isinstance(getattr(backend, "breaker", None), CircuitBreaker):
+            backend = GuardedBackend(backend, breaker or CircuitBreaker("database"))
+        self.breaker = backend.breaker
+        self.journal = journal or WriteJournal(
+            journal_path(os.getenv("DB_JOURNAL_DIR", "."))
+        )
+        self.snapshot = snapshot or ReadSnapshot()
+        self.replayer = JournalReplayer(self, replay_interval)
+        # Local id of each replayed booking -> id it got in the database
+        self._replayed: Dict[str, str] = {}
+        super().__init__(backend)
+
+    # ==================== DEGRADED READS ====================
+
+    async def get_user_profile(self, contact_number: str) -> Optional[UserProfile]:
+        with self.breaker.watch() as watch:
+            profile = await super().get_user_profile(contact_number)
+        if watch.failed:
+            logger.warning(f"Serving profile of {contact_number} from snapshot")
+            return self.snapshot.profiles.get(contact_number)
+        self.snapshot.put_profile(contact_number, profile)
+        return profile
+
+    async def get_user_appointments(
+        self,
+        contact_number: str,
+        include_cancelled: bool = False,
+        from_date: Optional[date] = None,
+    ) -> List[Appointment]:
+        with self.breaker.watch() as watch:
+            appointments = await super().get_user_appointments(
+                contact_number, include_cancelled, from_date
+            )
+        if not watch.failed:
+            if not include_cancelled:
+                self.snapshot.put_appointments(contact_number, appointments)
+            return appointments
+
+        logger.warning(f"Serving appointments of {contact_number} from snapshot")
+        creates, cancelled = self._pending_writes()
+        known = self.snapshot.appointments.get(contact_number, [])
+        pending = [
+            Appointment.from_row(row)
+            for row in creates.values()
+            if row["contact_number"] == contact_number
+        ]
+        appointments = [
+            a
+            for a in known + pending
+            if a.id not in cancelled
+            and (from_date is None or a.appointment_date >= from_date)
+        ]
+        return sorted(appointments, key=lambda a: a.cursor)
+
+    async def get_bookings(self, start_date: date, end_date: date) -> List[Booking]:
+        with self.breaker.watch() as watch:
+            try:
+                bookings = await super().get_bookings(start_date, end_date)
+            except Exception:
+                if not watch.failed:
+                    raise
+        if watch.failed:
+            logger.warning(f"Serving bookings {start_date}..{end_date} from snapshot")
+            return self._bookings_view(start_date, end_date)
+        self.snapshot.put_bookings(start_date, end_date, bookings)
+        return bookings
+
+    async def check_slot_available(
+        self,
+        appt_date: date,
+        appt_time: time,
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        resource_ids: Optional[Sequence[str]] = None,
+        exclude_id: Optional[str] = None,
+        capacities: Optional[Dict[str, int]] = None,
+    ) -> tuple[bool, Optional[str]]:
+        with self.breaker.watch() as watch:
+            result = await super().check_slot_available(
+                appt_date,
+                appt_time,
+                duration_minutes,
+                resource_ids,
+                exclude_id,
+                capacities,
+            )
+        if not watch.failed:
+            return result
+        free = self._snapshot_free_seats(
+            appt_date, appt_time, duration_minutes, resource_ids, exclude_id, capacities
+        )
+        if not free:
+            return False, "This time slot is already booked"
+        return True, None
+
+    def _pending_writes(self) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+        """Journaled bookings not cancelled since (by local id), and cancelled ids."""
+        creates: Dict[str, Dict[str, Any]] = {}
+        cancelled: Set[str] = set()
+        for entry in self.journal.pending():
+            if entry.op == CREATE:
+                row = entry.args["appointment"]
+                creates[row["id"]] = row
+            elif entry.op == CANCEL:
+                cancelled.add(entry.args["appointment_id"])
+        for appointment_id in cancelled:
+            creates.pop(appointment_id, None)
+        return creates, cancelled
+
+    def _bookings_view(self, start_date: date, end_date: date) -> List[Booking]:
+        """Snapshot bookings with the journaled bookings and cancellations applied."""
+        creates, cancelled = self._pending_writes()
+        bookings = [
+            b
+            for b in self.snapshot.day_bookings(start_date, end_date)
+            if b.booking_id not in cancelled
+        ]
+        for row in creates.values():
+            booking = Booking.from_row(row)
+            if start_date <= booking.start.date() <= end_date:
+                bookings.append(booking)
+        return bookings
+
+    def _snapshot_free_seats(
+        self,
+        appt_date: date,
+        appt_time: time,
+        duration_minutes: int,
+        resource_ids: Optional[Sequence[str]],
+        exclude_id: Optional[str],
+        capacities: Optional[Dict[str, int]],
+    ) -> List[Tuple[str, int]]:
+        engine = SchedulingEngine(
+            resource_ids or [DEFAULT_RESOURCE], capacities=capacities
+        )
+        engine.load(self._bookings_view(appt_date, appt_date))
+        start = datetime.combine(appt_date, appt_time)
+        free = []
+        for resource_id in engine.resource_ids:
+            seats = engine.free_seats(resource_id, start, duration_minutes, exclude_id)
+            if seats:
+                free.append((resource_id, seats[0]))
+        return free
+
+    # ==================== JOURNALED WRITES ====================
+
+    async def create_appointment(
+        self,
+        contact_number: str,
+        user_name: str,
+        appt_date: date,
+        appt_time: time,
+        notes: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        resource_ids: Optional[Sequence[str]] = None,
+        capacities: Optional[Dict[str, int]] = None,
+    ) -> Appointment:
+        with self.breaker.watch() as watch:
+            try:
+                return await super().create_appointment(
+                    contact_number,
+                    user_name,
+                    appt_date,
+                    appt_time,
+                    notes,
+                    idempotency_key,
+                    duration_minutes,
+                    resource_ids,
+                    capacities,
+                )
+            except Exception:
+                if not watch.failed:
+                    raise
+
+        local_id = f"{LOCAL_PREFIX}{uuid.uuid4().hex}"
+        # The key also makes the replay idempotent if the insert did land
+        key = idempotency_key or local_id
+        creates, _ = self._pending_writes()
+        for row in creates.values():
+            if row["idempotency_key"] == key:
+                return Appointment.from_row(row)
+
+        free = self._snapshot_free_seats(
+            appt_date, appt_time, duration_minutes, resource_ids, None, capacities
+        )
+        if not free:
+            raise ValueError("This time slot is already booked")
+        resource_id, seat = free[0]
+        row = {
+            "id": local_id,
+            "contact_number": contact_number,
+            "user_name": user_name,
+            "appointment_date": str(appt_date),
+            "appointment_time": str(appt_time),
+            "status": "active",
+            "notes": notes,
+            "resource_id": resource_id,
+            "seat": seat,
+            "duration_minutes": duration_minutes,
+            "idempotency_key": key,
+        }
+        await self.journal.append(
+            CREATE,
+            {
+                "appointment": row,
+                "resource_ids": list(resource_ids) if resource_ids else None,
+                "capacities": capacities,
+            },
+        )
+        logger.warning(
+            f"Database unavailable; appointment {local_id} for {user_name} "
+            f"on {appt_date} at {appt_time} journaled"
+        )
+        return Appointment.from_row(row)
+
+    async def cancel_appointment(self, appointment_id: str) -> bool:
+        appointment_id = self._replayed.get(appointment_id, appointment_id)
+        if appointment_id.startswith(LOCAL_PREFIX):
+            # Still only in the journal: the replay drops both writes
+            await self.journal.append(CANCEL, {"appointment_id": appointment_id})
+            return True
+
+        with self.breaker.watch() as watch:
+            cancelled = await super().cancel_appointment(appointment_id)
+        if not watch.failed:
+            return cancelled
+        await self.journal.append(CANCEL, {"appointment_id": appointment_id})
+        logger.warning(
+            f"Database unavailable; cancellation of {appointment_id} journaled"
+        )
+        return True
+
+    async def save_conversation_summary(
+        self,
+        session_id: str,
+        summary: str,
+        contact_number: Optional[str] = None,
+        appointments: Optional[List[Dict[str, Any]]] = None,
+        user_preferences: Optional[str] = None,
+        cost_breakdown: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        args = {
+            "session_id": session_id,
+            "summary": summary,
+            "contact_number": contact_number,
+            "appointments": appointments,
+            "user_preferences": user_preferences,
+            "cost_breakdown": cost_breakdown,
+        }
+        with self.breaker.watch() as watch:
+            try:
+                return await super().save_conversation_summary(**args)
+            except Exception:
+                if not watch.failed:
+                    raise
+        entry = await self.journal.append(SUMMARY, args)
+        logger.warning(
+            f"Database unavailable; summary of session {session_id} journaled"
+        )
+        return {**args, "id": f"{LOCAL_PREFIX}{entry.id}"}
+
+    # ==================== REPLAY ====================
+
+    async def replay_journal(
+        self, journal: Optional[WriteJournal] = None
+    ) -> ReplayReport:
+        """
+        Apply pending journal entries to the database, in order.
+
+        Stops at the first outage and leaves the rest pending. A booking
+        whose slot was taken in the meantime is not retried: the caller is
+        told through a conversation summary and the entry counts as replayed.
+
+        Args:
+            journal: Journal to replay (this worker's if None)
+
+        Returns:
+            ReplayReport of the pass
+        """
+        journal = journal or self.journal
+        await journal.flush()
+        report = ReplayReport()
+        pending = journal.pending()
+        # Bookings cancelled before they were replayed are dropped altogether
+        dropped = {
+            entry.args["appointment_id"]
+            for entry in pending
+            if entry.op == CANCEL
+            and entry.args["appointment_id"].startswith(LOCAL_PREFIX)
+        }
+
+        for entry in pending:
+            with self.breaker.watch() as watch:
+                try:
+                    await self._replay(entry, dropped, report)
+                except Exception as e:
+                    if not watch.failed:
+                        # Rejected for good; retrying would block the journal
+                        logger.error(f"Dropping journal entry {entry.id}: {e}")
+            if watch.failed:
+                logger.warning(
+                    f"Database still unavailable; replay paused at {entry.seq}"
+                )
+                break
+            await journal.mark_replayed(entry.seq)
+            report.replayed += 1
+
+        report.remaining = len(journal.pending())
+        if not report.remaining:
+            await journal.compact()
+        logger.info(
+            f"Replayed {report.replayed} journal entries "
+            f"({len(report.conflicts)} conflicts, {report.remaining} remaining)"
+        )
+        return report
+
+    async def _replay(
+        self, entry: JournalEntry, dropped: Set[str], report: ReplayReport
+    ):
+        args = entry.args
+        if entry.op == SUMMARY:
+            await super().save_conversation_summary(**args)
+
+        elif entry.op == CANCEL:
+            appointment_id = self._replayed.get(
+                args["appointment_id"], args["appointment_id"]
+            )
+            if not appointment_id.startswith(LOCAL_PREFIX):
+                await super().cancel_appointment(appointment_id)
+
+        elif entry.op == CREATE:
+            row = args["appointment"]
+            if row["id"] in dropped:
+                return
+            try:
+                appointment = await super().create_appointment(
+                    row["contact_number"],
+                    row["user_name"],
+                    date.fromisoformat(row["appointment_date"]),
+                    time.fromisoformat(row["appointment_time"]),
+                    row.get("notes"),
+                    row["idempotency_key"],
+                    row["duration_minutes"],
+                    args.get("resource_ids"),
+                    args.get("capacities"),
+                )
+            except ValueError:
+                report.conflicts.append(entry)
+                await self._report_conflict(entry)
+                return
+            self._replayed[row["id"]] = appointment.id
+
+    async def _report_conflict(self, entry: JournalEntry):
+        """Leave a summary telling the caller their journaled slot was taken."""
+        appointment = Appointment.from_row(entry.args["appointment"])
+        logger.warning(
+            f"Journaled appointment {appointment.id} lost its slot "
+            f"({appointment.display}) while the database was down"
+        )
+        if not await self.get_user_profile(appointment.contact_number):
+            await self.create_user_profile(
+                appointment.contact_number, appointment.user_name
+            )
+        await super().save_conversation_summary(
+            session_id=f"{LOCAL_PREFIX}{entry.id}",
+            summary=(
+                f"While the booking system was offline, {appointment.user_name} "
+                f"was booked for {appointment.display}, but the slot had already "
+                f"been taken. The appointment was not made; please contact the "
+                f"caller to choose another time."
+            ),
+            contact_number=appointment.contact_number,
+            appointments=[{**appointment.to_dict(), "status": "conflict"}],
+        )
+
+
+class JournalReplayer:
+    """
+    Background task replaying the journal whenever the database is reachable.
+
+    Also adopts the journals of dead workers sharing the journal directory.
+    """
+
+    def __init__(self, db: JournaledDatabase, interval: float = 5.0):
+        """
+        Args:
+            db: Database whose journal is replayed
+            interval: Seconds between checks
+        """
+        self.db = db
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.db.breaker.state == OPEN:
+                continue
+            try:
+                if self.db.journal.has_pending:
+                    await self.db.replay_journal()
+                await self.adopt_orphans()
+            except Exception as e:
+                logger.error(f"Journal replay failed: {e}")
+
+    async def adopt_orphans(self) -> int:
+        """
+        Replay the journals of workers that are no longer running.
+
+        Returns:
+            Number of orphaned journals fully replayed and removed
+        """
+        directory = os.path.dirname(self.db.journal.path) or "."
+        adopted = 0
+        for path in orphaned_journals(directory):
+            with open(path, "a") as lock:
+                try:
+                    # Another worker may be adopting it already
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                orphan = WriteJournal(path)
+                report = await self.db.replay_journal(orphan)
+                if report.remaining:
+                    break
+                orphan.discard()
+                adopted += 1
+                logger.info(f"Adopted and replayed orphaned journal {path}")
+        return adopted
+
+    def start(self):
+        """Start replaying on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop replaying."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+def journal_path(directory: str, pid: Optional[int] = None) -> str:
+    """Journal file of a worker process in the journal directory."""
+    return os.path.join(directory, f"{pid or os.getpid()}.jsonl")
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def orphaned_journals(directory: str) -> List[str]:
+    """Journals in a directory whose worker process is no longer running."""
+    orphans = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+        name = os.path.basename(path)[: -len(".jsonl")]
+        if name.isdigit() and int(name) != os.getpid() and not _alive(int(name)):
+            orphans.append(path)
+    return orphans
+
+
+class ShardedJournaledDatabase(ShardedDatabase, JournaledDatabase):
+    """JournaledDatabase whose bookings go to the worker owning each resource."""
+
+
+_process_db: Optional[DatabaseManager] = None
+_worker_reads: Optional[ReadService] = None
+_worker_shard: Optional[ShardNode] = None
+
+
+def _env_seconds(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return float(value) if value.strip() else None
+
+
+def _guarded_backend() -> GuardedBackend:
+    """The configured storage backend behind its breaker and call policies."""
+    breaker = CircuitBreaker(
+        "database",
+        failure_threshold=int(os.getenv("DB_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("DB_BREAKER_RESET", "30")),
+    )
+    return GuardedBackend(
+        create_backend(),
+        breaker,
+        read_policy=CallPolicy(
+            deadline=_env_seconds("DB_READ_DEADLINE", DEFAULT_READ_POLICY.deadline),
+            retries=int(os.getenv("DB_READ_RETRIES", DEFAULT_READ_POLICY.retries)),
+            hedge=os.getenv("DB_HEDGE_READS", "true").lower() == "true",
+            coalesce=os.getenv("DB_COALESCE_READS", "true").lower() == "true",
+        ),
+        write_policy=CallPolicy(
+            deadline=_env_seconds("DB_WRITE_DEADLINE", DEFAULT_WRITE_POLICY.deadline)
+        ),
+        flights=SingleFlight(),
+    )
+
+
+def _shares_reads() -> bool:
+    """Whether job processes read through the worker (see shared_reads.py)."""
+    return (
+        read_socket_path() is not None
+        and os.getenv("DB_SHARED_READS", "true").lower() == "true"
+        # Every process has its own in-memory store
+        and os.getenv("STORAGE_BACKEND", "supabase").lower() != "memory"
+    )
+
+
+def serve_worker_reads() -> Optional[ReadService]:
+    """
+    Serve the reads of this worker's job processes from the worker process.
+
+    Each call runs in its own job process, so this is where the sessions of
+    a worker meet: their reads share one GuardedBackend, and identical reads
+    in flight at the same time share one query (DB_COALESCE_READS). With
+    DB_CACHE_TTL set (seconds), profile, appointment and booked-slot reads
+    are cached here for all of them, and invalidated by the worker's
+    invalidation bus and by the writes its job processes announce. Call it
+    from the worker process on its running event loop.
+
+    Returns:
+        The running ReadService, or None if reads are not shared
+        (DB_SHARED_READS=false, the in-memory backend, or no worker state
+        directory)
+    """
+    global _worker_reads
+    if _worker_reads is None:
+        if not _shares_reads():
+            return None
+        guarded = _guarded_backend()
+        backend, bus = guarded, None
+        cache_ttl = _env_seconds("DB_CACHE_TTL", None)
+        if cache_ttl:
+            bus = create_bus()
+            backend = CachedBackend(guarded, bus, cache_ttl)
+        _worker_reads = ReadService(backend, read_socket_path(), guarded.flights, bus)
+    if _worker_reads.bus is not None:
+        _worker_reads.bus.start()
+    _worker_reads.start()
+    return _worker_reads
+
+
+def serve_worker_shard() -> Optional[ShardNode]:
+    """
+    Join the SHARD_DIR ring with this worker process and serve its shard.
+
+    The node's id is the worker's process id, so the ring changes only when
+    workers start or stop, never with the calls they run. Its calendars read
+    and book through the worker's shared backend (see serve_worker_reads).
+    Call it from the worker process on its running event loop, after
+    serve_worker_reads.
+
+    Returns:
+        The running ShardNode, or None without SHARD_DIR
+    """
+    global _worker_shard
+    directory = os.getenv("SHARD_DIR")
+    if not directory:
+        return None
+    if _worker_shard is None:
+        backend = _worker_reads.backend if _worker_reads else _guarded_backend()
+        shard = CalendarShard(backend, ttl=float(os.getenv("SHARD_INDEX_TTL", "10")))
+        _worker_shard = ShardNode(directory, shard)
+    _worker_shard.start()
+    return _worker_shard
+
+
+def create_database(journal_dir: Optional[str] = None) -> DatabaseManager:
+    """
+    Create the database manager of this process's sessions.
+
+    AgentServer runs each call in its own job process, so the manager, its
+    breaker and its journal belong to one call. Reads are sent to the
+    worker's ReadService (see serve_worker_reads), which coalesces and
+    caches them with the reads of the worker's other calls; writes, and
+    reads the worker cannot answer, go through this process's
+    GuardedBackend. Deadlines come from DB_READ_DEADLINE and
+    DB_WRITE_DEADLINE (seconds; empty disables), read retries from
+    DB_READ_RETRIES and hedging from DB_HEDGE_READS. Only when reads are not
+    shared does DB_CACHE_TTL cache reads here, for this process alone. With
+    DB_JOURNAL_DIR set, the manager is a JournaledDatabase whose replayer
+    starts on the running event loop. With SHARD_DIR set, availability
+    checks and bookings of each resource go to the worker owning it (see
+    serve_worker_shard); this process only follows the ring.
+
+    Args:
+        journal_dir: Directory of the journals; overrides DB_JOURNAL_DIR
+
+    Returns:
+        Configured DatabaseManager
+    """
+    global _process_db
+    if _process_db is None:
+        backend = _guarded_backend()
+        cache_ttl = _env_seconds("DB_CACHE_TTL", None)
+        if _shares_reads():
+            # The worker caches for every call (see serve_worker_reads)
+            backend = SharedReads(backend, read_socket_path())
+        elif cache_ttl:
+            backend = CachedBackend(backend, create_bus(), cache_ttl)
+        journal_dir = journal_dir or os.getenv("DB_JOURNAL_DIR")
+        sharded = bool(os.getenv("SHARD_DIR"))
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+            manager = ShardedJournaledDatabase if sharded else JournaledDatabase
+            _process_db = manager(
+                backend, journal=WriteJournal(journal_path(journal_dir))
+            )
+        else:
+            _process_db = (
+                ShardedDatabase(backend) if sharded else DatabaseManager(backend)
+            )
+    if isinstance(_process_db.backend, CachedBackend):
+        with contextlib.suppress(RuntimeError):
+            _process_db.backend.bus.start()
+    if isinstance(_process_db, JournaledDatabase):
+        with contextlib.suppress(RuntimeError):
+            _process_db.replayer.start()
+    if isinstance(_process_db, ShardedDatabase):
+        with contextlib.suppress(RuntimeError):
+            _process_db.node.start()
+    return _process_db
@@ -0,0 +1,320 @@
+"""Event-loop lag watchdog and worker load reporting for job admission."""
+
+import asyncio
+import contextlib
+import glob
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+
+from livekit.agents.utils.hw import get_cpu_monitor
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LoadThresholds:
+    """
+    Limits at which a worker counts as saturated.
+
+    Reaching any single limit reports a load equal to load_threshold, which
+    makes the AgentServer stop accepting new rooms until the signal recovers.
+    """
+
+    max_cpu: float = 0.8  # fraction of the CPUs available to the container
+    max_loop_lag_ms: float = 150.0
+    max_sessions: int = 0  # 0 disables the session cap
+    lag_warn_ms: float = 50.0
+    load_threshold: float = 0.7  # AgentServer's production default
+
+    @classmethod
+    def from_env(cls) -> "LoadThresholds":
+        """Read thresholds from WORKER_* environment variables."""
+        defaults = cls()
+        return cls(
+            max_cpu=float(os.getenv("WORKER_MAX_CPU", defaults.max_cpu)),
+            max_loop_lag_ms=float(
+                os.getenv("WORKER_MAX_LOOP_LAG_MS", defaults.max_loop_lag_ms)
+            ),
+            max_sessions=int(os.getenv("WORKER_MAX_SESSIONS", defaults.max_sessions)),
+            lag_warn_ms=float(os.getenv("WORKER_LAG_WARN_MS", defaults.lag_warn_ms)),
+            load_threshold=float(
+                os.getenv("WORKER_LOAD_THRESHOLD", defaults.load_threshold)
+            ),
+        )
+
+
+def worker_state_dir() -> str:
+    """
+    Directory the job processes of this worker share state through.
+
+    WORKER_STATE_DIR when set; otherwise a temporary directory is created and
+    exported, so job processes started afterwards inherit the same one.
+    """
+    directory = os.getenv("WORKER_STATE_DIR")
+    if not directory:
+        directory = tempfile.mkdtemp(prefix="superbryn-worker-")
+        os.environ["WORKER_STATE_DIR"] = directory
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+class JobLagBoard:
+    """
+    Recent loop lag of every job process, shared through a directory.
+
+    Sessions run in job processes, while the load function runs in the
+    worker process, so each job's LoopLagMonitor writes its worst recent lag
+    to ``<directory>/<pid>.lag`` and the worker reads the worst of them. A
+    job that stopped publishing is lagging at least as long as it has been
+    silent; files of exited processes are removed.
+    """
+
+    def __init__(self, directory: str, interval: float = 1.0):
+        """
+        Args:
+            directory: Directory shared by the worker and its job processes
+            interval: Seconds between publications of a job
+        """
+        self.directory = directory
+        self.interval = interval
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.lag")
+
+    def publish(self, lag_ms: float, pid: Optional[int] = None):
+        """Record a job's worst recent lag (atomically replacing the last)."""
+        path = self._path(pid or os.getpid())
+        try:
+            with open(f"{path}.tmp", "w") as f:
+                f.write(f"{lag_ms:.1f}")
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.debug(f"Could not publish loop lag: {e}")
+
+    def remove(self, pid: Optional[int] = None):
+        """Forget a job, e.g. when its session ends."""
+        with contextlib.suppress(OSError):
+            os.remove(self._path(pid or os.getpid()))
+
+    @staticmethod
+    def _alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass
+        return True
+
+    def worst_ms(self) -> float:
+        """Worst recent lag across the live job processes, in milliseconds."""
+        worst = 0.0
+        now = time.time()
+        for path in glob.glob(os.path.join(self.directory, "*.lag")):
+            try:
+                pid = int(os.path.basename(path)[: -len(".lag")])
+                with open(path) as f:
+                    lag_ms = float(f.read() or 0)
+                silent = now - os.path.getmtime(path) - 2 * self.interval
+            except (OSError, ValueError):
+                continue
+            if not self._alive(pid):
+                self.remove(pid)
+                continue
+            worst = max(worst, lag_ms, silent * 1000)
+        return worst
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up from a fixed-interval sleep.
+
+    Anything that blocks the loop (sync I/O, heavy parsing, audio filters
+    running inline) shows up directly as lag. The recent window is kept so the
+    load function can react to spikes rather than a long-run average.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        window: int = 50,
+        warn_ms: float = 50.0,
+        board: Optional[JobLagBoard] = None,
+    ):
+        """
+        Args:
+            interval: Seconds between probes
+            window: Number of recent samples kept
+            warn_ms: Lag above which a warning is logged
+            board: Where a job process publishes its lag for the worker
+        """
+        self.interval = interval
+        self.warn_ms = warn_ms
+        self.board = board
+        self.samples: Deque[float] = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self._last_warning = 0.0
+        self._last_published = 0.0
+
+    @property
+    def current_ms(self) -> float:
+        """Most recent lag sample in milliseconds."""
+        return self.samples[-1] * 1000 if self.samples else 0.0
+
+    @property
+    def max_recent_ms(self) -> float:
+        """Worst lag within the recent window in milliseconds."""
+        return max(self.samples, default=0.0) * 1000
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.samples.append(lag)
+
+            now = time.monotonic()
+            if lag * 1000 > self.warn_ms and now - self._last_warning > 10:
+                self._last_warning = now
+                logger.warning(f"Event loop lag of {lag * 1000:.0f}ms detected")
+            if self.board and now - self._last_published >= self.board.interval:
+                self._last_published = now
+                self.board.publish(self.max_recent_ms)
+
+    def start(self):
+        """Start probing on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop probing."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self.board:
+            self.board.remove()
+
+
+class WorkerLoadMonitor:
+    """
+    Load function for AgentServer combining CPU, loop lag and session count.
+
+    Each signal is divided by its limit and the largest ratio is scaled so a
+    signal at its limit reports exactly load_threshold. CPU is sampled by a
+    background thread with the cgroup-aware monitor LiveKit uses itself. Loop
+    lag is the worst of the worker's own loop and, through job_lag, the loops
+    of the job processes running the sessions.
+    """
+
+    def __init__(
+        self,
+        thresholds: Optional[LoadThresholds] = None,
+        lag_monitor: Optional[LoopLagMonitor] = None,
+        job_lag: Optional[JobLagBoard] = None,
+    ):
+        """
+        Args:
+            thresholds: Saturation limits; read from env when omitted
+            lag_monitor: Probe of the worker process's own event loop
+            job_lag: Lag published by the job processes
+        """
+        self.thresholds = thresholds or LoadThresholds.from_env()
+        self.lag_monitor = lag_monitor or LoopLagMonitor(
+            warn_ms=self.thresholds.lag_warn_ms
+        )
+        self.job_lag = job_lag
+        self.saturated = False
+        self.last_breakdown: Dict[str, Any] = {}
+
+        self._cpu_monitor = get_cpu_monitor()
+        self._cpu_samples: Deque[float] = deque(maxlen=5)
+        self._cpu_lock = threading.Lock()
+        self._cpu_thread: Optional[threading.Thread] = None
+
+    def _sample_cpu(self):
+        while True:
+            cpu = self._cpu_monitor.cpu_percent(interval=0.5)
+            with self._cpu_lock:
+                self._cpu_samples.append(cpu)
+
+    @property
+    def cpu(self) -> float:
+        """Average CPU utilisation (0-1) over the last few samples."""
+        with self._cpu_lock:
+            if not self._cpu_samples:
+                return 0.0
+            return sum(self._cpu_samples) / len(self._cpu_samples)
+
+    def start_cpu_sampling(self):
+        """Start the background CPU sampler (safe to call more than once)."""
+        if self._cpu_thread is None:
+            self._cpu_thread = threading.Thread(
+                target=self._sample_cpu, daemon=True, name="worker_load_monitor"
+            )
+            self._cpu_thread.start()
+
+    def start(self):
+        """Start CPU sampling and the loop lag probe (call from the event loop)."""
+        self.start_cpu_sampling()
+        self.lag_monitor.start()
+
+    @property
+    def loop_lag_ms(self) -> float:
+        """Worst recent lag of the worker's and its job processes' loops."""
+        lag_ms = self.lag_monitor.max_recent_ms
+        if self.job_lag is not None:
+            lag_ms = max(lag_ms, self.job_lag.worst_ms())
+        return lag_ms
+
+    def compute_load(self, active_sessions: int) -> float:
+        """
+        Compute the load to report for a given number of active sessions.
+
+        Returns:
+            Load in the AgentServer's scale; >= load_threshold means saturated
+        """
+        t = self.thresholds
+        loop_lag_ms = self.loop_lag_ms
+        ratios = {
+            "cpu": self.cpu / t.max_cpu if t.max_cpu > 0 else 0.0,
+            "loop_lag": (
+                loop_lag_ms / t.max_loop_lag_ms if t.max_loop_lag_ms > 0 else 0.0
+            ),
+            "sessions": active_sessions / t.max_sessions if t.max_sessions > 0 else 0.0,
+        }
+        bottleneck = max(ratios, key=ratios.get)
+        load = min(1.0, ratios[bottleneck] * t.load_threshold)
+
+        saturated = load >= t.load_threshold
+        if saturated != self.saturated:
+            self.saturated = saturated
+            if saturated:
+                logger.warning(
+                    f"Worker saturated by {bottleneck} (cpu={self.cpu:.0%}, "
+                    f"lag={loop_lag_ms:.0f}ms, "
+                    f"sessions={active_sessions}); not accepting new rooms"
+                )
+            else:
+                logger.info("Worker load recovered; accepting new rooms")
+
+        self.last_breakdown = {
+            "load": round(load, 3),
+            "bottleneck": bottleneck,
+            "cpu": round(self.cpu, 3),
+            "loop_lag_ms": round(loop_lag_ms, 1),
+            "active_sessions": active_sessions,
+        }
+        return load
+
+    def __call__(self, server: Any) -> float:
+        """AgentServer load_fnc entry point."""
+        return self.compute_load(len(server.active_jobs))
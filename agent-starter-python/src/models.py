@@ -0,0 +1,224 @@
+"""
+Compact typed records for rows read from storage.
+
+Dates and times are parsed once, when a row crosses the DatabaseManager
+boundary, and the strings spoken to the caller or sent to the frontend are
+derived once per record. The records are frozen, so the cached values can
+never go stale.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Columns projected when reading appointment pages; contact_number is the
+# query key, so it is not repeated on every row
+APPOINTMENT_COLUMNS = (
+    "id",
+    "user_name",
+    "appointment_date",
+    "appointment_time",
+    "status",
+    "notes",
+)
+
+# Resource and length of appointments booked before either was recorded
+DEFAULT_RESOURCE = "default"
+DEFAULT_DURATION_MINUTES = 30
+
+# Keyset cursor of an appointment page: (YYYY-MM-DD, HH:MM:SS, id)
+AppointmentCursor = Tuple[str, str, str]
+
+
+def _as_date(value: Any) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def _as_time(value: Any) -> time:
+    return value if isinstance(value, time) else time.fromisoformat(str(value))
+
+
+def display_date(value: date) -> str:
+    """Spoken form of a date, e.g. "Monday, March 02, 2026"."""
+    return value.strftime("%A, %B %d, %Y")
+
+
+def display_time(value: time) -> str:
+    """Spoken form of a time, e.g. "2:30 PM"."""
+    return value.strftime("%I:%M %p").lstrip("0")
+
+
+@dataclass(frozen=True, slots=True)
+class Appointment:
+    """One appointment with its date and time parsed once, at the DB boundary."""
+
+    id: str
+    appointment_date: date
+    appointment_time: time
+    status: str = "active"
+    user_name: Optional[str] = None
+    notes: Optional[str] = None
+    contact_number: Optional[str] = None
+    resource_id: str = DEFAULT_RESOURCE
+    duration_minutes: int = DEFAULT_DURATION_MINUTES
+    series_id: Optional[str] = None
+    display: str = field(init=False, repr=False, compare=False)
+    _payload: Optional[Dict[str, Any]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        object.__setattr__(
+            self,
+            "display",
+            f"{display_date(self.appointment_date)} at "
+            f"{display_time(self.appointment_time)}",
+        )
+
+    @classmethod
+    def from_row(
+        cls, row: Dict[str, Any], contact_number: Optional[str] = None
+    ) -> "Appointment":
+        """
+        Build from a storage row (full or projected to APPOINTMENT_COLUMNS).
+
+        Args:
+            row: Appointment row with string or parsed date/time values
+            contact_number: Owner, when the row was projected without it
+        """
+        return cls(
+            id=str(row["id"]),
+            appointment_date=_as_date(row["appointment_date"]),
+            appointment_time=_as_time(row["appointment_time"]),
+            status=row.get("status") or "active",
+            user_name=row.get("user_name"),
+            notes=row.get("notes"),
+            contact_number=row.get("contact_number", contact_number),
+            resource_id=row.get("resource_id") or DEFAULT_RESOURCE,
+            duration_minutes=int(
+                row.get("duration_minutes") or DEFAULT_DURATION_MINUTES
+            ),
+            series_id=row.get("series_id"),
+        )
+
+    @property
+    def slot_key(self) -> Tuple[str, str]:
+        """(YYYY-MM-DD, HH:MM), the key used by get_booked_slots and Slot."""
+        return (
+            self.appointment_date.isoformat(),
+            self.appointment_time.strftime("%H:%M"),
+        )
+
+    @property
+    def cursor(self) -> AppointmentCursor:
+        """Keyset position of this row, for fetching the page after it."""
+        return (
+            self.appointment_date.isoformat(),
+            self.appointment_time.isoformat(),
+            self.id,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Row-shaped dict, as sent to the frontend and stored in summaries.
+
+        Built on first use and shared afterwards; treat it as read-only.
+        """
+        if self._payload is None:
+            object.__setattr__(
+                self,
+                "_payload",
+                {
+                    "id": self.id,
+                    "user_name": self.user_name,
+                    "contact_number": self.contact_number,
+                    "appointment_date": self.appointment_date.isoformat(),
+                    "appointment_time": self.appointment_time.isoformat(),
+                    "status": self.status,
+                    "notes": self.notes,
+                    "resource_id": self.resource_id,
+                    "duration_minutes": self.duration_minutes,
+                    "series_id": self.series_id,
+                    "display": self.display,
+                },
+            )
+        return self._payload
+
+
+@dataclass(frozen=True, slots=True)
+class AppointmentPage:
+    """One page of a user's appointments in (date, time, id) order."""
+
+    items: Tuple[Appointment, ...] = ()
+    next_cursor: Optional[AppointmentCursor] = None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+    def __iter__(self) -> Iterator[Appointment]:
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+@dataclass(frozen=True, slots=True)
+class UserProfile:
+    """The caller identified in a session."""
+
+    contact_number: str
+    name: Optional[str] = None
+    email: Optional[str] = None
+    is_new: bool = False
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "UserProfile":
+        return cls(
+            contact_number=row["contact_number"],
+            name=row.get("name"),
+            email=row.get("email"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Payload sent to the LLM and the frontend."""
+        return {
+            "contact_number": self.contact_number,
+            "name": self.name,
+            "email": self.email,
+            "is_new": self.is_new,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class Slot:
+    """A bookable slot from the configured schedule."""
+
+    slot_date: date
+    slot_time: time
+    key: Tuple[str, str] = field(init=False, repr=False, compare=False)
+    display: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(
+            self,
+            "key",
+            (self.slot_date.isoformat(), self.slot_time.strftime("%H:%M")),
+        )
+        object.__setattr__(
+            self,
+            "display",
+            f"{display_date(self.slot_date)} at {display_time(self.slot_time)}",
+        )
+
+    @property
+    def date_str(self) -> str:
+        return self.key[0]
+
+    @property
+    def time_str(self) -> str:
+        return self.key[1]
+
+    def to_dict(self) -> Dict[str, str]:
+        """Payload offered to the caller by fetch_slots."""
+        return {"date": self.key[0], "time": self.key[1], "display": self.display}
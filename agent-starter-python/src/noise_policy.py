@@ -0,0 +1,273 @@
+"""Load-aware selection of the noise cancellation model for new sessions."""
+
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import IO, Any, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Modes ordered from most to least expensive
+MODE_BVC = "bvc"  # background voice cancellation (BVCTelephony for SIP callers)
+MODE_NC = "nc"  # standard noise cancellation
+MODE_OFF = "off"
+MODES = (MODE_BVC, MODE_NC, MODE_OFF)
+
+
+@dataclass
+class NoisePolicyThresholds:
+    """
+    CPU levels at which new sessions get a cheaper noise cancellation mode.
+
+    Only sessions starting after a threshold is crossed are affected; running
+    sessions keep the mode they started with.
+    """
+
+    downgrade_cpu: float = 0.6  # above this new sessions use NC instead of BVC
+    disable_cpu: float = 0.75  # above this new sessions run without a filter
+    force_mode: Optional[str] = None  # pin a mode regardless of load
+
+    @classmethod
+    def from_env(cls) -> "NoisePolicyThresholds":
+        """Read thresholds from NC_* environment variables."""
+        defaults = cls()
+        force_mode = os.getenv("NC_FORCE_MODE") or None
+        if force_mode is not None and force_mode not in MODES:
+            logger.warning(f"Ignoring unknown NC_FORCE_MODE={force_mode!r}")
+            force_mode = None
+        return cls(
+            downgrade_cpu=float(os.getenv("NC_DOWNGRADE_CPU", defaults.downgrade_cpu)),
+            disable_cpu=float(os.getenv("NC_DISABLE_CPU", defaults.disable_cpu)),
+            force_mode=force_mode,
+        )
+
+
+@dataclass
+class NoiseDecision:
+    """The noise cancellation mode chosen for one session and why."""
+
+    mode: str
+    reason: str
+    cpu: float
+    telephony: bool = False
+    cpu_ms_per_s: Optional[float] = None  # measured once the session has run
+    estimates: Dict[str, float] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable view stored in the conversation summary."""
+        data = {
+            "mode": self.mode,
+            "reason": self.reason,
+            "cpu_at_start": round(self.cpu, 3),
+            "telephony": self.telephony,
+        }
+        if self.cpu_ms_per_s is not None:
+            data["session_cpu_ms_per_s"] = round(self.cpu_ms_per_s, 2)
+        if self.estimates:
+            data["estimated_cpu_ms_per_s"] = self.estimates
+        return data
+
+
+class SessionCpuMeter:
+    """
+    CPU time consumed by the current process per second of wall time.
+
+    Each job runs in its own process, so process CPU time is the session's
+    cost including the native noise cancellation threads.
+    """
+
+    def __init__(self):
+        self._cpu_start = time.process_time()
+        self._wall_start = time.monotonic()
+
+    def elapsed(self) -> Tuple[float, float]:
+        """Return (cpu_seconds, wall_seconds) since the meter was created."""
+        return (
+            time.process_time() - self._cpu_start,
+            time.monotonic() - self._wall_start,
+        )
+
+    def cpu_ms_per_s(self) -> float:
+        """Average CPU milliseconds used per wall-clock second so far."""
+        cpu, wall = self.elapsed()
+        return cpu * 1000 / wall if wall > 0 else 0.0
+
+
+class NoiseCancellationPolicy:
+    """
+    Chooses BVC, NC or no noise cancellation from current CPU utilisation.
+
+    Per-session CPU cost is tracked per mode as an exponentially weighted
+    moving average so the overhead of noise cancellation (BVC minus off)
+    shows up in logs and summaries next to each decision. Each session runs
+    in a job process that may not outlive it, so with a state_path the
+    averages are kept in a file shared by the worker's job processes rather
+    than in the process.
+    """
+
+    def __init__(
+        self,
+        thresholds: Optional[NoisePolicyThresholds] = None,
+        cpu_source: Optional[Callable[[], float]] = None,
+        alpha: float = 0.2,
+        state_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            thresholds: CPU levels for downgrading; read from env when omitted
+            cpu_source: Callable returning CPU utilisation in the range 0-1
+            alpha: Weight of the newest sample in the per-mode cost average
+            state_path: JSON file the per-mode averages are kept in
+        """
+        self.thresholds = thresholds or NoisePolicyThresholds.from_env()
+        self.cpu_source = cpu_source or (lambda: 0.0)
+        self.alpha = alpha
+        self.state_path = state_path
+        self.cost_ms_per_s: Dict[str, float] = {}
+        self.decisions: Dict[str, int] = dict.fromkeys(MODES, 0)
+
+    @contextlib.contextmanager
+    def _shared_costs(self, exclusive: bool = False) -> Iterator[Optional[IO]]:
+        """Lock state_path and load the averages from it; yields the file."""
+        with contextlib.ExitStack() as stack:
+            f = None
+            if self.state_path:
+                try:
+                    f = stack.enter_context(open(self.state_path, "a+"))
+                    fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                    f.seek(0)
+                    self.cost_ms_per_s = json.loads(f.read() or "{}")
+                except ValueError:
+                    logger.warning(f"Ignoring unreadable {self.state_path}")
+                except OSError as e:
+                    logger.warning(f"Noise cancellation costs not shared: {e}")
+                    stack.close()
+                    f = None
+            yield f
+
+    def choose_mode(self, cpu: float) -> Tuple[str, str]:
+        """
+        Pick the mode for a session starting at the given CPU level.
+
+        Returns:
+            Tuple of (mode, reason)
+        """
+        t = self.thresholds
+        if t.force_mode:
+            return t.force_mode, "forced"
+        if cpu >= t.disable_cpu:
+            return MODE_OFF, f"cpu {cpu:.0%} >= {t.disable_cpu:.0%}"
+        if cpu >= t.downgrade_cpu:
+            return MODE_NC, f"cpu {cpu:.0%} >= {t.downgrade_cpu:.0%}"
+        return MODE_BVC, "normal load"
+
+    def decide(self, telephony: bool = False) -> NoiseDecision:
+        """Make and log the decision for a new session."""
+        cpu = self.cpu_source()
+        mode, reason = self.choose_mode(cpu)
+        self.decisions[mode] += 1
+        decision = NoiseDecision(
+            mode=mode,
+            reason=reason,
+            cpu=cpu,
+            telephony=telephony,
+            estimates=self.estimates(),
+        )
+        if mode == MODE_BVC:
+            logger.info(f"Noise cancellation: {mode} ({reason})")
+        else:
+            logger.warning(f"Noise cancellation downgraded to {mode} ({reason})")
+        return decision
+
+    @staticmethod
+    def build_filter(mode: str, telephony: bool = False) -> Any:
+        """
+        Instantiate the LiveKit filter for a mode.
+
+        Returns:
+            A noise cancellation option, or None when the mode is off
+        """
+        from livekit.plugins import noise_cancellation
+
+        if mode == MODE_BVC:
+            return (
+                noise_cancellation.BVCTelephony()
+                if telephony
+                else noise_cancellation.BVC()
+            )
+        if mode == MODE_NC:
+            return noise_cancellation.NC()
+        return None
+
+    def selector(
+        self, on_decision: Optional[Callable[[NoiseDecision], None]] = None
+    ) -> Callable[[Any], Any]:
+        """
+        Build a noise_cancellation selector for room_io.AudioInputOptions.
+
+        The mode is decided on the first audio track of the session and reused
+        if the participant republishes, so a session never switches mid-call.
+
+        Args:
+            on_decision: Called once with the decision when it is made
+        """
+        from livekit import rtc
+
+        state: Dict[str, NoiseDecision] = {}
+
+        def _select(params: Any) -> Any:
+            telephony = (
+                params.participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_SIP
+            )
+            decision = state.get("decision")
+            if decision is None:
+                decision = state["decision"] = self.decide(telephony=telephony)
+                if on_decision is not None:
+                    on_decision(decision)
+            return self.build_filter(decision.mode, telephony=telephony)
+
+        return _select
+
+    def record_session(self, mode: str, cpu_seconds: float, wall_seconds: float):
+        """
+        Fold a finished session's CPU usage into the per-mode average.
+
+        Args:
+            mode: Mode the session ran with
+            cpu_seconds: Process CPU time the session consumed
+            wall_seconds: Session duration
+        """
+        if wall_seconds <= 0:
+            return
+        sample = cpu_seconds * 1000 / wall_seconds
+        with self._shared_costs(exclusive=True) as f:
+            previous = self.cost_ms_per_s.get(mode)
+            self.cost_ms_per_s[mode] = (
+                sample
+                if previous is None
+                else self.alpha * sample + (1 - self.alpha) * previous
+            )
+            if f is not None:
+                try:
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(self.cost_ms_per_s, f)
+                except OSError as e:
+                    logger.warning(f"Noise cancellation costs not saved: {e}")
+        logger.info(
+            f"Session with noise cancellation {mode} used {sample:.1f}ms CPU/s "
+            f"(average {self.cost_ms_per_s[mode]:.1f}ms CPU/s)"
+        )
+
+    def estimates(self) -> Dict[str, float]:
+        """Average CPU ms per second of session per mode, plus the NC overhead."""
+        with self._shared_costs():
+            pass
+        data = {mode: round(cost, 2) for mode, cost in self.cost_ms_per_s.items()}
+        if MODE_BVC in data and MODE_OFF in data:
+            data["bvc_overhead"] = round(data[MODE_BVC] - data[MODE_OFF], 2)
+        return data
@@ -0,0 +1,335 @@
+"""Versioned pricing registry and per-tool attribution of usage costs."""
+
+import functools
+import json
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Used when pricing_config.json is missing or unreadable
+DEFAULT_PRICING: Dict[str, Any] = {
+    "defaults": {
+        "llm": "openai/gpt-4o-mini",
+        "tts": "cartesia/sonic-3",
+        "stt": "deepgram/nova-2",
+    },
+    "versions": [
+        {
+            "version": "2024-07-18",
+            "effective_from": "2024-07-18",
+            "llm": {
+                "openai/gpt-4o-mini": {
+                    "input_per_1m": 0.15,
+                    "cached_input_per_1m": 0.075,
+                    "output_per_1m": 0.60,
+                }
+            },
+            "tts": {"cartesia/sonic-3": {"per_1k_chars": 0.015}},
+            "stt": {"deepgram/nova-2": {"per_minute": 0.0043}},
+        }
+    ],
+}
+
+
+@dataclass(frozen=True)
+class PriceSheet:
+    """Provider rates in effect from a given date."""
+
+    version: str
+    effective_from: date
+    llm: Dict[str, Dict[str, float]]
+    tts: Dict[str, Dict[str, float]]
+    stt: Dict[str, Dict[str, float]]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PriceSheet":
+        return cls(
+            version=str(data["version"]),
+            effective_from=date.fromisoformat(data["effective_from"]),
+            llm=data.get("llm", {}),
+            tts=data.get("tts", {}),
+            stt=data.get("stt", {}),
+        )
+
+
+class PricingRegistry:
+    """
+    Looks up provider rates by model and date and prices usage with them.
+
+    Price sheets are versioned by effective date so a summary computed today
+    and one recomputed later for the same call use the same rates.
+    """
+
+    def __init__(self, sheets: List[PriceSheet], defaults: Dict[str, str]):
+        """
+        Args:
+            sheets: Price sheets; at least one is required
+            defaults: Model used per kind ("llm", "tts", "stt") when none is given
+        """
+        if not sheets:
+            raise ValueError("PricingRegistry needs at least one price sheet")
+        self.sheets = sorted(sheets, key=lambda s: s.effective_from)
+        self.defaults = defaults
+        self._warned: set = set()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PricingRegistry":
+        return cls(
+            sheets=[PriceSheet.from_dict(v) for v in data["versions"]],
+            defaults=data.get("defaults", {}),
+        )
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "PricingRegistry":
+        """
+        Load pricing from JSON, falling back to the built-in defaults.
+
+        Args:
+            path: Config file; defaults to PRICING_CONFIG or pricing_config.json
+        """
+        config_file = Path(
+            path
+            or os.getenv("PRICING_CONFIG")
+            or Path(__file__).parent / "pricing_config.json"
+        )
+        try:
+            with open(config_file) as f:
+                registry = cls.from_dict(json.load(f))
+            logger.info(f"Pricing loaded from {config_file}")
+            return registry
+        except Exception as e:
+            logger.error(f"Error loading pricing from {config_file}: {e}")
+            return cls.from_dict(DEFAULT_PRICING)
+
+    def sheet_for(self, on: Optional[date] = None) -> PriceSheet:
+        """Return the price sheet in effect on a date (default: today, UTC)."""
+        on = on or datetime.now(timezone.utc).date()
+        current = self.sheets[0]
+        for sheet in self.sheets:
+            if sheet.effective_from <= on:
+                current = sheet
+        return current
+
+    def _rates(
+        self, kind: str, model: Optional[str], on: Optional[date]
+    ) -> Dict[str, float]:
+        table = getattr(self.sheet_for(on), kind)
+        model = model or self.defaults.get(kind)
+        if model in table:
+            return table[model]
+
+        fallback = self.defaults.get(kind)
+        if (kind, model) not in self._warned:
+            self._warned.add((kind, model))
+            logger.warning(
+                f"No {kind} pricing for {model!r}; using rates of {fallback!r}"
+            )
+        return table.get(fallback, {})
+
+    def llm_cost(
+        self,
+        prompt_tokens: float,
+        completion_tokens: float,
+        cached_tokens: float = 0,
+        model: Optional[str] = None,
+        on: Optional[date] = None,
+    ) -> float:
+        """Cost of LLM tokens; cached prompt tokens use the cached rate if set."""
+        rates = self._rates("llm", model, on)
+        input_rate = rates.get("input_per_1m", 0.0)
+        cached_rate = rates.get("cached_input_per_1m", input_rate)
+        uncached = max(prompt_tokens - cached_tokens, 0)
+        return (
+            uncached * input_rate
+            + cached_tokens * cached_rate
+            + completion_tokens * rates.get("output_per_1m", 0.0)
+        ) / 1_000_000
+
+    def blended_llm_cost(
+        self, tokens: float, model: Optional[str] = None, on: Optional[date] = None
+    ) -> float:
+        """Cost of tokens when the input/output split is unknown (average rate)."""
+        rates = self._rates("llm", model, on)
+        blended = (rates.get("input_per_1m", 0.0) + rates.get("output_per_1m", 0.0)) / 2
+        return tokens * blended / 1_000_000
+
+    def tts_cost(
+        self, characters: float, model: Optional[str] = None, on: Optional[date] = None
+    ) -> float:
+        """Cost of synthesizing the given number of characters."""
+        return (
+            characters * self._rates("tts", model, on).get("per_1k_chars", 0.0) / 1000
+        )
+
+    def stt_cost(
+        self, seconds: float, model: Optional[str] = None, on: Optional[date] = None
+    ) -> float:
+        """Cost of transcribing the given seconds of audio."""
+        return seconds / 60 * self._rates("stt", model, on).get("per_minute", 0.0)
+
+    def costs_from_usage(
+        self,
+        usage: Any,
+        models: Optional[Dict[str, str]] = None,
+        on: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """
+        Price a UsageCollector summary.
+
+        Args:
+            usage: metrics.UsageSummary from UsageCollector.get_summary()
+            models: Model per kind ("llm", "tts", "stt"); defaults when omitted
+            on: Date whose price sheet applies (default: today, UTC)
+
+        Returns:
+            Cost breakdown with token/character/audio totals, the models and the
+            pricing version used
+        """
+        models = {**self.defaults, **(models or {})}
+        prompt_tokens = usage.llm_prompt_tokens
+        completion_tokens = usage.llm_completion_tokens
+        cached_tokens = usage.llm_prompt_cached_tokens
+
+        llm_cost = self.llm_cost(
+            prompt_tokens, completion_tokens, cached_tokens, models["llm"], on
+        )
+        tts_cost = self.tts_cost(usage.tts_characters_count, models["tts"], on)
+        stt_cost = self.stt_cost(usage.stt_audio_duration, models["stt"], on)
+
+        return {
+            "llm_cost": round(llm_cost, 6),
+            "tts_cost": round(tts_cost, 6),
+            "stt_cost": round(stt_cost, 6),
+            "total_cost": round(llm_cost + tts_cost + stt_cost, 6),
+            "completion_tokens": completion_tokens,
+            "prompt_tokens": prompt_tokens,
+            "prompt_cached_tokens": cached_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "tts_characters": usage.tts_characters_count,
+            "tts_audio_duration": round(usage.tts_audio_duration, 2),
+            "stt_audio_duration": round(usage.stt_audio_duration, 2),
+            "models": models,
+            "pricing_version": self.sheet_for(on).version,
+        }
+
+
+@functools.lru_cache(maxsize=1)
+def get_pricing_registry() -> PricingRegistry:
+    """Process-wide registry loaded from pricing_config.json."""
+    return PricingRegistry.load()
+
+
+# ==================== Per-tool attribution ====================
+
+CONVERSATION = "conversation"  # turns that did not follow a tool call
+
+
+@dataclass
+class UsageBucket:
+    """Usage and latency attributed to one tool (or to plain conversation)."""
+
+    calls: int = 0
+    queries: int = 0
+    tool_time: float = 0.0
+    llm_time: float = 0.0
+    tts_ttfb: float = 0.0
+    prompt_tokens: float = 0.0
+    cached_tokens: float = 0.0
+    completion_tokens: float = 0.0
+    tts_characters: float = 0.0
+
+
+@dataclass
+class CostAttribution:
+    """
+    Attributes LLM tokens and TTS characters to the tool that caused them.
+
+    A tool's output is sent back to the LLM, so the generation that follows a
+    tool call (and the speech synthesized from it) is charged to that tool. A
+    large tool result, such as a long slot list, therefore shows up as prompt
+    tokens and TTS characters on the tool's own line. Generations not preceded
+    by a tool call are charged to "conversation".
+    """
+
+    registry: PricingRegistry = field(default_factory=get_pricing_registry)
+    models: Dict[str, str] = field(default_factory=dict)
+    buckets: Dict[str, UsageBucket] = field(
+        default_factory=lambda: defaultdict(UsageBucket)
+    )
+    _pending: List[str] = field(default_factory=list)
+    _speech_labels: Dict[str, List[str]] = field(default_factory=dict)
+
+    def record_tool(self, name: str, duration: float, queries: int = 0):
+        """Record a finished tool call; the next LLM generation is charged to it."""
+        bucket = self.buckets[name]
+        bucket.calls += 1
+        bucket.queries += queries
+        bucket.tool_time += duration
+        self._pending.append(name)
+
+    def collect(self, metrics: Any):
+        """Attribute an LLM or TTS metrics event (from metrics_collected)."""
+        kind = getattr(metrics, "type", None)
+        if kind == "llm_metrics":
+            labels = self._pending or [CONVERSATION]
+            self._pending = []
+            if metrics.speech_id:
+                self._speech_labels[metrics.speech_id] = labels
+            share = 1 / len(labels)
+            for label in labels:
+                bucket = self.buckets[label]
+                bucket.llm_time += metrics.duration * share
+                bucket.prompt_tokens += metrics.prompt_tokens * share
+                bucket.cached_tokens += metrics.prompt_cached_tokens * share
+                bucket.completion_tokens += metrics.completion_tokens * share
+        elif kind == "tts_metrics":
+            labels = self._speech_labels.get(metrics.speech_id or "", [CONVERSATION])
+            share = 1 / len(labels)
+            for label in labels:
+                bucket = self.buckets[label]
+                bucket.tts_ttfb += metrics.ttfb * share
+                bucket.tts_characters += metrics.characters_count * share
+
+    def merge(self, other: "CostAttribution"):
+        """Add another session's attributed usage to this one (for aggregates)."""
+        for label, theirs in other.buckets.items():
+            ours = self.buckets[label]
+            for name in fields(UsageBucket):
+                setattr(
+                    ours,
+                    name.name,
+                    getattr(ours, name.name) + getattr(theirs, name.name),
+                )
+
+    def report(self, on: Optional[date] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Cost and latency per tool, most expensive first.
+
+        Returns:
+            Mapping of tool name (or "conversation") to its usage, latency and cost
+        """
+        models = {**self.registry.defaults, **self.models}
+        rows = {}
+        for label, b in self.buckets.items():
+            llm_cost = self.registry.llm_cost(
+                b.prompt_tokens, b.completion_tokens, b.cached_tokens, models["llm"], on
+            )
+            tts_cost = self.registry.tts_cost(b.tts_characters, models["tts"], on)
+            rows[label] = {
+                "calls": b.calls,
+                "queries": b.queries,
+                "prompt_tokens": round(b.prompt_tokens),
+                "completion_tokens": round(b.completion_tokens),
+                "tts_characters": round(b.tts_characters),
+                "tool_ms": round(b.tool_time * 1000, 1),
+                "llm_ms": round(b.llm_time * 1000, 1),
+                "tts_ttfb_ms": round(b.tts_ttfb * 1000, 1),
+                "cost": round(llm_cost + tts_cost, 6),
+            }
+        return dict(sorted(rows.items(), key=lambda kv: kv[1]["cost"], reverse=True))
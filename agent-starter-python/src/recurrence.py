@@ -0,0 +1,295 @@
+"""
+Recurring appointment series.
+
+A series ("every Tuesday at 10 for six weeks") is stored once, as an RFC 5545
+RRULE plus its first start, in the appointment_series table. Occurrences are
+expanded lazily with dateutil's rrule and never listed in full. Only those
+within the booking horizon (``days_ahead``) become appointment rows. They
+are checked against availability with one range query and inserted in one
+batch. A daily run of this module books the next occurrences as the horizon
+moves forward:
+
+    python -m src.recurrence
+    python -m src.recurrence --backend sqlite --days-ahead 28
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from dateutil.rrule import DAILY, MONTHLY, WEEKLY, rrule, rrulestr
+
+try:
+    from .models import (
+        DEFAULT_DURATION_MINUTES,
+        Appointment,
+        display_date,
+        display_time,
+    )
+except ImportError:
+    from models import (
+        DEFAULT_DURATION_MINUTES,
+        Appointment,
+        display_date,
+        display_time,
+    )
+
+logger = logging.getLogger(__name__)
+
+# Frequencies a caller can ask for, as (rrule frequency, interval)
+FREQUENCIES: Dict[str, Tuple[int, int]] = {
+    "daily": (DAILY, 1),
+    "weekly": (WEEKLY, 1),
+    "biweekly": (WEEKLY, 2),
+    "fortnightly": (WEEKLY, 2),
+    "monthly": (MONTHLY, 1),
+}
+
+# Upper bound on the occurrences of one series, also for open-ended rules
+MAX_OCCURRENCES = 52
+
+_WEEKDAYS = (
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+)
+
+
+def build_rule(
+    frequency: str,
+    start: datetime,
+    count: Optional[int] = None,
+    until: Optional[date] = None,
+    weekdays: Optional[Sequence[int]] = None,
+) -> str:
+    """
+    RRULE text (without DTSTART) for a spoken frequency.
+
+    Args:
+        frequency: One of FREQUENCIES, e.g. "weekly"
+        start: First occurrence
+        count: Number of occurrences (capped at MAX_OCCURRENCES)
+        until: Last possible date, used when no count is given
+        weekdays: Days a daily series may fall on (0=Monday), e.g. opening days
+
+    Returns:
+        e.g. "FREQ=WEEKLY;COUNT=6"
+
+    Raises:
+        ValueError: If the frequency is unknown or neither count nor until is set
+    """
+    key = frequency.strip().lower().replace("-", "").replace(" ", "")
+    if key not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency: {frequency}")
+    if not count and not until:
+        raise ValueError("A recurring series needs a number of times or an end date")
+
+    freq, interval = FREQUENCIES[key]
+    rule = rrule(
+        freq,
+        dtstart=start,
+        interval=interval,
+        count=min(count, MAX_OCCURRENCES) if count else None,
+        until=datetime.combine(until, time.max) if not count else None,
+        byweekday=tuple(weekdays) if weekdays and freq == DAILY else None,
+    )
+    # str(rule) is "DTSTART:...\nRRULE:..."; the start is stored separately
+    text = str(rule).splitlines()[-1]
+    return text.removeprefix("RRULE:")
+
+
+def _rule_parts(rule: str) -> Dict[str, str]:
+    return dict(part.split("=", 1) for part in rule.split(";") if "=" in part)
+
+
+@dataclass(frozen=True, slots=True)
+class Series:
+    """A recurring appointment, stored once and expanded on demand."""
+
+    id: Optional[str]
+    contact_number: str
+    user_name: str
+    rule: str
+    start: datetime
+    duration_minutes: int = DEFAULT_DURATION_MINUTES
+    resource_id: Optional[str] = None
+    status: str = "active"
+    notes: Optional[str] = None
+    materialized_until: Optional[date] = None
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Series":
+        materialized = row.get("materialized_until")
+        return cls(
+            id=str(row["id"]),
+            contact_number=row["contact_number"],
+            user_name=row["user_name"],
+            rule=row["rule"],
+            start=datetime.combine(
+                date.fromisoformat(str(row["start_date"])),
+                time.fromisoformat(str(row["start_time"])),
+            ),
+            duration_minutes=int(
+                row.get("duration_minutes") or DEFAULT_DURATION_MINUTES
+            ),
+            resource_id=row.get("resource_id"),
+            status=row.get("status") or "active",
+            notes=row.get("notes"),
+            materialized_until=(
+                date.fromisoformat(str(materialized)) if materialized else None
+            ),
+        )
+
+    def to_row(self) -> Dict[str, Any]:
+        """Columns of the appointment_series row (without the generated id)."""
+        return {
+            "contact_number": self.contact_number,
+            "user_name": self.user_name,
+            "rule": self.rule,
+            "start_date": self.start.date().isoformat(),
+            "start_time": self.start.time().isoformat(),
+            "duration_minutes": self.duration_minutes,
+            "resource_id": self.resource_id,
+            "status": self.status,
+            "notes": self.notes,
+            "materialized_until": (
+                self.materialized_until.isoformat() if self.materialized_until else None
+            ),
+        }
+
+    def occurrences(
+        self, after: Optional[datetime] = None, before: Optional[datetime] = None
+    ) -> Iterator[datetime]:
+        """
+        Starts of the occurrences in [after, before), generated lazily.
+
+        Args:
+            after: First start to include (default: the series start)
+            before: Stop before this start (default: the end of the rule)
+        """
+        rule = rrulestr(self.rule, dtstart=self.start)
+        for start in islice(rule, MAX_OCCURRENCES):
+            if before is not None and start >= before:
+                return
+            if after is None or start >= after:
+                yield start
+
+    def describe(self) -> str:
+        """Spoken form of the rule, e.g. "every Tuesday at 10:00 AM, 6 times"."""
+        parts = _rule_parts(self.rule)
+        interval = int(parts.get("INTERVAL", 1))
+        weekday = _WEEKDAYS[self.start.weekday()]
+        freq = parts.get("FREQ")
+        if freq == "WEEKLY":
+            every = f"every {weekday}" if interval == 1 else f"every other {weekday}"
+        elif freq == "MONTHLY":
+            every = f"on day {self.start.day} of every month"
+        else:
+            every = "every day" if "BYDAY" not in parts else "every working day"
+        text = f"{every} at {display_time(self.start.time())}"
+        if "COUNT" in parts:
+            return f"{text}, {parts['COUNT']} times"
+        if "UNTIL" in parts:
+            until = datetime.strptime(parts["UNTIL"][:8], "%Y%m%d").date()
+            return f"{text}, until {display_date(until)}"
+        return text
+
+    def to_dict(self, upcoming: int = 0) -> Dict[str, Any]:
+        """
+        Payload for the caller and the frontend.
+
+        Args:
+            upcoming: Also list the next N occurrences from the series start
+        """
+        payload = {
+            "id": self.id,
+            "description": self.describe(),
+            "start": self.start.isoformat(),
+            "duration_minutes": self.duration_minutes,
+            "resource_id": self.resource_id,
+            "status": self.status,
+        }
+        if upcoming:
+            payload["upcoming"] = [
+                f"{display_date(start.date())} at {display_time(start.time())}"
+                for start in islice(self.occurrences(), upcoming)
+            ]
+        return payload
+
+
+@dataclass(frozen=True, slots=True)
+class SeriesBooking:
+    """Outcome of booking a series: what was booked and which starts could not be."""
+
+    series: Series
+    booked: Tuple[Appointment, ...] = ()
+    conflicts: Tuple[datetime, ...] = ()
+
+    @property
+    def saved(self) -> bool:
+        return self.series.id is not None
+
+
+def horizon_end(horizon: date) -> datetime:
+    """Exclusive end of a booking horizon that includes the whole last day."""
+    return datetime.combine(horizon + timedelta(days=1), time())
+
+
+# ==================== CLI ====================
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--backend", help="supabase, sqlite or memory (default: STORAGE_BACKEND)"
+    )
+    parser.add_argument(
+        "--days-ahead", type=int, help="Booking horizon (default: slots_config.json)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    # DatabaseManager imports this module, so load it only when run as a job
+    try:
+        from .config import AppConfig
+        from .database import DatabaseManager
+        from .storage import create_backend
+    except ImportError:
+        from config import AppConfig
+        from database import DatabaseManager
+        from storage import create_backend
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    args = parse_args(argv)
+    config = AppConfig()
+    if args.days_ahead:
+        # is_valid_slot rejects dates past the config's own horizon
+        config.days_ahead = args.days_ahead
+    horizon = date.today() + timedelta(days=config.days_ahead)
+    try:
+        asyncio.run(
+            DatabaseManager(create_backend(args.backend)).materialize_series(
+                horizon,
+                config.resource_ids,
+                config.capacities,
+                valid_slot=config.is_valid_slot,
+            )
+        )
+    except Exception as e:
+        logger.error(f"Materializing recurring series failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,535 @@
+"""
+Failure handling between the agent and its database.
+
+When Supabase stalls, every call waits for its own timeout and every tool
+fails, and callers who hear "I'm having trouble" retry, which only adds
+load. A CircuitBreaker counts consecutive outage failures (timeouts and
+connection errors, not rejected writes such as slot conflicts). Once there
+are enough of them it opens: calls fail at once with CircuitOpenError, and
+after ``reset_timeout`` a single probe call is let through (half-open). A
+success closes the circuit again.
+
+GuardedBackend sends every call of a storage backend through a breaker, so
+DatabaseManager and its callers see the same state, and bounds the latency of
+each call with its method's CallPolicy:
+
+    - a deadline for the whole call, retries and hedges included, so one
+      stalled PostgREST request cannot hold a conversation indefinitely
+    - reads (idempotent) are hedged: when the first attempt has not answered
+      within the method's recent p95 latency, a duplicate is sent and the
+      first answer wins
+    - reads are retried after transient errors, with exponential backoff and
+      full jitter so that workers do not retry in lockstep
+
+Identical concurrent reads can also share one in-flight call (see
+singleflight.py). Per-method counters and latency percentiles are kept in
+MethodStats.
+journal.py uses the breaker to switch to degraded mode.
+"""
+
+import asyncio
+import contextlib
+import functools
+import inspect
+import logging
+import random
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+)
+
+try:
+    from .singleflight import SingleFlight, signature
+except ImportError:
+    from singleflight import SingleFlight, signature
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+# Backend methods that only read, and so may be hedged and retried
+READ_PREFIXES = ("get_", "list_", "find_", "page_")
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling a store whose circuit breaker is open."""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a call, retries and hedges included, outlasts its deadline."""
+
+
+def is_outage(error: BaseException) -> bool:
+    """
+    Whether an error means the store is unreachable or too slow.
+
+    Timeouts, connection errors and the HTTP client's transport errors count;
+    errors the store answered with (conflicts, constraint violations, bad
+    input) do not.
+    """
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, OSError)):
+        return True
+    module = type(error).__module__.split(".")[0]
+    return module in ("httpx", "httpcore")
+
+
+class CallWatch:
+    """Outcome of the breaker calls made inside CircuitBreaker.watch()."""
+
+    __slots__ = ("error", "failed", "parent")
+
+    def __init__(self, parent: Optional["CallWatch"] = None):
+        self.failed = False
+        self.error: Optional[BaseException] = None
+        self.parent = parent
+
+    def fail(self, error: BaseException):
+        """Record an outage here and in every enclosing watch."""
+        watch: Optional[CallWatch] = self
+        while watch is not None:
+            watch.failed, watch.error = True, error
+            watch = watch.parent
+
+
+_watch: ContextVar[Optional[CallWatch]] = ContextVar("breaker_watch", default=None)
+
+
+class CircuitBreaker:
+    """Closed, open or half-open state of one store, shared by its callers."""
+
+    def __init__(
+        self,
+        name: str = "database",
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        is_failure: Callable[[BaseException], bool] = is_outage,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            name: Store name for log messages
+            failure_threshold: Consecutive outage failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe
+            is_failure: Which errors count as outage failures
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        """CLOSED, OPEN, or HALF_OPEN once an open circuit is due a probe."""
+        if (
+            self._state == OPEN
+            and self._clock() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    @property
+    def healthy(self) -> bool:
+        return self.state == CLOSED
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; half-open allows one probe."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        if self._state != CLOSED:
+            logger.info(f"Circuit for {self.name} closed again")
+        self._state = CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self, error: BaseException):
+        """Count an outage failure, also reporting it to the active watch."""
+        watch = _watch.get()
+        if watch is not None:
+            watch.fail(error)
+        self._failures += 1
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != OPEN:
+                self.times_opened += 1
+                logger.warning(
+                    f"Circuit for {self.name} opened after {self._failures} "
+                    f"failures: {error!r}"
+                )
+            self._state = OPEN
+            self._opened_at = self._clock()
+            self._probing = False
+
+    async def call(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Await ``fn(*args, **kwargs)`` unless the circuit is open.
+
+        Raises:
+            CircuitOpenError: If the circuit is open (nothing is called)
+        """
+        watch = _watch.get()
+        if not self.allow():
+            error = CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+            if watch is not None:
+                watch.fail(error)
+            raise error
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure(e)
+            else:
+                # The store answered; it is reachable
+                self.record_success()
+            raise
+        except BaseException:
+            # Cancelled: the outcome is unknown, let the next call probe
+            self._probing = False
+            raise
+        self.record_success()
+        return result
+
+    @contextlib.contextmanager
+    def watch(self) -> Iterator[CallWatch]:
+        """
+        Report whether any call inside the block hit an outage.
+
+        DatabaseManager logs and swallows some errors (returning None, [] or
+        False); a watch tells such a result apart from a real empty answer.
+        """
+        watch = CallWatch(parent=_watch.get())
+        token = _watch.set(watch)
+        try:
+            yield watch
+        finally:
+            _watch.reset(token)
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    """How one backend method is called."""
+
+    # Seconds for the whole call, retries and hedges included; None waits
+    deadline: Optional[float] = None
+    # Extra attempts after transient (outage) errors
+    retries: int = 0
+    # Send a duplicate attempt once the first outlasts the recent p95
+    hedge: bool = False
+    # Share one in-flight call among identical concurrent calls (singleflight)
+    coalesce: bool = False
+
+
+DEFAULT_READ_POLICY = CallPolicy(deadline=2.0, retries=2, hedge=True, coalesce=True)
+# Writes are not retried or hedged: a timed-out insert may still have landed
+DEFAULT_WRITE_POLICY = CallPolicy(deadline=5.0)
+
+
+def retry_delay(attempt: int, base: float = 0.05, cap: float = 1.0) -> float:
+    """Backoff before retry ``attempt`` (1-based): exponential, full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class MethodStats:
+    """Outcome counters and recent attempt latencies of one backend method."""
+
+    def __init__(self, window: int = 256):
+        """
+        Args:
+            window: Successful attempts kept for the latency percentiles
+        """
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self._ordered: List[float] = []
+        self._unsorted = 0
+
+    def record(self, duration: float):
+        """Add the latency of a successful attempt."""
+        self.latencies.append(duration)
+        self._unsorted += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Latency percentile of recent attempts, None before the first one.
+
+        The window is re-sorted only after 16 new samples, as hedging asks
+        for the p95 on every read.
+        """
+        if not self.latencies:
+            return None
+        if not self._ordered or self._unsorted >= 16:
+            self._ordered = sorted(self.latencies)
+            self._unsorted = 0
+        ordered = self._ordered
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def as_dict(self) -> Dict[str, Any]:
+        def ms(pct: float) -> Optional[float]:
+            value = self.percentile(pct)
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p50_ms": ms(50),
+            "p95_ms": ms(95),
+            "p99_ms": ms(99),
+        }
+
+
+class GuardedBackend:
+    """
+    Storage backend proxy applying a breaker and per-method call policies.
+
+    Reads (methods named like READ_PREFIXES) get ``read_policy`` and writes
+    ``write_policy`` unless ``policies`` names the method.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        breaker: CircuitBreaker,
+        policies: Optional[Dict[str, CallPolicy]] = None,
+        read_policy: CallPolicy = DEFAULT_READ_POLICY,
+        write_policy: CallPolicy = DEFAULT_WRITE_POLICY,
+        hedge_min_samples: int = 20,
+        hedge_min_delay: float = 0.005,
+        hedge_initial_delay: Optional[float] = 0.1,
+        flights: Optional[SingleFlight] = None,
+    ):
+        """
+        Args:
+            backend: StorageBackend to guard
+            breaker: Breaker shared by every user of the backend
+            policies: Policies of individual methods, by method name
+            read_policy: Policy of the other read methods
+            write_policy: Policy of the other methods
+            hedge_min_samples: Attempts a method needs before its p95 is used
+            hedge_min_delay: Shortest wait before a hedge, in seconds
+            hedge_initial_delay: Wait before a hedge until the p95 is known;
+                None does not hedge until then
+            flights: Coalesces the calls of methods whose policy allows it;
+                None sends every call
+        """
+        self.backend = backend
+        self.breaker = breaker
+        self.policies = dict(policies or {})
+        self.read_policy = read_policy
+        self.write_policy = write_policy
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_initial_delay = hedge_initial_delay
+        self.flights = flights
+        self.stats: Dict[str, MethodStats] = defaultdict(MethodStats)
+        self.name = backend.name
+
+    def policy(self, name: str) -> CallPolicy:
+        """The CallPolicy of a backend method."""
+        if name in self.policies:
+            return self.policies[name]
+        return self.read_policy if name.startswith(READ_PREFIXES) else self.write_policy
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable metrics of every method called so far."""
+        return {
+            "breaker": {
+                "state": self.breaker.state,
+                "times_opened": self.breaker.times_opened,
+            },
+            "methods": {name: s.as_dict() for name, s in sorted(self.stats.items())},
+            "coalescing": self.flights.snapshot() if self.flights else None,
+        }
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.backend, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def guarded(*args, **kwargs):
+            policy = self.policy(name)
+            call = functools.partial(attr, *args, **kwargs)
+            if self.flights is None:
+                return await self._call(name, policy, call)
+            if policy.coalesce:
+                key = signature(name, attr, args, kwargs)
+                return await self._call(name, policy, call, key)
+            try:
+                return await self._call(name, policy, call)
+            finally:
+                # Reads issued from now on must see this write
+                self.flights.barrier()
+
+        # Later lookups find the wrapper without going through __getattr__
+        setattr(self, name, guarded)
+        return guarded
+
+    async def _call(
+        self,
+        name: str,
+        policy: CallPolicy,
+        call: Callable[[], Awaitable[Any]],
+        key: Optional[Hashable] = None,
+    ) -> Any:
+        stats = self.stats[name]
+        stats.calls += 1
+        # A watch learns the outcome of the whole call, not of each attempt:
+        # a read that succeeds on retry is no outage. Each caller of a
+        # coalesced call gets the shared outcome in its own watch.
+        watch = _watch.get()
+        token = _watch.set(None)
+        try:
+            if key is None:
+                return await self._bounded(name, policy, call, stats)
+            return await self.flights.do(
+                key, lambda: self._bounded(name, policy, call, stats)
+            )
+        except Exception as e:
+            if isinstance(e, CircuitOpenError):
+                stats.rejected += 1
+            else:
+                stats.failures += 1
+            if watch is not None and self.breaker.is_failure(e):
+                watch.fail(e)
+            raise
+        finally:
+            _watch.reset(token)
+
+    async def _bounded(
+        self,
+        name: str,
+        policy: CallPolicy,
+        call: Callable[[], Awaitable[Any]],
+        stats: MethodStats,
+    ) -> Any:
+        """The call's attempts, given up after the policy's deadline."""
+        if policy.deadline is None:
+            return await self._attempts(policy, call, stats)
+
+        # Cancel the running task at the deadline (as asyncio.timeout does on
+        # 3.11), rather than paying for a task and a wait on every call
+        task = asyncio.current_task()
+        expired = False
+
+        def expire():
+            nonlocal expired
+            expired = True
+            task.cancel()
+
+        handle = asyncio.get_running_loop().call_later(policy.deadline, expire)
+        try:
+            return await self._attempts(policy, call, stats)
+        except asyncio.CancelledError:
+            if not expired:
+                raise
+            if hasattr(task, "uncancel"):
+                task.uncancel()
+        finally:
+            handle.cancel()
+        stats.timeouts += 1
+        error = DeadlineExceededError(
+            f"{name} did not answer within {policy.deadline}s"
+        )
+        self.breaker.record_failure(error)
+        raise error
+
+    async def _attempts(
+        self, policy: CallPolicy, call: Callable[[], Awaitable[Any]], stats: MethodStats
+    ) -> Any:
+        attempt = 0
+        while True:
+            try:
+                if policy.hedge:
+                    return await self._hedged(call, stats)
+                return await self._attempt(call, stats)
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                if attempt >= policy.retries or not self.breaker.is_failure(e):
+                    raise
+                attempt += 1
+                stats.retries += 1
+                await asyncio.sleep(retry_delay(attempt))
+
+    async def _attempt(
+        self, call: Callable[[], Awaitable[Any]], stats: MethodStats
+    ) -> Any:
+        start = time.perf_counter()
+        result = await self.breaker.call(call)
+        stats.record(time.perf_counter() - start)
+        return result
+
+    async def _hedged(
+        self, call: Callable[[], Awaitable[Any]], stats: MethodStats
+    ) -> Any:
+        """First answer of the attempt and, if it is slow, a duplicate of it."""
+        if len(stats.latencies) >= self.hedge_min_samples:
+            delay = max(self.hedge_min_delay, stats.percentile(95) or 0.0)
+        elif self.hedge_initial_delay is not None:
+            delay = self.hedge_initial_delay
+        else:
+            return await self._attempt(call, stats)
+
+        first = asyncio.ensure_future(self._attempt(call, stats))
+        attempts = [first]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if done:
+                return first.result()
+            stats.hedges += 1
+            attempts.append(asyncio.ensure_future(self._attempt(call, stats)))
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            stats.hedge_wins += 1
+                        return task.result()
+            # Every attempt failed: report the first one's error
+            return first.result()
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # retrieved, so a lost race is not logged
@@ -0,0 +1,348 @@
+"""
+Resolution of spoken appointment references for cancel and modify.
+
+Callers rarely say an appointment ID; they say "the 2pm one", "the second
+one", "Monday's" or "March 5th". The identifier is parsed once into an
+AppointmentReference (an ID is recognised up front and never reaches date
+parsing), and matched against a small index over the caller's appointments.
+A reference either resolves to one appointment or yields a short ranked list
+of candidates to offer back to the caller.
+"""
+
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, time, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    from .models import Appointment
+except ImportError:
+    from models import Appointment
+
+UUID_RE = re.compile(
+    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE
+)
+
+WEEKDAYS = {
+    name: index
+    for index, names in enumerate(
+        (
+            ("monday", "mon"),
+            ("tuesday", "tue", "tues"),
+            ("wednesday", "wed"),
+            ("thursday", "thu", "thur", "thurs"),
+            ("friday", "fri"),
+            ("saturday", "sat"),
+            ("sunday", "sun"),
+        )
+    )
+    for name in names
+}
+
+MONTHS = {
+    name: index
+    for index, names in enumerate(
+        (
+            ("january", "jan"),
+            ("february", "feb"),
+            ("march", "mar"),
+            ("april", "apr"),
+            ("may",),
+            ("june", "jun"),
+            ("july", "jul"),
+            ("august", "aug"),
+            ("september", "sep", "sept"),
+            ("october", "oct"),
+            ("november", "nov"),
+            ("december", "dec"),
+        ),
+        start=1,
+    )
+    for name in names
+}
+
+# -1 is the last appointment; "next" counts as the first one
+ORDINALS = {
+    "first": 1,
+    "1st": 1,
+    "earliest": 1,
+    "soonest": 1,
+    "next": 1,
+    "second": 2,
+    "2nd": 2,
+    "third": 3,
+    "3rd": 3,
+    "fourth": 4,
+    "4th": 4,
+    "fifth": 5,
+    "5th": 5,
+    "last": -1,
+    "latest": -1,
+    "final": -1,
+}
+
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+_WEEKDAY = "|".join(sorted(WEEKDAYS, key=len, reverse=True))
+_ORDINAL = "|".join(sorted(ORDINALS, key=len, reverse=True))
+
+ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+NUMERIC_DATE_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+MONTH_DAY_RE = re.compile(
+    rf"\b({_MONTH})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s*(\d{{4}}))?"
+)
+DAY_MONTH_RE = re.compile(
+    rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({_MONTH})\b(?:,?\s*(\d{{4}}))?"
+)
+RELATIVE_DATE_RE = re.compile(r"\b(today|tomorrow)\b")
+WEEKDAY_RE = re.compile(rf"\b(?:next\s+|this\s+)?({_WEEKDAY})(?:'s|s)?\b")
+CLOCK_RE = re.compile(
+    r"\b(\d{1,2})(?::(\d{2}))?\s*(a\.?m\.?|p\.?m\.?)(?![a-z])|\b(\d{1,2}):(\d{2})\b"
+)
+BARE_HOUR_RE = re.compile(r"\b(?:at|around)\s+(\d{1,2})\b")
+NAMED_TIME_RE = re.compile(r"\b(noon|midday)\b")
+ORDINAL_RE = re.compile(rf"\b({_ORDINAL})\b")
+
+
+@dataclass(frozen=True, slots=True)
+class AppointmentReference:
+    """What an identifier said about the appointment it refers to."""
+
+    text: str
+    appointment_id: Optional[str] = None
+    on_date: Optional[date] = None
+    weekday: Optional[int] = None
+    # Exact times, or both readings of a bare hour ("at 2" is 2 AM or 2 PM)
+    times: Tuple[time, ...] = ()
+    ordinal: Optional[int] = None
+
+    @property
+    def is_empty(self) -> bool:
+        """True when nothing in the text narrows down the appointment."""
+        return not (
+            self.appointment_id
+            or self.on_date
+            or self.weekday is not None
+            or self.times
+            or self.ordinal
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Resolution:
+    """Outcome of resolving a reference against a caller's appointments."""
+
+    reference: AppointmentReference
+    match: Optional[Appointment] = None
+    # Best candidates first when the reference matched more than one (or none
+    # exactly); empty when it matched exactly one or nothing at all
+    candidates: Tuple[Appointment, ...] = ()
+
+    @property
+    def is_ambiguous(self) -> bool:
+        return self.match is None and bool(self.candidates)
+
+    def choices(self) -> str:
+        """Candidates as one spoken phrase: "A, B or C"."""
+        displays = [appt.display for appt in self.candidates]
+        if len(displays) <= 1:
+            return "".join(displays)
+        return f"{', '.join(displays[:-1])} or {displays[-1]}"
+
+
+def _upcoming(month: int, day: int, year: Optional[int], today: date) -> date:
+    """The date with that month and day, next year if it has already passed."""
+    if year is not None:
+        return date(year if year >= 100 else 2000 + year, month, day)
+    candidate = date(today.year, month, day)
+    return candidate if candidate >= today else date(today.year + 1, month, day)
+
+
+def _to_time(hour: int, minute: int, meridiem: Optional[str]) -> Optional[time]:
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem.startswith("p") else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return time(hour, minute)
+
+
+def parse_reference(text: str, today: Optional[date] = None) -> AppointmentReference:
+    """
+    Parse an appointment identifier once into its date, time and ordinal parts.
+
+    Each recognised phrase is consumed from the text before the next pattern
+    runs, so "March 2nd" is a date rather than an ordinal and "next Monday"
+    is a weekday rather than "the next one".
+
+    Args:
+        text: Identifier as passed by the LLM ("the 2pm one", a UUID, ...)
+        today: Reference date for "tomorrow" and dates without a year
+
+    Returns:
+        AppointmentReference; empty when nothing was recognised
+    """
+    raw = text.strip()
+    if UUID_RE.match(raw):
+        return AppointmentReference(text=raw, appointment_id=raw.lower())
+
+    today = today or date.today()
+    rest = f" {raw.lower()} "
+    on_date: Optional[date] = None
+    weekday: Optional[int] = None
+    times: List[time] = []
+    ordinal: Optional[int] = None
+
+    def take(pattern: re.Pattern) -> Optional[re.Match]:
+        nonlocal rest
+        found = pattern.search(rest)
+        if found:
+            rest = f"{rest[: found.start()]} {rest[found.end() :]}"
+        return found
+
+    try:
+        if found := take(ISO_DATE_RE):
+            on_date = date(*(int(part) for part in found.groups()))
+        elif found := take(MONTH_DAY_RE):
+            month, day, year = found.groups()
+            on_date = _upcoming(
+                MONTHS[month], int(day), int(year) if year else None, today
+            )
+        elif found := take(DAY_MONTH_RE):
+            day, month, year = found.groups()
+            on_date = _upcoming(
+                MONTHS[month], int(day), int(year) if year else None, today
+            )
+        elif found := take(NUMERIC_DATE_RE):
+            month, day, year = found.groups()
+            on_date = _upcoming(
+                int(month), int(day), int(year) if year else None, today
+            )
+        elif found := take(RELATIVE_DATE_RE):
+            on_date = today + timedelta(days=1 if found.group(1) == "tomorrow" else 0)
+    except ValueError:
+        on_date = None  # e.g. "February 30"
+
+    if found := take(WEEKDAY_RE):
+        weekday = WEEKDAYS[found.group(1)]
+
+    if found := take(CLOCK_RE):
+        hour, minute, meridiem, hour24, minute24 = found.groups()
+        if hour24 is not None:
+            parsed = _to_time(int(hour24), int(minute24), None)
+        else:
+            parsed = _to_time(int(hour), int(minute or 0), meridiem.replace(".", ""))
+        times = [parsed] if parsed else []
+    elif take(NAMED_TIME_RE):
+        times = [time(12, 0)]
+    elif found := take(BARE_HOUR_RE):
+        hour = int(found.group(1))
+        if 1 <= hour <= 12:
+            times = [time(hour % 12), time(hour % 12 + 12)]
+
+    if found := take(ORDINAL_RE):
+        ordinal = ORDINALS[found.group(1)]
+
+    return AppointmentReference(
+        text=raw,
+        on_date=on_date,
+        weekday=weekday,
+        times=tuple(times),
+        ordinal=ordinal,
+    )
+
+
+class AppointmentResolver:
+    """Index of one caller's appointments for resolving spoken references."""
+
+    def __init__(self, appointments: Sequence[Appointment], max_candidates: int = 3):
+        """
+        Args:
+            appointments: The caller's appointments (any order)
+            max_candidates: Most candidates offered back when ambiguous
+        """
+        self.appointments: Tuple[Appointment, ...] = tuple(
+            sorted(appointments, key=lambda appt: appt.cursor)
+        )
+        self.max_candidates = max_candidates
+        self.by_id: Dict[str, Appointment] = {}
+        self.by_date: Dict[date, List[Appointment]] = defaultdict(list)
+        self.by_weekday: Dict[int, List[Appointment]] = defaultdict(list)
+        self.by_time: Dict[time, List[Appointment]] = defaultdict(list)
+        for appt in self.appointments:
+            self.by_id[appt.id.lower()] = appt
+            self.by_date[appt.appointment_date].append(appt)
+            self.by_weekday[appt.appointment_date.weekday()].append(appt)
+            self.by_time[appt.appointment_time].append(appt)
+
+    def resolve(self, identifier: str, today: Optional[date] = None) -> Resolution:
+        """
+        Resolve an identifier to one appointment or a ranked set of candidates.
+
+        The date, weekday and time in the reference narrow the appointments
+        down and an ordinal then picks within what is left ("the second one
+        on Monday"). With no exact match the candidates are the appointments
+        agreeing with most of the reference, soonest first.
+
+        Args:
+            identifier: Appointment ID or spoken description
+            today: Reference date for relative dates (default: today)
+
+        Returns:
+            Resolution with ``match`` set, or with ranked ``candidates``
+        """
+        exact = self.by_id.get(identifier.strip().lower())
+        reference = parse_reference(identifier, today)
+        if exact is not None:
+            return Resolution(reference, match=exact)
+        if reference.appointment_id is not None or not self.appointments:
+            return Resolution(reference)
+
+        if reference.is_empty:
+            if len(self.appointments) == 1:
+                return Resolution(reference, match=self.appointments[0])
+            return Resolution(reference, candidates=self._top(self.appointments))
+
+        filters = []
+        if reference.on_date is not None:
+            filters.append(self.by_date.get(reference.on_date, []))
+        if reference.weekday is not None:
+            filters.append(self.by_weekday.get(reference.weekday, []))
+        if reference.times:
+            filters.append(
+                [appt for t in reference.times for appt in self.by_time.get(t, [])]
+            )
+
+        if filters:
+            ids = set.intersection(*({appt.id for appt in f} for f in filters))
+            matches = [appt for appt in self.appointments if appt.id in ids]
+        else:
+            matches = list(self.appointments)
+
+        if matches and reference.ordinal:
+            index = reference.ordinal - 1 if reference.ordinal > 0 else -1
+            if index < len(matches):
+                return Resolution(reference, match=matches[index])
+            return Resolution(reference, candidates=self._top(matches))
+
+        if len(matches) == 1:
+            return Resolution(reference, match=matches[0])
+        if matches:
+            return Resolution(reference, candidates=self._top(matches))
+        return Resolution(reference, candidates=self._ranked(filters))
+
+    def _top(self, appointments: Sequence[Appointment]) -> Tuple[Appointment, ...]:
+        return tuple(appointments[: self.max_candidates])
+
+    def _ranked(self, filters: List[List[Appointment]]) -> Tuple[Appointment, ...]:
+        """Appointments matching part of the reference, most parts first."""
+        hits: Dict[str, int] = defaultdict(int)
+        for matched in filters:
+            for appt in matched:
+                hits[appt.id] += 1
+        ranked = sorted(
+            (appt for appt in self.appointments if appt.id in hits),
+            key=lambda appt: -hits[appt.id],
+        )
+        return self._top(ranked)
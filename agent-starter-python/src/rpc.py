@@ -0,0 +1,181 @@
+"""
+Calls between the processes of a host over Unix sockets.
+
+Each call of a session runs in its own job process, so anything sessions
+share (the coalesced and cached reads of shared_reads.py, the calendar
+shards of sharding.py) is served by the long-lived worker process and
+reached through a socket. Requests and responses are newline-delimited JSON
+objects: ``{"id", "method", "kwargs"}`` answered by ``{"id", "result"}`` or
+``{"id", "error"}``. One connection carries any number of concurrent
+requests.
+"""
+
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Longest request or response line, in bytes
+LINE_LIMIT = 2**20
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+class RpcUnavailableError(ConnectionError):
+    """The server could not be reached; nothing was sent to it."""
+
+
+class RpcCallError(RuntimeError):
+    """The server received a request and failed it."""
+
+
+class RpcClient:
+    """Connection to a server's socket, shared by all requests."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self._connecting = asyncio.Lock()
+
+    async def _connect(self) -> asyncio.StreamWriter:
+        async with self._connecting:
+            if self._writer is None or self._writer.is_closing():
+                try:
+                    reader, self._writer = await asyncio.open_unix_connection(
+                        self.path, limit=LINE_LIMIT
+                    )
+                except OSError as e:
+                    raise RpcUnavailableError(f"{self.path}: {e}") from e
+                self._reader_task = asyncio.get_running_loop().create_task(
+                    self._read(reader)
+                )
+            return self._writer
+
+    async def _read(self, reader: asyncio.StreamReader):
+        try:
+            while line := await reader.readline():
+                response = json.loads(line)
+                future = self._pending.pop(response["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Connection to {self.path} failed: {e}")
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"{self.path} closed"))
+            self._pending.clear()
+
+    async def request(self, method: str, kwargs: Dict[str, Any], timeout: float):
+        """
+        Call a method of the server.
+
+        Raises:
+            RpcUnavailableError: If the server could not be reached
+            RpcCallError: If the server failed the call
+            ConnectionError: If the connection closed before the answer
+            asyncio.TimeoutError: If the server did not answer in time
+        """
+        writer = await self._connect()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            line = json.dumps(
+                {"id": request_id, "method": method, "kwargs": kwargs}, default=str
+            )
+            writer.write(line.encode() + b"\n")
+            response = await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+        if "error" in response:
+            raise RpcCallError(response["error"])
+        return response["result"]
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader_task
+
+
+class RpcServer:
+    """Answers the requests sent to a socket with ``handlers``."""
+
+    def __init__(self, path: str, handlers: Dict[str, Handler]):
+        """
+        Args:
+            path: Socket to listen on; a file left there is replaced
+            handlers: Coroutine functions answering each method, by name
+        """
+        self.path = path
+        self.handlers = handlers
+        self.stats: Dict[str, int] = defaultdict(int)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._answers: Set[asyncio.Task] = set()
+
+    async def start(self):
+        """
+        Listen on the running loop.
+
+        Raises:
+            OSError: If the socket cannot be created
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)  # left by a process that no longer runs
+        self._server = await asyncio.start_unix_server(
+            self._serve, self.path, limit=LINE_LIMIT
+        )
+
+    async def stop(self):
+        """Stop listening and remove the socket."""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                # Requests of one connection are answered concurrently
+                task = asyncio.get_running_loop().create_task(
+                    self._answer(json.loads(line), writer)
+                )
+                self._answers.add(task)
+                task.add_done_callback(self._answers.discard)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Connection to {self.path} failed: {e}")
+        finally:
+            writer.close()
+
+    async def _answer(self, request: Dict[str, Any], writer: asyncio.StreamWriter):
+        response: Dict[str, Any] = {"id": request.get("id")}
+        try:
+            method = request["method"]
+            handler = self.handlers.get(method)
+            if handler is None:
+                raise ValueError(f"Unknown method '{method}'")
+            self.stats["served"] += 1
+            response["result"] = await handler(**request["kwargs"])
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Call {request.get('method')} on {self.path} failed: {e}")
+            response["error"] = f"{type(e).__name__}: {e}"
+        if not writer.is_closing():
+            writer.write(json.dumps(response, default=str).encode() + b"\n")
@@ -0,0 +1,459 @@
+"""
+Interval-indexed availability across several resources.
+
+A booking occupies the interval [start, start + duration) of one resource (a
+provider or a room), so appointment types of different lengths and several
+calendars side by side cannot be answered by an exact (date, time) match.
+
+Each resource keeps its booked intervals as parallel sorted lists of minute
+offsets. Bookings of one resource never overlap, so the ends are sorted in
+the same order as the starts: a single bisect tells whether an interval is
+free, and one merge pass over the sorted candidate starts and the booked
+intervals answers "which N-minute windows are free" for a whole date range,
+per resource, without a query or a scan per candidate.
+
+A resource that takes several people at once (capacity > 1) has one such
+calendar per seat. A booking occupies one seat, so "remaining capacity" at a
+start is the number of seats free for the whole appointment.
+"""
+
+import heapq
+import logging
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from .models import DEFAULT_DURATION_MINUTES, DEFAULT_RESOURCE, Slot
+except ImportError:
+    from models import DEFAULT_DURATION_MINUTES, DEFAULT_RESOURCE, Slot
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minute(moment: datetime) -> int:
+    """Minutes since 0001-01-01 00:00, the engine's integer time axis."""
+    return moment.toordinal() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+
+def from_minute(minute: int) -> datetime:
+    """Inverse of to_minute."""
+    day, offset = divmod(minute, MINUTES_PER_DAY)
+    return datetime.combine(date.fromordinal(day), time(offset // 60, offset % 60))
+
+
+@dataclass(frozen=True, slots=True)
+class Booking:
+    """An active appointment as the interval it occupies on a resource."""
+
+    resource_id: str
+    start: datetime
+    duration_minutes: int = DEFAULT_DURATION_MINUTES
+    booking_id: Optional[str] = None
+    seat: int = 0
+
+    @property
+    def end(self) -> datetime:
+        return self.start + timedelta(minutes=self.duration_minutes)
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Booking":
+        """Build from a list_booked_slots row; older rows use the defaults."""
+        return cls(
+            resource_id=row.get("resource_id") or DEFAULT_RESOURCE,
+            start=datetime.combine(
+                date.fromisoformat(str(row["appointment_date"])),
+                time.fromisoformat(str(row["appointment_time"])),
+            ),
+            duration_minutes=int(
+                row.get("duration_minutes") or DEFAULT_DURATION_MINUTES
+            ),
+            booking_id=str(row["id"]) if row.get("id") is not None else None,
+            seat=int(row.get("seat") or 0),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Window:
+    """A free interval of one seat of a resource."""
+
+    resource_id: str
+    start: datetime
+    end: datetime
+    seat: int = 0
+
+
+class ResourceCalendar:
+    """Booked intervals of one seat of a resource, sorted and non-overlapping."""
+
+    __slots__ = ("_ends", "_ids", "_start_of", "_starts", "resource_id", "seat")
+
+    def __init__(self, resource_id: str, seat: int = 0):
+        self.resource_id = resource_id
+        self.seat = seat
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        self._ids: List[Optional[str]] = []
+        self._start_of: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    @property
+    def starts(self) -> Sequence[int]:
+        """Booked start minutes in ascending order (read-only)."""
+        return self._starts
+
+    @property
+    def ends(self) -> Sequence[int]:
+        """Booked end minutes, in the same (ascending) order as the starts."""
+        return self._ends
+
+    def intervals(self) -> List[Tuple[int, int]]:
+        """Booked (start, end) minute pairs in order."""
+        return list(zip(self._starts, self._ends))
+
+    def overlaps(self, start: int, end: int, ignore: Optional[str] = None) -> bool:
+        """
+        Whether [start, end) overlaps a booked interval.
+
+        Args:
+            start: First minute of the interval
+            end: Minute the interval ends (exclusive)
+            ignore: Booking to disregard, e.g. the one being moved
+        """
+        i = bisect_right(self._ends, start)
+        while i < len(self._starts) and self._starts[i] < end:
+            if ignore is None or self._ids[i] != ignore:
+                return True
+            i += 1
+        return False
+
+    def add(self, start: int, end: int, booking_id: Optional[str] = None):
+        """
+        Record a booked interval.
+
+        Raises:
+            ValueError: If the interval is empty or overlaps a booking
+        """
+        if end <= start:
+            raise ValueError("Booking must end after it starts")
+        if self.overlaps(start, end):
+            raise ValueError(
+                f"{from_minute(start)} overlaps a booking of {self.resource_id}"
+            )
+        i = bisect_left(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+        self._ids.insert(i, booking_id)
+        if booking_id is not None:
+            self._start_of[booking_id] = start
+
+    def load(self, intervals: Iterable[Tuple[int, int, Optional[str]]]) -> int:
+        """
+        Replace the calendar with (start, end, booking_id) intervals in bulk.
+
+        Sorting once is much cheaper than inserting one at a time. Rows that
+        overlap (possible in data written before durations were checked) are
+        merged into one busy interval, so nothing booked is offered.
+
+        Returns:
+            Number of intervals kept
+        """
+        self._starts, self._ends, self._ids = [], [], []
+        self._start_of = {}
+        for start, end, booking_id in sorted(intervals, key=lambda iv: iv[0]):
+            if self._ends and start < self._ends[-1]:
+                logger.warning(
+                    f"Booking {booking_id} overlaps another on {self.resource_id}"
+                )
+                self._ends[-1] = max(self._ends[-1], end)
+                continue
+            self._starts.append(start)
+            self._ends.append(end)
+            self._ids.append(booking_id)
+            if booking_id is not None:
+                self._start_of[booking_id] = start
+        return len(self._starts)
+
+    def remove(self, booking_id: str) -> bool:
+        """Drop a booking by id; False if it is not on this calendar."""
+        start = self._start_of.pop(booking_id, None)
+        if start is None:
+            return False
+        i = bisect_left(self._starts, start)
+        del self._starts[i], self._ends[i], self._ids[i]
+        return True
+
+    def free_starts(self, candidates: Sequence[int], duration: int) -> List[int]:
+        """
+        Candidates at which a ``duration``-minute booking fits, in one pass.
+
+        Args:
+            candidates: Candidate start minutes in ascending order
+            duration: Length of the booking in minutes
+
+        Returns:
+            The free candidates, in order
+        """
+        starts, ends = self._starts, self._ends
+        n = len(starts)
+        j = 0
+        free = []
+        for candidate in candidates:
+            # Skip bookings that end before this candidate; candidates only
+            # move forward, so neither pointer ever goes back
+            while j < n and ends[j] <= candidate:
+                j += 1
+            if j == n or starts[j] >= candidate + duration:
+                free.append(candidate)
+        return free
+
+
+class SchedulingEngine:
+    """
+    Per-resource calendars answering availability for resource sets.
+
+    Load the bookings of a date range once (DatabaseManager.get_bookings),
+    then ask for free windows, free resources at a given start, or whether
+    one resource is free, without further queries. Calendars are kept per
+    (resource, seat); a resource has as many seats as its capacity.
+    """
+
+    def __init__(
+        self,
+        resource_ids: Sequence[str] = (DEFAULT_RESOURCE,),
+        business_hours: Tuple[time, time] = (time(9, 0), time(17, 0)),
+        capacities: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Args:
+            resource_ids: Resources in order of preference
+            business_hours: (opens, closes); a booking must fit inside them
+            capacities: Concurrent bookings per resource (1 if not listed)
+        """
+        self.resource_ids = list(resource_ids)
+        self.opens, self.closes = business_hours
+        self.capacities: Dict[str, int] = {
+            resource_id: max(1, int(capacity))
+            for resource_id, capacity in (capacities or {}).items()
+        }
+        self.calendars: Dict[Tuple[str, int], ResourceCalendar] = {}
+        for resource_id in self.resource_ids:
+            self.seats(resource_id)
+
+    @classmethod
+    def from_config(cls, config: Any) -> "SchedulingEngine":
+        """Engine for the resources, hours and capacities of an AppConfig."""
+        return cls(config.resource_ids, config.hours, config.capacities)
+
+    def capacity(self, resource_id: str) -> int:
+        """Number of bookings a resource can take at the same time."""
+        return self.capacities.get(resource_id, 1)
+
+    def calendar(self, resource_id: str, seat: int = 0) -> ResourceCalendar:
+        """Calendar of a resource's seat, created empty if the engine has none yet."""
+        calendar = self.calendars.get((resource_id, seat))
+        if calendar is None:
+            calendar = ResourceCalendar(resource_id, seat)
+            self.calendars[(resource_id, seat)] = calendar
+        return calendar
+
+    def seats(self, resource_id: str) -> List[ResourceCalendar]:
+        """The calendar of every seat of a resource, lowest seat first."""
+        return [
+            self.calendar(resource_id, seat)
+            for seat in range(self.capacity(resource_id))
+        ]
+
+    def load(self, bookings: Iterable[Booking]) -> int:
+        """
+        Replace every calendar's contents with the given bookings.
+
+        Returns:
+            Number of booked intervals kept
+        """
+        grouped: Dict[Tuple[str, int], List[Tuple[int, int, Optional[str]]]] = {
+            key: [] for key in self.calendars
+        }
+        for booking in bookings:
+            start = to_minute(booking.start)
+            grouped.setdefault((booking.resource_id, booking.seat), []).append(
+                (start, start + booking.duration_minutes, booking.booking_id)
+            )
+        return sum(
+            self.calendar(*key).load(intervals) for key, intervals in grouped.items()
+        )
+
+    def book(self, booking: Booking):
+        """
+        Record one booking.
+
+        Raises:
+            ValueError: If it overlaps a booking of the same seat
+        """
+        start = to_minute(booking.start)
+        self.calendar(booking.resource_id, booking.seat).add(
+            start, start + booking.duration_minutes, booking.booking_id
+        )
+
+    def release(self, resource_id: str, booking_id: str) -> bool:
+        """Remove a booking; False if the resource has no such booking."""
+        return any(
+            calendar.remove(booking_id)
+            for (resource, _), calendar in self.calendars.items()
+            if resource == resource_id
+        )
+
+    def fits(self, start: datetime, duration_minutes: int) -> bool:
+        """Whether a booking starting at ``start`` ends within business hours."""
+        end = start + timedelta(minutes=duration_minutes)
+        return (
+            start.time() >= self.opens
+            and end.date() == start.date()
+            and end.time() <= self.closes
+        )
+
+    def free_seats(
+        self,
+        resource_id: str,
+        start: datetime,
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        ignore: Optional[str] = None,
+    ) -> List[int]:
+        """
+        Seats of a resource free for a whole booking, lowest first.
+
+        Business hours are not checked; ``len()`` of the result is the
+        remaining capacity at ``start``.
+
+        Args:
+            resource_id: Resource to check
+            start: Start of the booking
+            duration_minutes: Length of the booking
+            ignore: Booking to disregard, e.g. the one being moved
+        """
+        minute = to_minute(start)
+        end = minute + duration_minutes
+        return [
+            calendar.seat
+            for calendar in self.seats(resource_id)
+            if not calendar.overlaps(minute, end, ignore)
+        ]
+
+    def is_free(
+        self,
+        resource_id: str,
+        start: datetime,
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        ignore: Optional[str] = None,
+    ) -> bool:
+        """
+        Whether one resource can take a booking.
+
+        Args:
+            resource_id: Resource to check
+            start: Start of the booking
+            duration_minutes: Length of the booking
+            ignore: Booking to disregard, e.g. the one being moved
+        """
+        if not self.fits(start, duration_minutes):
+            return False
+        return bool(self.free_seats(resource_id, start, duration_minutes, ignore))
+
+    def free_resources(
+        self,
+        start: datetime,
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        resource_ids: Optional[Sequence[str]] = None,
+        ignore: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Resources that can take a booking at ``start``, in preference order.
+
+        Args:
+            start: Start of the booking
+            duration_minutes: Length of the booking
+            resource_ids: Resources to consider; all of the engine's by default
+            ignore: Booking to disregard, e.g. the one being moved
+        """
+        return [
+            resource_id
+            for resource_id in resource_ids or self.resource_ids
+            if self.is_free(resource_id, start, duration_minutes, ignore)
+        ]
+
+    def _candidates(self, starts: Iterable[datetime], duration: int) -> List[int]:
+        return sorted(
+            {to_minute(start) for start in starts if self.fits(start, duration)}
+        )
+
+    def free_windows(
+        self,
+        starts: Iterable[datetime],
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        resource_ids: Optional[Sequence[str]] = None,
+    ) -> List[Window]:
+        """
+        Free ``duration_minutes`` windows of a resource set, in one pass each.
+
+        Args:
+            starts: Candidate starts, e.g. the configured slot grid for a range
+            duration_minutes: Length of the appointment type
+            resource_ids: Resources to consider; all of the engine's by default
+
+        Returns:
+            Windows ordered by start, then by resource preference and seat
+        """
+        candidates = self._candidates(starts, duration_minutes)
+        lanes = [
+            calendar
+            for resource_id in resource_ids or self.resource_ids
+            for calendar in self.seats(resource_id)
+        ]
+        per_lane = [
+            [
+                (minute, rank)
+                for minute in calendar.free_starts(candidates, duration_minutes)
+            ]
+            for rank, calendar in enumerate(lanes)
+        ]
+        return [
+            Window(
+                lanes[rank].resource_id,
+                from_minute(minute),
+                from_minute(minute + duration_minutes),
+                lanes[rank].seat,
+            )
+            for minute, rank in heapq.merge(*per_lane)
+        ]
+
+    def available(
+        self,
+        slots: Sequence[Slot],
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        resource_ids: Optional[Sequence[str]] = None,
+    ) -> List[Slot]:
+        """
+        Slots at which at least one of the resources is free.
+
+        Args:
+            slots: Candidate slots in date and time order
+            duration_minutes: Length of the appointment type
+            resource_ids: Resources to consider; all of the engine's by default
+
+        Returns:
+            The bookable slots, in their original order
+        """
+        starts = [datetime.combine(s.slot_date, s.slot_time) for s in slots]
+        candidates = self._candidates(starts, duration_minutes)
+        free = set()
+        for resource_id in resource_ids or self.resource_ids:
+            for calendar in self.seats(resource_id):
+                free.update(calendar.free_starts(candidates, duration_minutes))
+                if len(free) == len(candidates):
+                    break
+        return [slot for slot, start in zip(slots, starts) if to_minute(start) in free]
@@ -0,0 +1,578 @@
+"""
+Sharded scheduling: each resource's calendar is owned by one worker process.
+
+Without sharding every worker of a host reads a day's bookings and races the
+others with conditional inserts for every booking of a hot calendar. With
+SHARD_DIR set, the workers sharing that directory form a consistent hash
+ring over their sockets (``<SHARD_DIR>/<pid>.sock``), and each resource (a
+provider, room or location calendar) is owned by one of them. Ring members
+are the long-lived worker processes, which serve their shard from the
+worker_started hook; the job process of each call is only a client of the
+ring, so calls starting and ending never move a calendar:
+
+- The owner keeps the authoritative in-memory availability index of its
+  resources: one SchedulingEngine per day, loaded with one query and kept
+  for SHARD_INDEX_TTL seconds. Availability checks are answered from it.
+- Bookings of a resource are forwarded to its owner over a newline-delimited
+  JSON protocol on a Unix socket, and the owner claims seats one booking at a
+  time per resource. A booking the index already knows cannot fit is
+  refused without touching the database.
+
+The database stays the arbiter: the owner still books with the conditional
+insert, so workers that disagree on the ring for a moment, or bookings made
+outside the owner (waitlist claims, series), can never overbook a seat. When
+the index turns out to be stale, the day is reloaded. Cancellations and
+modifications are announced to every worker, which drop them from their
+index.
+
+A call that cannot reach a resource's owner (or finds no worker serving a
+shard) falls back to the unsharded path. A claim whose outcome is unknown (the owner timed out or
+failed after the request was sent) is not retried elsewhere, so a caller is
+never booked twice.
+"""
+
+import asyncio
+import bisect
+import contextlib
+import functools
+import glob
+import hashlib
+import logging
+import os
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, time
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    from .database import DatabaseManager
+    from .models import DEFAULT_DURATION_MINUTES, DEFAULT_RESOURCE, Appointment
+    from .rpc import RpcCallError, RpcClient, RpcServer, RpcUnavailableError
+    from .scheduling import Booking, SchedulingEngine
+except ImportError:
+    from database import DatabaseManager
+    from models import DEFAULT_DURATION_MINUTES, DEFAULT_RESOURCE, Appointment
+    from rpc import RpcCallError, RpcClient, RpcServer, RpcUnavailableError
+    from scheduling import Booking, SchedulingEngine
+
+logger = logging.getLogger(__name__)
+
+# Shard methods a peer may call
+SHARD_METHODS = ("free_seats", "claim", "release")
+
+
+# The owner of a resource could not be reached, so nothing was sent to it; or
+# it received a request and failed it
+ShardUnavailableError = RpcUnavailableError
+ShardCallError = RpcCallError
+
+
+# ==================== HASH RING ====================
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), "big"
+    )
+
+
+class HashRing:
+    """
+    Consistent hashing of keys onto nodes.
+
+    Each node is placed at ``replicas`` points of a 64-bit ring and a key
+    belongs to the first point at or after its hash, so adding or removing a
+    node only moves the keys of that node.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 64):
+        """
+        Args:
+            nodes: Initial node ids
+            replicas: Points per node; more points spread keys more evenly
+        """
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self._nodes: Set[str] = set()
+        self.update(nodes)
+
+    @property
+    def nodes(self) -> Set[str]:
+        return set(self._nodes)
+
+    def update(self, nodes: Iterable[str]):
+        """Make ``nodes`` the ring's members."""
+        self._nodes = set(nodes)
+        points = sorted(
+            (_hash(f"{node}#{i}"), node)
+            for node in self._nodes
+            for i in range(self.replicas)
+        )
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def add(self, node: str):
+        self.update(self._nodes | {node})
+
+    def remove(self, node: str):
+        self.update(self._nodes - {node})
+
+    def owner(self, key: str) -> Optional[str]:
+        """Node owning a key, or None if the ring is empty."""
+        if not self._points:
+            return None
+        index = bisect.bisect_left(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+# ==================== OWNED CALENDARS ====================
+
+
+class CalendarShard:
+    """
+    Availability index of the resources a worker owns.
+
+    Days are loaded lazily with one list_booked_slots query and kept for
+    ``ttl`` seconds, or until a claim shows they are stale. Claims of one
+    resource run one at a time, in arrival order.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        ttl: float = 10.0,
+        max_days: int = 60,
+        clock=monotonic,
+    ):
+        """
+        Args:
+            backend: Storage backend the bookings are read from and written to
+            ttl: Seconds a loaded day is trusted
+            max_days: Days kept, least recently used dropped first
+            clock: Monotonic time source in seconds
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.max_days = max_days
+        self.clock = clock
+        self.loads = 0
+        self.refused = 0
+        self.claimed = 0
+        self.stale = 0
+        self._days: OrderedDict[str, Tuple[float, SchedulingEngine]] = OrderedDict()
+        self._loading: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._claiming: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    def forget(self, day: str):
+        """Drop a day's index; the next request reloads it."""
+        self._days.pop(day, None)
+
+    async def _day(self, day: str) -> SchedulingEngine:
+        async with self._loading[day]:
+            cached = self._days.get(day)
+            if cached is not None and cached[0] > self.clock():
+                self._days.move_to_end(day)
+                return cached[1]
+            rows = await self.backend.list_booked_slots(day, day)
+            engine = SchedulingEngine([])
+            engine.load(Booking.from_row(row) for row in rows)
+            self.loads += 1
+            self._days[day] = (self.clock() + self.ttl, engine)
+            while len(self._days) > self.max_days:
+                oldest, _ = self._days.popitem(last=False)
+                if not self._loading[oldest].locked():
+                    del self._loading[oldest]
+            return engine
+
+    async def free_seats(
+        self,
+        resource_id: str,
+        appointment_date: str,
+        appointment_time: str,
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        capacity: int = 1,
+        exclude_id: Optional[str] = None,
+    ) -> List[int]:
+        """
+        Seats of a resource free for a whole appointment, lowest first.
+
+        Args:
+            resource_id: Resource to check
+            appointment_date: YYYY-MM-DD
+            appointment_time: HH:MM[:SS]
+            duration_minutes: Length of the appointment
+            capacity: Seats of the resource
+            exclude_id: Appointment to disregard, e.g. the one being moved
+        """
+        engine = await self._day(appointment_date)
+        engine.capacities[resource_id] = max(1, int(capacity))
+        start = datetime.combine(
+            date.fromisoformat(appointment_date),
+            datetime.strptime(appointment_time[:5], "%H:%M").time(),
+        )
+        return engine.free_seats(resource_id, start, duration_minutes, exclude_id)
+
+    async def claim(
+        self, resource_id: str, data: Dict[str, Any], capacity: int = 1
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Book the lowest free seat of an owned resource.
+
+        Args:
+            resource_id: Resource to book
+            data: Appointment row without its resource
+            capacity: Seats of the resource
+
+        Returns:
+            The inserted row, or None if every seat is taken
+        """
+        day = data["appointment_date"]
+        async with self._claiming[resource_id]:
+            seats = await self.free_seats(
+                resource_id,
+                day,
+                data["appointment_time"],
+                int(data.get("duration_minutes") or DEFAULT_DURATION_MINUTES),
+                capacity,
+            )
+            if not seats:
+                self.refused += 1
+                return None
+            try:
+                row = await self.backend.insert_appointment_if_free(
+                    {**data, "resource_id": resource_id}, capacity
+                )
+            except ValueError:
+                row = None
+            if row is None:
+                # Booked outside this shard since the day was loaded
+                self.stale += 1
+                self.forget(day)
+                return None
+            self.claimed += 1
+            cached = self._days.get(day)
+            if cached is not None:
+                try:
+                    cached[1].book(Booking.from_row(row))
+                except ValueError:
+                    self.forget(day)
+            return row
+
+    async def release(self, booking_id: str, moved_to: Optional[str] = None) -> bool:
+        """
+        Remove a cancelled or moved booking from every loaded day.
+
+        Args:
+            booking_id: Id of the appointment
+            moved_to: Date (YYYY-MM-DD) it moved to; that day is reloaded
+
+        Returns:
+            Whether a loaded day had the booking
+        """
+        if moved_to is not None:
+            self.forget(moved_to)
+        removed = False
+        for _, engine in self._days.values():
+            for calendar in engine.calendars.values():
+                removed = calendar.remove(booking_id) or removed
+        return removed
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "days": len(self._days),
+            "loads": self.loads,
+            "claimed": self.claimed,
+            "refused": self.refused,
+            "stale": self.stale,
+        }
+
+
+# ==================== RING NODES ====================
+
+
+class ShardNode:
+    """
+    A process's view of the ring: serves its shard, forwards the rest.
+
+    A node with a shard is a ring member, run by a worker process. A node
+    without one is a client, as in the job process of a call: it forwards
+    every call and never joins the ring. Members are the sockets in
+    ``directory``, re-read every ``refresh`` seconds. A socket nobody listens
+    on is removed as soon as a call finds it dead.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        shard: Optional[CalendarShard] = None,
+        node_id: Optional[str] = None,
+        replicas: int = 64,
+        refresh: float = 5.0,
+        timeout: float = 2.0,
+    ):
+        """
+        Args:
+            directory: Directory of the ring's sockets
+            shard: Calendars of the resources this node owns; None for a
+                client
+            node_id: Id (socket name) of a member; the process id by default
+            replicas: Ring points per node
+            refresh: Seconds between re-reads of the ring's members
+            timeout: Seconds to wait for a forwarded call
+        """
+        self.directory = directory
+        self.shard = shard
+        self.node_id = (node_id or str(os.getpid())) if shard is not None else None
+        self.path = self.socket_path(self.node_id) if self.node_id else None
+        self.ring = HashRing([], replicas)
+        self.refresh = refresh
+        self.timeout = timeout
+        self.stats: Dict[str, int] = defaultdict(int)
+        self._peers: Dict[str, RpcClient] = {}
+        self._server: Optional[RpcServer] = None
+        self._task: Optional[asyncio.Task] = None
+        self.update_members()
+
+    def socket_path(self, node_id: str) -> str:
+        return os.path.join(self.directory, f"{node_id}.sock")
+
+    def owner(self, resource_id: str) -> Optional[str]:
+        """Node owning a resource's calendar, or None if the ring is empty."""
+        return self.ring.owner(resource_id) or self.node_id
+
+    def members(self) -> Set[str]:
+        """Nodes with a socket in the directory, this one included if a member."""
+        paths = glob.glob(os.path.join(glob.escape(self.directory), "*.sock"))
+        members = {os.path.basename(p)[: -len(".sock")] for p in paths}
+        if self.node_id is not None:
+            members.add(self.node_id)
+        return members
+
+    def update_members(self):
+        members = self.members()
+        if members != self.ring.nodes:
+            logger.info(f"Shard ring of {self.node_id or 'client'}: {sorted(members)}")
+            self.ring.update(members)
+
+    async def call(self, resource_id: str, method: str, **kwargs) -> Any:
+        """
+        Call a CalendarShard method on the owner of a resource.
+
+        Raises:
+            ShardUnavailableError: If the owner could not be reached, or no
+                worker serves a shard
+            ShardCallError: If the owner failed the call
+            asyncio.TimeoutError: If the owner did not answer in time
+        """
+        owner = self.owner(resource_id)
+        if owner is None:
+            self.stats["unavailable"] += 1
+            raise ShardUnavailableError(f"No shard in {self.directory}")
+        return await self._call_node(
+            owner, method, {"resource_id": resource_id, **kwargs}
+        )
+
+    async def broadcast(self, method: str, **kwargs):
+        """Call a CalendarShard method on every node; failures are only logged."""
+        nodes = sorted(self.ring.nodes)
+        results = await asyncio.gather(
+            *(self._call_node(node_id, method, kwargs) for node_id in nodes),
+            return_exceptions=True,
+        )
+        for node_id, result in zip(nodes, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Shard {method} on {node_id} failed: {result}")
+
+    async def _call_node(self, node_id: str, method: str, kwargs: Dict[str, Any]):
+        if node_id == self.node_id:
+            self.stats["local"] += 1
+            return await getattr(self.shard, method)(**kwargs)
+
+        self.stats["forwarded"] += 1
+        peer = self._peers.get(node_id)
+        if peer is None:
+            peer = self._peers[node_id] = RpcClient(self.socket_path(node_id))
+        try:
+            return await peer.request(method, kwargs, self.timeout)
+        except ShardUnavailableError as e:
+            self.stats["unavailable"] += 1
+            if isinstance(e.__cause__, (ConnectionRefusedError, FileNotFoundError)):
+                self._drop(node_id)
+            raise
+
+    def _drop(self, node_id: str):
+        """Forget a node whose socket nobody listens on any more."""
+        peer = self._peers.pop(node_id, None)
+        if peer is not None:
+            asyncio.get_running_loop().create_task(peer.close())
+        with contextlib.suppress(OSError):
+            os.unlink(self.socket_path(node_id))
+        self.ring.remove(node_id)
+
+    # ==================== SERVING ====================
+
+    async def _serve_call(self, method: str, **kwargs) -> Any:
+        self.stats["served"] += 1
+        return await getattr(self.shard, method)(**kwargs)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh)
+            self.update_members()
+
+    def start(self):
+        """Serve this node's shard, if any, and follow the ring on the running loop."""
+        if self._task is not None and not self._task.done():
+            return
+        loop = asyncio.get_running_loop()
+        self._task = loop.create_task(self._start())
+
+    async def _start(self):
+        if self.shard is not None:
+            self._server = RpcServer(
+                self.path,
+                {m: functools.partial(self._serve_call, m) for m in SHARD_METHODS},
+            )
+            try:
+                await self._server.start()
+            except OSError as e:
+                # Alone in its ring, this node books every resource itself
+                logger.error(f"Shard socket {self.path} unavailable: {e}")
+                self._server = None
+                return
+        self.update_members()
+        await self._run()
+
+    async def stop(self):
+        """Stop serving and leave the ring."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._server is not None:
+            await self._server.stop()
+            self._server = None
+        for peer in self._peers.values():
+            await peer.close()
+        self._peers.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "node": self.node_id,
+            "members": sorted(self.ring.nodes),
+            **self.stats,
+            "shard": self.shard.snapshot() if self.shard is not None else None,
+        }
+
+
+# ==================== ROUTING ====================
+
+
+class ShardedDatabase(DatabaseManager):
+    """
+    DatabaseManager whose availability checks and seat claims go to the
+    worker owning each resource.
+
+    Cancellations and modifications are written as usual and then announced
+    to every node, so no index keeps a seat that was freed. Mixes in before
+    JournaledDatabase, too: everything else is the underlying manager's.
+    """
+
+    def __init__(self, *args, node: Optional[ShardNode] = None, **kwargs):
+        """
+        Args:
+            node: Ring node of this process (a client of the ring over
+                SHARD_DIR if None; the workers serve the shards)
+            *args, **kwargs: Arguments of the underlying manager
+        """
+        super().__init__(*args, **kwargs)
+        self.node = node or ShardNode(os.environ["SHARD_DIR"])
+
+    async def _free_seats(
+        self,
+        appt_date: date,
+        appt_time: time,
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        resource_ids: Optional[Sequence[str]] = None,
+        exclude_id: Optional[str] = None,
+        capacities: Optional[Dict[str, int]] = None,
+    ) -> List[Tuple[str, int]]:
+        resource_ids = list(resource_ids or [DEFAULT_RESOURCE])
+        try:
+            seats = await asyncio.gather(
+                *(
+                    self.node.call(
+                        resource_id,
+                        "free_seats",
+                        appointment_date=str(appt_date),
+                        appointment_time=str(appt_time),
+                        duration_minutes=duration_minutes,
+                        capacity=(capacities or {}).get(resource_id, 1),
+                        exclude_id=exclude_id,
+                    )
+                    for resource_id in resource_ids
+                )
+            )
+        except (ConnectionError, asyncio.TimeoutError, ShardCallError) as e:
+            # A read: answering it without the owners is always safe
+            logger.warning(f"Checking {appt_date} {appt_time} without shards: {e}")
+            self.node.stats["fallbacks"] += 1
+            return await super()._free_seats(
+                appt_date,
+                appt_time,
+                duration_minutes,
+                resource_ids,
+                exclude_id,
+                capacities,
+            )
+        return [
+            (resource_id, free[0])
+            for resource_id, free in zip(resource_ids, seats)
+            if free
+        ]
+
+    async def cancel_appointment(self, appointment_id: str) -> bool:
+        cancelled = await super().cancel_appointment(appointment_id)
+        if cancelled:
+            await self.node.broadcast("release", booking_id=appointment_id)
+        return cancelled
+
+    async def modify_appointment(
+        self,
+        appointment_id: str,
+        new_date: date,
+        new_time: time,
+        duration_minutes: int = DEFAULT_DURATION_MINUTES,
+        resource_ids: Optional[Sequence[str]] = None,
+        capacities: Optional[Dict[str, int]] = None,
+    ) -> Optional[Appointment]:
+        appointment = await super().modify_appointment(
+            appointment_id,
+            new_date,
+            new_time,
+            duration_minutes,
+            resource_ids,
+            capacities,
+        )
+        if appointment is not None:
+            await self.node.broadcast(
+                "release",
+                booking_id=appointment_id,
+                moved_to=str(appointment.appointment_date),
+            )
+        return appointment
+
+    async def _claim_seat(
+        self, data: Dict[str, Any], resource_id: str, capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            return await self.node.call(
+                resource_id, "claim", data=data, capacity=capacity
+            )
+        except ShardUnavailableError as e:
+            # Nothing reached the owner, so claiming here cannot book twice
+            logger.warning(f"Booking {resource_id} without its shard: {e}")
+            self.node.stats["fallbacks"] += 1
+            return await super()._claim_seat(data, resource_id, capacity)
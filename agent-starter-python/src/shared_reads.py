@@ -0,0 +1,219 @@
+"""
+Storage reads shared by every session of a worker.
+
+AgentServer runs each call in its own job process (the default process
+executor), so a SingleFlight or a read cache built in a job process only
+ever sees the reads of one session. Instead the worker process keeps one
+GuardedBackend for all of them, with the breaker, latency percentiles and
+in-flight reads that identical reads join, and with DB_CACHE_TTL the
+CachedBackend in front of it (see invalidation.py). It serves their reads on
+a Unix socket in the worker's state directory (ReadService). Job processes
+wrap their own backend in SharedReads:
+
+    - reads (methods named like READ_PREFIXES) are sent to the worker, so
+      identical reads of concurrent sessions share one query and one cache
+    - writes go through the job's own backend as before and are then
+      announced to the worker with what they changed; before the write
+      returns, the worker starts a new flight epoch and drops the cache
+      entries the change covers, so a session always reads its own writes
+    - a read the worker cannot answer (unreachable, timed out or failed) is
+      sent through the job's own backend, whose breaker then sees any outage
+
+The in-memory backend is private to each process, so it is never shared.
+"""
+
+import asyncio
+import contextlib
+import functools
+import inspect
+import logging
+import os
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from .invalidation import ChangeEvent, InvalidationBus, change_of
+    from .resilience import READ_PREFIXES
+    from .rpc import RpcCallError, RpcClient, RpcServer, RpcUnavailableError
+    from .singleflight import SingleFlight
+except ImportError:
+    from invalidation import ChangeEvent, InvalidationBus, change_of
+    from resilience import READ_PREFIXES
+    from rpc import RpcCallError, RpcClient, RpcServer, RpcUnavailableError
+    from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+SOCKET_NAME = "reads.sock"
+
+
+def read_socket_path() -> Optional[str]:
+    """Socket of this worker's ReadService, or None outside a worker."""
+    directory = os.getenv("WORKER_STATE_DIR")
+    return os.path.join(directory, SOCKET_NAME) if directory else None
+
+
+class ReadService:
+    """Answers the reads of a worker's job processes from one shared backend."""
+
+    def __init__(
+        self,
+        backend: Any,
+        path: str,
+        flights: Optional[SingleFlight] = None,
+        bus: Optional[InvalidationBus] = None,
+    ):
+        """
+        Args:
+            backend: Backend the reads are sent through (a GuardedBackend
+                coalescing with ``flights``, possibly behind a CachedBackend)
+            path: Socket to serve on
+            flights: In-flight reads to close to a job process's writes
+            bus: Bus of the cache, told what a job process's writes changed
+        """
+        self.backend = backend
+        self.flights = flights
+        self.bus = bus
+        self.server = RpcServer(path, {"read": self.read, "wrote": self.wrote})
+        self._task: Optional[asyncio.Task] = None
+
+    async def read(self, name: str, kwargs: Dict[str, Any]) -> Any:
+        """Run a read method of the backend."""
+        if not name.startswith(READ_PREFIXES):
+            raise ValueError(f"'{name}' is not a read")
+        return await getattr(self.backend, name)(**kwargs)
+
+    async def wrote(self, change: Optional[str] = None, clear: bool = False) -> bool:
+        """
+        A job process wrote: later reads must not see what it replaced.
+
+        Args:
+            change: ChangeEvent payload of the write, if it changed cached rows
+            clear: Drop every cached entry (the change could not be named)
+        """
+        if self.flights is not None:
+            self.flights.barrier()
+        if self.bus is not None:
+            if clear:
+                self.bus.reset()
+            elif change is not None:
+                self.bus.publish(ChangeEvent.from_payload(change))
+        return True
+
+    def start(self):
+        """Serve on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._start())
+
+    async def _start(self):
+        try:
+            await self.server.start()
+        except OSError as e:
+            # Job processes then read through their own backends
+            logger.error(f"Read service socket {self.server.path} unavailable: {e}")
+            return
+        logger.info(f"Serving shared reads on {self.server.path}")
+
+    async def stop(self):
+        """Stop serving."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.server.stop()
+
+    def snapshot(self) -> Dict[str, Any]:
+        inner = getattr(self.backend, "snapshot", None)
+        return {
+            **(inner() if callable(inner) else {}),
+            "served": dict(self.server.stats),
+        }
+
+
+class SharedReads:
+    """
+    Backend proxy sending reads to the worker's ReadService.
+
+    Every attribute other than the read and write methods is the backend's,
+    so the breaker of a GuardedBackend stays reachable.
+    """
+
+    def __init__(self, backend: Any, path: str, timeout: float = 10.0):
+        """
+        Args:
+            backend: This process's backend, used for writes and fallbacks
+            path: Socket of the worker's ReadService
+            timeout: Seconds to wait for the worker before reading locally
+        """
+        self.backend = backend
+        self.name = backend.name
+        self.path = path
+        self.timeout = timeout
+        self.stats: Dict[str, int] = defaultdict(int)
+        self._client = RpcClient(path)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The wrapped backend's snapshot, if any, plus the sharing counters."""
+        inner = getattr(self.backend, "snapshot", None)
+        snapshot = inner() if callable(inner) else {}
+        return {**snapshot, "shared_reads": dict(self.stats)}
+
+    async def close(self):
+        """Close the connection to the worker."""
+        await self._client.close()
+
+    async def _read(self, name: str, attr: Callable, args: tuple, kwargs: dict):
+        arguments = inspect.signature(attr).bind(*args, **kwargs).arguments
+        try:
+            result = await self._client.request(
+                "read", {"name": name, "kwargs": dict(arguments)}, self.timeout
+            )
+        except (ConnectionError, asyncio.TimeoutError, RpcCallError) as e:
+            self.stats["local"] += 1
+            if not isinstance(e, RpcUnavailableError):
+                logger.warning(f"Reading {name} without the worker: {e}")
+            return await attr(*args, **kwargs)
+        self.stats["shared"] += 1
+        return result
+
+    async def _write(self, name: str, attr: Callable, args: tuple, kwargs: dict):
+        result = None
+        failed = True
+        try:
+            result = await attr(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            try:
+                arguments = inspect.signature(attr).bind(*args, **kwargs).arguments
+                event = change_of(name, arguments, result, failed)
+            except (TypeError, KeyError) as e:
+                logger.warning(f"Clearing the worker's cache after {name}: {e}")
+                await self._announce(name, clear=True)
+            else:
+                await self._announce(
+                    name, change=event.to_payload() if event is not None else None
+                )
+
+    async def _announce(self, name: str, **kwargs):
+        try:
+            await self._client.request("wrote", kwargs, self.timeout)
+            self.stats["announced"] += 1
+        except (ConnectionError, asyncio.TimeoutError, RpcCallError) as e:
+            self.stats["unannounced"] += 1
+            logger.debug(f"Worker not told of {name}: {e}")
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.backend, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+        call = self._read if name.startswith(READ_PREFIXES) else self._write
+
+        @functools.wraps(attr)
+        async def shared(*args, **kwargs):
+            return await call(name, attr, args, kwargs)
+
+        # Later lookups find the wrapper without going through __getattr__
+        setattr(self, name, shared)
+        return shared
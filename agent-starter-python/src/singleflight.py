@@ -0,0 +1,169 @@
+"""
+Request coalescing ("singleflight") for identical concurrent reads.
+
+At peak, many sessions of a worker ask for the same thing within the same
+second: the booked slots of the same date window (every fetch_slots), the
+same profile, the same holds. SingleFlight lets the first caller issue the
+query and every identical call that arrives while it is in flight wait for
+that result instead of sending its own. Nothing is cached: once the query
+completes, the next call starts a new flight.
+
+Calls are identified by a normalized signature (method name plus its bound
+arguments, with defaults applied and dates, lists and dicts frozen), so
+``list_booked_slots("2026-03-02", "2026-03-16")`` and the same call made
+with keywords share one flight.
+
+A caller that wrote must see its write: barrier() (called after every write)
+starts a new epoch, and calls only join flights of the current epoch.
+resilience.GuardedBackend applies this to the read methods of a backend.
+
+Flights are only shared within a process, and every call runs in its own job
+process, so the sessions of a worker coalesce through the worker's
+ReadService (see shared_reads.py), which owns the one SingleFlight they share.
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_freeze(v) for v in value))
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    return value
+
+
+@functools.lru_cache(maxsize=512)
+def _parameters(fn: Callable) -> Optional[Tuple[Tuple[str, Any], ...]]:
+    """(name, default) of each parameter, or None if it takes *args/**kwargs."""
+    parameters = inspect.signature(fn).parameters.values()
+    if any(p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD) for p in parameters):
+        return None
+    return tuple((p.name, p.default) for p in parameters)
+
+
+def signature(name: str, fn: Callable, args: tuple, kwargs: Dict[str, Any]) -> Hashable:
+    """
+    Key shared by every call of ``fn`` that would run the same query.
+
+    Args:
+        name: Method name (the key's namespace)
+        fn: The callable, used to name positional arguments and fill defaults
+        args: Positional arguments of the call
+        kwargs: Keyword arguments of the call
+    """
+    parameters = _parameters(fn)
+    if parameters is None or len(args) > len(parameters):
+        items = tuple(enumerate(args)) + tuple(sorted(kwargs.items()))
+    else:
+        values = dict(zip((p for p, _ in parameters), args))
+        values.update(kwargs)
+        items = tuple(
+            (p, values.get(p, default))
+            for p, default in parameters
+            if p in values or default is not inspect.Parameter.empty
+        )
+    return (name, tuple((key, _freeze(value)) for key, value in items))
+
+
+@dataclass
+class FlightStats:
+    """Calls of one method and how many of them ran a query."""
+
+    calls: int = 0
+    executions: int = 0
+
+    @property
+    def coalesced(self) -> int:
+        return self.calls - self.executions
+
+    @property
+    def ratio(self) -> float:
+        """Calls per query actually sent (1.0 when nothing was merged)."""
+        return self.calls / self.executions if self.executions else 1.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "ratio": round(self.ratio, 2),
+        }
+
+
+@dataclass
+class _Flight:
+    epoch: int
+    task: asyncio.Future
+
+
+class SingleFlight:
+    """In-flight calls by signature, shared by the callers in one process."""
+
+    def __init__(self):
+        self.stats: Dict[str, FlightStats] = defaultdict(FlightStats)
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._epoch = 0
+
+    def barrier(self):
+        """Let no later call join a flight that started before now."""
+        self._epoch += 1
+
+    @property
+    def total(self) -> FlightStats:
+        """Counts summed over every method."""
+        return FlightStats(
+            sum(s.calls for s in self.stats.values()),
+            sum(s.executions for s in self.stats.values()),
+        )
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await ``fn()``, or the identical call already in flight.
+
+        The shared call runs in its own task: a caller that is cancelled
+        stops waiting without cancelling it for the others. Every caller
+        receives the same result object (treat it as read-only) or exception.
+
+        Args:
+            key: Signature of the call (see signature()); its first item
+                names the method in the stats
+            fn: Issues the call
+        """
+        stats = self.stats[key[0] if isinstance(key, tuple) else str(key)]
+        stats.calls += 1
+        flight = self._flights.get(key)
+        if flight is None or flight.epoch != self._epoch:
+            stats.executions += 1
+            flight = _Flight(self._epoch, asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(functools.partial(self._land, key, flight))
+        return await asyncio.shield(flight.task)
+
+    def _land(self, key: Hashable, flight: _Flight, task: asyncio.Future):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()  # retrieved even if every caller gave up
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable coalescing counters, in total and per method."""
+        return {
+            **self.total.as_dict(),
+            "methods": {name: s.as_dict() for name, s in sorted(self.stats.items())},
+        }
@@ -0,0 +1,256 @@
+"""
+Vectorized slot generation and availability for long horizons.
+
+The candidate starts of a date range form a day x time-of-day grid. A
+SlotMatrix keeps that grid as a boolean numpy mask, and each filter clears
+cells with array operations instead of a Python loop per slot:
+
+    - excluded weekdays       whole rows, from the datetime64 day column
+    - past-time cutoff        cells before "now + buffer"
+    - business hours          columns where an appointment would not fit
+    - bookings                per resource seat, one np.searchsorted of
+                              every cell against the seat's sorted booked
+                              intervals (SchedulingEngine calendars); the
+                              free seats per cell are the remaining capacity
+    - holds                   the few held cells, by index: each hold takes
+                              one place off the cell's free seats
+
+Only the cells actually returned (usually the first 20) are turned into Slot
+records, so a 180-day, 15-minute grid across many resources costs a few
+array passes rather than hundreds of thousands of Python objects.
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .models import Slot
+    from .scheduling import MINUTES_PER_DAY, SchedulingEngine, to_minute
+except ImportError:
+    from models import Slot
+    from scheduling import MINUTES_PER_DAY, SchedulingEngine, to_minute
+
+logger = logging.getLogger(__name__)
+
+# date.toordinal() of the datetime64 epoch, to put days on the engine's axis
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class SlotMatrix:
+    """Bookable cells of a date range as a day x time-of-day boolean mask."""
+
+    def __init__(
+        self,
+        start_date: date,
+        days: int,
+        times: Sequence[time],
+        excluded_weekdays: Iterable[int] = (),
+        slot_factory: Callable[[date, time], Slot] = Slot,
+    ):
+        """
+        Args:
+            start_date: First day of the range
+            days: Number of days in the range
+            times: Candidate start times of each day
+            excluded_weekdays: Weekdays without slots (0=Monday, 6=Sunday)
+            slot_factory: Builds the Slot of a cell (e.g. a caching one)
+        """
+        self.start_date = start_date
+        self.times = sorted(set(times))
+        self._columns = {t.strftime("%H:%M"): i for i, t in enumerate(self.times)}
+        self._slot_factory = slot_factory
+
+        self.dates = np.datetime64(start_date, "D") + np.arange(days)
+        epoch_days = self.dates.astype(np.int64)
+        self.time_minutes = np.array(
+            [t.hour * 60 + t.minute for t in self.times], dtype=np.int64
+        )
+        # Start of every cell in minutes on the SchedulingEngine axis
+        day_minutes = (epoch_days + _EPOCH_ORDINAL) * MINUTES_PER_DAY
+        self.starts = day_minutes[:, None] + self.time_minutes[None, :]
+
+        # 1970-01-01 was a Thursday (weekday 3)
+        weekdays = (epoch_days + 3) % 7
+        self.mask = np.ones(self.starts.shape, dtype=bool)
+        self.mask[np.isin(weekdays, list(excluded_weekdays))] = False
+
+        self.free_counts: Optional[np.ndarray] = None
+        self._open: Optional[np.ndarray] = None
+        self._resources = 0
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.mask.shape
+
+    def not_before(self, moment: datetime):
+        """Clear cells that start before ``moment``."""
+        self.mask &= self.starts >= to_minute(moment)
+
+    def within_hours(self, opens: time, closes: time, duration_minutes: int):
+        """Clear times at which an appointment would not fit in business hours."""
+        open_minute = opens.hour * 60 + opens.minute
+        close_minute = closes.hour * 60 + closes.minute
+        fits = (self.time_minutes >= open_minute) & (
+            self.time_minutes + duration_minutes <= close_minute
+        )
+        self.mask &= fits[None, :]
+
+    def apply_bookings(
+        self,
+        engine: SchedulingEngine,
+        duration_minutes: int,
+        resource_ids: Optional[Sequence[str]] = None,
+    ):
+        """
+        Keep cells where at least one resource is free for the whole appointment.
+
+        Each seat's booked intervals are sorted and non-overlapping, so for
+        every cell the first booking ending after its start is found with one
+        searchsorted over the whole grid; the seat is busy if that booking
+        starts before the appointment would end. free_counts then holds the
+        remaining capacity of every cell.
+
+        Args:
+            engine: Scheduling engine loaded with the range's bookings
+            duration_minutes: Length of the appointment type
+            resource_ids: Resources to consider; all of the engine's by default
+        """
+        self.within_hours(engine.opens, engine.closes, duration_minutes)
+        resources = list(resource_ids or engine.resource_ids)
+        cells = self.starts.ravel()
+        cell_ends = cells + duration_minutes
+        counts = np.zeros(cells.shape, dtype=np.int32)
+
+        seats = [calendar for r in resources for calendar in engine.seats(r)]
+        for calendar in seats:
+            if not len(calendar):
+                counts += 1
+                continue
+            starts = np.asarray(calendar.starts, dtype=np.int64)
+            ends = np.asarray(calendar.ends, dtype=np.int64)
+            nxt = np.searchsorted(ends, cells, side="right")
+            busy = (nxt < len(starts)) & (
+                starts[np.minimum(nxt, len(starts) - 1)] < cell_ends
+            )
+            counts += ~busy
+
+        self._open = self.mask.copy()
+        self._resources = len(seats)
+        self.free_counts = counts.reshape(self.shape)
+        self.mask &= self.free_counts > 0
+
+    def remove_keys(self, keys: Iterable[Tuple[str, str]]):
+        """Clear cells by (YYYY-MM-DD, HH:MM) key, e.g. slots held by others."""
+        days = self.shape[0]
+        for day, clock in keys:
+            row = (date.fromisoformat(day) - self.start_date).days
+            column = self._columns.get(clock)
+            if column is not None and 0 <= row < days:
+                self.mask[row, column] = False
+
+    def remove_held(self, held: Mapping[Tuple[str, str], int]):
+        """
+        Take places held by other callers off each cell's remaining capacity.
+
+        A cell is cleared once holds take every seat left free by bookings;
+        before apply_bookings every held cell is cleared.
+
+        Args:
+            held: Number of places held per (YYYY-MM-DD, HH:MM) key
+        """
+        if self.free_counts is None:
+            self.remove_keys(held)
+            return
+        days = self.shape[0]
+        for (day, clock), places in held.items():
+            row = (date.fromisoformat(day) - self.start_date).days
+            column = self._columns.get(clock)
+            if column is not None and 0 <= row < days:
+                left = max(0, int(self.free_counts[row, column]) - places)
+                self.free_counts[row, column] = left
+                self.mask[row, column] &= left > 0
+
+    def _row(self, on: date) -> Optional[int]:
+        row = (on - self.start_date).days
+        return row if 0 <= row < self.shape[0] else None
+
+    def count(self, on: Optional[date] = None) -> int:
+        """Number of free cells, in the whole range or on one day."""
+        if on is None:
+            return int(self.mask.sum())
+        row = self._row(on)
+        return 0 if row is None else int(self.mask[row].sum())
+
+    def date_range(self) -> Optional[Tuple[date, date]]:
+        """First and last day with a free cell, or None if there is none."""
+        rows = np.flatnonzero(self.mask.any(axis=1))
+        if not len(rows):
+            return None
+        return (
+            self.start_date + timedelta(days=int(rows[0])),
+            self.start_date + timedelta(days=int(rows[-1])),
+        )
+
+    def slots(
+        self, limit: Optional[int] = None, on: Optional[date] = None
+    ) -> List[Slot]:
+        """
+        The first ``limit`` free cells as Slot records, in date and time order.
+
+        Args:
+            limit: Most slots to return; all of them if None
+            on: Only return slots of this day
+        """
+        if on is None:
+            cells = np.flatnonzero(self.mask)[:limit]
+        else:
+            row = self._row(on)
+            if row is None:
+                return []
+            cells = np.flatnonzero(self.mask[row])[:limit] + row * self.shape[1]
+        width = self.shape[1]
+        return [
+            self._slot_factory(
+                self.start_date + timedelta(days=int(cell // width)),
+                self.times[int(cell % width)],
+            )
+            for cell in cells
+        ]
+
+    def remaining(self, slots: Iterable[Slot]) -> List[int]:
+        """
+        Remaining capacity (free seats across resources) of each slot.
+
+        Only available after apply_bookings; slots outside the grid get 0.
+        """
+        if self.free_counts is None:
+            raise RuntimeError("apply_bookings has not been called")
+        counts = []
+        for slot in slots:
+            row = self._row(slot.slot_date)
+            column = self._columns.get(slot.time_str)
+            if row is None or column is None:
+                counts.append(0)
+            else:
+                counts.append(int(self.free_counts[row, column]))
+        return counts
+
+    def occupancy(self) -> Dict[date, float]:
+        """
+        Share of each day's open seat-slots that are booked.
+
+        Only available after apply_bookings; days without open cells are left out.
+        """
+        if self.free_counts is None or not self._resources:
+            return {}
+        open_cells = self._open.sum(axis=1)
+        free = np.where(self._open, self.free_counts, 0).sum(axis=1)
+        rows = np.flatnonzero(open_cells)
+        share = 1 - free[rows] / (open_cells[rows] * self._resources)
+        return {
+            self.start_date + timedelta(days=int(row)): float(value)
+            for row, value in zip(rows, share)
+        }
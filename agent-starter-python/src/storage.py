@@ -0,0 +1,2126 @@
+"""Storage backends used by DatabaseManager: Supabase, SQLite and in-memory."""
+
+import asyncio
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from supabase import Client, create_client
+
+logger = logging.getLogger(__name__)
+
+
+class StorageError(Exception):
+    """Raised when the storage backend rejects an operation."""
+
+
+class SlotConflictError(StorageError, ValueError):
+    """Raised when a write would create a second active booking for a slot."""
+
+    def __init__(self, message: str = "This time slot is already booked"):
+        super().__init__(message)
+
+
+def _now() -> str:
+    """Current UTC timestamp in the ISO format PostgREST returns."""
+    return datetime.now(timezone.utc).isoformat()
+
+
+# Tables that can be scanned in bulk, with the unique column that breaks ties
+# between rows sharing the same order value
+SCAN_KEYS: Dict[str, str] = {
+    "appointments": "id",
+    "appointments_archive": "id",
+    "conversation_summaries": "id",
+    "user_profiles": "contact_number",
+}
+SCAN_ORDER_COLUMNS = ("created_at", "updated_at")
+
+# Precomputed aggregate tables and their primary key columns
+ROLLUP_TABLES: Dict[str, Tuple[str, ...]] = {
+    "cost_rollup_daily": ("day",),
+    "cost_rollup_caller": ("contact_number",),
+    "cost_rollup_model": ("model",),
+}
+
+
+# Order of appointment pages; the last column breaks ties
+PAGE_KEY = ("appointment_date", "appointment_time", "id")
+
+
+def _minute_of_day(clock: str) -> int:
+    """Minutes after midnight of an HH:MM[:SS] time string."""
+    return int(clock[:2]) * 60 + int(clock[3:5])
+
+
+def _page_columns(columns: Optional[Sequence[str]]) -> Optional[List[str]]:
+    """Validate an appointment page projection; the page key is always included."""
+    if columns is None:
+        return None
+    for column in columns:
+        if not column.isidentifier():
+            raise ValueError(f"Invalid column name '{column}'")
+    return list(dict.fromkeys([*PAGE_KEY, *columns]))
+
+
+def _scan_columns(
+    table: str, order_column: str, columns: Optional[Sequence[str]]
+) -> Optional[List[str]]:
+    """
+    Validate scan arguments and return the projected columns.
+
+    The order and key columns are always included so the caller can build
+    the cursor for the next page. Returns None for all columns.
+    """
+    if table not in SCAN_KEYS:
+        raise ValueError(f"Table '{table}' cannot be scanned")
+    if order_column not in SCAN_ORDER_COLUMNS:
+        raise ValueError(f"Cannot order scans by '{order_column}'")
+    if columns is None:
+        return None
+    for column in columns:
+        if not column.isidentifier():
+            raise ValueError(f"Invalid column name '{column}'")
+    key = SCAN_KEYS[table]
+    return list(dict.fromkeys([order_column, key, *columns]))
+
+
+class StorageBackend(ABC):
+    """
+    Primitive data operations behind DatabaseManager.
+
+    Each method corresponds to exactly one round trip to the store, so
+    instrumentation can count calls as queries. Rows are plain dicts shaped
+    like the Supabase tables: dates as YYYY-MM-DD and times as HH:MM:SS
+    strings. Every backend enforces the unique active-slot constraint (one
+    active booking per resource and start) by raising SlotConflictError.
+    """
+
+    name = "base"
+
+    # ==================== USER PROFILES ====================
+
+    @abstractmethod
+    async def get_user_profile(self, contact_number: str) -> Optional[Dict[str, Any]]:
+        """Return the profile for a phone number, or None."""
+
+    @abstractmethod
+    async def insert_user_profile(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a profile row and return it."""
+
+    @abstractmethod
+    async def update_user_profile(
+        self, contact_number: str, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Update a profile row and return it, or None if it does not exist."""
+
+    # ==================== APPOINTMENTS ====================
+
+    @abstractmethod
+    async def find_active_appointments(
+        self, appt_date: str, appt_time: str
+    ) -> List[Dict[str, Any]]:
+        """Return active appointments booked at exactly this slot."""
+
+    @abstractmethod
+    async def list_booked_slots(
+        self, start_date: str, end_date: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Return id, date/time, resource, seat and duration of every active
+        appointment within a date range.
+        """
+
+    @abstractmethod
+    async def insert_appointment(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert an appointment row and return it."""
+
+    @abstractmethod
+    async def insert_appointment_if_free(
+        self, data: Dict[str, Any], capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Insert an active appointment on the lowest free seat of its resource.
+
+        A seat is free if none of its active appointments overlaps the new
+        one's [start, start + duration). Choosing the seat and inserting is a
+        single atomic round trip, so concurrent bookings can never take more
+        than ``capacity`` seats.
+
+        Returns:
+            The inserted row, or None if all ``capacity`` seats are taken
+        """
+
+    @abstractmethod
+    async def get_appointment_by_idempotency_key(
+        self, key: str
+    ) -> Optional[Dict[str, Any]]:
+        """Return the active appointment booked with this idempotency key, or None."""
+
+    @abstractmethod
+    async def list_user_appointments(
+        self,
+        contact_number: str,
+        include_cancelled: bool,
+        from_date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return a user's appointments ordered by date and time.
+
+        With ``from_date`` only appointments on or after that date are
+        returned; for active appointments this is a range scan of the partial
+        (contact_number, appointment_date, appointment_time) index.
+        """
+
+    @abstractmethod
+    async def page_user_appointments(
+        self,
+        contact_number: str,
+        include_cancelled: bool,
+        from_date: Optional[str] = None,
+        after: Optional[Tuple[str, str, str]] = None,
+        limit: int = 20,
+        columns: Optional[Sequence[str]] = None,
+        archived: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return one keyset page of a user's appointments.
+
+        Rows are ordered by PAGE_KEY (date, time, id) and start strictly after
+        ``after``, so each page is a range scan of the (contact_number, date,
+        time, id) index however deep into the history it is.
+
+        Args:
+            contact_number: User's phone number
+            include_cancelled: Include cancelled and modified appointments
+            from_date: Only appointments on or after this date
+            after: PAGE_KEY values of the last row of the previous page
+            limit: Maximum rows to return
+            columns: Columns to project; None for all
+            archived: Read appointments_archive instead of appointments
+        """
+
+    @abstractmethod
+    async def get_appointment(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+        """Return an appointment by id, or None."""
+
+    @abstractmethod
+    async def update_appointment(
+        self, appointment_id: str, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Update an appointment and return it, or None if it does not exist."""
+
+    @abstractmethod
+    async def update_appointment_if_free(
+        self, appointment_id: str, updates: Dict[str, Any], capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Move an appointment to the lowest free seat of its new resource.
+
+        ``updates`` holds the new appointment_date, appointment_time,
+        resource_id and duration_minutes. Only an active appointment moves,
+        so a cancelled one is never brought back. Its own current interval
+        never blocks the move. Choosing the seat and updating is a single
+        atomic round trip, like insert_appointment_if_free.
+
+        Returns:
+            The updated row, or None if all ``capacity`` seats are taken or
+            the appointment does not exist or is not active
+        """
+
+    @abstractmethod
+    async def insert_appointments(
+        self, rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert several appointment rows in one batch and return them.
+
+        All or nothing: if one row would double-book a slot, none is stored
+        and SlotConflictError is raised.
+        """
+
+    # ==================== RECURRING SERIES ====================
+
+    @abstractmethod
+    async def insert_series(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert an appointment_series row and return it."""
+
+    @abstractmethod
+    async def list_series(
+        self,
+        contact_number: Optional[str] = None,
+        materialized_before: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return active series, optionally of one caller, or only those whose
+        occurrences are booked up to a date before ``materialized_before``.
+        """
+
+    @abstractmethod
+    async def update_series(
+        self, series_id: str, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Update a series and return it, or None if it does not exist."""
+
+    # ==================== WAITLIST ====================
+
+    @abstractmethod
+    async def insert_waitlist_entry(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a waitlist row and return it."""
+
+    @abstractmethod
+    async def list_waitlist(self, on_date: str) -> List[Dict[str, Any]]:
+        """Return the waiting entries whose date range covers ``on_date``, oldest first."""
+
+    @abstractmethod
+    async def claim_waitlist_entry(
+        self, entry_id: str, data: Dict[str, Any], capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Book a waiting entry: insert its appointment and mark it booked.
+
+        Both happen in one transaction, and the appointment is inserted like
+        insert_appointment_if_free, so an entry is booked at most once and a
+        seat is never overbooked.
+
+        Returns:
+            The inserted appointment row, or None if the entry is no longer
+            waiting or all ``capacity`` seats are taken
+        """
+
+    # ==================== CONVERSATION SUMMARIES ====================
+
+    @abstractmethod
+    async def insert_conversation_summary(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a conversation summary row and return it."""
+
+    @abstractmethod
+    async def get_conversation_summary(
+        self, session_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """Return the summary stored for a session, or None."""
+
+    # ==================== ARCHIVE ====================
+
+    @abstractmethod
+    async def archive_appointments(
+        self, cutoff_date: str, cancelled_before: str, limit: int
+    ) -> int:
+        """
+        Move one batch of old appointments to appointments_archive.
+
+        A row is archived when its date is before ``cutoff_date``, or when it
+        is no longer active and was last updated before ``cancelled_before``.
+        The move is atomic per batch.
+
+        Returns:
+            Number of rows moved; 0 once nothing is left to archive
+        """
+
+    @abstractmethod
+    async def list_archived_appointments(
+        self, contact_number: str
+    ) -> List[Dict[str, Any]]:
+        """Return a user's archived appointments ordered by date and time."""
+
+    # ==================== SLOT HOLDS ====================
+
+    @abstractmethod
+    async def acquire_slot_hold(
+        self,
+        slot_date: str,
+        slot_time: str,
+        holder: str,
+        ttl_seconds: float,
+        seats: int = 1,
+    ) -> bool:
+        """
+        Hold one of a slot's ``seats`` free places for ``ttl_seconds``.
+
+        Atomic: concurrent callers never hold more places than ``seats``
+        between them. Renews the hold when ``holder`` already has one, and
+        ignores expired holds.
+
+        Returns:
+            True if ``holder`` now holds a place at the slot
+        """
+
+    @abstractmethod
+    async def list_slot_holds(
+        self, start_date: str, end_date: str
+    ) -> List[Dict[str, Any]]:
+        """Return unexpired holds (slot_date, slot_time, holder) in a date range."""
+
+    @abstractmethod
+    async def release_slot_hold(self, slot_date: str, slot_time: str, holder: str):
+        """Drop ``holder``'s hold on a slot, if any."""
+
+    # ==================== BULK READS AND ROLLUPS ====================
+
+    @abstractmethod
+    async def scan_rows(
+        self,
+        table: str,
+        order_column: str = "created_at",
+        after: Optional[Tuple[Any, Any]] = None,
+        limit: int = 1000,
+        columns: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return one page of a keyset-paginated scan.
+
+        Rows are ordered by (order_column, key) where key is the table's entry
+        in SCAN_KEYS, and only rows strictly after ``after`` are returned. Pass
+        the (order value, key) of the last row to fetch the next page. Each
+        page is an index range scan, however deep into the table it is.
+
+        Args:
+            table: One of SCAN_KEYS
+            order_column: "created_at" or "updated_at"
+            after: Cursor from the previous page, or None to start
+            limit: Maximum rows to return
+            columns: Columns to project; None for all
+        """
+
+    @abstractmethod
+    async def upsert_rows(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        """Insert or replace rows of a table in ROLLUP_TABLES; returns the count."""
+
+
+# ==================== SUPABASE ====================
+
+
+class SupabaseBackend(StorageBackend):
+    """PostgREST-backed storage using the Supabase client."""
+
+    name = "supabase"
+
+    def __init__(
+        self, supabase_url: Optional[str] = None, supabase_key: Optional[str] = None
+    ):
+        """Initialize Supabase client from arguments or environment variables."""
+        supabase_url = supabase_url or os.getenv("SUPABASE_URL")
+        supabase_key = supabase_key or os.getenv("SUPABASE_KEY")
+
+        if not supabase_url or not supabase_key:
+            raise ValueError(
+                "SUPABASE_URL and SUPABASE_KEY must be set in environment variables"
+            )
+
+        self.supabase: Client = create_client(supabase_url, supabase_key)
+
+    @staticmethod
+    async def _execute(query: Any) -> Any:
+        """
+        Run a query builder, translating unique and exclusion (overlapping
+        booking) violations to SlotConflictError.
+
+        The Supabase client is synchronous, so the HTTP round trip runs in a
+        worker thread instead of blocking the event loop for every session.
+        """
+        try:
+            return await asyncio.to_thread(query.execute)
+        except Exception as e:
+            if getattr(e, "code", None) in ("23505", "23P01"):
+                raise SlotConflictError() from e
+            raise
+
+    @staticmethod
+    def _first(response: Any) -> Optional[Dict[str, Any]]:
+        return response.data[0] if response.data else None
+
+    async def get_user_profile(self, contact_number: str) -> Optional[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.table("user_profiles")
+            .select("*")
+            .eq("contact_number", contact_number)
+        )
+        return self._first(response)
+
+    async def insert_user_profile(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self._execute(
+            self.supabase.table("user_profiles").insert(data)
+        )
+        return self._first(response) or data
+
+    async def update_user_profile(
+        self, contact_number: str, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.table("user_profiles")
+            .update(updates)
+            .eq("contact_number", contact_number)
+        )
+        return self._first(response)
+
+    async def find_active_appointments(
+        self, appt_date: str, appt_time: str
+    ) -> List[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.table("appointments")
+            .select("id, user_name")
+            .eq("appointment_date", appt_date)
+            .eq("appointment_time", appt_time)
+            .eq("status", "active")
+        )
+        return response.data or []
+
+    async def list_booked_slots(
+        self, start_date: str, end_date: str
+    ) -> List[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.table("appointments")
+            .select(
+                "id, appointment_date, appointment_time, resource_id, seat, "
+                "duration_minutes"
+            )
+            .gte("appointment_date", start_date)
+            .lte("appointment_date", end_date)
+            .eq("status", "active")
+        )
+        return response.data or []
+
+    async def insert_appointment(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self._execute(self.supabase.table("appointments").insert(data))
+        return self._first(response) or data
+
+    async def insert_appointment_if_free(
+        self, data: Dict[str, Any], capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.rpc(
+                "book_appointment_seat",
+                {"p_appointment": data, "p_capacity": capacity},
+            )
+        )
+        return self._first(response)
+
+    async def get_appointment_by_idempotency_key(
+        self, key: str
+    ) -> Optional[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.table("appointments")
+            .select("*")
+            .eq("idempotency_key", key)
+            .eq("status", "active")
+            .limit(1)
+        )
+        return self._first(response)
+
+    async def list_user_appointments(
+        self,
+        contact_number: str,
+        include_cancelled: bool,
+        from_date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        query = (
+            self.supabase.table("appointments")
+            .select("*")
+            .eq("contact_number", contact_number)
+            .order("appointment_date", desc=False)
+            .order("appointment_time", desc=False)
+        )
+        if not include_cancelled:
+            query = query.eq("status", "active")
+        if from_date is not None:
+            query = query.gte("appointment_date", from_date)
+        return (await self._execute(query)).data or []
+
+    async def page_user_appointments(
+        self,
+        contact_number: str,
+        include_cancelled: bool,
+        from_date: Optional[str] = None,
+        after: Optional[Tuple[str, str, str]] = None,
+        limit: int = 20,
+        columns: Optional[Sequence[str]] = None,
+        archived: bool = False,
+    ) -> List[Dict[str, Any]]:
+        projection = _page_columns(columns)
+        query = (
+            self.supabase.table("appointments_archive" if archived else "appointments")
+            .select(", ".join(projection) if projection else "*")
+            .eq("contact_number", contact_number)
+        )
+        if not include_cancelled:
+            query = query.eq("status", "active")
+        if from_date is not None:
+            query = query.gte("appointment_date", from_date)
+        if after is not None:
+            d, t, last_id = after
+            query = query.or_(
+                f'appointment_date.gt."{d}",'
+                f'and(appointment_date.eq."{d}",appointment_time.gt."{t}"),'
+                f'and(appointment_date.eq."{d}",appointment_time.eq."{t}",'
+                f'id.gt."{last_id}")'
+            )
+        for column in PAGE_KEY:
+            query = query.order(column)
+        return (await self._execute(query.limit(limit))).data or []
+
+    async def get_appointment(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.table("appointments").select("*").eq("id", appointment_id)
+        )
+        return self._first(response)
+
+    async def update_appointment(
+        self, appointment_id: str, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.table("appointments").update(updates).eq("id", appointment_id)
+        )
+        return self._first(response)
+
+    async def update_appointment_if_free(
+        self, appointment_id: str, updates: Dict[str, Any], capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.rpc(
+                "move_appointment_seat",
+                {"p_id": appointment_id, "p_updates": updates, "p_capacity": capacity},
+            )
+        )
+        return self._first(response)
+
+    async def insert_appointments(
+        self, rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        if not rows:
+            return []
+        # One multi-row INSERT, so the batch is a single atomic statement
+        response = await self._execute(self.supabase.table("appointments").insert(rows))
+        return response.data or []
+
+    async def insert_series(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self._execute(
+            self.supabase.table("appointment_series").insert(data)
+        )
+        return self._first(response) or data
+
+    async def list_series(
+        self,
+        contact_number: Optional[str] = None,
+        materialized_before: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        query = (
+            self.supabase.table("appointment_series").select("*").eq("status", "active")
+        )
+        if contact_number is not None:
+            query = query.eq("contact_number", contact_number)
+        if materialized_before is not None:
+            query = query.lt("materialized_until", materialized_before)
+        response = await self._execute(query.order("start_date", desc=False))
+        return response.data or []
+
+    async def update_series(
+        self, series_id: str, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.table("appointment_series")
+            .update(updates)
+            .eq("id", series_id)
+        )
+        return self._first(response)
+
+    async def insert_waitlist_entry(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self._execute(self.supabase.table("waitlist").insert(data))
+        return self._first(response) or data
+
+    async def list_waitlist(self, on_date: str) -> List[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.table("waitlist")
+            .select("*")
+            .eq("status", "waiting")
+            .lte("earliest_date", on_date)
+            .gte("latest_date", on_date)
+            .order("created_at", desc=False)
+        )
+        return response.data or []
+
+    async def claim_waitlist_entry(
+        self, entry_id: str, data: Dict[str, Any], capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.rpc(
+                "claim_waitlist_entry",
+                {
+                    "p_entry_id": entry_id,
+                    "p_appointment": data,
+                    "p_capacity": capacity,
+                },
+            )
+        )
+        return self._first(response)
+
+    async def insert_conversation_summary(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self._execute(
+            self.supabase.table("conversation_summaries").insert(data)
+        )
+        return self._first(response) or data
+
+    async def get_conversation_summary(
+        self, session_id: str
+    ) -> Optional[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.table("conversation_summaries")
+            .select("*")
+            .eq("session_id", session_id)
+        )
+        return self._first(response)
+
+    async def archive_appointments(
+        self, cutoff_date: str, cancelled_before: str, limit: int
+    ) -> int:
+        response = await self._execute(
+            self.supabase.rpc(
+                "archive_appointments",
+                {
+                    "p_cutoff": cutoff_date,
+                    "p_cancelled_before": cancelled_before,
+                    "p_batch_size": limit,
+                },
+            )
+        )
+        return int(response.data or 0)
+
+    async def list_archived_appointments(
+        self, contact_number: str
+    ) -> List[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.table("appointments_archive")
+            .select("*")
+            .eq("contact_number", contact_number)
+            .order("appointment_date", desc=False)
+            .order("appointment_time", desc=False)
+        )
+        return response.data or []
+
+    async def acquire_slot_hold(
+        self,
+        slot_date: str,
+        slot_time: str,
+        holder: str,
+        ttl_seconds: float,
+        seats: int = 1,
+    ) -> bool:
+        response = await self._execute(
+            self.supabase.rpc(
+                "acquire_slot_hold",
+                {
+                    "p_date": slot_date,
+                    "p_time": slot_time,
+                    "p_holder": holder,
+                    "p_ttl_seconds": ttl_seconds,
+                    "p_seats": seats,
+                },
+            )
+        )
+        return bool(response.data)
+
+    async def list_slot_holds(
+        self, start_date: str, end_date: str
+    ) -> List[Dict[str, Any]]:
+        response = await self._execute(
+            self.supabase.table("slot_holds")
+            .select("slot_date, slot_time, holder")
+            .gte("slot_date", start_date)
+            .lte("slot_date", end_date)
+            .gt("expires_at", _now())
+        )
+        return response.data or []
+
+    async def release_slot_hold(self, slot_date: str, slot_time: str, holder: str):
+        await self._execute(
+            self.supabase.table("slot_holds")
+            .delete()
+            .eq("slot_date", slot_date)
+            .eq("slot_time", slot_time)
+            .eq("holder", holder)
+        )
+
+    async def scan_rows(
+        self,
+        table: str,
+        order_column: str = "created_at",
+        after: Optional[Tuple[Any, Any]] = None,
+        limit: int = 1000,
+        columns: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        projection = _scan_columns(table, order_column, columns)
+        key = SCAN_KEYS[table]
+        query = self.supabase.table(table).select(
+            ", ".join(projection) if projection else "*"
+        )
+        if after is not None:
+            value, last_key = after
+            query = query.or_(
+                f'{order_column}.gt."{value}",'
+                f'and({order_column}.eq."{value}",{key}.gt."{last_key}")'
+            )
+        query = query.order(order_column).order(key).limit(limit)
+        return (await self._execute(query)).data or []
+
+    async def upsert_rows(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        if table not in ROLLUP_TABLES:
+            raise ValueError(f"Table '{table}' is not a rollup table")
+        if not rows:
+            return 0
+        await self._execute(
+            self.supabase.table(table).upsert(
+                rows, on_conflict=",".join(ROLLUP_TABLES[table])
+            )
+        )
+        return len(rows)
+
+
+# ==================== SQLITE ====================
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_profiles (
+    contact_number TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    preferences TEXT DEFAULT '{}',
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS appointments (
+    id TEXT PRIMARY KEY,
+    contact_number TEXT NOT NULL REFERENCES user_profiles(contact_number) ON DELETE CASCADE,
+    user_name TEXT NOT NULL,
+    appointment_date TEXT NOT NULL,
+    appointment_time TEXT NOT NULL,
+    status TEXT DEFAULT 'active' CHECK (status IN ('active', 'cancelled', 'modified')),
+    notes TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    idempotency_key TEXT,
+    resource_id TEXT NOT NULL DEFAULT 'default',
+    duration_minutes INTEGER NOT NULL DEFAULT 30,
+    seat INTEGER NOT NULL DEFAULT 0,
+    series_id TEXT
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_unique_active_seat
+ON appointments(resource_id, appointment_date, seat, appointment_time)
+WHERE status = 'active';
+CREATE UNIQUE INDEX IF NOT EXISTS idx_appointments_idempotency
+ON appointments(idempotency_key)
+WHERE idempotency_key IS NOT NULL AND status = 'active';
+
+-- Appointments of different lengths must not overlap on the same seat (the
+-- exclusion constraint appointments_no_overlap of the Postgres schema)
+CREATE TRIGGER IF NOT EXISTS appointments_no_overlap_insert
+BEFORE INSERT ON appointments
+WHEN NEW.status = 'active' AND EXISTS (
+    SELECT 1 FROM appointments a
+    WHERE a.status = 'active'
+      AND a.resource_id = NEW.resource_id
+      AND a.appointment_date = NEW.appointment_date
+      AND a.seat = NEW.seat
+      AND time(a.appointment_time)
+          < time(NEW.appointment_time, '+' || NEW.duration_minutes || ' minutes')
+      AND time(a.appointment_time, '+' || a.duration_minutes || ' minutes')
+          > time(NEW.appointment_time)
+)
+BEGIN
+    SELECT RAISE(ABORT, 'appointments_no_overlap');
+END;
+CREATE TRIGGER IF NOT EXISTS appointments_no_overlap_update
+BEFORE UPDATE OF appointment_date, appointment_time, status, resource_id,
+    duration_minutes, seat ON appointments
+WHEN NEW.status = 'active' AND EXISTS (
+    SELECT 1 FROM appointments a
+    WHERE a.status = 'active'
+      AND a.id <> NEW.id
+      AND a.resource_id = NEW.resource_id
+      AND a.appointment_date = NEW.appointment_date
+      AND a.seat = NEW.seat
+      AND time(a.appointment_time)
+          < time(NEW.appointment_time, '+' || NEW.duration_minutes || ' minutes')
+      AND time(a.appointment_time, '+' || a.duration_minutes || ' minutes')
+          > time(NEW.appointment_time)
+)
+BEGIN
+    SELECT RAISE(ABORT, 'appointments_no_overlap');
+END;
+
+CREATE INDEX IF NOT EXISTS idx_appointments_contact ON appointments(contact_number);
+CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments(appointment_date);
+CREATE INDEX IF NOT EXISTS idx_appointments_status ON appointments(status);
+CREATE INDEX IF NOT EXISTS idx_appointments_datetime ON appointments(appointment_date, appointment_time);
+CREATE INDEX IF NOT EXISTS idx_appointments_created ON appointments(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_appointments_updated ON appointments(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_appointments_active_contact
+ON appointments(contact_number, appointment_date, appointment_time)
+WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS idx_appointments_contact_page
+ON appointments(contact_number, appointment_date, appointment_time, id);
+CREATE INDEX IF NOT EXISTS idx_appointments_inactive_updated
+ON appointments(updated_at)
+WHERE status <> 'active';
+CREATE INDEX IF NOT EXISTS idx_appointments_series
+ON appointments(series_id)
+WHERE series_id IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS appointment_series (
+    id TEXT PRIMARY KEY,
+    contact_number TEXT NOT NULL REFERENCES user_profiles(contact_number) ON DELETE CASCADE,
+    user_name TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    duration_minutes INTEGER NOT NULL DEFAULT 30,
+    resource_id TEXT,
+    status TEXT DEFAULT 'active' CHECK (status IN ('active', 'cancelled', 'completed')),
+    notes TEXT,
+    materialized_until TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_series_contact ON appointment_series(contact_number);
+CREATE INDEX IF NOT EXISTS idx_series_materialized
+ON appointment_series(materialized_until)
+WHERE status = 'active';
+
+CREATE TABLE IF NOT EXISTS waitlist (
+    id TEXT PRIMARY KEY,
+    contact_number TEXT NOT NULL REFERENCES user_profiles(contact_number) ON DELETE CASCADE,
+    user_name TEXT NOT NULL,
+    earliest_date TEXT NOT NULL,
+    latest_date TEXT NOT NULL,
+    earliest_time TEXT,
+    latest_time TEXT,
+    duration_minutes INTEGER NOT NULL DEFAULT 30,
+    resource_id TEXT,
+    status TEXT DEFAULT 'waiting' CHECK (status IN ('waiting', 'booked', 'cancelled')),
+    appointment_id TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_waitlist_waiting
+ON waitlist(earliest_date, latest_date, created_at)
+WHERE status = 'waiting';
+CREATE INDEX IF NOT EXISTS idx_waitlist_contact ON waitlist(contact_number);
+
+CREATE TABLE IF NOT EXISTS appointments_archive (
+    id TEXT PRIMARY KEY,
+    contact_number TEXT NOT NULL,
+    user_name TEXT NOT NULL,
+    appointment_date TEXT NOT NULL,
+    appointment_time TEXT NOT NULL,
+    status TEXT,
+    notes TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    idempotency_key TEXT,
+    resource_id TEXT NOT NULL DEFAULT 'default',
+    duration_minutes INTEGER NOT NULL DEFAULT 30,
+    seat INTEGER NOT NULL DEFAULT 0,
+    series_id TEXT,
+    archived_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_archive_contact
+ON appointments_archive(contact_number, appointment_date, appointment_time, id);
+
+CREATE TABLE IF NOT EXISTS slot_holds (
+    slot_date TEXT NOT NULL,
+    slot_time TEXT NOT NULL,
+    holder TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    PRIMARY KEY (slot_date, slot_time, holder)
+);
+
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    contact_number TEXT REFERENCES user_profiles(contact_number) ON DELETE SET NULL,
+    summary TEXT NOT NULL,
+    appointments_mentioned TEXT DEFAULT '[]',
+    user_preferences TEXT,
+    cost_breakdown TEXT DEFAULT '{}',
+    created_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_summaries_session ON conversation_summaries(session_id);
+CREATE INDEX IF NOT EXISTS idx_summaries_contact ON conversation_summaries(contact_number);
+CREATE INDEX IF NOT EXISTS idx_summaries_created ON conversation_summaries(created_at, id);
+
+CREATE TABLE IF NOT EXISTS cost_rollup_daily (
+    day TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL,
+    llm_cost REAL, tts_cost REAL, stt_cost REAL, total_cost REAL,
+    prompt_tokens INTEGER, completion_tokens INTEGER,
+    tts_characters INTEGER, stt_audio_duration REAL,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS cost_rollup_caller (
+    contact_number TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL,
+    llm_cost REAL, tts_cost REAL, stt_cost REAL, total_cost REAL,
+    prompt_tokens INTEGER, completion_tokens INTEGER,
+    tts_characters INTEGER, stt_audio_duration REAL,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS cost_rollup_model (
+    model TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL,
+    llm_cost REAL, tts_cost REAL, stt_cost REAL, total_cost REAL,
+    prompt_tokens INTEGER, completion_tokens INTEGER,
+    tts_characters INTEGER, stt_audio_duration REAL,
+    updated_at TEXT
+);
+"""
+
+# Columns copied from appointments to appointments_archive
+_APPOINTMENT_COLUMNS = (
+    "id, contact_number, user_name, appointment_date, appointment_time, "
+    "status, notes, created_at, updated_at, idempotency_key, resource_id, "
+    "duration_minutes, seat, series_id"
+)
+
+# Columns stored as JSON text in SQLite but as JSONB in Postgres
+_JSON_COLUMNS = {
+    "preferences",
+    "appointments_mentioned",
+    "cost_breakdown",
+}
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Single-file SQLite storage in WAL mode, indexed like supabase_setup.sql.
+
+    Intended for local benchmarking, tests and single-node deployments.
+    Statements run inline on the event loop; with WAL and synchronous=NORMAL
+    a write is a few microseconds and never waits on fsync.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = ":memory:"):
+        """
+        Open (and if needed create) the database.
+
+        Args:
+            path: Database file path, or ":memory:" for a private in-memory DB
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self._migrate()
+        self.conn.executescript(SQLITE_SCHEMA)
+
+    def _migrate(self):
+        """Add columns introduced after an existing database file was created."""
+        added = {
+            "idempotency_key": "TEXT",
+            "resource_id": "TEXT NOT NULL DEFAULT 'default'",
+            "duration_minutes": "INTEGER NOT NULL DEFAULT 30",
+            "seat": "INTEGER NOT NULL DEFAULT 0",
+            "series_id": "TEXT",
+        }
+        for table in ("appointments", "appointments_archive"):
+            columns = {
+                row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")
+            }
+            if not columns:
+                continue
+            for column, definition in added.items():
+                if column not in columns:
+                    self.conn.execute(
+                        f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                    )
+        # Holds were one per slot; they are short-lived, so the table is rebuilt
+        keys = [
+            row["name"]
+            for row in self.conn.execute("PRAGMA table_info(slot_holds)")
+            if row["pk"]
+        ]
+        if keys and "holder" not in keys:
+            self.conn.execute("DROP TABLE slot_holds")
+        # Active slots are unique per resource seat, not across all resources
+        self.conn.execute("DROP INDEX IF EXISTS idx_unique_active_slot")
+        self.conn.execute("DROP INDEX IF EXISTS idx_unique_active_resource_slot")
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        data = dict(row)
+        for column in _JSON_COLUMNS.intersection(data):
+            if data[column] is not None:
+                data[column] = json.loads(data[column])
+        return data
+
+    def _query(
+        self, sql: str, params: tuple = (), immediate: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Run one statement and return its rows.
+
+        With ``immediate``, the statement runs in a BEGIN IMMEDIATE
+        transaction: it takes the write lock before reading, so a statement
+        that reads and then writes sees every other connection's commits.
+        """
+        with self._lock:
+            try:
+                if immediate:
+                    self.conn.execute("BEGIN IMMEDIATE")
+                try:
+                    rows = self.conn.execute(sql, params).fetchall()
+                except BaseException:
+                    if immediate:
+                        self.conn.execute("ROLLBACK")
+                    raise
+                if immediate:
+                    self.conn.execute("COMMIT")
+            except sqlite3.IntegrityError as e:
+                raise self._integrity_error(e) from e
+        return [self._row(r) for r in rows]
+
+    @staticmethod
+    def _integrity_error(error: sqlite3.IntegrityError) -> StorageError:
+        if "appointments_no_overlap" in str(error):
+            return SlotConflictError()
+        if "UNIQUE" in str(error) and "appointments" in str(error):
+            return SlotConflictError()
+        return StorageError(str(error))
+
+    def _insert(self, table: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        data = {k: json.dumps(v) if k in _JSON_COLUMNS else v for k, v in data.items()}
+        columns = ", ".join(data)
+        placeholders = ", ".join("?" for _ in data)
+        rows = self._query(
+            f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) RETURNING *",
+            tuple(data.values()),
+        )
+        return rows[0]
+
+    def _update(
+        self, table: str, key: str, value: Any, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        updates = {
+            k: json.dumps(v) if k in _JSON_COLUMNS else v for k, v in updates.items()
+        }
+        assignments = ", ".join(f"{k} = ?" for k in updates)
+        rows = self._query(
+            f"UPDATE {table} SET {assignments} WHERE {key} = ? RETURNING *",
+            (*updates.values(), value),
+        )
+        return rows[0] if rows else None
+
+    async def get_user_profile(self, contact_number: str) -> Optional[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT * FROM user_profiles WHERE contact_number = ?", (contact_number,)
+        )
+        return rows[0] if rows else None
+
+    async def insert_user_profile(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        now = _now()
+        return self._insert(
+            "user_profiles", {"created_at": now, "updated_at": now, **data}
+        )
+
+    async def update_user_profile(
+        self, contact_number: str, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        return self._update(
+            "user_profiles",
+            "contact_number",
+            contact_number,
+            {**updates, "updated_at": _now()},
+        )
+
+    async def find_active_appointments(
+        self, appt_date: str, appt_time: str
+    ) -> List[Dict[str, Any]]:
+        return self._query(
+            "SELECT id, user_name FROM appointments "
+            "WHERE appointment_date = ? AND appointment_time = ? AND status = 'active'",
+            (appt_date, appt_time),
+        )
+
+    async def list_booked_slots(
+        self, start_date: str, end_date: str
+    ) -> List[Dict[str, Any]]:
+        return self._query(
+            "SELECT id, appointment_date, appointment_time, resource_id, seat, "
+            "duration_minutes FROM appointments "
+            "WHERE appointment_date BETWEEN ? AND ? AND status = 'active'",
+            (start_date, end_date),
+        )
+
+    async def insert_appointment(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        now = _now()
+        return self._insert(
+            "appointments",
+            {"id": str(uuid.uuid4()), "created_at": now, "updated_at": now, **data},
+        )
+
+    async def insert_appointment_if_free(
+        self, data: Dict[str, Any], capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        rows = self._query(*self._seat_insert(data, capacity), immediate=True)
+        return rows[0] if rows else None
+
+    @staticmethod
+    def _seat_insert(data: Dict[str, Any], capacity: int) -> Tuple[str, tuple]:
+        """The conditional insert of insert_appointment_if_free, with its params."""
+        now = _now()
+        row = {
+            "id": str(uuid.uuid4()),
+            "status": "active",
+            "resource_id": "default",
+            "duration_minutes": 30,
+            "created_at": now,
+            "updated_at": now,
+            **data,
+        }
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        # Pick the lowest seat without an overlapping active appointment and
+        # insert into it in the same statement
+        return (
+            f"""
+            WITH RECURSIVE seats(seat) AS (
+                SELECT 0 UNION ALL SELECT seat + 1 FROM seats WHERE seat + 1 < ?
+            )
+            INSERT INTO appointments ({columns}, seat)
+            SELECT {placeholders}, seat FROM seats
+            WHERE NOT EXISTS (
+                SELECT 1 FROM appointments a
+                WHERE a.status = 'active'
+                  AND a.resource_id = ?
+                  AND a.appointment_date = ?
+                  AND a.seat = seats.seat
+                  AND time(a.appointment_time) < time(?, ?)
+                  AND time(a.appointment_time,
+                           '+' || a.duration_minutes || ' minutes') > time(?)
+            )
+            ORDER BY seat
+            LIMIT 1
+            RETURNING *
+            """,
+            (
+                max(1, capacity),
+                *row.values(),
+                row["resource_id"],
+                row["appointment_date"],
+                row["appointment_time"],
+                f"+{int(row['duration_minutes'])} minutes",
+                row["appointment_time"],
+            ),
+        )
+
+    async def list_user_appointments(
+        self,
+        contact_number: str,
+        include_cancelled: bool,
+        from_date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        filters, params = "", (contact_number,)
+        if not include_cancelled:
+            filters += " AND status = 'active'"
+        if from_date is not None:
+            filters, params = (
+                f"{filters} AND appointment_date >= ?",
+                (*params, from_date),
+            )
+        return self._query(
+            "SELECT * FROM appointments WHERE contact_number = ?"
+            f"{filters} ORDER BY appointment_date, appointment_time",
+            params,
+        )
+
+    async def page_user_appointments(
+        self,
+        contact_number: str,
+        include_cancelled: bool,
+        from_date: Optional[str] = None,
+        after: Optional[Tuple[str, str, str]] = None,
+        limit: int = 20,
+        columns: Optional[Sequence[str]] = None,
+        archived: bool = False,
+    ) -> List[Dict[str, Any]]:
+        projection = _page_columns(columns)
+        table = "appointments_archive" if archived else "appointments"
+        filters, params = ["contact_number = ?"], [contact_number]
+        if not include_cancelled:
+            filters.append("status = 'active'")
+        if from_date is not None:
+            filters.append("appointment_date >= ?")
+            params.append(from_date)
+        if after is not None:
+            filters.append(f"({', '.join(PAGE_KEY)}) > (?, ?, ?)")
+            params.extend(after)
+        return self._query(
+            f"SELECT {', '.join(projection) if projection else '*'} FROM {table} "
+            f"WHERE {' AND '.join(filters)} ORDER BY {', '.join(PAGE_KEY)} LIMIT ?",
+            (*params, limit),
+        )
+
+    async def get_appointment(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT * FROM appointments WHERE id = ?", (appointment_id,))
+        return rows[0] if rows else None
+
+    async def get_appointment_by_idempotency_key(
+        self, key: str
+    ) -> Optional[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT * FROM appointments "
+            "WHERE idempotency_key = ? AND status = 'active' LIMIT 1",
+            (key,),
+        )
+        return rows[0] if rows else None
+
+    async def update_appointment(
+        self, appointment_id: str, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        return self._update(
+            "appointments", "id", appointment_id, {**updates, "updated_at": _now()}
+        )
+
+    async def update_appointment_if_free(
+        self, appointment_id: str, updates: Dict[str, Any], capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        updates = {**updates, "updated_at": _now()}
+        assignments = ", ".join(f"{k} = ?" for k in updates)
+        # Same seat choice as _seat_insert, disregarding the appointment itself
+        rows = self._query(
+            f"""
+            WITH RECURSIVE seats(seat) AS (
+                SELECT 0 UNION ALL SELECT seat + 1 FROM seats WHERE seat + 1 < ?
+            ),
+            free(seat) AS (
+                SELECT seat FROM seats
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM appointments a
+                    WHERE a.status = 'active'
+                      AND a.id <> ?
+                      AND a.resource_id = ?
+                      AND a.appointment_date = ?
+                      AND a.seat = seats.seat
+                      AND time(a.appointment_time) < time(?, ?)
+                      AND time(a.appointment_time,
+                               '+' || a.duration_minutes || ' minutes') > time(?)
+                )
+                ORDER BY seat
+                LIMIT 1
+            )
+            UPDATE appointments SET {assignments}, seat = (SELECT seat FROM free)
+            WHERE id = ? AND status = 'active' AND EXISTS (SELECT 1 FROM free)
+            RETURNING *
+            """,
+            (
+                max(1, capacity),
+                appointment_id,
+                updates["resource_id"],
+                updates["appointment_date"],
+                updates["appointment_time"],
+                f"+{int(updates['duration_minutes'])} minutes",
+                updates["appointment_time"],
+                *updates.values(),
+                appointment_id,
+            ),
+            immediate=True,
+        )
+        return rows[0] if rows else None
+
+    async def insert_appointments(
+        self, rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        if not rows:
+            return []
+        now = _now()
+        rows = [
+            {"id": str(uuid.uuid4()), "created_at": now, "updated_at": now, **row}
+            for row in rows
+        ]
+        columns = list(rows[0])
+        values = ", ".join("(" + ", ".join("?" for _ in columns) + ")" for _ in rows)
+        return self._query(
+            f"INSERT INTO appointments ({', '.join(columns)}) "
+            f"VALUES {values} RETURNING *",
+            tuple(row.get(column) for row in rows for column in columns),
+        )
+
+    async def insert_series(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        now = _now()
+        return self._insert(
+            "appointment_series",
+            {"id": str(uuid.uuid4()), "created_at": now, "updated_at": now, **data},
+        )
+
+    async def list_series(
+        self,
+        contact_number: Optional[str] = None,
+        materialized_before: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        where, params = ["status = 'active'"], []
+        if contact_number is not None:
+            where.append("contact_number = ?")
+            params.append(contact_number)
+        if materialized_before is not None:
+            where.append("materialized_until < ?")
+            params.append(materialized_before)
+        return self._query(
+            f"SELECT * FROM appointment_series WHERE {' AND '.join(where)} "
+            "ORDER BY start_date",
+            tuple(params),
+        )
+
+    async def update_series(
+        self, series_id: str, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        return self._update(
+            "appointment_series", "id", series_id, {**updates, "updated_at": _now()}
+        )
+
+    async def insert_waitlist_entry(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        now = _now()
+        return self._insert(
+            "waitlist",
+            {"id": str(uuid.uuid4()), "created_at": now, "updated_at": now, **data},
+        )
+
+    async def list_waitlist(self, on_date: str) -> List[Dict[str, Any]]:
+        return self._query(
+            "SELECT * FROM waitlist WHERE status = 'waiting' "
+            "AND earliest_date <= ? AND latest_date >= ? ORDER BY created_at, id",
+            (on_date, on_date),
+        )
+
+    async def claim_waitlist_entry(
+        self, entry_id: str, data: Dict[str, Any], capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        sql, params = self._seat_insert(data, capacity)
+        now = _now()
+        with self._lock:
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                try:
+                    claimed = self.conn.execute(
+                        "UPDATE waitlist SET status = 'booked', updated_at = ? "
+                        "WHERE id = ? AND status = 'waiting'",
+                        (now, entry_id),
+                    ).rowcount
+                    rows = self.conn.execute(sql, params).fetchall() if claimed else []
+                    if rows:
+                        self.conn.execute(
+                            "UPDATE waitlist SET appointment_id = ? WHERE id = ?",
+                            (rows[0]["id"], entry_id),
+                        )
+                        self.conn.execute("COMMIT")
+                    else:
+                        self.conn.execute("ROLLBACK")
+                except BaseException:
+                    self.conn.execute("ROLLBACK")
+                    raise
+            except sqlite3.IntegrityError as e:
+                raise self._integrity_error(e) from e
+        return self._row(rows[0]) if rows else None
+
+    async def insert_conversation_summary(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return self._insert(
+            "conversation_summaries",
+            {"id": str(uuid.uuid4()), "created_at": _now(), **data},
+        )
+
+    async def get_conversation_summary(
+        self, session_id: str
+    ) -> Optional[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT * FROM conversation_summaries WHERE session_id = ? LIMIT 1",
+            (session_id,),
+        )
+        return rows[0] if rows else None
+
+    async def archive_appointments(
+        self, cutoff_date: str, cancelled_before: str, limit: int
+    ) -> int:
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    "CREATE TEMP TABLE IF NOT EXISTS archive_batch (id TEXT PRIMARY KEY)"
+                )
+                self.conn.execute("DELETE FROM archive_batch")
+                self.conn.execute(
+                    "INSERT INTO archive_batch SELECT id FROM appointments "
+                    "WHERE appointment_date < ? "
+                    "OR (status <> 'active' AND updated_at < ?) LIMIT ?",
+                    (cutoff_date, cancelled_before, limit),
+                )
+                self.conn.execute(
+                    f"INSERT INTO appointments_archive ({_APPOINTMENT_COLUMNS}, "
+                    f"archived_at) SELECT {_APPOINTMENT_COLUMNS}, ? FROM appointments "
+                    "WHERE id IN (SELECT id FROM archive_batch)",
+                    (_now(),),
+                )
+                moved = self.conn.execute(
+                    "DELETE FROM appointments WHERE id IN (SELECT id FROM archive_batch)"
+                ).rowcount
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return moved
+
+    async def list_archived_appointments(
+        self, contact_number: str
+    ) -> List[Dict[str, Any]]:
+        return self._query(
+            "SELECT * FROM appointments_archive WHERE contact_number = ? "
+            "ORDER BY appointment_date, appointment_time",
+            (contact_number,),
+        )
+
+    async def acquire_slot_hold(
+        self,
+        slot_date: str,
+        slot_time: str,
+        holder: str,
+        ttl_seconds: float,
+        seats: int = 1,
+    ) -> bool:
+        now = datetime.now(timezone.utc)
+        expires_at = (now + timedelta(seconds=ttl_seconds)).isoformat()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    "DELETE FROM slot_holds "
+                    "WHERE slot_date = ? AND slot_time = ? AND expires_at <= ?",
+                    (slot_date, slot_time, now.isoformat()),
+                )
+                rows = self.conn.execute(
+                    "INSERT INTO slot_holds (slot_date, slot_time, holder, expires_at) "
+                    "SELECT ?, ?, ?, ? WHERE EXISTS ("
+                    "    SELECT 1 FROM slot_holds "
+                    "    WHERE slot_date = ? AND slot_time = ? AND holder = ?"
+                    ") OR ("
+                    "    SELECT COUNT(*) FROM slot_holds "
+                    "    WHERE slot_date = ? AND slot_time = ?"
+                    ") < ? "
+                    "ON CONFLICT (slot_date, slot_time, holder) DO UPDATE "
+                    "SET expires_at = excluded.expires_at "
+                    "RETURNING holder",
+                    (
+                        slot_date,
+                        slot_time,
+                        holder,
+                        expires_at,
+                        slot_date,
+                        slot_time,
+                        holder,
+                        slot_date,
+                        slot_time,
+                        seats,
+                    ),
+                ).fetchall()
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return bool(rows)
+
+    async def list_slot_holds(
+        self, start_date: str, end_date: str
+    ) -> List[Dict[str, Any]]:
+        return self._query(
+            "SELECT slot_date, slot_time, holder FROM slot_holds "
+            "WHERE slot_date BETWEEN ? AND ? AND expires_at > ?",
+            (start_date, end_date, _now()),
+        )
+
+    async def release_slot_hold(self, slot_date: str, slot_time: str, holder: str):
+        self._query(
+            "DELETE FROM slot_holds "
+            "WHERE slot_date = ? AND slot_time = ? AND holder = ?",
+            (slot_date, slot_time, holder),
+        )
+
+    async def scan_rows(
+        self,
+        table: str,
+        order_column: str = "created_at",
+        after: Optional[Tuple[Any, Any]] = None,
+        limit: int = 1000,
+        columns: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        projection = _scan_columns(table, order_column, columns)
+        key = SCAN_KEYS[table]
+        select = ", ".join(projection) if projection else "*"
+        where, params = "", ()
+        if after is not None:
+            where, params = f" WHERE ({order_column}, {key}) > (?, ?)", tuple(after)
+        return self._query(
+            f"SELECT {select} FROM {table}{where} "
+            f"ORDER BY {order_column}, {key} LIMIT ?",
+            (*params, limit),
+        )
+
+    async def upsert_rows(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        if table not in ROLLUP_TABLES:
+            raise ValueError(f"Table '{table}' is not a rollup table")
+        if not rows:
+            return 0
+        columns = list(rows[0])
+        keys = ROLLUP_TABLES[table]
+        assignments = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in keys)
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {assignments}"
+        )
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(sql, [tuple(r[c] for c in columns) for r in rows])
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+
+# ==================== IN-MEMORY ====================
+
+
+class InMemoryBackend(StorageBackend):
+    """
+    Pure in-process storage with the same constraints as the Postgres schema.
+
+    Active slots are tracked in a dict keyed by (resource, seat, date, time),
+    so the overlap check only looks at active appointments. Returned
+    rows are copies, so callers cannot mutate stored state by accident.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        """Initialize empty tables."""
+        self._lock = threading.Lock()
+        self.user_profiles: Dict[str, Dict[str, Any]] = {}
+        self.appointments: Dict[str, Dict[str, Any]] = {}
+        self.appointments_archive: Dict[str, Dict[str, Any]] = {}
+        self.conversation_summaries: List[Dict[str, Any]] = []
+        self.rollups: Dict[str, Dict[tuple, Dict[str, Any]]] = {
+            table: {} for table in ROLLUP_TABLES
+        }
+        self._active_slots: Dict[tuple[str, int, str, str], str] = {}
+        self.slot_holds: Dict[tuple[str, str, str], Dict[str, Any]] = {}
+        self.appointment_series: Dict[str, Dict[str, Any]] = {}
+        self.waitlist: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _copy(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(row) if row is not None else None
+
+    @staticmethod
+    def _slot(row: Dict[str, Any]) -> tuple[str, int, str, str]:
+        return (
+            row["resource_id"],
+            row["seat"],
+            row["appointment_date"],
+            row["appointment_time"],
+        )
+
+    def _require_profile(self, contact_number: Optional[str]):
+        if contact_number is not None and contact_number not in self.user_profiles:
+            raise StorageError(
+                f"contact_number {contact_number} is not present in user_profiles"
+            )
+
+    async def get_user_profile(self, contact_number: str) -> Optional[Dict[str, Any]]:
+        return self._copy(self.user_profiles.get(contact_number))
+
+    async def insert_user_profile(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            if data["contact_number"] in self.user_profiles:
+                raise StorageError(
+                    f"user_profiles already contains {data['contact_number']}"
+                )
+            now = _now()
+            row = {
+                "name": None,
+                "email": None,
+                "preferences": {},
+                "created_at": now,
+                "updated_at": now,
+                **data,
+            }
+            self.user_profiles[row["contact_number"]] = row
+            return self._copy(row)
+
+    async def update_user_profile(
+        self, contact_number: str, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.user_profiles.get(contact_number)
+            if row is None:
+                return None
+            row.update(updates, updated_at=_now())
+            return self._copy(row)
+
+    async def find_active_appointments(
+        self, appt_date: str, appt_time: str
+    ) -> List[Dict[str, Any]]:
+        return [
+            {"id": row["id"], "user_name": row["user_name"]}
+            for (_, _, d, t), appointment_id in self._active_slots.items()
+            if d == appt_date and t == appt_time
+            for row in (self.appointments[appointment_id],)
+        ]
+
+    async def list_booked_slots(
+        self, start_date: str, end_date: str
+    ) -> List[Dict[str, Any]]:
+        rows = [
+            self.appointments[appointment_id]
+            for (_, _, d, _), appointment_id in self._active_slots.items()
+            if start_date <= d <= end_date
+        ]
+        return [
+            {
+                "id": row["id"],
+                "appointment_date": row["appointment_date"],
+                "appointment_time": row["appointment_time"],
+                "resource_id": row["resource_id"],
+                "seat": row["seat"],
+                "duration_minutes": row["duration_minutes"],
+            }
+            for row in rows
+        ]
+
+    def _new_appointment(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        self._require_profile(data.get("contact_number"))
+        now = _now()
+        return {
+            "id": str(uuid.uuid4()),
+            "status": "active",
+            "notes": None,
+            "resource_id": "default",
+            "duration_minutes": 30,
+            "seat": 0,
+            "created_at": now,
+            "updated_at": now,
+            **data,
+        }
+
+    def _taken_seats(self, row: Dict[str, Any]) -> set[int]:
+        """Seats of the row's resource with another active appointment overlapping it."""
+        start = _minute_of_day(row["appointment_time"])
+        end = start + int(row["duration_minutes"])
+        taken = set()
+        for (resource, seat, day, _), appointment_id in self._active_slots.items():
+            if (
+                resource != row["resource_id"]
+                or day != row["appointment_date"]
+                or appointment_id == row["id"]
+            ):
+                continue
+            other = self.appointments[appointment_id]
+            other_start = _minute_of_day(other["appointment_time"])
+            if other_start < end and start < other_start + other["duration_minutes"]:
+                taken.add(seat)
+        return taken
+
+    def _store_appointment(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        if row["status"] == "active":
+            if row["seat"] in self._taken_seats(row):
+                raise SlotConflictError()
+            self._active_slots[self._slot(row)] = row["id"]
+        self.appointments[row["id"]] = row
+        return self._copy(row)
+
+    def _unstore_appointment(self, row: Dict[str, Any]):
+        """Undo _store_appointment; the caller holds the lock."""
+        del self.appointments[row["id"]]
+        if row["status"] == "active":
+            self._active_slots.pop(self._slot(row), None)
+
+    async def insert_appointment(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            return self._store_appointment(self._new_appointment(data))
+
+    async def insert_appointment_if_free(
+        self, data: Dict[str, Any], capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._insert_if_free(data, capacity)
+
+    def _insert_if_free(
+        self, data: Dict[str, Any], capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        """insert_appointment_if_free; the caller holds the lock."""
+        row = self._new_appointment(data)
+        taken = self._taken_seats(row)
+        free = [seat for seat in range(max(1, capacity)) if seat not in taken]
+        if not free:
+            return None
+        return self._store_appointment({**row, "seat": free[0]})
+
+    async def list_user_appointments(
+        self,
+        contact_number: str,
+        include_cancelled: bool,
+        from_date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        rows = [
+            row
+            for row in self.appointments.values()
+            if row["contact_number"] == contact_number
+            and (include_cancelled or row["status"] == "active")
+            and (from_date is None or row["appointment_date"] >= from_date)
+        ]
+        rows.sort(key=lambda r: (r["appointment_date"], r["appointment_time"]))
+        return [self._copy(r) for r in rows]
+
+    async def page_user_appointments(
+        self,
+        contact_number: str,
+        include_cancelled: bool,
+        from_date: Optional[str] = None,
+        after: Optional[Tuple[str, str, str]] = None,
+        limit: int = 20,
+        columns: Optional[Sequence[str]] = None,
+        archived: bool = False,
+    ) -> List[Dict[str, Any]]:
+        projection = _page_columns(columns)
+        source = self.appointments_archive if archived else self.appointments
+
+        def page_key(row: Dict[str, Any]) -> tuple:
+            return tuple(row[c] for c in PAGE_KEY)
+
+        rows = sorted(
+            (
+                row
+                for row in source.values()
+                if row["contact_number"] == contact_number
+                and (include_cancelled or row["status"] == "active")
+                and (from_date is None or row["appointment_date"] >= from_date)
+                and (after is None or page_key(row) > tuple(after))
+            ),
+            key=page_key,
+        )[:limit]
+        if projection is not None:
+            rows = [{c: r.get(c) for c in projection} for r in rows]
+        return [self._copy(r) for r in rows]
+
+    async def get_appointment(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+        return self._copy(self.appointments.get(appointment_id))
+
+    async def get_appointment_by_idempotency_key(
+        self, key: str
+    ) -> Optional[Dict[str, Any]]:
+        for row in self.appointments.values():
+            if row.get("idempotency_key") == key and row["status"] == "active":
+                return self._copy(row)
+        return None
+
+    async def update_appointment(
+        self, appointment_id: str, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.appointments.get(appointment_id)
+            if row is None:
+                return None
+            new_row = {**row, **updates, "updated_at": _now()}
+            if new_row["status"] == "active" and new_row["seat"] in self._taken_seats(
+                new_row
+            ):
+                raise SlotConflictError()
+            return self._replace_appointment(row, new_row)
+
+    def _replace_appointment(
+        self, row: Dict[str, Any], new_row: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Store an updated row in place of ``row``; the caller holds the lock."""
+        if row["status"] == "active":
+            self._active_slots.pop(self._slot(row), None)
+        if new_row["status"] == "active":
+            self._active_slots[self._slot(new_row)] = new_row["id"]
+        self.appointments[new_row["id"]] = new_row
+        return self._copy(new_row)
+
+    async def update_appointment_if_free(
+        self, appointment_id: str, updates: Dict[str, Any], capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.appointments.get(appointment_id)
+            if row is None or row["status"] != "active":
+                return None
+            new_row = {**row, **updates, "updated_at": _now()}
+            taken = self._taken_seats(new_row)
+            free = [seat for seat in range(max(1, capacity)) if seat not in taken]
+            if not free:
+                return None
+            return self._replace_appointment(row, {**new_row, "seat": free[0]})
+
+    async def insert_appointments(
+        self, rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            new_rows = [self._new_appointment(row) for row in rows]
+            stored: List[Dict[str, Any]] = []
+            try:
+                for row in new_rows:
+                    self._store_appointment(row)
+                    stored.append(row)
+            except SlotConflictError:
+                # All or nothing, like the single INSERT of the other backends
+                for row in stored:
+                    self._unstore_appointment(row)
+                raise
+            return [self._copy(row) for row in new_rows]
+
+    async def insert_series(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._require_profile(data.get("contact_number"))
+            now = _now()
+            row = {
+                "id": str(uuid.uuid4()),
+                "status": "active",
+                "created_at": now,
+                "updated_at": now,
+                **data,
+            }
+            self.appointment_series[row["id"]] = row
+            return self._copy(row)
+
+    async def list_series(
+        self,
+        contact_number: Optional[str] = None,
+        materialized_before: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        rows = [
+            row
+            for row in self.appointment_series.values()
+            if row["status"] == "active"
+            and (contact_number is None or row["contact_number"] == contact_number)
+            and (
+                materialized_before is None
+                or (
+                    row.get("materialized_until") is not None
+                    and row["materialized_until"] < materialized_before
+                )
+            )
+        ]
+        rows.sort(key=lambda row: row["start_date"])
+        return [self._copy(row) for row in rows]
+
+    async def update_series(
+        self, series_id: str, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.appointment_series.get(series_id)
+            if row is None:
+                return None
+            row.update(updates, updated_at=_now())
+            return self._copy(row)
+
+    async def insert_waitlist_entry(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._require_profile(data.get("contact_number"))
+            now = _now()
+            row = {
+                "id": str(uuid.uuid4()),
+                "status": "waiting",
+                "appointment_id": None,
+                "created_at": now,
+                "updated_at": now,
+                **data,
+            }
+            self.waitlist[row["id"]] = row
+            return self._copy(row)
+
+    async def list_waitlist(self, on_date: str) -> List[Dict[str, Any]]:
+        rows = [
+            row
+            for row in self.waitlist.values()
+            if row["status"] == "waiting"
+            and row["earliest_date"] <= on_date <= row["latest_date"]
+        ]
+        rows.sort(key=lambda row: (row["created_at"], row["id"]))
+        return [self._copy(row) for row in rows]
+
+    async def claim_waitlist_entry(
+        self, entry_id: str, data: Dict[str, Any], capacity: int
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.waitlist.get(entry_id)
+            if entry is None or entry["status"] != "waiting":
+                return None
+            booked = self._insert_if_free(data, capacity)
+            if booked is not None:
+                entry.update(
+                    status="booked", appointment_id=booked["id"], updated_at=_now()
+                )
+            return booked
+
+    async def insert_conversation_summary(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._require_profile(data.get("contact_number"))
+            row = {"id": str(uuid.uuid4()), "created_at": _now(), **data}
+            self.conversation_summaries.append(row)
+            return self._copy(row)
+
+    async def get_conversation_summary(
+        self, session_id: str
+    ) -> Optional[Dict[str, Any]]:
+        for row in self.conversation_summaries:
+            if row["session_id"] == session_id:
+                return self._copy(row)
+        return None
+
+    async def archive_appointments(
+        self, cutoff_date: str, cancelled_before: str, limit: int
+    ) -> int:
+        with self._lock:
+            batch = [
+                row
+                for row in self.appointments.values()
+                if row["appointment_date"] < cutoff_date
+                or (row["status"] != "active" and row["updated_at"] < cancelled_before)
+            ][:limit]
+            archived_at = _now()
+            for row in batch:
+                if row["status"] == "active":
+                    self._active_slots.pop(self._slot(row), None)
+                del self.appointments[row["id"]]
+                self.appointments_archive[row["id"]] = {
+                    **row,
+                    "archived_at": archived_at,
+                }
+            return len(batch)
+
+    async def list_archived_appointments(
+        self, contact_number: str
+    ) -> List[Dict[str, Any]]:
+        rows = [
+            row
+            for row in self.appointments_archive.values()
+            if row["contact_number"] == contact_number
+        ]
+        rows.sort(key=lambda r: (r["appointment_date"], r["appointment_time"]))
+        return [self._copy(r) for r in rows]
+
+    async def acquire_slot_hold(
+        self,
+        slot_date: str,
+        slot_time: str,
+        holder: str,
+        ttl_seconds: float,
+        seats: int = 1,
+    ) -> bool:
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            holders = set()
+            for key, row in list(self.slot_holds.items()):
+                if key[:2] != (slot_date, slot_time):
+                    continue
+                if row["expires_at"] > now.isoformat():
+                    holders.add(key[2])
+                else:
+                    del self.slot_holds[key]
+            if holder not in holders and len(holders) >= seats:
+                return False
+            self.slot_holds[(slot_date, slot_time, holder)] = {
+                "slot_date": slot_date,
+                "slot_time": slot_time,
+                "holder": holder,
+                "expires_at": (now + timedelta(seconds=ttl_seconds)).isoformat(),
+            }
+            return True
+
+    async def list_slot_holds(
+        self, start_date: str, end_date: str
+    ) -> List[Dict[str, Any]]:
+        now = _now()
+        return [
+            {k: row[k] for k in ("slot_date", "slot_time", "holder")}
+            for row in self.slot_holds.values()
+            if start_date <= row["slot_date"] <= end_date and row["expires_at"] > now
+        ]
+
+    async def release_slot_hold(self, slot_date: str, slot_time: str, holder: str):
+        with self._lock:
+            self.slot_holds.pop((slot_date, slot_time, holder), None)
+
+    async def scan_rows(
+        self,
+        table: str,
+        order_column: str = "created_at",
+        after: Optional[Tuple[Any, Any]] = None,
+        limit: int = 1000,
+        columns: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        projection = _scan_columns(table, order_column, columns)
+        key = SCAN_KEYS[table]
+        source = getattr(self, table)
+        rows = source.values() if isinstance(source, dict) else source
+
+        def sort_key(row: Dict[str, Any]) -> tuple:
+            return (row.get(order_column) or "", row[key])
+
+        page = sorted(
+            (r for r in rows if after is None or sort_key(r) > tuple(after)),
+            key=sort_key,
+        )[:limit]
+        if projection is not None:
+            page = [{c: r.get(c) for c in projection} for r in page]
+        return [self._copy(r) for r in page]
+
+    async def upsert_rows(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        if table not in ROLLUP_TABLES:
+            raise ValueError(f"Table '{table}' is not a rollup table")
+        keys = ROLLUP_TABLES[table]
+        with self._lock:
+            for row in rows:
+                self.rollups[table][tuple(row[k] for k in keys)] = self._copy(row)
+        return len(rows)
+
+
+# ==================== FACTORY ====================
+
+
+def create_backend(kind: Optional[str] = None) -> StorageBackend:
+    """
+    Create the storage backend selected by STORAGE_BACKEND.
+
+    Args:
+        kind: "supabase" (default), "sqlite" or "memory"; overrides the env var
+
+    Returns:
+        Configured StorageBackend
+    """
+    kind = (kind or os.getenv("STORAGE_BACKEND", "supabase")).lower()
+
+    if kind == "supabase":
+        return SupabaseBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(os.getenv("SQLITE_PATH", "superbryn.db"))
+    if kind == "memory":
+        return InMemoryBackend()
+
+    raise ValueError(f"Unknown STORAGE_BACKEND '{kind}'")
@@ -0,0 +1,215 @@
+"""Live cost and latency updates pushed to the frontend during a call."""
+
+import asyncio
+import contextlib
+import logging
+import math
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+try:
+    from .pricing import PricingRegistry, get_pricing_registry
+except ImportError:
+    from pricing import PricingRegistry, get_pricing_registry
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_EVENT = "telemetry_update"
+
+# Turns awaiting their first TTS audio; interrupted turns never get it, so
+# the oldest are dropped beyond this many
+MAX_PENDING_TURNS = 8
+
+# Usage fields copied from the priced cost breakdown into each snapshot
+_COST_FIELDS = (
+    "llm_cost",
+    "tts_cost",
+    "stt_cost",
+    "total_cost",
+    "prompt_tokens",
+    "completion_tokens",
+    "tts_characters",
+    "stt_audio_duration",
+)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class TelemetryStream:
+    """
+    Throttled, delta-encoded cost and latency updates for one session.
+
+    Metrics events mark the stream dirty; a background task then sends at most
+    one update per ``min_interval`` seconds. Each update carries only the
+    fields that changed since the previous one, and every ``keyframe_every``
+    updates a full snapshot is sent so a client that missed one recovers.
+    Values are cumulative, so applying an update is a plain merge.
+
+    Update payload:
+        {"seq": 3, "full": false, "changes": {"total_cost": 0.0012, ...}}
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, Dict[str, Any]], Awaitable[None]],
+        usage_collector: Any = None,
+        models: Optional[Dict[str, str]] = None,
+        registry: Optional[PricingRegistry] = None,
+        min_interval: float = 2.0,
+        keyframe_every: int = 15,
+        slow_turn_ms: float = 2000.0,
+        window: int = 50,
+    ):
+        """
+        Args:
+            send: Coroutine taking (event_type, payload), e.g. _send_to_frontend
+            usage_collector: metrics.UsageCollector for the session
+            models: Model per kind ("llm", "tts", "stt") used for pricing
+            registry: Pricing registry; the process-wide one when omitted
+            min_interval: Minimum seconds between two updates
+            keyframe_every: Send a full snapshot every this many updates
+            slow_turn_ms: Turns slower than this are counted as slow
+            window: Number of recent turns used for latency percentiles
+        """
+        self.send = send
+        self.usage_collector = usage_collector
+        self.models = models
+        self.registry = registry or get_pricing_registry()
+        self.min_interval = min_interval
+        self.keyframe_every = keyframe_every
+        self.slow_turn_ms = slow_turn_ms
+
+        self.turn_latencies: Deque[float] = deque(maxlen=window)
+        self.turns = 0
+        self.slow_turns = 0
+        self._pending_turns: OrderedDict[str, Dict[str, float]] = OrderedDict()
+        self._last_turn: Dict[str, float] = {}
+
+        self.seq = 0
+        self._last_sent: Dict[str, Any] = {}
+        self._dirty = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    # ==================== Collection ====================
+
+    def collect(self, metrics: Any):
+        """Fold a metrics event (from metrics_collected) into the stream."""
+        kind = getattr(metrics, "type", None)
+        speech_id = getattr(metrics, "speech_id", None)
+
+        if kind == "eou_metrics" and speech_id:
+            self._pending(speech_id)["eou"] = metrics.end_of_utterance_delay
+        elif kind == "llm_metrics" and speech_id:
+            # Only the first generation of a turn delays the first word
+            self._pending(speech_id).setdefault("llm_ttft", metrics.ttft)
+        elif kind == "tts_metrics" and speech_id in self._pending_turns:
+            self._complete_turn(speech_id, metrics.ttfb)
+
+        self._dirty.set()
+
+    def _pending(self, speech_id: str) -> Dict[str, float]:
+        """Parts collected so far of a turn, dropping the oldest turns if needed."""
+        parts = self._pending_turns.get(speech_id)
+        if parts is None:
+            parts = self._pending_turns[speech_id] = {}
+            while len(self._pending_turns) > MAX_PENDING_TURNS:
+                self._pending_turns.popitem(last=False)
+        return parts
+
+    def _complete_turn(self, speech_id: str, tts_ttfb: float):
+        parts = self._pending_turns.pop(speech_id)
+        parts["tts_ttfb"] = tts_ttfb
+        latency_ms = sum(parts.values()) * 1000
+
+        self.turns += 1
+        self.turn_latencies.append(latency_ms)
+        self._last_turn = {k: v * 1000 for k, v in parts.items()}
+        if latency_ms > self.slow_turn_ms:
+            self.slow_turns += 1
+            logger.warning(f"Slow turn {speech_id}: {latency_ms:.0f}ms ({parts})")
+
+    # ==================== Encoding ====================
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current cumulative cost and latency values."""
+        data: Dict[str, Any] = dict.fromkeys(_COST_FIELDS, 0)
+        if self.usage_collector is not None:
+            costs = self.registry.costs_from_usage(
+                self.usage_collector.get_summary(), models=self.models
+            )
+            data.update({key: costs[key] for key in _COST_FIELDS})
+
+        latencies = list(self.turn_latencies)
+        data.update(
+            {
+                "turns": self.turns,
+                "slow_turns": self.slow_turns,
+                "last_turn_ms": round(latencies[-1], 1) if latencies else None,
+                "p50_turn_ms": round(_percentile(latencies, 50), 1),
+                "p95_turn_ms": round(_percentile(latencies, 95), 1),
+                "last_eou_ms": round(self._last_turn.get("eou", 0.0), 1),
+                "last_llm_ttft_ms": round(self._last_turn.get("llm_ttft", 0.0), 1),
+                "last_tts_ttfb_ms": round(self._last_turn.get("tts_ttfb", 0.0), 1),
+            }
+        )
+        return data
+
+    def next_update(self, force_full: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Build the next update, or None when nothing changed.
+
+        Args:
+            force_full: Send the whole snapshot rather than the changed fields
+        """
+        current = self.snapshot()
+        full = force_full or not self._last_sent or self.seq % self.keyframe_every == 0
+        changes = (
+            current
+            if full
+            else {k: v for k, v in current.items() if self._last_sent.get(k) != v}
+        )
+        if not changes:
+            return None
+
+        self.seq += 1
+        self._last_sent = current
+        return {"seq": self.seq, "full": full, "changes": changes}
+
+    # ==================== Background task ====================
+
+    async def _flush(self):
+        update = self.next_update()
+        if update is not None:
+            await self.send(TELEMETRY_EVENT, update)
+
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            try:
+                await self._flush()
+            except Exception as e:
+                logger.error(f"Error sending telemetry update: {e}")
+            await asyncio.sleep(self.min_interval)
+
+    def start(self):
+        """Start pushing updates from the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and send any final changes."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        with contextlib.suppress(Exception):
+            await self._flush()
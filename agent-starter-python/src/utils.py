@@ -3,10 +3,17 @@
 import logging
 import re
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple
+from typing import Dict, Optional, Tuple, Union
 
 from dateutil import parser as date_parser
 
+try:
+    from .models import Appointment
+    from .pricing import get_pricing_registry
+except ImportError:
+    from models import Appointment
+    from pricing import get_pricing_registry
+
 logger = logging.getLogger(__name__)
 
 
@@ -177,10 +184,10 @@ def calculate_costs(
     """
     Calculate API costs breakdown based on usage.
 
-    Pricing (as of 2024):
-    - OpenAI GPT-4o-mini: ~$0.15/1M input tokens, ~$0.60/1M output tokens (avg $0.30/1M)
-    - Cartesia TTS: ~$0.015/1K characters
-    - Deepgram STT: ~$0.0043/minute
+    Rates come from the pricing registry (pricing_config.json) for the default
+    models. The input/output split is unknown here, so tokens are priced at
+    the average of the input and output rates; use
+    PricingRegistry.costs_from_usage when a UsageCollector summary is available.
 
     Args:
         tokens_used: Total tokens used by LLM
@@ -191,10 +198,11 @@ def calculate_costs(
         Dictionary with cost breakdown
     """
     try:
+        registry = get_pricing_registry()
         costs = {
-            "llm_cost": round(tokens_used * 0.30 / 1_000_000, 6),  # OpenAI pricing
-            "tts_cost": round(tts_chars * 0.015 / 1000, 6),  # Cartesia pricing
-            "stt_cost": round(stt_seconds * 0.0043 / 60, 6),  # Deepgram pricing
+            "llm_cost": round(registry.blended_llm_cost(tokens_used), 6),
+            "tts_cost": round(registry.tts_cost(tts_chars), 6),
+            "stt_cost": round(registry.stt_cost(stt_seconds), 6),
             "total_cost": 0.0,
         }
 
@@ -215,27 +223,21 @@ def calculate_costs(
         }
 
 
-def format_appointment_display(appointment: Dict) -> str:
+def format_appointment_display(appointment: Union[Appointment, Dict]) -> str:
     """
     Format appointment data for display to user.
 
     Args:
-        appointment: Appointment dictionary
+        appointment: Appointment record (its cached display string is used)
+            or a raw appointment row
 
     Returns:
         Formatted string for voice output
     """
+    if isinstance(appointment, Appointment):
+        return appointment.display
     try:
-        # Parse date and time
-        appt_date = datetime.strptime(
-            appointment["appointment_date"], "%Y-%m-%d"
-        ).strftime("%A, %B %d, %Y")
-        appt_time = datetime.strptime(
-            appointment["appointment_time"], "%H:%M:%S"
-        ).strftime("%I:%M %p")
-
-        return f"{appt_date} at {appt_time}"
-
+        return Appointment.from_row(appointment).display
     except Exception as e:
         logger.error(f"Error formatting appointment: {e}")
         return f"{appointment.get('appointment_date', 'Unknown date')} at {appointment.get('appointment_time', 'Unknown time')}"
@@ -0,0 +1,273 @@
+"""
+Waitlist for callers who found no free slot.
+
+A waiting entry covers a date range and, optionally, a window of start times.
+When an appointment is cancelled or moved, the starts it frees are matched
+against the waiting entries in memory:
+
+    - every freed start gets a priority queue (heapq) of the entries that
+      would take it, so the best candidate is popped without sorting
+    - entries are ordered by the day they asked, then by flexibility (the
+      fewer days and minutes an entry accepts, the sooner it is served, as
+      it has fewer chances later), then by the exact request time
+    - a SchedulingEngine loaded with the day's bookings checks that the
+      popped entry fits a free seat, and records it so later matches of the
+      same run cannot overlap it
+
+Each match is then committed with one atomic claim (claim_waitlist_entry),
+which books the seat and marks the entry booked together, so an entry is
+never booked twice and a seat never overbooked, even with several workers.
+"""
+
+import heapq
+import itertools
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+try:
+    from .models import DEFAULT_DURATION_MINUTES, display_date, display_time
+    from .scheduling import Booking, SchedulingEngine
+except ImportError:
+    from models import DEFAULT_DURATION_MINUTES, display_date, display_time
+    from scheduling import Booking, SchedulingEngine
+
+logger = logging.getLogger(__name__)
+
+_MINUTES_PER_DAY = 24 * 60
+
+
+def _as_time(value: Any) -> Optional[time]:
+    return time.fromisoformat(str(value)) if value else None
+
+
+@dataclass(frozen=True, slots=True)
+class WaitlistEntry:
+    """A caller waiting for any slot within a date range and time window."""
+
+    id: Optional[str]
+    contact_number: str
+    user_name: str
+    earliest_date: date
+    latest_date: date
+    earliest_time: Optional[time] = None
+    latest_time: Optional[time] = None
+    duration_minutes: int = DEFAULT_DURATION_MINUTES
+    resource_id: Optional[str] = None
+    status: str = "waiting"
+    requested_at: Optional[datetime] = None
+    appointment_id: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "WaitlistEntry":
+        created = row.get("created_at")
+        return cls(
+            id=str(row["id"]),
+            contact_number=row["contact_number"],
+            user_name=row["user_name"],
+            earliest_date=date.fromisoformat(str(row["earliest_date"])),
+            latest_date=date.fromisoformat(str(row["latest_date"])),
+            earliest_time=_as_time(row.get("earliest_time")),
+            latest_time=_as_time(row.get("latest_time")),
+            duration_minutes=int(
+                row.get("duration_minutes") or DEFAULT_DURATION_MINUTES
+            ),
+            resource_id=row.get("resource_id"),
+            status=row.get("status") or "waiting",
+            requested_at=datetime.fromisoformat(str(created)) if created else None,
+            appointment_id=row.get("appointment_id"),
+        )
+
+    def to_row(self) -> Dict[str, Any]:
+        """Columns of the waitlist row (without the generated id)."""
+        return {
+            "contact_number": self.contact_number,
+            "user_name": self.user_name,
+            "earliest_date": self.earliest_date.isoformat(),
+            "latest_date": self.latest_date.isoformat(),
+            "earliest_time": (
+                self.earliest_time.isoformat() if self.earliest_time else None
+            ),
+            "latest_time": self.latest_time.isoformat() if self.latest_time else None,
+            "duration_minutes": self.duration_minutes,
+            "resource_id": self.resource_id,
+            "status": self.status,
+        }
+
+    def accepts(self, start: datetime) -> bool:
+        """Whether the caller would take an appointment starting at ``start``."""
+        clock = start.time()
+        return (
+            self.earliest_date <= start.date() <= self.latest_date
+            and (self.earliest_time is None or clock >= self.earliest_time)
+            and (self.latest_time is None or clock <= self.latest_time)
+        )
+
+    @property
+    def flexibility(self) -> int:
+        """Day-minutes the entry accepts: days in its range x minutes in its window."""
+        opens = self.earliest_time or time(0, 0)
+        window = (
+            (self.latest_time.hour * 60 + self.latest_time.minute)
+            if self.latest_time
+            else _MINUTES_PER_DAY
+        ) - (opens.hour * 60 + opens.minute)
+        days = (self.latest_date - self.earliest_date).days + 1
+        return days * max(window, 0)
+
+    @property
+    def priority(self) -> Tuple[date, int, datetime]:
+        """Queue order: day of the request, then flexibility, then request time."""
+        requested = self.requested_at or datetime.max
+        return (requested.date(), self.flexibility, requested.replace(tzinfo=None))
+
+    def describe(self) -> str:
+        """Spoken form, e.g. "March 2 to March 6, between 9:00 AM and 11:00 AM"."""
+        if self.earliest_date == self.latest_date:
+            days = display_date(self.earliest_date)
+        else:
+            days = f"{display_date(self.earliest_date)} to {display_date(self.latest_date)}"
+        if self.earliest_time and self.latest_time:
+            window = f"between {display_time(self.earliest_time)} and {display_time(self.latest_time)}"
+        elif self.earliest_time:
+            window = f"from {display_time(self.earliest_time)}"
+        elif self.latest_time:
+            window = f"up to {display_time(self.latest_time)}"
+        else:
+            window = "any time"
+        return f"{days}, {window}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Payload for the caller and the frontend."""
+        return {
+            "id": self.id,
+            "description": self.describe(),
+            "duration_minutes": self.duration_minutes,
+            "resource_id": self.resource_id,
+            "status": self.status,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class WaitlistMatch:
+    """A freed start assigned to a waiting entry, on a resource seat."""
+
+    start: datetime
+    entry: WaitlistEntry
+    resource_id: str
+    seat: int
+
+
+class WaitlistMatcher:
+    """Per-start priority queues of waiting entries, matched against an engine."""
+
+    def __init__(self, engine: SchedulingEngine):
+        """
+        Args:
+            engine: Loaded with the bookings of the freed starts' days;
+                matches are booked into it as they are made
+        """
+        self.engine = engine
+        self._queues: Dict[datetime, List[Tuple[tuple, int, WaitlistEntry]]] = {}
+        self._order = itertools.count()
+
+    def add(self, entry: WaitlistEntry, starts: Iterable[datetime]) -> int:
+        """
+        Queue an entry at every start it accepts.
+
+        Returns:
+            Number of queues the entry joined
+        """
+        queued = 0
+        for start in starts:
+            if entry.accepts(start):
+                heapq.heappush(
+                    self._queues.setdefault(start, []),
+                    (entry.priority, next(self._order), entry),
+                )
+                queued += 1
+        return queued
+
+    def _candidates(self, start: datetime) -> Iterator[WaitlistEntry]:
+        queue = self._queues.get(start, [])
+        while queue:
+            yield heapq.heappop(queue)[2]
+
+    def _seat_for(
+        self, entry: WaitlistEntry, start: datetime
+    ) -> Optional[Tuple[str, int]]:
+        if not self.engine.fits(start, entry.duration_minutes):
+            return None
+        resources = (
+            [entry.resource_id] if entry.resource_id else self.engine.resource_ids
+        )
+        for resource_id in resources:
+            seats = self.engine.free_seats(resource_id, start, entry.duration_minutes)
+            if seats:
+                return resource_id, seats[0]
+        return None
+
+    def match(self) -> List[WaitlistMatch]:
+        """
+        Assign each freed start to its best waiting entry that fits a free seat.
+
+        Starts are served in time order and every entry is matched at most
+        once. The engine records each match, so an entry booked into a
+        longer interval takes the later starts it overlaps as well.
+        """
+        matched: Set[Optional[str]] = set()
+        matches: List[WaitlistMatch] = []
+        for start in sorted(self._queues):
+            for entry in self._candidates(start):
+                if entry.id in matched:
+                    continue
+                choice = self._seat_for(entry, start)
+                if choice is None:
+                    continue
+                resource_id, seat = choice
+                self.engine.book(
+                    Booking(resource_id, start, entry.duration_minutes, seat=seat)
+                )
+                matched.add(entry.id)
+                matches.append(WaitlistMatch(start, entry, resource_id, seat))
+                break
+        return matches
+
+
+def freed_starts(
+    appt_date: date,
+    appt_time: time,
+    duration_minutes: int,
+    times: Sequence[str],
+) -> List[datetime]:
+    """
+    Configured start times that fall within a freed appointment's interval.
+
+    Args:
+        appt_date: Date of the cancelled or moved appointment
+        appt_time: Its start time
+        duration_minutes: Its length
+        times: The configured HH:MM start times (AppConfig.available_times)
+
+    Returns:
+        Starts in [start, start + duration), always including the start itself
+    """
+    start = datetime.combine(appt_date, appt_time)
+    end = start + timedelta(minutes=duration_minutes)
+    starts = {start}
+    for clock in times:
+        candidate = datetime.combine(appt_date, time.fromisoformat(clock))
+        if start <= candidate < end:
+            starts.add(candidate)
+    return sorted(starts)
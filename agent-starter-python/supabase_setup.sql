@@ -31,20 +31,72 @@ CREATE TABLE IF NOT EXISTS appointments (
     status TEXT DEFAULT 'active' CHECK (status IN ('active', 'cancelled', 'modified')),
     notes TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    -- Hash of the booking request; a repeated tool call returns the original row
+    idempotency_key TEXT,
+    -- Provider or room booked (ids from "resources" in slots_config.json)
+    resource_id TEXT NOT NULL DEFAULT 'default',
+    duration_minutes INTEGER NOT NULL DEFAULT 30 CHECK (duration_minutes > 0),
+    -- Which of the resource's concurrent places ("capacity") the booking takes
+    seat INTEGER NOT NULL DEFAULT 0 CHECK (seat >= 0)
 );
 
--- Unique constraint to prevent double-booking (only for active appointments)
-CREATE UNIQUE INDEX IF NOT EXISTS idx_unique_active_slot 
-ON appointments(appointment_date, appointment_time) 
+-- For tables created before the columns existed
+ALTER TABLE appointments ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
+ALTER TABLE appointments ADD COLUMN IF NOT EXISTS resource_id TEXT NOT NULL DEFAULT 'default';
+ALTER TABLE appointments ADD COLUMN IF NOT EXISTS duration_minutes INTEGER NOT NULL DEFAULT 30;
+ALTER TABLE appointments ADD COLUMN IF NOT EXISTS seat INTEGER NOT NULL DEFAULT 0;
+
+-- Unique constraint to prevent double-booking (only for active appointments);
+-- each seat of a resource has its own calendar, so the start is unique per seat
+DROP INDEX IF EXISTS idx_unique_active_slot;
+DROP INDEX IF EXISTS idx_unique_active_resource_slot;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_unique_active_seat
+ON appointments(resource_id, appointment_date, seat, appointment_time)
 WHERE status = 'active';
 
+-- Appointments of different lengths must not overlap on the same seat
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE appointments DROP CONSTRAINT IF EXISTS appointments_no_overlap;
+ALTER TABLE appointments ADD CONSTRAINT appointments_no_overlap
+EXCLUDE USING gist (
+    resource_id WITH =,
+    seat WITH =,
+    tsrange(
+        appointment_date + appointment_time,
+        appointment_date + appointment_time + make_interval(mins => duration_minutes)
+    ) WITH &&
+)
+WHERE (status = 'active');
+
+-- At most one active booking per idempotency key
+CREATE UNIQUE INDEX IF NOT EXISTS idx_appointments_idempotency
+ON appointments(idempotency_key)
+WHERE idempotency_key IS NOT NULL AND status = 'active';
+
 -- Indexes for faster queries
 CREATE INDEX IF NOT EXISTS idx_appointments_contact ON appointments(contact_number);
 CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments(appointment_date);
 CREATE INDEX IF NOT EXISTS idx_appointments_status ON appointments(status);
 CREATE INDEX IF NOT EXISTS idx_appointments_datetime ON appointments(appointment_date, appointment_time);
 
+-- Keyset pagination for exports and analytics: ORDER BY created_at/updated_at, id
+CREATE INDEX IF NOT EXISTS idx_appointments_created ON appointments(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_appointments_updated ON appointments(updated_at, id);
+
+-- Hot-path reads (a caller's active appointments from today on) and the
+-- archival job's scan for old cancelled/modified rows
+CREATE INDEX IF NOT EXISTS idx_appointments_active_contact
+ON appointments(contact_number, appointment_date, appointment_time)
+WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS idx_appointments_inactive_updated
+ON appointments(updated_at)
+WHERE status <> 'active';
+
+-- Keyset pages of a caller's history: ORDER BY appointment_date, appointment_time, id
+CREATE INDEX IF NOT EXISTS idx_appointments_contact_page
+ON appointments(contact_number, appointment_date, appointment_time, id);
+
 -- ============================================
 -- 3. CONVERSATION SUMMARIES TABLE
 -- ============================================
@@ -62,6 +114,7 @@ CREATE TABLE IF NOT EXISTS conversation_summaries (
 -- Index for session lookups
 CREATE INDEX IF NOT EXISTS idx_summaries_session ON conversation_summaries(session_id);
 CREATE INDEX IF NOT EXISTS idx_summaries_contact ON conversation_summaries(contact_number);
+CREATE INDEX IF NOT EXISTS idx_summaries_created ON conversation_summaries(created_at, id);
 
 -- ============================================
 -- 4. FUNCTIONS & TRIGGERS
@@ -90,6 +143,94 @@ CREATE TRIGGER update_appointments_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Book the lowest free seat of a resource in one round trip; returns no row
+-- when all p_capacity seats overlap the appointment. A concurrent booking of
+-- the same seat makes the insert wait for it and then fail the exclusion
+-- constraint, and the next seat is tried, so a resource is never overbooked.
+CREATE OR REPLACE FUNCTION book_appointment_seat(
+    p_appointment JSONB,
+    p_capacity INTEGER DEFAULT 1
+)
+RETURNS SETOF appointments AS $$
+DECLARE
+    booked appointments;
+    violated TEXT;
+BEGIN
+    FOR seat_no IN 0 .. GREATEST(p_capacity, 1) - 1 LOOP
+        BEGIN
+            INSERT INTO appointments (
+                contact_number, user_name, appointment_date, appointment_time,
+                status, notes, idempotency_key, resource_id, duration_minutes, seat,
+                series_id
+            )
+            VALUES (
+                p_appointment->>'contact_number',
+                p_appointment->>'user_name',
+                (p_appointment->>'appointment_date')::DATE,
+                (p_appointment->>'appointment_time')::TIME,
+                COALESCE(p_appointment->>'status', 'active'),
+                p_appointment->>'notes',
+                p_appointment->>'idempotency_key',
+                COALESCE(p_appointment->>'resource_id', 'default'),
+                COALESCE((p_appointment->>'duration_minutes')::INTEGER, 30),
+                seat_no,
+                (p_appointment->>'series_id')::UUID
+            )
+            RETURNING * INTO booked;
+            RETURN NEXT booked;
+            RETURN;
+        EXCEPTION WHEN exclusion_violation OR unique_violation THEN
+            GET STACKED DIAGNOSTICS violated = CONSTRAINT_NAME;
+            IF violated NOT IN ('appointments_no_overlap', 'idx_unique_active_seat') THEN
+                RAISE;
+            END IF;
+        END;
+    END LOOP;
+    RETURN;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Move an appointment to the lowest free seat of its new resource and slot,
+-- like book_appointment_seat; its own current interval never blocks the
+-- move. Returns no row when every seat is taken or the appointment is gone
+-- or no longer active, so a cancelled appointment is never brought back.
+CREATE OR REPLACE FUNCTION move_appointment_seat(
+    p_id UUID,
+    p_updates JSONB,
+    p_capacity INTEGER DEFAULT 1
+)
+RETURNS SETOF appointments AS $$
+DECLARE
+    moved appointments;
+    violated TEXT;
+BEGIN
+    FOR seat_no IN 0 .. GREATEST(p_capacity, 1) - 1 LOOP
+        BEGIN
+            UPDATE appointments
+            SET appointment_date = (p_updates->>'appointment_date')::DATE,
+                appointment_time = (p_updates->>'appointment_time')::TIME,
+                resource_id = COALESCE(p_updates->>'resource_id', resource_id),
+                duration_minutes = COALESCE(
+                    (p_updates->>'duration_minutes')::INTEGER, duration_minutes
+                ),
+                seat = seat_no
+            WHERE id = p_id AND status = 'active'
+            RETURNING * INTO moved;
+            IF moved.id IS NOT NULL THEN
+                RETURN NEXT moved;
+            END IF;
+            RETURN;
+        EXCEPTION WHEN exclusion_violation OR unique_violation THEN
+            GET STACKED DIAGNOSTICS violated = CONSTRAINT_NAME;
+            IF violated NOT IN ('appointments_no_overlap', 'idx_unique_active_seat') THEN
+                RAISE;
+            END IF;
+        END;
+    END LOOP;
+    RETURN;
+END;
+$$ LANGUAGE plpgsql;
+
 -- ============================================
 -- 5. SAMPLE DATA (Optional - for testing)
 -- ============================================
@@ -118,6 +259,393 @@ CREATE POLICY "Enable all access for service role" ON appointments
 CREATE POLICY "Enable all access for service role" ON conversation_summaries
     FOR ALL USING (true);
 
+-- ============================================
+-- 7. COST ROLLUPS (written by src/analytics.py)
+-- ============================================
+-- Precomputed aggregates of conversation_summaries.cost_breakdown so
+-- dashboards do not scan the raw JSON. Rebuilt with:
+--   python -m src.analytics --output db
+CREATE TABLE IF NOT EXISTS cost_rollup_daily (
+    day DATE PRIMARY KEY,
+    sessions INTEGER NOT NULL,
+    llm_cost NUMERIC(14, 6),
+    tts_cost NUMERIC(14, 6),
+    stt_cost NUMERIC(14, 6),
+    total_cost NUMERIC(14, 6),
+    prompt_tokens BIGINT,
+    completion_tokens BIGINT,
+    tts_characters BIGINT,
+    stt_audio_duration DOUBLE PRECISION,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS cost_rollup_caller (
+    contact_number TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL,
+    llm_cost NUMERIC(14, 6),
+    tts_cost NUMERIC(14, 6),
+    stt_cost NUMERIC(14, 6),
+    total_cost NUMERIC(14, 6),
+    prompt_tokens BIGINT,
+    completion_tokens BIGINT,
+    tts_characters BIGINT,
+    stt_audio_duration DOUBLE PRECISION,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS cost_rollup_model (
+    model TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL,
+    llm_cost NUMERIC(14, 6),
+    tts_cost NUMERIC(14, 6),
+    stt_cost NUMERIC(14, 6),
+    total_cost NUMERIC(14, 6),
+    prompt_tokens BIGINT,
+    completion_tokens BIGINT,
+    tts_characters BIGINT,
+    stt_audio_duration DOUBLE PRECISION,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE cost_rollup_daily ENABLE ROW LEVEL SECURITY;
+ALTER TABLE cost_rollup_caller ENABLE ROW LEVEL SECURITY;
+ALTER TABLE cost_rollup_model ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Enable all access for service role" ON cost_rollup_daily
+    FOR ALL USING (true);
+
+CREATE POLICY "Enable all access for service role" ON cost_rollup_caller
+    FOR ALL USING (true);
+
+CREATE POLICY "Enable all access for service role" ON cost_rollup_model
+    FOR ALL USING (true);
+
+-- ============================================
+-- 8. APPOINTMENT ARCHIVE (filled by src/archival.py)
+-- ============================================
+-- Past appointments, and cancelled/modified ones after a grace period, are
+-- moved out of the appointments table in batches so the table the agent
+-- reads and the unique active-slot index only hold upcoming bookings.
+-- The archive is range-partitioned by appointment date; add a partition per
+-- year ahead of time (rows outside every range land in the default one).
+CREATE TABLE IF NOT EXISTS appointments_archive (
+    id UUID NOT NULL,
+    contact_number TEXT NOT NULL,
+    user_name TEXT NOT NULL,
+    appointment_date DATE NOT NULL,
+    appointment_time TIME NOT NULL,
+    status TEXT,
+    notes TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    idempotency_key TEXT,
+    resource_id TEXT NOT NULL DEFAULT 'default',
+    duration_minutes INTEGER NOT NULL DEFAULT 30,
+    seat INTEGER NOT NULL DEFAULT 0,
+    series_id UUID,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (id, appointment_date)
+) PARTITION BY RANGE (appointment_date);
+
+-- For archives created before the columns existed
+ALTER TABLE appointments_archive ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
+ALTER TABLE appointments_archive ADD COLUMN IF NOT EXISTS resource_id TEXT NOT NULL DEFAULT 'default';
+ALTER TABLE appointments_archive ADD COLUMN IF NOT EXISTS duration_minutes INTEGER NOT NULL DEFAULT 30;
+ALTER TABLE appointments_archive ADD COLUMN IF NOT EXISTS seat INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE appointments_archive ADD COLUMN IF NOT EXISTS series_id UUID;
+
+CREATE TABLE IF NOT EXISTS appointments_archive_2024 PARTITION OF appointments_archive
+    FOR VALUES FROM ('2024-01-01') TO ('2025-01-01');
+CREATE TABLE IF NOT EXISTS appointments_archive_2025 PARTITION OF appointments_archive
+    FOR VALUES FROM ('2025-01-01') TO ('2026-01-01');
+CREATE TABLE IF NOT EXISTS appointments_archive_2026 PARTITION OF appointments_archive
+    FOR VALUES FROM ('2026-01-01') TO ('2027-01-01');
+CREATE TABLE IF NOT EXISTS appointments_archive_2027 PARTITION OF appointments_archive
+    FOR VALUES FROM ('2027-01-01') TO ('2028-01-01');
+CREATE TABLE IF NOT EXISTS appointments_archive_default PARTITION OF appointments_archive DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_archive_contact
+ON appointments_archive(contact_number, appointment_date, appointment_time, id);
+
+-- Move one batch of archivable rows; returns the number moved (0 when done).
+-- SKIP LOCKED lets the job run while sessions are booking and cancelling.
+CREATE OR REPLACE FUNCTION archive_appointments(
+    p_cutoff DATE,
+    p_cancelled_before TIMESTAMP WITH TIME ZONE,
+    p_batch_size INTEGER DEFAULT 5000
+)
+RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+BEGIN
+    WITH batch AS (
+        SELECT id FROM appointments
+        WHERE appointment_date < p_cutoff
+           OR (status <> 'active' AND updated_at < p_cancelled_before)
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    ),
+    removed AS (
+        DELETE FROM appointments a
+        USING batch
+        WHERE a.id = batch.id
+        RETURNING a.id, a.contact_number, a.user_name, a.appointment_date,
+                  a.appointment_time, a.status, a.notes, a.created_at, a.updated_at,
+                  a.idempotency_key, a.resource_id, a.duration_minutes, a.seat,
+                  a.series_id
+    )
+    INSERT INTO appointments_archive (
+        id, contact_number, user_name, appointment_date, appointment_time,
+        status, notes, created_at, updated_at, idempotency_key, resource_id,
+        duration_minutes, seat, series_id
+    )
+    SELECT * FROM removed;
+
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE appointments_archive ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Enable all access for service role" ON appointments_archive
+    FOR ALL USING (true);
+
+-- Optional: with pg_cron, archive up to 5000 rows every 10 minutes instead of
+-- running the Python job
+-- SELECT cron.schedule('archive-appointments', '*/10 * * * *', $$
+--     SELECT archive_appointments(CURRENT_DATE, NOW() - INTERVAL '1 day', 5000)
+-- $$);
+
+-- ============================================
+-- 9. SLOT HOLDS (used when SLOT_HOLD_STORE=database)
+-- ============================================
+-- A caller confirming details holds one of the slot's places for a couple of
+-- minutes, so other sessions stop offering the slot once holds and bookings
+-- take every place. Expired rows are ignored and cleared on the next acquire.
+CREATE TABLE IF NOT EXISTS slot_holds (
+    slot_date DATE NOT NULL,
+    slot_time TIME NOT NULL,
+    holder TEXT NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (slot_date, slot_time, holder)
+);
+
+-- Holds used to be one per slot; each holder now has its own row
+ALTER TABLE slot_holds DROP CONSTRAINT IF EXISTS slot_holds_pkey;
+ALTER TABLE slot_holds ADD PRIMARY KEY (slot_date, slot_time, holder);
+DROP FUNCTION IF EXISTS acquire_slot_hold(DATE, TIME, TEXT, DOUBLE PRECISION);
+
+-- Take or renew a hold on one of p_seats free places; false if other
+-- holders' unexpired holds already take them all. Acquires of one slot are
+-- serialized, so concurrent callers never hold more places than p_seats.
+CREATE OR REPLACE FUNCTION acquire_slot_hold(
+    p_date DATE,
+    p_time TIME,
+    p_holder TEXT,
+    p_ttl_seconds DOUBLE PRECISION DEFAULT 120,
+    p_seats INTEGER DEFAULT 1
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('slot_hold ' || p_date || ' ' || p_time));
+
+    DELETE FROM slot_holds
+    WHERE slot_date = p_date AND slot_time = p_time AND expires_at <= NOW();
+
+    IF NOT EXISTS (
+        SELECT 1 FROM slot_holds
+        WHERE slot_date = p_date AND slot_time = p_time AND holder = p_holder
+    ) AND (
+        SELECT COUNT(*) FROM slot_holds
+        WHERE slot_date = p_date AND slot_time = p_time
+    ) >= p_seats THEN
+        RETURN FALSE;
+    END IF;
+
+    INSERT INTO slot_holds (slot_date, slot_time, holder, expires_at)
+    VALUES (p_date, p_time, p_holder, NOW() + make_interval(secs => p_ttl_seconds))
+    ON CONFLICT (slot_date, slot_time, holder) DO UPDATE
+    SET expires_at = EXCLUDED.expires_at;
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE slot_holds ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Enable all access for service role" ON slot_holds
+    FOR ALL USING (true);
+
+-- ============================================
+-- 10. RECURRING SERIES (see src/recurrence.py)
+-- ============================================
+-- A series is stored once as an RRULE. Only occurrences within the booking
+-- horizon are appointment rows; `python -m src.recurrence` books the next
+-- ones daily and moves materialized_until forward.
+CREATE TABLE IF NOT EXISTS appointment_series (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    contact_number TEXT NOT NULL REFERENCES user_profiles(contact_number) ON DELETE CASCADE,
+    user_name TEXT NOT NULL,
+    rule TEXT NOT NULL,  -- e.g. FREQ=WEEKLY;COUNT=6
+    start_date DATE NOT NULL,
+    start_time TIME NOT NULL,
+    duration_minutes INTEGER NOT NULL DEFAULT 30 CHECK (duration_minutes > 0),
+    resource_id TEXT,  -- NULL: any resource
+    -- completed: every occurrence is booked, the daily job skips it
+    status TEXT DEFAULT 'active' CHECK (status IN ('active', 'cancelled', 'completed')),
+    notes TEXT,
+    materialized_until DATE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE appointment_series DROP CONSTRAINT IF EXISTS appointment_series_status_check;
+ALTER TABLE appointment_series ADD CONSTRAINT appointment_series_status_check
+CHECK (status IN ('active', 'cancelled', 'completed'));
+
+CREATE INDEX IF NOT EXISTS idx_series_contact ON appointment_series(contact_number);
+CREATE INDEX IF NOT EXISTS idx_series_materialized
+ON appointment_series(materialized_until)
+WHERE status = 'active';
+
+ALTER TABLE appointments
+ADD COLUMN IF NOT EXISTS series_id UUID REFERENCES appointment_series(id) ON DELETE SET NULL;
+CREATE INDEX IF NOT EXISTS idx_appointments_series
+ON appointments(series_id)
+WHERE series_id IS NOT NULL;
+
+DROP TRIGGER IF EXISTS update_appointment_series_updated_at ON appointment_series;
+CREATE TRIGGER update_appointment_series_updated_at
+    BEFORE UPDATE ON appointment_series
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+ALTER TABLE appointment_series ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Enable all access for service role" ON appointment_series
+    FOR ALL USING (true);
+
+-- ============================================
+-- 11. WAITLIST (matched by src/waitlist.py)
+-- ============================================
+-- Callers who found nothing free. When an appointment is cancelled or moved,
+-- the agent matches the freed starts against the waiting entries in memory
+-- and books each match with claim_waitlist_entry().
+CREATE TABLE IF NOT EXISTS waitlist (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    contact_number TEXT NOT NULL REFERENCES user_profiles(contact_number) ON DELETE CASCADE,
+    user_name TEXT NOT NULL,
+    earliest_date DATE NOT NULL,
+    latest_date DATE NOT NULL,
+    earliest_time TIME,  -- NULL: from opening
+    latest_time TIME,  -- latest acceptable start; NULL: until closing
+    duration_minutes INTEGER NOT NULL DEFAULT 30 CHECK (duration_minutes > 0),
+    resource_id TEXT,  -- NULL: any resource
+    status TEXT DEFAULT 'waiting' CHECK (status IN ('waiting', 'booked', 'cancelled')),
+    appointment_id UUID REFERENCES appointments(id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    CHECK (latest_date >= earliest_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_waitlist_waiting
+ON waitlist(earliest_date, latest_date, created_at)
+WHERE status = 'waiting';
+CREATE INDEX IF NOT EXISTS idx_waitlist_contact ON waitlist(contact_number);
+
+DROP TRIGGER IF EXISTS update_waitlist_updated_at ON waitlist;
+CREATE TRIGGER update_waitlist_updated_at
+    BEFORE UPDATE ON waitlist
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Book a waiting entry into a freed slot in one transaction. The entry row is
+-- locked first, so two workers matching the same cancellation cannot both
+-- book it; no row is returned if it is no longer waiting or no seat is free.
+CREATE OR REPLACE FUNCTION claim_waitlist_entry(
+    p_entry_id UUID,
+    p_appointment JSONB,
+    p_capacity INTEGER DEFAULT 1
+)
+RETURNS SETOF appointments AS $$
+DECLARE
+    booked appointments;
+BEGIN
+    PERFORM 1 FROM waitlist
+    WHERE id = p_entry_id AND status = 'waiting'
+    FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    SELECT * INTO booked FROM book_appointment_seat(p_appointment, p_capacity);
+    IF booked.id IS NULL THEN
+        RETURN;
+    END IF;
+
+    UPDATE waitlist
+    SET status = 'booked', appointment_id = booked.id
+    WHERE id = p_entry_id;
+    RETURN NEXT booked;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE waitlist ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Enable all access for service role" ON waitlist
+    FOR ALL USING (true);
+
+-- ============================================
+-- 12. CACHE INVALIDATION (used when DB_CACHE_TTL is set, see src/invalidation.py)
+-- ============================================
+-- Workers that cache reads LISTEN on superbryn_changes. Every change to a
+-- profile or appointment notifies them, on commit, of the callers and dates
+-- it touched (old and new values of an update), so each worker can drop what
+-- it cached. Identical notifications of one transaction are sent once.
+CREATE OR REPLACE FUNCTION notify_cache_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    contacts TEXT[];
+    dates TEXT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        contacts := ARRAY[NEW.contact_number];
+    ELSIF TG_OP = 'DELETE' THEN
+        contacts := ARRAY[OLD.contact_number];
+    ELSE
+        contacts := ARRAY[OLD.contact_number, NEW.contact_number];
+    END IF;
+
+    IF TG_TABLE_NAME = 'appointments' THEN
+        IF TG_OP = 'INSERT' THEN
+            dates := ARRAY[NEW.appointment_date::TEXT];
+        ELSIF TG_OP = 'DELETE' THEN
+            dates := ARRAY[OLD.appointment_date::TEXT];
+        ELSE
+            dates := ARRAY[OLD.appointment_date::TEXT, NEW.appointment_date::TEXT];
+        END IF;
+    END IF;
+
+    PERFORM pg_notify(
+        'superbryn_changes',
+        json_build_object('table', TG_TABLE_NAME, 'contacts', contacts, 'dates', dates)::TEXT
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notify_user_profiles_change ON user_profiles;
+CREATE TRIGGER notify_user_profiles_change
+    AFTER INSERT OR UPDATE OR DELETE ON user_profiles
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_change();
+
+DROP TRIGGER IF EXISTS notify_appointments_change ON appointments;
+CREATE TRIGGER notify_appointments_change
+    AFTER INSERT OR UPDATE OR DELETE ON appointments
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_cache_change();
+
 -- ============================================
 -- SETUP COMPLETE
 -- ============================================
@@ -0,0 +1,17 @@
+import pytest
+
+from database import DatabaseManager
+from storage import InMemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    """Each storage backend the tests run against."""
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "test.db"))
+    return InMemoryBackend()
+
+
+@pytest.fixture
+def db(backend) -> DatabaseManager:
+    return DatabaseManager(backend=backend)
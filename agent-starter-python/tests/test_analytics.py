@@ -0,0 +1,59 @@
+import pytest
+
+from analytics import build_rollups, write_parquet
+from database import DatabaseManager
+from storage import SQLiteBackend
+
+
+async def _seed(db: DatabaseManager) -> None:
+    await db.create_user_profile("5550001", "Ada")
+    rows = [
+        ("5550001", "2026-03-01T09:00:00+00:00", 0.01, "openai/gpt-4o-mini"),
+        ("5550001", "2026-03-01T12:00:00+00:00", 0.02, "openai/gpt-4o-mini"),
+        (None, "2026-03-02T09:00:00+00:00", 0.04, None),
+    ]
+    for i, (contact, created_at, cost, model) in enumerate(rows):
+        breakdown = {"total_cost": cost, "llm_cost": cost, "prompt_tokens": 100}
+        if model:
+            breakdown["models"] = {"llm": model}
+        await db.backend.insert_conversation_summary(
+            {
+                "session_id": f"room-{i}",
+                "summary": "",
+                "contact_number": contact,
+                "cost_breakdown": breakdown,
+                "created_at": created_at,
+            }
+        )
+
+
+@pytest.mark.asyncio
+async def test_rollups_group_by_day_caller_and_model(tmp_path) -> None:
+    db = DatabaseManager(backend=SQLiteBackend(str(tmp_path / "test.db")))
+    await _seed(db)
+
+    tables = (await build_rollups(db, page_size=2)).tables()
+
+    daily = {r["day"]: r for r in tables["cost_rollup_daily"]}
+    assert daily["2026-03-01"]["sessions"] == 2
+    assert daily["2026-03-01"]["total_cost"] == 0.03
+    assert daily["2026-03-01"]["prompt_tokens"] == 200
+    callers = {r["contact_number"]: r["sessions"] for r in tables["cost_rollup_caller"]}
+    assert callers == {"5550001": 2, "anonymous": 1}
+    models = {r["model"]: r["total_cost"] for r in tables["cost_rollup_model"]}
+    assert models == {"openai/gpt-4o-mini": 0.03, "unknown": 0.04}
+
+    for table, rows in tables.items():
+        await db.upsert_rollup(table, rows)
+    await db.upsert_rollup(table, rows)  # idempotent re-run
+    count = db.backend.conn.execute("SELECT COUNT(*) FROM cost_rollup_model").fetchone()
+    assert count[0] == 2
+
+
+def test_parquet_output(tmp_path) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    tables = {"cost_rollup_model": [{"model": "m", "sessions": 1, "total_cost": 0.5}]}
+
+    (path,) = write_parquet(tables, tmp_path)
+
+    assert pq.read_table(path).to_pylist() == tables["cost_rollup_model"]
@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+
+import pytest
+
+from archival import archive_appointments
+from database import DatabaseManager
+
+TODAY = date(2026, 3, 2)
+
+
+async def _book(db: DatabaseManager, day: date, status: str, updated_at: str) -> None:
+    await db.backend.insert_appointment(
+        {
+            "contact_number": "5550001",
+            "user_name": "Ada",
+            "appointment_date": str(day),
+            "appointment_time": "09:00:00" if status == "active" else "10:00:00",
+            "status": status,
+            "updated_at": updated_at,
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_archival_keeps_only_the_hot_set(db: DatabaseManager) -> None:
+    await db.create_user_profile("5550001", "Ada")
+    long_ago = "2020-01-01T00:00:00+00:00"
+    for days in range(1, 4):
+        await _book(db, TODAY - timedelta(days=days), "active", long_ago)
+    await _book(db, TODAY + timedelta(days=5), "cancelled", long_ago)
+    await _book(db, TODAY + timedelta(days=6), "cancelled", "2999-01-01T00:00:00+00:00")
+    await _book(db, TODAY + timedelta(days=7), "active", long_ago)
+
+    result = await archive_appointments(db, today=TODAY, batch_size=2)
+
+    assert result.moved == 4
+    upcoming = await db.get_user_appointments("5550001", from_date=TODAY)
+    assert [a.appointment_date for a in upcoming] == [TODAY + timedelta(days=7)]
+
+    history = await db.get_user_appointments("5550001", include_cancelled=True)
+    assert len(history) == 6
+    assert [a.appointment_date for a in history] == sorted(
+        a.appointment_date for a in history
+    )
+    recent = await db.get_user_appointments(
+        "5550001", include_cancelled=True, from_date=TODAY
+    )
+    assert len(recent) == 3
+
+    # Nothing left to move; a rerun is a no-op
+    assert (await archive_appointments(db, today=TODAY)).moved == 0
+
+
+@pytest.mark.asyncio
+async def test_archived_rows_keep_their_resource_and_length(
+    db: DatabaseManager,
+) -> None:
+    await db.create_user_profile("5550001", "Ada")
+    await db.backend.insert_appointment(
+        {
+            "contact_number": "5550001",
+            "user_name": "Ada",
+            "appointment_date": str(TODAY - timedelta(days=1)),
+            "appointment_time": "09:00:00",
+            "resource_id": "room-2",
+            "duration_minutes": 60,
+            "seat": 1,
+        }
+    )
+
+    assert (await archive_appointments(db, today=TODAY)).moved == 1
+
+    (archived,) = await db.backend.list_archived_appointments("5550001")
+    assert (archived["resource_id"], archived["duration_minutes"]) == ("room-2", 60)
+    assert archived["seat"] == 1
+    (history,) = await db.get_user_appointments("5550001", include_cancelled=True)
+    assert (history.resource_id, history.duration_minutes) == ("room-2", 60)
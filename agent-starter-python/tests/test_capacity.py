@@ -0,0 +1,179 @@
+import asyncio
+import threading
+from collections import Counter
+from datetime import date, datetime, time
+
+import pytest
+
+from database import DatabaseManager
+from models import Slot
+from scheduling import Booking, SchedulingEngine
+from slot_matrix import SlotMatrix
+from storage import InMemoryBackend, SlotConflictError, SQLiteBackend
+
+SLOT_DATE = date(2026, 3, 2)
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime.combine(SLOT_DATE, time(hour, minute))
+
+
+def test_remaining_capacity_per_seat() -> None:
+    engine = SchedulingEngine(["clinic", "dr-b"], capacities={"clinic": 3})
+    engine.load(
+        [
+            Booking("clinic", at(10, 0), 30, "1", seat=0),
+            Booking("clinic", at(10, 0), 60, "2", seat=1),
+            Booking("dr-b", at(10, 0), 30, "3"),
+        ]
+    )
+    assert engine.free_seats("clinic", at(10, 0)) == [2]
+    assert engine.free_seats("clinic", at(10, 30)) == [0, 2]
+    assert engine.free_resources(at(10, 0)) == ["clinic"]
+
+    windows = engine.free_windows([at(10, 0), at(10, 30)], 30, ["clinic"])
+    assert [(w.start.time(), w.seat) for w in windows] == [
+        (time(10, 0), 2),
+        (time(10, 30), 0),
+        (time(10, 30), 2),
+    ]
+
+    matrix = SlotMatrix(SLOT_DATE, 1, [time(10, 0), time(10, 30), time(11, 0)])
+    matrix.apply_bookings(engine, 30)
+    slots = [Slot(SLOT_DATE, t) for t in (time(10, 0), time(10, 30), time(11, 0))]
+    assert matrix.remaining(slots) == [1, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_capacity_fills_seats_then_rejects(db: DatabaseManager):
+    capacities = {"clinic": 2}
+    clinic = {"resource_ids": ["clinic"], "capacities": capacities}
+    first = await db.create_appointment(
+        "5550001", "Ada", SLOT_DATE, time(10, 0), duration_minutes=60, **clinic
+    )
+    second = await db.create_appointment(
+        "5550002", "Grace", SLOT_DATE, time(10, 30), **clinic
+    )
+    assert [first.resource_id, second.resource_id] == ["clinic", "clinic"]
+
+    # Both seats are taken at 10:30; 11:00 has both seats free again
+    with pytest.raises(ValueError):
+        await db.create_appointment(
+            "5550003", "Linus", SLOT_DATE, time(10, 30), **clinic
+        )
+    available, _ = await db.check_slot_available(
+        SLOT_DATE, time(11, 0), 30, ["clinic"], capacities=capacities
+    )
+    assert available
+
+    # The conditional insert is the guard, even when a caller skips the check
+    rows = [
+        await db.backend.insert_appointment_if_free(
+            {
+                "contact_number": "5550001",
+                "user_name": "Ada",
+                "appointment_date": str(SLOT_DATE),
+                "appointment_time": "10:30:00",
+                "resource_id": "clinic",
+            },
+            2,
+        )
+        for _ in range(2)
+    ]
+    assert rows == [None, None]
+
+
+@pytest.mark.asyncio
+async def test_writes_never_overlap_a_booked_seat(db: DatabaseManager):
+    long = await db.create_appointment(
+        "5550001", "Ada", SLOT_DATE, time(10, 0), duration_minutes=60
+    )
+    short = await db.create_appointment("5550002", "Grace", SLOT_DATE, time(11, 0))
+
+    def row(clock: str, duration_minutes: int = 30) -> dict:
+        return {
+            "contact_number": "5550001",
+            "user_name": "Ada",
+            "appointment_date": str(SLOT_DATE),
+            "appointment_time": clock,
+            "duration_minutes": duration_minutes,
+        }
+
+    # Plain writes to seat 0 inside 10:00-11:00, or overlapping each other
+    with pytest.raises(SlotConflictError):
+        await db.backend.update_appointment(short.id, {"appointment_time": "10:30:00"})
+    with pytest.raises(SlotConflictError):
+        await db.backend.insert_appointments([row("12:00:00"), row("10:30:00")])
+    with pytest.raises(SlotConflictError):
+        await db.backend.insert_appointments([row("12:00:00", 60), row("12:30:00")])
+    assert len(await db.get_bookings(SLOT_DATE, SLOT_DATE)) == 2
+
+    # A move is a conditional claim: its own interval never blocks it
+    move = {
+        "appointment_date": str(SLOT_DATE),
+        "appointment_time": "09:30:00",
+        "resource_id": "default",
+        "duration_minutes": 60,
+    }
+    moved = await db.backend.update_appointment_if_free(long.id, move, 1)
+    assert (moved["appointment_time"][:5], moved["seat"]) == ("09:30", 0)
+
+    # ...but a seat booked since the check does
+    move.update(appointment_time="11:00:00", duration_minutes=30)
+    assert await db.backend.update_appointment_if_free(long.id, move, 1) is None
+    moved = await db.backend.update_appointment_if_free(long.id, move, 2)
+    assert moved["seat"] == 1
+    assert await db.backend.update_appointment_if_free("missing", move, 2) is None
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_parallel_bookings_never_exceed_capacity(backend: str, tmp_path) -> None:
+    """Many threads, each with its own event loop (and connection), book at once."""
+    threads, attempts, capacity = 8, 12, 5
+    times = [time(10, 0), time(10, 30)]
+    shared = InMemoryBackend()
+    path = str(tmp_path / "parallel.db")
+    SQLiteBackend(path)
+    barrier = threading.Barrier(threads)
+    booked, rejected = Counter(), Counter()
+    lock = threading.Lock()
+
+    def caller(worker: int):
+        db = DatabaseManager(
+            backend=shared if backend == "memory" else SQLiteBackend(path)
+        )
+
+        async def book_all():
+            for attempt in range(attempts):
+                slot = times[attempt % len(times)]
+                try:
+                    await db.create_appointment(
+                        f"555{worker:02d}{attempt:02d}",
+                        "Caller",
+                        SLOT_DATE,
+                        slot,
+                        resource_ids=["clinic"],
+                        capacities={"clinic": capacity},
+                    )
+                    outcome = booked
+                except ValueError:
+                    outcome = rejected
+                with lock:
+                    outcome[slot] += 1
+
+        barrier.wait()
+        asyncio.run(book_all())
+
+    pool = [threading.Thread(target=caller, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    assert booked == dict.fromkeys(times, capacity)
+    assert sum(rejected.values()) == threads * attempts - capacity * len(times)
+
+    db = DatabaseManager(backend=shared if backend == "memory" else SQLiteBackend(path))
+    bookings = asyncio.run(db.get_bookings(SLOT_DATE, SLOT_DATE))
+    seats = Counter((b.start.time(), b.seat) for b in bookings)
+    assert len(seats) == capacity * len(times) and set(seats.values()) == {1}
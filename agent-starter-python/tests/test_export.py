@@ -0,0 +1,63 @@
+from datetime import date, time
+
+import pytest
+
+from database import DatabaseManager
+from export import WatermarkStore, export_table
+from storage import SQLiteBackend
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.mark.asyncio
+async def test_incremental_export_reads_only_new_rows(tmp_path) -> None:
+    db = DatabaseManager(backend=SQLiteBackend(str(tmp_path / "test.db")))
+    for hour in range(9, 13):
+        await db.create_appointment("5550001", "Ada", date(2026, 3, 2), time(hour, 0))
+    await db.create_appointment(
+        "5550001",
+        "Ada",
+        date(2026, 3, 2),
+        time(13, 0),
+        idempotency_key="call-1",
+        duration_minutes=60,
+    )
+    watermarks = WatermarkStore(tmp_path / "out" / "watermarks.json")
+
+    first = await export_table(
+        db, "appointments", tmp_path / "out", watermarks, page_size=2
+    )
+    assert (first.rows, first.batches) == (5, 3)
+    table = pq.read_table(first.path)
+    assert table.schema.field("appointment_date").type == "date32[day]"
+    assert sorted(table.column("appointment_time").to_pylist())[0] == time(9, 0)
+    rows = {row["appointment_time"]: row for row in table.to_pylist()}
+    assert {
+        key: rows[time(13, 0)][key]
+        for key in (
+            "resource_id",
+            "duration_minutes",
+            "seat",
+            "series_id",
+            "idempotency_key",
+        )
+    } == {
+        "resource_id": "default",
+        "duration_minutes": 60,
+        "seat": 0,
+        "series_id": None,
+        "idempotency_key": "call-1",
+    }
+    assert table.schema.field("duration_minutes").type == "int32"
+
+    nothing = await export_table(db, "appointments", tmp_path / "out", watermarks)
+    assert nothing.rows == 0
+    assert nothing.path is None
+
+    # A cancellation bumps updated_at, so the row is exported again
+    await db.cancel_appointment(table.column("id")[0].as_py())
+    reloaded = WatermarkStore(tmp_path / "out" / "watermarks.json")
+    second = await export_table(db, "appointments", tmp_path / "out", reloaded)
+    assert second.rows == 1
+    assert pq.read_table(second.path).column("status").to_pylist() == ["cancelled"]
+    assert reloaded.state["appointments"]["rows_exported"] == 6
@@ -0,0 +1,161 @@
+from datetime import date, time
+
+import pytest
+
+from database import DatabaseManager
+from holds import DatabaseSlotHolds, LocalSlotHolds, create_slot_holds
+from models import UserProfile
+from storage import InMemoryBackend
+
+SLOT_DATE = date(2026, 3, 2)
+
+
+@pytest.mark.asyncio
+async def test_local_holds_expire_and_renew() -> None:
+    now = [0.0]
+    holds = LocalSlotHolds(ttl=60, clock=lambda: now[0])
+
+    assert await holds.acquire(SLOT_DATE, time(9, 0), "a")
+    assert not await holds.acquire(SLOT_DATE, time(9, 0), "b")
+    assert await holds.held_by_others(SLOT_DATE, SLOT_DATE, "b") == {
+        ("2026-03-02", "09:00"): 1
+    }
+    assert await holds.held_by_others(SLOT_DATE, SLOT_DATE, "a") == {}
+
+    now[0] = 50
+    assert await holds.acquire(SLOT_DATE, time(9, 0), "a")  # renewed to 110
+    now[0] = 100
+    assert not await holds.acquire(SLOT_DATE, time(9, 0), "b")
+    now[0] = 111
+    assert await holds.acquire(SLOT_DATE, time(9, 0), "b")
+
+
+@pytest.mark.asyncio
+async def test_database_holds_are_exclusive(db: DatabaseManager) -> None:
+    holds = DatabaseSlotHolds(db, ttl=60)
+
+    assert await holds.acquire(SLOT_DATE, time(9, 0), "a")
+    assert await holds.acquire(SLOT_DATE, time(9, 0), "a")
+    assert not await holds.acquire(SLOT_DATE, time(9, 0), "b")
+    assert await holds.held_by_others(SLOT_DATE, SLOT_DATE, "b") == {
+        ("2026-03-02", "09:00"): 1
+    }
+
+    await holds.release(SLOT_DATE, time(9, 0), "b")  # not b's to release
+    assert not await holds.acquire(SLOT_DATE, time(9, 0), "b")
+    await holds.release(SLOT_DATE, time(9, 0), "a")
+    assert await holds.acquire(SLOT_DATE, time(9, 0), "b")
+
+    expired = DatabaseSlotHolds(db, ttl=0)
+    assert await expired.acquire(SLOT_DATE, time(10, 0), "a")
+    assert await holds.acquire(SLOT_DATE, time(10, 0), "b")
+
+
+@pytest.mark.asyncio
+async def test_held_slots_are_hidden_from_other_callers() -> None:
+    from agent import AppointmentAssistant
+
+    db = DatabaseManager(backend=InMemoryBackend())
+    holds = LocalSlotHolds()
+    alice = AppointmentAssistant(db=db, holds=holds)
+    bob = AppointmentAssistant(db=db, holds=holds)
+    for assistant, phone in ((alice, "5550001"), (bob, "5550002")):
+        assistant.current_user = UserProfile(contact_number=phone, is_new=True)
+
+    offered = (await alice.fetch_slots(None))["slots"][0]
+    held = await alice.hold_slot(None, offered["date"], offered["time"])
+    assert held["success"]
+
+    assert offered not in (await bob.fetch_slots(None))["slots"]
+    assert offered in (await alice.fetch_slots(None))["slots"]
+
+    lost = await bob.book_appointment(None, offered["date"], offered["time"], "Bob")
+    assert not lost["success"] and lost["error"] == "Slot held"
+
+    booked = await alice.book_appointment(
+        None, offered["date"], offered["time"], "Alice"
+    )
+    assert booked["success"]
+    assert await holds.held_by_others(date.min, date.max, bob.hold_id) == {}
+
+
+@pytest.mark.asyncio
+async def test_default_holds_apply_across_processes(backend) -> None:
+    from agent import AppointmentAssistant
+
+    # Each call builds its own database manager and hold store in its own job
+    # process; only the storage backend is shared
+    alice, bob = (
+        AppointmentAssistant(db=db, holds=create_slot_holds(db))
+        for db in (DatabaseManager(backend=backend), DatabaseManager(backend=backend))
+    )
+    assert alice.holds is not bob.holds
+    for assistant, phone in ((alice, "5550001"), (bob, "5550002")):
+        assistant.current_user = UserProfile(contact_number=phone, is_new=True)
+
+    offered = (await alice.fetch_slots(None))["slots"][0]
+    assert (await alice.hold_slot(None, offered["date"], offered["time"]))["success"]
+
+    assert offered not in (await bob.fetch_slots(None))["slots"]
+    taken = await bob.hold_slot(None, offered["date"], offered["time"])
+    assert not taken["success"]
+    lost = await bob.book_appointment(None, offered["date"], offered["time"], "Bob")
+    assert not lost["success"] and lost["error"] == "Slot held"
+
+    booked = await alice.book_appointment(
+        None, offered["date"], offered["time"], "Alice"
+    )
+    assert booked["success"]
+
+
+@pytest.mark.asyncio
+async def test_holds_take_one_place_each(db: DatabaseManager) -> None:
+    for holds in (LocalSlotHolds(ttl=60), DatabaseSlotHolds(db, ttl=60)):
+        assert await holds.acquire(SLOT_DATE, time(10, 0), "a", seats=2)
+        assert await holds.acquire(SLOT_DATE, time(10, 0), "b", seats=2)
+        assert not await holds.acquire(SLOT_DATE, time(10, 0), "c", seats=2)
+        # A holder keeps its place even once the others fill the slot
+        assert await holds.acquire(SLOT_DATE, time(10, 0), "a", seats=1)
+        assert await holds.held_by_others(SLOT_DATE, SLOT_DATE, "c") == {
+            ("2026-03-02", "10:00"): 2
+        }
+
+        await holds.release(SLOT_DATE, time(10, 0), "b")
+        assert await holds.acquire(SLOT_DATE, time(10, 0), "c", seats=2)
+
+
+@pytest.mark.asyncio
+async def test_a_hold_leaves_the_other_places_on_offer() -> None:
+    from agent import AppointmentAssistant
+
+    db = DatabaseManager(backend=InMemoryBackend())
+    holds = LocalSlotHolds()
+    callers = [AppointmentAssistant(db=db, holds=holds) for _ in range(4)]
+    for i, assistant in enumerate(callers):
+        assistant.config.resources = [{"id": "default", "capacity": 3}]
+        assistant.current_user = UserProfile(contact_number=f"555000{i}", is_new=True)
+    alice, bob, carol, dave = callers
+
+    offered = (await alice.fetch_slots(None))["slots"][0]
+    assert offered["remaining"] == 3
+    assert (await alice.hold_slot(None, offered["date"], offered["time"]))["success"]
+
+    seen = (await bob.fetch_slots(None))["slots"][0]
+    assert seen == {**offered, "remaining": 2}
+    booked = await bob.book_appointment(None, seen["date"], seen["time"], "Bob")
+    assert booked["success"]
+
+    # Alice's hold and Bob's booking leave one place, which Carol takes
+    assert (await carol.hold_slot(None, offered["date"], offered["time"]))["success"]
+    offers = (await dave.fetch_slots(None))["slots"]
+    assert offered["time"] not in [
+        s["time"] for s in offers if s["date"] == offered["date"]
+    ]
+    lost = await dave.book_appointment(None, offered["date"], offered["time"], "Dave")
+    assert not lost["success"] and lost["error"] == "Slot held"
+
+    for assistant, name in ((alice, "Alice"), (carol, "Carol")):
+        booked = await assistant.book_appointment(
+            None, offered["date"], offered["time"], name
+        )
+        assert booked["success"]
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import date, time
+
+import pytest
+
+from database import DatabaseManager
+from idempotency import IdempotencyCache, request_key
+from instrumentation import assert_query_budget
+from models import UserProfile
+from storage import InMemoryBackend
+
+SLOT_DATE = date(2026, 3, 2)
+
+
+def test_request_key_normalizes_arguments() -> None:
+    assert request_key("book", name="Ada  Lovelace", on=date(2026, 3, 2)) == (
+        request_key("book", on="2026-03-02", name="ada lovelace")
+    )
+    assert request_key("book", name="Ada") != request_key("modify", name="Ada")
+
+
+@pytest.mark.asyncio
+async def test_cache_replays_until_the_ttl_expires() -> None:
+    now = [0.0]
+    cache = IdempotencyCache(ttl=10, clock=lambda: now[0])
+    calls = []
+
+    async def call() -> dict:
+        calls.append(1)
+        return {"success": True, "n": len(calls)}
+
+    assert (await cache.run("k", call))["n"] == 1
+    assert (await cache.run("k", call))["n"] == 1
+    now[0] = 11
+    assert (await cache.run("k", call))["n"] == 2
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_repeated_booking_returns_the_original(db: DatabaseManager) -> None:
+    key = request_key("book_appointment", contact_number="5550001")
+    first = await db.create_appointment(
+        "5550001", "Ada", SLOT_DATE, time(9, 0), idempotency_key=key
+    )
+    again = await db.create_appointment(
+        "5550001", "Ada", SLOT_DATE, time(9, 0), idempotency_key=key
+    )
+    assert again.id == first.id
+
+    # Without the key (or with another one) the slot is still taken
+    with pytest.raises(ValueError):
+        await db.create_appointment("5550002", "Grace", SLOT_DATE, time(9, 0))
+
+    moved = await db.modify_appointment(first.id, SLOT_DATE, time(10, 0))
+    assert (await db.modify_appointment(first.id, SLOT_DATE, time(10, 0))) == moved
+
+
+@pytest.mark.asyncio
+async def test_agent_replays_duplicate_tool_calls() -> None:
+    from agent import AppointmentAssistant
+
+    db = DatabaseManager(backend=InMemoryBackend())
+    assistant = AppointmentAssistant(db=db)
+    assistant.current_user = UserProfile(contact_number="5550001", is_new=True)
+    slot = assistant.config.get_available_slots()[0]
+    args = (None, slot.date_str, slot.time_str, "Ada")
+
+    first, concurrent = await asyncio.gather(
+        assistant.book_appointment(*args), assistant.book_appointment(*args)
+    )
+    assert first["success"] and concurrent is first
+
+    with assert_query_budget(0, "repeated book_appointment"):
+        again = await assistant.book_appointment(*args)
+    assert again is first
+
+    appointments = await db.get_user_appointments("5550001")
+    assert [a.id for a in appointments] == [first["appointment"]["id"]]
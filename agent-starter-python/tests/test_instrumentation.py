@@ -0,0 +1,41 @@
+from datetime import date, time
+
+import pytest
+
+from database import DatabaseManager
+from instrumentation import assert_query_budget, query_tracker
+from storage import InMemoryBackend
+
+
+@pytest.fixture
+def db() -> DatabaseManager:
+    query_tracker.reset()
+    return DatabaseManager(backend=InMemoryBackend())
+
+
+@pytest.mark.asyncio
+async def test_fetch_slots_uses_single_query(db: DatabaseManager) -> None:
+    """fetch_slots must not issue a query per candidate slot."""
+    from agent import AppointmentAssistant
+
+    assistant = AppointmentAssistant(db=db)
+
+    # One query for booked slots, one for slots held by other callers
+    with assert_query_budget(2, "fetch_slots"):
+        result = await assistant.fetch_slots(None)
+
+    assert result["success"]
+    assert query_tracker.tools["fetch_slots"].queries == 2
+
+
+@pytest.mark.asyncio
+async def test_budget_helper_reports_offending_methods(db: DatabaseManager) -> None:
+    """Exceeding a budget fails with a per-method breakdown."""
+    with (
+        pytest.raises(AssertionError, match="check_slot_available=2"),
+        assert_query_budget(1, "two slot checks"),
+    ):
+        await db.check_slot_available(date(2026, 1, 5), time(9, 0))
+        await db.check_slot_available(date(2026, 1, 5), time(9, 30))
+
+    assert query_tracker.methods["check_slot_available"].calls == 2
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import date, time
+
+import pytest
+
+from database import DatabaseManager
+from invalidation import APPOINTMENTS, CachedBackend, ChangeEvent, InvalidationBus
+from storage import InMemoryBackend
+
+SLOT_DATE = date(2026, 3, 2)
+
+
+@pytest.mark.asyncio
+async def test_workers_drop_what_another_worker_changed(backend):
+    # Two workers over one backend; the shared bus stands in for NOTIFY
+    bus = InvalidationBus()
+    first = DatabaseManager(CachedBackend(backend, bus))
+    second = DatabaseManager(CachedBackend(backend, bus))
+
+    assert await first.get_user_profile("5550001") is None
+    assert await first.get_bookings(SLOT_DATE, SLOT_DATE) == []
+    assert await first.get_bookings(SLOT_DATE, SLOT_DATE) == []
+    assert first.backend.stats.hits == 1
+
+    booked = await second.create_appointment("5550001", "Ada", SLOT_DATE, time(9, 0))
+    assert (await first.get_user_profile("5550001")).name == "Ada"
+    bookings = await first.get_bookings(SLOT_DATE, SLOT_DATE)
+    assert [b.booking_id for b in bookings] == [booked.id]
+    assert [a.id for a in await first.get_user_appointments("5550001")] == [booked.id]
+
+    assert await second.cancel_appointment(booked.id)
+    assert await first.get_bookings(SLOT_DATE, SLOT_DATE) == []
+    assert await first.get_user_appointments("5550001") == []
+    assert first.backend.snapshot()["cache"]["invalidated"] >= 3
+
+
+@pytest.mark.asyncio
+async def test_only_covered_entries_are_dropped_and_racing_reads_not_cached():
+    now = [0.0]
+    backend = InMemoryBackend()
+    list_booked_slots = backend.list_booked_slots
+    started = asyncio.Event()
+    release = asyncio.Event()
+    release.set()
+
+    async def gated(start_date, end_date):
+        started.set()
+        await release.wait()
+        return await list_booked_slots(start_date, end_date)
+
+    backend.list_booked_slots = gated
+    bus = InvalidationBus()
+    cache = CachedBackend(backend, bus, ttl=30, clock=lambda: now[0])
+
+    await cache.list_booked_slots("2026-03-02", "2026-03-08")
+    await cache.list_booked_slots("2026-03-09", "2026-03-15")
+    await cache.get_user_profile("5550001")
+    bus.publish(ChangeEvent(APPOINTMENTS, ("5550002",), ("2026-03-10",)))
+    assert cache.size == 2
+
+    # An event during the query keeps its (possibly stale) result out
+    started.clear()
+    release.clear()
+    read = asyncio.ensure_future(cache.list_booked_slots("2026-03-09", "2026-03-15"))
+    await started.wait()
+    bus.publish(ChangeEvent(APPOINTMENTS, None, ("2026-03-12",)))
+    release.set()
+    await read
+    assert cache.size == 2
+
+    now[0] = 31
+    await cache.get_user_profile("5550001")
+    assert (cache.stats.hits, cache.stats.misses) == (0, 5)
+
+
+def test_trigger_payload_is_parsed():
+    payload = '{"table":"appointments","contacts":["5550001",null],"dates":null}'
+    event = ChangeEvent.from_payload(payload)
+    assert event == ChangeEvent(APPOINTMENTS, ("5550001",), None)
+    assert ChangeEvent.from_payload(event.to_payload()) == event
@@ -0,0 +1,170 @@
+import asyncio
+import inspect
+from datetime import date, time
+
+import pytest
+
+from journal import CANCEL, CREATE, JournaledDatabase, WriteJournal
+from resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+SLOT_DATE = date(2026, 3, 2)
+
+
+class FlakyBackend:
+    """Backend proxy whose calls fail with ConnectionError while ``down``."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+        self.down = False
+
+    def __getattr__(self, name):
+        attr = getattr(self.backend, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            if self.down:
+                raise ConnectionError("database unreachable")
+            return await attr(*args, **kwargs)
+
+        return call
+
+
+@pytest.fixture
+def db(backend, tmp_path) -> JournaledDatabase:
+    return JournaledDatabase(
+        backend=FlakyBackend(backend),
+        journal=WriteJournal(str(tmp_path / "1.jsonl")),
+        breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0),
+    )
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_probes_after_reset_timeout():
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=2, reset_timeout=30, clock=lambda: now[0]
+    )
+
+    async def fail():
+        raise TimeoutError()
+
+    async def conflict():
+        raise ValueError("This time slot is already booked")
+
+    async def ok():
+        return "ok"
+
+    # Rejected writes do not count against the store
+    with pytest.raises(ValueError):
+        await breaker.call(conflict)
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            await breaker.call(fail)
+    assert breaker.state == OPEN
+
+    with breaker.watch() as watch, pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+    assert watch.failed
+
+    now[0] = 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() and not breaker.allow()
+    breaker._probing = False
+    assert await breaker.call(ok) == "ok"
+    assert breaker.state == CLOSED and breaker.times_opened == 1
+
+
+@pytest.mark.asyncio
+async def test_journal_group_commits_and_resumes_after_checkpoint(tmp_path):
+    path = str(tmp_path / "1.jsonl")
+    journal = WriteJournal(path)
+    entries = await asyncio.gather(
+        *(journal.append(CANCEL, {"appointment_id": str(i)}) for i in range(50))
+    )
+    assert [e.seq for e in entries] == list(range(1, 51))
+    # 50 concurrent appends shared one write and fsync
+    assert journal.fsyncs == journal.batches == 1
+
+    await journal.mark_replayed(20)
+    reopened = WriteJournal(path)
+    assert [e.seq for e in reopened.pending()] == list(range(21, 51))
+
+    await reopened.mark_replayed(50)
+    assert await reopened.compact()
+    again = WriteJournal(path)
+    assert again.pending() == []
+    assert (await again.append(CREATE, {})).seq == 51
+
+
+@pytest.mark.asyncio
+async def test_outage_is_journaled_and_replayed(db: JournaledDatabase):
+    backend = db.backend.backend
+    kept = await db.create_appointment("5550001", "Ada", SLOT_DATE, time(9, 0))
+    assert await db.get_user_profile("5550001")
+    await db.get_user_appointments("5550001", from_date=SLOT_DATE)
+    await db.get_bookings(SLOT_DATE, SLOT_DATE)
+
+    backend.down = True
+    # Reads come from the snapshot
+    assert (await db.get_user_profile("5550001")).name == "Ada"
+    assert [b.booking_id for b in await db.get_bookings(SLOT_DATE, SLOT_DATE)] == [
+        kept.id
+    ]
+    assert await db.check_slot_available(SLOT_DATE, time(9, 0)) == (
+        False,
+        "This time slot is already booked",
+    )
+    assert db.breaker.state != CLOSED
+
+    # Writes are journaled, and still checked against the snapshot
+    booked = await db.create_appointment(
+        "5550001", "Ada", SLOT_DATE, time(11, 0), idempotency_key="k1"
+    )
+    with pytest.raises(ValueError):
+        await db.create_appointment("5550002", "Grace", SLOT_DATE, time(11, 0))
+    assert await db.cancel_appointment(kept.id)
+    await db.save_conversation_summary("s1", "Booked 11 AM", "5550001")
+    mine = await db.get_user_appointments("5550001", from_date=SLOT_DATE)
+    assert [a.id for a in mine] == [booked.id]
+    assert len(db.journal.pending()) == 3
+
+    backend.down = False
+    report = await db.replay_journal()
+    assert (report.replayed, report.conflicts, report.remaining) == (3, [], 0)
+    mine = await db.get_user_appointments("5550001", from_date=SLOT_DATE)
+    assert [(a.appointment_time, a.status) for a in mine] == [(time(11, 0), "active")]
+    assert await db.get_conversation_summary("s1")
+    assert WriteJournal(db.journal.path).pending() == []
+
+
+@pytest.mark.asyncio
+async def test_slot_taken_during_outage_is_reported(db: JournaledDatabase):
+    backend = db.backend.backend
+    await db.get_bookings(SLOT_DATE, SLOT_DATE)
+    backend.down = True
+    local = await db.create_appointment("5550002", "Grace", SLOT_DATE, time(10, 0))
+
+    # Another worker books the slot before this one replays
+    backend.down = False
+    await backend.backend.insert_user_profile(
+        {"contact_number": "5550003", "name": "Linus"}
+    )
+    await backend.backend.insert_appointment_if_free(
+        {
+            "contact_number": "5550003",
+            "user_name": "Linus",
+            "appointment_date": str(SLOT_DATE),
+            "appointment_time": "10:00:00",
+            "status": "active",
+        },
+        1,
+    )
+
+    report = await db.replay_journal()
+    assert [e.args["appointment"]["id"] for e in report.conflicts] == [local.id]
+    assert report.remaining == 0
+    summary = await db.get_conversation_summary(f"journal-{report.conflicts[0].id}")
+    assert summary["contact_number"] == "5550002"
+    assert await db.get_user_appointments("5550002") == []
@@ -0,0 +1,58 @@
+import os
+
+from load_monitor import JobLagBoard, LoadThresholds, WorkerLoadMonitor
+
+
+def _monitor(job_lag=None, **overrides) -> WorkerLoadMonitor:
+    thresholds = LoadThresholds(
+        max_cpu=0.8, max_loop_lag_ms=100, max_sessions=10, load_threshold=0.7
+    )
+    for key, value in overrides.items():
+        setattr(thresholds, key, value)
+    return WorkerLoadMonitor(thresholds=thresholds, job_lag=job_lag)
+
+
+def test_idle_worker_reports_low_load() -> None:
+    monitor = _monitor()
+    assert monitor.compute_load(active_sessions=1) < 0.1
+    assert not monitor.saturated
+
+
+def test_loop_lag_saturates_worker() -> None:
+    """A lag spike at the limit reports exactly the admission threshold."""
+    monitor = _monitor()
+    monitor.lag_monitor.samples.extend([0.01, 0.1, 0.02])
+
+    load = monitor.compute_load(active_sessions=1)
+
+    assert load == 0.7
+    assert monitor.saturated
+    assert monitor.last_breakdown["bottleneck"] == "loop_lag"
+
+
+def test_session_cap_saturates_worker() -> None:
+    monitor = _monitor()
+    assert monitor.compute_load(active_sessions=10) >= 0.7
+    assert monitor.last_breakdown["bottleneck"] == "sessions"
+
+    monitor = _monitor(max_sessions=0)
+    assert monitor.compute_load(active_sessions=10) < 0.7
+
+
+def test_job_process_lag_reaches_the_load(tmp_path) -> None:
+    """Sessions run in job processes; their lag counts, exited jobs do not."""
+    board = JobLagBoard(str(tmp_path))
+    monitor = _monitor(job_lag=board)
+    board.publish(20.0)
+    assert monitor.compute_load(active_sessions=1) < 0.7
+
+    board.publish(100.0)
+    assert monitor.compute_load(active_sessions=1) == 0.7
+    assert monitor.last_breakdown["loop_lag_ms"] == 100.0
+
+    exited = 2**22 + 1  # above pid_max, so no such process
+    board.publish(500.0, pid=exited)
+    os.utime(tmp_path / f"{exited}.lag", (0, 0))
+    board.remove()
+    assert monitor.compute_load(active_sessions=1) < 0.1
+    assert os.listdir(tmp_path) == []
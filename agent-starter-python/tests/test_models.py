@@ -0,0 +1,52 @@
+from datetime import date, time
+
+from models import Appointment, Slot, UserProfile
+
+ROW = {
+    "id": "a1",
+    "contact_number": "5550001",
+    "user_name": "Ada",
+    "appointment_date": "2026-03-02",
+    "appointment_time": "09:30:00",
+    "status": "active",
+    "notes": None,
+    "resource_id": "default",
+    "duration_minutes": 30,
+    "series_id": None,
+}
+
+
+def test_appointment_is_parsed_once_and_serialized_once() -> None:
+    appointment = Appointment.from_row(ROW)
+
+    assert appointment.appointment_date == date(2026, 3, 2)
+    assert appointment.appointment_time == time(9, 30)
+    assert appointment.display == "Monday, March 02, 2026 at 9:30 AM"
+    assert appointment.slot_key == ("2026-03-02", "09:30")
+
+    payload = appointment.to_dict()
+    assert payload is appointment.to_dict()
+    assert payload == {**ROW, "display": appointment.display}
+
+
+def test_projected_rows_take_the_contact_from_the_query() -> None:
+    row = {k: v for k, v in ROW.items() if k != "contact_number"}
+    assert Appointment.from_row(row, "5550001").contact_number == "5550001"
+
+
+def test_slot_and_profile_payloads() -> None:
+    slot = Slot(date(2026, 3, 2), time(14, 0))
+    assert slot.to_dict() == {
+        "date": "2026-03-02",
+        "time": "14:00",
+        "display": "Monday, March 02, 2026 at 2:00 PM",
+    }
+    assert slot == Slot(date(2026, 3, 2), time(14, 0))
+
+    profile = UserProfile.from_row({"contact_number": "5550001", "name": "Ada"})
+    assert profile.to_dict() == {
+        "contact_number": "5550001",
+        "name": "Ada",
+        "email": None,
+        "is_new": False,
+    }
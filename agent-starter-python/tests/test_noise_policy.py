@@ -0,0 +1,53 @@
+from noise_policy import (
+    MODE_BVC,
+    MODE_NC,
+    MODE_OFF,
+    NoiseCancellationPolicy,
+    NoisePolicyThresholds,
+)
+
+
+def _policy(cpu: float, **overrides) -> NoiseCancellationPolicy:
+    thresholds = NoisePolicyThresholds(downgrade_cpu=0.6, disable_cpu=0.75)
+    for key, value in overrides.items():
+        setattr(thresholds, key, value)
+    return NoiseCancellationPolicy(thresholds=thresholds, cpu_source=lambda: cpu)
+
+
+def test_mode_steps_down_with_cpu() -> None:
+    assert _policy(0.2).decide().mode == MODE_BVC
+    assert _policy(0.65).decide().mode == MODE_NC
+    assert _policy(0.9).decide().mode == MODE_OFF
+
+    forced = _policy(0.9, force_mode=MODE_BVC).decide()
+    assert forced.mode == MODE_BVC
+    assert forced.reason == "forced"
+
+
+def test_session_costs_feed_estimates() -> None:
+    policy = _policy(0.2)
+    policy.record_session(MODE_BVC, cpu_seconds=6.0, wall_seconds=60.0)
+    policy.record_session(MODE_OFF, cpu_seconds=3.0, wall_seconds=60.0)
+
+    decision = policy.decide()
+    summary = decision.as_dict()
+
+    assert summary["mode"] == MODE_BVC
+    assert summary["estimated_cpu_ms_per_s"] == {
+        MODE_BVC: 100.0,
+        MODE_OFF: 50.0,
+        "bvc_overhead": 50.0,
+    }
+
+
+def test_session_costs_outlive_the_job_process(tmp_path) -> None:
+    """Each session's job process starts a fresh policy over the same file."""
+    path = str(tmp_path / "noise_costs.json")
+    first = NoiseCancellationPolicy(cpu_source=lambda: 0.2, state_path=path)
+    first.record_session(MODE_BVC, cpu_seconds=6.0, wall_seconds=60.0)
+
+    second = NoiseCancellationPolicy(cpu_source=lambda: 0.2, state_path=path)
+    second.record_session(MODE_BVC, cpu_seconds=12.0, wall_seconds=60.0)
+
+    third = NoiseCancellationPolicy(cpu_source=lambda: 0.2, state_path=path)
+    assert third.estimates() == {MODE_BVC: 120.0}
@@ -0,0 +1,72 @@
+from datetime import date
+from types import SimpleNamespace
+
+from pricing import CONVERSATION, CostAttribution, PricingRegistry
+from utils import calculate_costs
+
+
+def _registry() -> PricingRegistry:
+    sheet = {
+        "llm": {"m": {"input_per_1m": 1.0, "output_per_1m": 2.0}},
+        "tts": {"t": {"per_1k_chars": 0.01}},
+        "stt": {"s": {"per_minute": 0.01}},
+    }
+    return PricingRegistry.from_dict(
+        {
+            "defaults": {"llm": "m", "tts": "t", "stt": "s"},
+            "versions": [
+                {"version": "v1", "effective_from": "2024-01-01", **sheet},
+                {
+                    "version": "v2",
+                    "effective_from": "2025-01-01",
+                    **sheet,
+                    "llm": {"m": {"input_per_1m": 0.5, "output_per_1m": 1.0}},
+                },
+            ],
+        }
+    )
+
+
+def test_price_sheet_is_chosen_by_date() -> None:
+    registry = _registry()
+    assert registry.sheet_for(date(2024, 6, 1)).version == "v1"
+    assert registry.sheet_for(date(2025, 6, 1)).version == "v2"
+    assert registry.llm_cost(1_000_000, 0, on=date(2024, 6, 1)) == 1.0
+    assert registry.llm_cost(1_000_000, 0, on=date(2025, 6, 1)) == 0.5
+
+
+def test_calculate_costs_uses_registry_rates() -> None:
+    costs = calculate_costs(tokens_used=1_000_000, tts_chars=1000, stt_seconds=60)
+    assert costs["llm_cost"] == 0.375
+    assert costs["tts_cost"] == 0.015
+    assert costs["stt_cost"] == 0.0043
+
+
+def test_generation_after_tool_is_charged_to_tool() -> None:
+    attribution = CostAttribution(registry=_registry())
+
+    def llm(speech_id: str, prompt: int) -> SimpleNamespace:
+        return SimpleNamespace(
+            type="llm_metrics",
+            speech_id=speech_id,
+            duration=0.1,
+            prompt_tokens=prompt,
+            prompt_cached_tokens=0,
+            completion_tokens=0,
+        )
+
+    attribution.collect(llm("a", 1_000_000))
+    attribution.record_tool("fetch_slots", duration=0.05, queries=1)
+    attribution.collect(llm("b", 3_000_000))
+    attribution.collect(
+        SimpleNamespace(
+            type="tts_metrics", speech_id="b", ttfb=0.2, characters_count=500
+        )
+    )
+
+    report = attribution.report(on=date(2024, 6, 1))
+    assert list(report) == ["fetch_slots", CONVERSATION]
+    assert report["fetch_slots"]["prompt_tokens"] == 3_000_000
+    assert report["fetch_slots"]["tts_characters"] == 500
+    assert report["fetch_slots"]["cost"] == 3.005
+    assert report[CONVERSATION]["cost"] == 1.0
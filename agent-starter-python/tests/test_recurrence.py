@@ -0,0 +1,104 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from database import DatabaseManager
+from instrumentation import query_tracker
+from recurrence import Series, build_rule
+
+TUESDAY = datetime(2026, 3, 3, 10, 0)
+
+
+def weekly(count: int = 6) -> Series:
+    return Series(
+        id=None,
+        contact_number="5550001",
+        user_name="Ada",
+        rule=build_rule("weekly", TUESDAY, count=count),
+        start=TUESDAY,
+    )
+
+
+def test_rules_expand_lazily() -> None:
+    series = weekly()
+    assert series.rule == "FREQ=WEEKLY;COUNT=6"
+    assert series.describe() == "every Tuesday at 10:00 AM, 6 times"
+
+    starts = list(series.occurrences())
+    assert len(starts) == 6 and starts[-1] == TUESDAY + timedelta(weeks=5)
+    window = series.occurrences(
+        after=TUESDAY + timedelta(days=1), before=TUESDAY + timedelta(weeks=3)
+    )
+    assert list(window) == [TUESDAY + timedelta(weeks=1), TUESDAY + timedelta(weeks=2)]
+
+    # Daily series skip the days the office is closed
+    daily = build_rule("daily", TUESDAY, count=5, weekdays=[0, 1, 2, 3, 4])
+    days = Series(None, "5550001", "Ada", daily, TUESDAY).occurrences()
+    assert [d.weekday() for d in days] == [1, 2, 3, 4, 0]
+
+    with pytest.raises(ValueError):
+        build_rule("weekly", TUESDAY)
+
+
+@pytest.mark.asyncio
+async def test_series_books_the_horizon_in_one_batch(db: DatabaseManager):
+    horizon = date(2026, 3, 17)
+    with query_tracker.scope("book_recurring_appointment") as stats:
+        result = await db.create_series(weekly(), horizon)
+
+    assert result.saved and not result.conflicts
+    assert [a.appointment_date for a in result.booked] == [
+        date(2026, 3, 3),
+        date(2026, 3, 10),
+        date(2026, 3, 17),
+    ]
+    assert {a.series_id for a in result.booked} == {result.series.id}
+    # booked slots, profile lookup, profile create, series, one batch insert
+    assert stats.queries == 5
+
+    # The daily job books the rest as the horizon moves
+    assert await db.materialize_series(date(2026, 3, 31)) == 2
+    (stored,) = await db.get_user_series("5550001")
+    assert stored.materialized_until == date(2026, 3, 31)
+
+    # ...and completes the series once its last occurrence is booked
+    assert await db.materialize_series(date(2026, 4, 30)) == 1
+    assert await db.materialize_series(date(2026, 4, 30)) == 0
+    bookings = await db.get_bookings(date(2026, 3, 1), date(2026, 4, 30))
+    assert len(bookings) == 6
+    assert await db.get_user_series("5550001") == []
+
+
+@pytest.mark.asyncio
+async def test_taken_occurrences_are_reported_or_skipped(db: DatabaseManager):
+    await db.create_appointment("5550002", "Grace", date(2026, 3, 10), time(10, 0))
+    horizon = date(2026, 3, 31)
+
+    result = await db.create_series(weekly(4), horizon)
+    assert not result.saved and result.booked == ()
+    assert result.conflicts == (TUESDAY + timedelta(weeks=1),)
+    assert await db.get_user_series("5550001") == []
+
+    result = await db.create_series(weekly(4), horizon, skip_conflicts=True)
+    assert result.saved and len(result.booked) == 3
+
+
+@pytest.mark.asyncio
+async def test_closed_days_are_reported_like_taken_ones(db: DatabaseManager):
+    # Monthly on the 3rd: April 3 is a Friday, May 3 a Sunday
+    monthly = Series(
+        None, "5550001", "Ada", build_rule("monthly", TUESDAY, count=4), TUESDAY
+    )
+    horizon = date(2026, 6, 30)
+
+    def weekdays_only(slot_date: str, slot_time: str) -> bool:
+        return date.fromisoformat(slot_date).weekday() < 5
+
+    result = await db.create_series(monthly, horizon, valid_slot=weekdays_only)
+    assert not result.saved
+    assert result.conflicts == (datetime(2026, 5, 3, 10, 0),)
+
+    result = await db.create_series(
+        monthly, horizon, skip_conflicts=True, valid_slot=weekdays_only
+    )
+    assert [a.appointment_date.month for a in result.booked] == [3, 4, 6]
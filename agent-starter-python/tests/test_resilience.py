@@ -0,0 +1,97 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from resilience import (
+    CallPolicy,
+    CircuitBreaker,
+    DeadlineExceededError,
+    GuardedBackend,
+    retry_delay,
+)
+
+
+class ScriptedBackend:
+    """Backend whose calls take the scripted delays, or raise scripted errors."""
+
+    name = "scripted"
+
+    def __init__(self):
+        self.script: List[object] = []
+        self.calls = 0
+
+    async def _next(self, value):
+        self.calls += 1
+        step = self.script.pop(0) if self.script else 0.001
+        if isinstance(step, Exception):
+            raise step
+        await asyncio.sleep(step)
+        return value
+
+    async def get_user_profile(self, contact_number: str):
+        return await self._next({"contact_number": contact_number})
+
+    async def insert_appointment(self, data):
+        return await self._next(data)
+
+
+def guard(backend: ScriptedBackend, **kwargs) -> GuardedBackend:
+    return GuardedBackend(
+        backend, CircuitBreaker(failure_threshold=3), hedge_min_samples=5, **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_slow_read_is_hedged_after_its_p95():
+    backend = ScriptedBackend()
+    guarded = guard(backend)
+    for _ in range(5):
+        await guarded.get_user_profile("5550001")
+
+    # The first attempt stalls; the duplicate sent after ~p95 answers
+    backend.script = [1.0, 0.001]
+    start = asyncio.get_running_loop().time()
+    assert await guarded.get_user_profile("5550001") == {"contact_number": "5550001"}
+    assert asyncio.get_running_loop().time() - start < 0.5
+
+    stats = guarded.snapshot()["methods"]["get_user_profile"]
+    assert (stats["calls"], stats["hedges"], stats["hedge_wins"]) == (6, 1, 1)
+    assert backend.calls == 7
+
+
+@pytest.mark.asyncio
+async def test_transient_read_errors_are_retried_but_writes_are_not():
+    backend = ScriptedBackend()
+    guarded = guard(backend)
+    breaker = guarded.breaker
+
+    backend.script = [ConnectionError("reset"), ConnectionError("reset")]
+    with breaker.watch() as watch:
+        assert await guarded.get_user_profile("5550001")
+    # Succeeded on the third attempt: not an outage for the caller
+    assert not watch.failed
+    assert guarded.stats["get_user_profile"].retries == 2
+
+    backend.script = [ConnectionError("reset")]
+    with breaker.watch() as watch, pytest.raises(ConnectionError):
+        await guarded.insert_appointment({"id": "a1"})
+    assert watch.failed and guarded.stats["insert_appointment"].retries == 0
+
+    # Backoff is jittered below an exponential cap
+    assert all(0 <= retry_delay(3) <= 0.2 for _ in range(50))
+
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_a_stalled_write():
+    backend = ScriptedBackend()
+    guarded = guard(backend, policies={"insert_appointment": CallPolicy(deadline=0.05)})
+
+    backend.script = [5.0]
+    with guarded.breaker.watch() as watch, pytest.raises(DeadlineExceededError):
+        await guarded.insert_appointment({"id": "a1"})
+    assert watch.failed
+
+    stats = guarded.snapshot()
+    assert stats["methods"]["insert_appointment"]["timeouts"] == 1
+    assert guarded.breaker._failures == 1
@@ -0,0 +1,70 @@
+from datetime import date, time
+
+import pytest
+
+from models import Appointment
+from resolver import AppointmentResolver, parse_reference
+
+TODAY = date(2026, 3, 1)  # a Sunday
+
+
+def _appt(appt_id: str, day: date, at: time) -> Appointment:
+    return Appointment(id=appt_id, appointment_date=day, appointment_time=at)
+
+
+MONDAY_9 = _appt("6f1c2d4e-0000-4000-8000-000000000001", date(2026, 3, 2), time(9))
+MONDAY_14 = _appt("6f1c2d4e-0000-4000-8000-000000000002", date(2026, 3, 2), time(14))
+FRIDAY_14 = _appt("6f1c2d4e-0000-4000-8000-000000000003", date(2026, 3, 6), time(14))
+
+
+@pytest.fixture
+def resolver() -> AppointmentResolver:
+    return AppointmentResolver([FRIDAY_14, MONDAY_14, MONDAY_9])
+
+
+@pytest.mark.parametrize(
+    ("identifier", "expected"),
+    [
+        (MONDAY_14.id.upper(), MONDAY_14),
+        ("the 9am one", MONDAY_9),
+        ("the second one", MONDAY_14),
+        ("my last appointment", FRIDAY_14),
+        ("Friday's", FRIDAY_14),
+        ("March 6th", FRIDAY_14),
+        ("the 2 p.m. on Monday", MONDAY_14),
+        ("the second one on monday", MONDAY_14),
+        ("tomorrow at 9", MONDAY_9),
+    ],
+)
+def test_resolves_spoken_references(
+    resolver: AppointmentResolver, identifier: str, expected: Appointment
+) -> None:
+    assert resolver.resolve(identifier, today=TODAY).match == expected
+
+
+def test_ambiguous_references_return_ranked_candidates(
+    resolver: AppointmentResolver,
+) -> None:
+    resolution = resolver.resolve("the 2pm one", today=TODAY)
+    assert resolution.match is None
+    assert resolution.candidates == (MONDAY_14, FRIDAY_14)
+    assert resolution.choices() == f"{MONDAY_14.display} or {FRIDAY_14.display}"
+
+    # No exact match: appointments agreeing with part of the reference first
+    partial = resolver.resolve("Friday at 9am", today=TODAY)
+    assert partial.match is None
+    assert partial.candidates[:2] == (MONDAY_9, FRIDAY_14)
+
+
+def test_unknown_ids_are_not_parsed_as_dates(resolver: AppointmentResolver) -> None:
+    reference = parse_reference("6f1c2d4e-0000-4000-8000-000000000099")
+    assert reference.appointment_id is not None
+    assert reference.on_date is None and not reference.times
+
+    resolution = resolver.resolve(reference.text)
+    assert resolution.match is None and not resolution.candidates
+
+
+def test_single_appointment_is_assumed() -> None:
+    resolution = AppointmentResolver([FRIDAY_14]).resolve("my appointment")
+    assert resolution.match == FRIDAY_14
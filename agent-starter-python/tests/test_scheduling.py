@@ -0,0 +1,148 @@
+import sqlite3
+from datetime import date, datetime, time
+
+import pytest
+
+from database import DatabaseManager
+from models import Slot
+from scheduling import Booking, ResourceCalendar, SchedulingEngine
+from storage import SQLiteBackend
+
+SLOT_DATE = date(2026, 3, 2)
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime.combine(SLOT_DATE, time(hour, minute))
+
+
+def test_calendar_overlap_and_single_pass_free_starts() -> None:
+    calendar = ResourceCalendar("room-1")
+    calendar.add(60, 120, "a")
+    calendar.add(180, 210, "b")
+
+    assert calendar.overlaps(90, 100)
+    assert calendar.overlaps(30, 61)
+    assert not calendar.overlaps(120, 180)
+    assert not calendar.overlaps(60, 120, ignore="a")
+    with pytest.raises(ValueError):
+        calendar.add(100, 130, "c")
+
+    # A 30-minute booking fits before, between and after the bookings
+    assert calendar.free_starts([0, 30, 60, 90, 120, 150, 180, 210], 30) == [
+        0,
+        30,
+        120,
+        150,
+        210,
+    ]
+    assert calendar.free_starts([0, 30, 120, 150, 210], 60) == [0, 120, 210]
+
+    assert calendar.remove("a")
+    assert not calendar.remove("a")
+    assert calendar.intervals() == [(180, 210)]
+
+
+def test_engine_windows_across_resources() -> None:
+    engine = SchedulingEngine(["dr-a", "dr-b"], (time(9, 0), time(12, 0)))
+    engine.load(
+        [
+            Booking("dr-a", at(9, 0), 60, "1"),
+            Booking("dr-b", at(10, 0), 30, "2"),
+        ]
+    )
+    starts = [at(9, 0), at(9, 30), at(10, 0), at(10, 30), at(11, 0), at(11, 30)]
+
+    windows = engine.free_windows(starts, 60)
+    assert [(w.resource_id, w.start.strftime("%H:%M")) for w in windows] == [
+        ("dr-b", "09:00"),
+        ("dr-a", "10:00"),
+        ("dr-a", "10:30"),
+        ("dr-b", "10:30"),
+        ("dr-a", "11:00"),
+        ("dr-b", "11:00"),
+    ]
+    # 11:30 + 60 minutes runs past closing
+    assert all(w.end <= at(12, 0) for w in windows)
+
+    assert engine.free_resources(at(10, 0), 30) == ["dr-a"]
+    assert engine.free_resources(at(9, 30), 30) == ["dr-b"]
+    assert not engine.is_free("dr-a", at(9, 30))
+    assert engine.is_free("dr-a", at(9, 30), ignore="1")
+
+    slots = [Slot(s.date(), s.time()) for s in starts]
+    assert [s.time_str for s in engine.available(slots, 30, ["dr-a"])] == [
+        "10:00",
+        "10:30",
+        "11:00",
+        "11:30",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bookings_of_different_lengths_do_not_overlap(db: DatabaseManager):
+    """Durations are checked as intervals, and each resource has its own calendar."""
+    resources = ["dr-a", "dr-b"]
+    first = await db.create_appointment(
+        "5550001",
+        "Ada",
+        SLOT_DATE,
+        time(9, 0),
+        duration_minutes=60,
+        resource_ids=resources,
+    )
+    assert (first.resource_id, first.duration_minutes) == ("dr-a", 60)
+
+    # 9:30 overlaps dr-a's hour, so it goes to dr-b
+    second = await db.create_appointment(
+        "5550002", "Grace", SLOT_DATE, time(9, 30), resource_ids=resources
+    )
+    assert second.resource_id == "dr-b"
+
+    # Both resources are busy at 9:45 for a 30-minute appointment
+    available, _ = await db.check_slot_available(
+        SLOT_DATE, time(9, 45), resource_ids=resources
+    )
+    assert not available
+    with pytest.raises(ValueError):
+        await db.create_appointment(
+            "5550003", "Linus", SLOT_DATE, time(9, 45), resource_ids=resources
+        )
+
+    # An appointment can move to a start that overlaps its own interval
+    moved = await db.modify_appointment(
+        first.id, SLOT_DATE, time(9, 30), 60, ["dr-a", "dr-b"]
+    )
+    assert (moved.resource_id, moved.appointment_time) == ("dr-a", time(9, 30))
+
+    bookings = await db.get_bookings(SLOT_DATE, SLOT_DATE)
+    engine = SchedulingEngine(resources)
+    engine.load(bookings)
+    assert engine.free_resources(at(10, 30), 30) == ["dr-a", "dr-b"]
+    assert engine.free_resources(at(10, 0), 30) == ["dr-b"]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_file_from_before_resources_is_migrated(tmp_path) -> None:
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE appointments (
+            id TEXT PRIMARY KEY, contact_number TEXT NOT NULL,
+            user_name TEXT NOT NULL, appointment_date TEXT NOT NULL,
+            appointment_time TEXT NOT NULL, status TEXT DEFAULT 'active',
+            notes TEXT, created_at TEXT, updated_at TEXT
+        );
+        CREATE UNIQUE INDEX idx_unique_active_slot
+        ON appointments(appointment_date, appointment_time) WHERE status = 'active';
+        """
+    )
+    conn.close()
+
+    db = DatabaseManager(backend=SQLiteBackend(path))
+    for number, resource in (("5550001", "dr-a"), ("5550002", "dr-b")):
+        await db.create_appointment(
+            number, "Ada", SLOT_DATE, time(9, 0), resource_ids=[resource]
+        )
+
+    assert len(await db.get_bookings(SLOT_DATE, SLOT_DATE)) == 2
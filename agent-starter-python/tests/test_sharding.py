@@ -0,0 +1,155 @@
+import asyncio
+import os
+from datetime import date, time
+
+import pytest
+
+from sharding import CalendarShard, HashRing, ShardedDatabase, ShardNode
+from storage import InMemoryBackend
+
+SLOT_DATE = date(2026, 3, 2)
+RESOURCES = [f"room-{i}" for i in range(6)]
+
+
+class CountingBackend:
+    """Backend proxy counting the seat claims that reach the store."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+        self.claims = 0
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    async def insert_appointment_if_free(self, data, capacity):
+        self.claims += 1
+        return await self.backend.insert_appointment_if_free(data, capacity)
+
+
+async def start_workers(directory: str, store, ids=("a", "b")):
+    workers = []
+    for node_id in ids:
+        node = ShardNode(directory, CalendarShard(store), node_id=node_id)
+        workers.append(ShardedDatabase(store, node=node))
+        node.start()
+    while not all(os.path.exists(w.node.path) for w in workers):
+        await asyncio.sleep(0.01)
+    for worker in workers:
+        worker.node.update_members()
+    return workers
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    ring = HashRing(["a", "b", "c"])
+    keys = [f"calendar-{i}" for i in range(3000)]
+    before = {key: ring.owner(key) for key in keys}
+    assert min(list(before.values()).count(n) for n in "abc") > 700
+
+    ring.add("d")
+    moved = [key for key in keys if ring.owner(key) != before[key]]
+    assert 500 < len(moved) < 1000
+    assert {ring.owner(key) for key in moved} == {"d"}
+
+
+@pytest.mark.asyncio
+async def test_bookings_of_a_resource_are_claimed_by_its_owner(tmp_path):
+    store = CountingBackend(InMemoryBackend())
+    first, second = await start_workers(str(tmp_path), store)
+    try:
+        assert {first.node.owner(r) for r in RESOURCES} == {"a", "b"}
+
+        async def book(db, contact_number, resource_id):
+            try:
+                return await db.create_appointment(
+                    contact_number,
+                    "Ada",
+                    SLOT_DATE,
+                    time(9, 0),
+                    resource_ids=[resource_id],
+                )
+            except ValueError:
+                return None
+
+        booked = await asyncio.gather(
+            *(book(first, "5550001", r) for r in RESOURCES),
+            *(book(second, "5550002", r) for r in RESOURCES),
+        )
+        assert len([a for a in booked if a]) == len(RESOURCES)
+        # Losers were refused by the owners' index, not by the store
+        assert store.claims == len(RESOURCES)
+        assert first.node.stats["forwarded"] and second.node.stats["served"]
+        assert first.node.shard.loads + second.node.shard.loads == 2
+
+        available, _ = await second.check_slot_available(
+            SLOT_DATE, time(9, 0), resource_ids=RESOURCES
+        )
+        assert not available
+
+        # A cancelled seat is free again at once, whichever worker asks
+        taken = next(a for a in booked if a)
+        assert await first.cancel_appointment(taken.id)
+        assert await book(second, "5550003", taken.resource_id)
+    finally:
+        await first.node.stop()
+        await second.node.stop()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_owner_is_left_out_of_the_ring(tmp_path):
+    store = InMemoryBackend()
+    first, second = await start_workers(str(tmp_path), store)
+    resource_id = next(r for r in RESOURCES if first.node.owner(r) == "b")
+    await second.node.stop()
+
+    try:
+        appointment = await first.create_appointment(
+            "5550001", "Ada", SLOT_DATE, time(9, 0), resource_ids=[resource_id]
+        )
+        assert appointment.resource_id == resource_id
+        assert first.node.stats["fallbacks"] == 1
+        assert first.node.ring.nodes == {"a"}
+    finally:
+        await first.node.stop()
+
+
+@pytest.mark.asyncio
+async def test_job_processes_are_clients_of_the_workers_ring(tmp_path):
+    store = CountingBackend(InMemoryBackend())
+    workers = await start_workers(str(tmp_path), store)
+    # One per call; each forwards to the workers and never joins the ring
+    calls = [ShardedDatabase(store, node=ShardNode(str(tmp_path))) for _ in range(3)]
+    try:
+        for call in calls:
+            assert call.node.node_id is None
+            assert call.node.ring.nodes == {"a", "b"}
+        assert workers[0].node.members() == {"a", "b"}
+
+        booked = await asyncio.gather(
+            *(
+                call.create_appointment(
+                    f"555000{i}", "Ada", SLOT_DATE, time(9, 0), resource_ids=RESOURCES
+                )
+                for i, call in enumerate(calls)
+            )
+        )
+        assert len({a.resource_id for a in booked}) == 3
+        assert sum(call.node.stats["forwarded"] for call in calls) >= 3
+        assert not any(call.node.stats["local"] for call in calls)
+        assert sum(w.node.stats["served"] for w in workers) >= 3
+    finally:
+        for node in [c.node for c in calls] + [w.node for w in workers]:
+            await node.stop()
+
+
+@pytest.mark.asyncio
+async def test_a_client_without_workers_books_itself(tmp_path):
+    store = InMemoryBackend()
+    call = ShardedDatabase(store, node=ShardNode(str(tmp_path)))
+
+    appointment = await call.create_appointment(
+        "5550001", "Ada", SLOT_DATE, time(9, 0), resource_ids=RESOURCES[:1]
+    )
+    assert appointment.resource_id == RESOURCES[0]
+    assert call.node.stats["fallbacks"] == 2  # the check, then the claim
+    assert await call.cancel_appointment(appointment.id)
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from invalidation import CachedBackend, InvalidationBus
+from resilience import CallPolicy, CircuitBreaker, GuardedBackend
+from shared_reads import ReadService, SharedReads
+from singleflight import SingleFlight
+from storage import InMemoryBackend
+
+WINDOW = ("2026-03-02", "2026-03-16")
+
+
+class SlowStore:
+    """Stands in for the database every process of a worker talks to."""
+
+    name = "slow"
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.queries = 0
+        self.booked = []
+
+    async def list_booked_slots(self, start_date: str, end_date: str):
+        self.queries += 1
+        booked = list(self.booked)
+        await asyncio.sleep(self.delay)
+        return booked
+
+    async def insert_appointment(self, data):
+        self.booked.append(data)
+        return data
+
+
+def guard(store: SlowStore) -> GuardedBackend:
+    return GuardedBackend(
+        store,
+        CircuitBreaker(failure_threshold=10),
+        read_policy=CallPolicy(coalesce=True),
+        flights=SingleFlight(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_job_processes_share_the_workers_flights(tmp_path):
+    store = SlowStore()
+    worker = guard(store)
+    service = ReadService(worker, str(tmp_path / "reads.sock"), worker.flights)
+    await service.server.start()
+    # One backend per job process, as each builds its own in create_database
+    jobs = [SharedReads(guard(store), service.server.path) for _ in range(2)]
+    try:
+        results = await asyncio.gather(
+            *(job.list_booked_slots(*WINDOW) for job in jobs for _ in range(3))
+        )
+        assert results == [[]] * 6
+        assert store.queries == 1
+        assert worker.flights.total.coalesced == 5
+        assert [job.stats["shared"] for job in jobs] == [3, 3]
+
+        # A write is announced before it returns, so the writer's next read
+        # does not join a read another job started before the write
+        stale = asyncio.ensure_future(jobs[1].list_booked_slots(*WINDOW))
+        await asyncio.sleep(0.01)
+        row = {"appointment_date": "2026-03-02"}
+        await jobs[0].insert_appointment(row)
+        assert await jobs[0].list_booked_slots(*WINDOW) == [row]
+        assert await stale == []
+        assert jobs[0].stats["announced"] == 1
+    finally:
+        for job in jobs:
+            await job.close()
+        await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_reads_fall_back_to_the_jobs_backend(tmp_path):
+    store = SlowStore(delay=0)
+    job = SharedReads(guard(store), str(tmp_path / "reads.sock"))
+
+    assert await job.list_booked_slots(*WINDOW) == []
+    await job.insert_appointment({"appointment_date": "2026-03-02"})
+    assert len(await job.list_booked_slots(*WINDOW)) == 1
+    assert job.stats["local"] == 2
+    assert job.stats["unannounced"] == 1
+    # Attributes other than calls are the backend's
+    assert job.breaker is job.backend.breaker
+
+
+@pytest.mark.asyncio
+async def test_job_processes_share_the_workers_cache(tmp_path):
+    store = InMemoryBackend()
+    await store.insert_user_profile({"contact_number": "5550001", "name": "Ada"})
+    bus = InvalidationBus()
+    worker = guard(store)
+    service = ReadService(
+        CachedBackend(worker, bus), str(tmp_path / "reads.sock"), worker.flights, bus
+    )
+    await service.server.start()
+    jobs = [SharedReads(guard(store), service.server.path) for _ in range(2)]
+    try:
+        for job in jobs:
+            assert (await job.get_user_profile("5550001"))["name"] == "Ada"
+        assert service.backend.stats.hits == 1
+
+        # The writer tells the worker, which drops the entry for every job
+        await jobs[0].update_user_profile("5550001", {"name": "Ada L."})
+        assert (await jobs[1].get_user_profile("5550001"))["name"] == "Ada L."
+        assert service.backend.stats.invalidated == 1
+    finally:
+        for job in jobs:
+            await job.close()
+        await service.stop()
@@ -0,0 +1,142 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from database import DatabaseManager
+from resilience import CallPolicy, CircuitBreaker, GuardedBackend
+from singleflight import SingleFlight
+
+
+class SlowBackend:
+    """Backend whose reads take ``delay`` and can be made to fail."""
+
+    name = "slow"
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.error = None
+        self.queries = 0
+        self.booked = []
+        self.archived = []
+
+    async def list_booked_slots(self, start_date: str, end_date: str):
+        self.queries += 1
+        booked = list(self.booked)
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return booked
+
+    async def page_user_appointments(
+        self, contact_number, include_cancelled, *args, archived=False, **kwargs
+    ):
+        self.queries += 1
+        rows = list(self.archived if archived else self.booked)
+        await asyncio.sleep(self.delay)
+        return rows
+
+    async def insert_appointment(self, data):
+        self.booked.append(data)
+        return data
+
+
+def guard(backend: SlowBackend) -> GuardedBackend:
+    return GuardedBackend(
+        backend,
+        CircuitBreaker(failure_threshold=10),
+        read_policy=CallPolicy(coalesce=True),
+        flights=SingleFlight(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_reads_share_one_query():
+    backend = SlowBackend()
+    guarded = guard(backend)
+
+    results = await asyncio.gather(
+        *(guarded.list_booked_slots("2026-03-02", "2026-03-16") for _ in range(5)),
+        guarded.list_booked_slots(start_date="2026-03-02", end_date="2026-03-16"),
+        guarded.list_booked_slots("2026-03-02", "2026-03-09"),
+    )
+    assert results == [[]] * 7
+    assert backend.queries == 2
+
+    stats = guarded.snapshot()["coalescing"]
+    assert (stats["calls"], stats["executions"], stats["coalesced"]) == (7, 2, 5)
+    assert stats["ratio"] == 3.5
+
+    # Nothing is cached once the flight lands
+    await guarded.list_booked_slots("2026-03-02", "2026-03-16")
+    assert backend.queries == 3
+
+
+@pytest.mark.asyncio
+async def test_read_after_write_does_not_join_an_earlier_flight():
+    backend = SlowBackend()
+    guarded = guard(backend)
+
+    before = asyncio.ensure_future(
+        guarded.list_booked_slots("2026-03-02", "2026-03-16")
+    )
+    await asyncio.sleep(0.01)
+    await guarded.insert_appointment({"appointment_date": "2026-03-02"})
+    after = await guarded.list_booked_slots("2026-03-02", "2026-03-16")
+
+    assert after == [{"appointment_date": "2026-03-02"}]
+    assert await before == []
+    assert backend.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_followers_share_the_outage_but_not_cancellation():
+    backend = SlowBackend()
+    guarded = guard(backend)
+    breaker = guarded.breaker
+
+    async def read():
+        with breaker.watch() as watch, contextlib.suppress(ConnectionError):
+            await guarded.list_booked_slots("2026-03-02", "2026-03-16")
+        return watch.failed
+
+    backend.error = ConnectionError("database unreachable")
+    assert await asyncio.gather(read(), read(), read()) == [True, True, True]
+    assert backend.queries == 1
+
+    # A leader that gives up does not cancel the query for the others
+    backend.error = None
+    leader = asyncio.ensure_future(
+        guarded.list_booked_slots("2026-03-02", "2026-03-16")
+    )
+    await asyncio.sleep(0.01)
+    follower = asyncio.ensure_future(
+        guarded.list_booked_slots("2026-03-02", "2026-03-16")
+    )
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert await follower == []
+    assert backend.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_callers_sharing_a_read_do_not_change_its_rows():
+    def row(appointment_id: str, day: str, status: str) -> dict:
+        return {
+            "id": appointment_id,
+            "appointment_date": day,
+            "appointment_time": "10:00:00",
+            "status": status,
+        }
+
+    backend = SlowBackend()
+    backend.booked = [row("b", "2026-03-02", "active")]
+    backend.archived = [row("a", "2026-02-02", "cancelled")]
+    db = DatabaseManager(backend=guard(backend))
+
+    pages = await asyncio.gather(
+        *(db.get_appointment_page("5550001", include_cancelled=True) for _ in range(3))
+    )
+    assert [[a.id for a in page.items] for page in pages] == [["a", "b"]] * 3
+    # One query for the appointments and one for the archive, both shared
+    assert backend.queries == 2
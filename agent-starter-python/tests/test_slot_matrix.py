@@ -0,0 +1,70 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+from scheduling import Booking, SchedulingEngine
+from slot_matrix import SlotMatrix
+
+MONDAY = date(2026, 3, 2)
+TIMES = [time(h, m) for h in range(9, 17) for m in (0, 15, 30, 45)]
+
+
+def test_weekdays_cutoff_and_top_k() -> None:
+    matrix = SlotMatrix(MONDAY, 7, TIMES, excluded_weekdays=[5, 6])
+    assert matrix.shape == (7, 32)
+    assert matrix.count() == 5 * 32
+    assert matrix.count(MONDAY + timedelta(days=5)) == 0
+
+    matrix.not_before(datetime.combine(MONDAY, time(16, 0)))
+    assert matrix.count(MONDAY) == 4
+    assert matrix.date_range() == (MONDAY, MONDAY + timedelta(days=4))
+
+    matrix.remove_keys([("2026-03-02", "16:15"), ("2026-03-20", "09:00")])
+    first = matrix.slots(3)
+    assert [s.key for s in first] == [
+        ("2026-03-02", "16:00"),
+        ("2026-03-02", "16:30"),
+        ("2026-03-02", "16:45"),
+    ]
+    tuesday = matrix.slots(2, on=MONDAY + timedelta(days=1))
+    assert [s.time_str for s in tuesday] == ["09:00", "09:15"]
+
+
+def test_bookings_match_the_scheduling_engine() -> None:
+    """The vectorized filter agrees with the engine's per-resource pass."""
+    rng = random.Random(7)
+    resources = [f"r{i}" for i in range(6)]
+    engine = SchedulingEngine(resources)
+    bookings = []
+    for day in range(21):
+        for resource in resources:
+            minute = 9 * 60
+            while minute < 17 * 60:
+                length = rng.choice((15, 30, 60, 90))
+                if minute + length <= 17 * 60 and rng.random() < 0.5:
+                    start = datetime.combine(MONDAY + timedelta(days=day), time())
+                    bookings.append(
+                        Booking(resource, start + timedelta(minutes=minute), length)
+                    )
+                    minute += length
+                else:
+                    minute += 15
+    engine.load(bookings)
+
+    for duration, subset in ((30, resources), (60, resources[:2]), (90, ["r5"])):
+        matrix = SlotMatrix(MONDAY, 21, TIMES, excluded_weekdays=[6])
+        candidates = matrix.slots()
+        matrix.apply_bookings(engine, duration, subset)
+        assert matrix.slots() == engine.available(candidates, duration, subset)
+
+
+def test_occupancy_per_day() -> None:
+    engine = SchedulingEngine(["a", "b"], (time(9, 0), time(11, 0)))
+    engine.load([Booking("a", datetime.combine(MONDAY, time(9, 0)), 60)])
+    times = [time(9, 0), time(9, 30), time(10, 0), time(10, 30)]
+
+    matrix = SlotMatrix(MONDAY, 2, times)
+    matrix.apply_bookings(engine, 30)
+
+    # Monday: 2 of 8 resource-slots booked; Tuesday is empty
+    assert matrix.occupancy() == {MONDAY: 0.25, MONDAY + timedelta(days=1): 0.0}
+    assert matrix.count(MONDAY) == 4
@@ -0,0 +1,156 @@
+from datetime import date, datetime, time, timezone
+
+import pytest
+
+from database import DatabaseManager
+from storage import SlotConflictError
+
+SLOT_DATE = date(2026, 3, 2)
+
+
+@pytest.mark.asyncio
+async def test_active_slot_is_unique(db: DatabaseManager) -> None:
+    """A second active booking for the same slot is rejected."""
+    await db.create_appointment("5550001", "Ada", SLOT_DATE, time(9, 0))
+
+    with pytest.raises(ValueError):
+        await db.create_appointment("5550002", "Grace", SLOT_DATE, time(9, 0))
+
+    # The backend enforces the constraint even when the pre-check is skipped
+    await db.create_user_profile("5550003", "Linus")
+    with pytest.raises(SlotConflictError):
+        await db.backend.insert_appointment(
+            {
+                "contact_number": "5550003",
+                "user_name": "Linus",
+                "appointment_date": str(SLOT_DATE),
+                "appointment_time": "09:00:00",
+                "status": "active",
+            }
+        )
+
+
+@pytest.mark.asyncio
+async def test_cancelling_frees_the_slot(db: DatabaseManager) -> None:
+    appointment = await db.create_appointment("5550001", "Ada", SLOT_DATE, time(9, 0))
+
+    assert await db.cancel_appointment(appointment.id)
+    assert await db.get_booked_slots(SLOT_DATE, SLOT_DATE) == set()
+
+    rebooked = await db.create_appointment("5550002", "Grace", SLOT_DATE, time(9, 0))
+    assert rebooked.status == "active"
+
+    history = await db.get_user_appointments("5550001", include_cancelled=True)
+    assert [a.status for a in history] == ["cancelled"]
+
+
+@pytest.mark.asyncio
+async def test_modify_rejects_taken_slot(db: DatabaseManager) -> None:
+    first = await db.create_appointment("5550001", "Ada", SLOT_DATE, time(9, 0))
+    await db.create_appointment("5550001", "Ada", SLOT_DATE, time(10, 0))
+
+    with pytest.raises(ValueError):
+        await db.modify_appointment(first.id, SLOT_DATE, time(10, 0))
+
+    moved = await db.modify_appointment(first.id, SLOT_DATE, time(11, 0))
+    assert moved.appointment_time == time(11, 0)
+
+    appointments = await db.get_user_appointments("5550001")
+    assert [a.appointment_time for a in appointments] == [time(10, 0), time(11, 0)]
+    assert await db.get_booked_slots(SLOT_DATE, SLOT_DATE) == {
+        (str(SLOT_DATE), "10:00"),
+        (str(SLOT_DATE), "11:00"),
+    }
+
+
+@pytest.mark.asyncio
+async def test_modify_never_revives_a_cancelled_appointment(
+    db: DatabaseManager,
+) -> None:
+    cancelled = await db.create_appointment("5550001", "Ada", SLOT_DATE, time(9, 0))
+    await db.cancel_appointment(cancelled.id)
+
+    assert await db.modify_appointment(cancelled.id, SLOT_DATE, time(11, 0)) is None
+    # Not even back into its own slot
+    assert await db.modify_appointment(cancelled.id, SLOT_DATE, time(9, 0)) is None
+
+    history = await db.get_user_appointments("5550001", include_cancelled=True)
+    assert [(a.status, a.appointment_time) for a in history] == [
+        ("cancelled", time(9, 0))
+    ]
+    assert await db.get_booked_slots(SLOT_DATE, SLOT_DATE) == set()
+
+
+@pytest.mark.asyncio
+async def test_summary_round_trip(db: DatabaseManager) -> None:
+    await db.create_user_profile("5550001", "Ada")
+    await db.save_conversation_summary(
+        session_id="room-1",
+        summary="Booked one appointment",
+        contact_number="5550001",
+        cost_breakdown={"total_cost": 0.01},
+    )
+
+    saved = await db.get_conversation_summary("room-1")
+    assert saved["cost_breakdown"] == {"total_cost": 0.01}
+    assert saved["appointments_mentioned"] == []
+
+
+@pytest.mark.asyncio
+async def test_keyset_scan_visits_every_row_once(db: DatabaseManager) -> None:
+    """Rows sharing a created_at value are not skipped at page boundaries."""
+    await db.create_user_profile("5550001", "Ada")
+    for i in range(7):
+        await db.backend.insert_conversation_summary(
+            {
+                "session_id": f"room-{i}",
+                "summary": "",
+                "contact_number": "5550001",
+                "created_at": f"2026-03-0{1 + i // 3}T10:00:00+00:00",
+            }
+        )
+
+    pages = [
+        page
+        async for page in db.iter_pages(
+            "conversation_summaries", page_size=2, columns=["session_id"]
+        )
+    ]
+
+    assert [len(p) for p in pages] == [2, 2, 2, 1]
+    session_ids = [row["session_id"] for page in pages for row in page]
+    assert sorted(session_ids) == [f"room-{i}" for i in range(7)]
+    assert set(pages[0][0]) == {"created_at", "id", "session_id"}
+
+
+@pytest.mark.asyncio
+async def test_appointment_pages_cover_hot_and_archived_rows(
+    db: DatabaseManager,
+) -> None:
+    """Pages are disjoint, ordered by (date, time, id) and span the archive."""
+    for hour in range(9, 14):
+        await db.create_appointment("5550001", "Ada", SLOT_DATE, time(hour, 0))
+    cancelled = await db.create_appointment("5550001", "Ada", SLOT_DATE, time(15, 0))
+    await db.cancel_appointment(cancelled.id)
+    # Half of the history moves to the archive
+    moved = await db.archive_appointments(
+        date(2026, 3, 3), datetime(2000, 1, 1, tzinfo=timezone.utc), batch_size=3
+    )
+    assert moved == 3
+
+    seen, after = [], None
+    while True:
+        page = await db.get_appointment_page(
+            "5550001", include_cancelled=True, after=after, limit=2
+        )
+        seen.extend(page)
+        if not page.has_more:
+            break
+        after = page.next_cursor
+
+    assert [a.appointment_time.hour for a in seen] == [9, 10, 11, 12, 13, 15]
+    assert seen[-1].status == "cancelled"
+    assert isinstance(seen[0].appointment_date, date)
+
+    hot = await db.get_appointment_page("5550001", limit=10)
+    assert len(hot) <= 3
@@ -0,0 +1,78 @@
+import asyncio
+from types import SimpleNamespace
+
+from telemetry import MAX_PENDING_TURNS, TELEMETRY_EVENT, TelemetryStream
+
+
+def _turn(
+    stream: TelemetryStream, speech_id: str, eou: float, ttft: float, ttfb: float
+):
+    stream.collect(
+        SimpleNamespace(
+            type="eou_metrics", speech_id=speech_id, end_of_utterance_delay=eou
+        )
+    )
+    stream.collect(SimpleNamespace(type="llm_metrics", speech_id=speech_id, ttft=ttft))
+    stream.collect(SimpleNamespace(type="tts_metrics", speech_id=speech_id, ttfb=ttfb))
+
+
+async def _noop(event: str, data: dict):
+    pass
+
+
+def test_updates_carry_only_changed_fields() -> None:
+    stream = TelemetryStream(_noop, slow_turn_ms=1000, keyframe_every=2)
+
+    _turn(stream, "a", eou=0.3, ttft=0.4, ttfb=0.2)
+    first = stream.next_update()
+    assert first["full"]
+    assert first["changes"]["last_turn_ms"] == 900.0
+    assert first["changes"]["slow_turns"] == 0
+
+    assert stream.next_update() is None
+
+    _turn(stream, "b", eou=0.5, ttft=0.6, ttfb=0.3)
+    second = stream.next_update()
+    assert not second["full"]
+    assert second["changes"]["slow_turns"] == 1
+    assert "total_cost" not in second["changes"]
+
+    _turn(stream, "c", eou=0.1, ttft=0.1, ttfb=0.1)
+    assert stream.next_update()["full"]  # keyframe
+
+
+def test_interrupted_turns_do_not_pile_up() -> None:
+    stream = TelemetryStream(_noop, slow_turn_ms=1000)
+
+    # Interrupted turns end before any audio, so they never complete
+    for i in range(MAX_PENDING_TURNS * 3):
+        stream.collect(
+            SimpleNamespace(
+                type="eou_metrics", speech_id=f"cut-{i}", end_of_utterance_delay=0.2
+            )
+        )
+    assert len(stream._pending_turns) == MAX_PENDING_TURNS
+
+    _turn(stream, "done", eou=0.3, ttft=0.4, ttfb=0.2)
+    assert stream.next_update()["changes"]["last_turn_ms"] == 900.0
+    assert "done" not in stream._pending_turns
+
+
+async def test_updates_are_throttled() -> None:
+    sent = []
+
+    async def send(event: str, data: dict):
+        sent.append((event, data))
+
+    stream = TelemetryStream(send, min_interval=0.2)
+    stream.start()
+    for i in range(5):
+        _turn(stream, f"turn-{i}", eou=0.1, ttft=0.1, ttfb=0.1)
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    assert len(sent) == 1
+
+    await stream.stop()
+    assert len(sent) == 2
+    assert sent[-1][0] == TELEMETRY_EVENT
+    assert sent[-1][1]["changes"]["turns"] == 5
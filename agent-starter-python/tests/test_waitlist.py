@@ -0,0 +1,122 @@
+from datetime import date, datetime, time
+from typing import Optional
+
+import pytest
+
+from database import DatabaseManager
+from instrumentation import query_tracker
+from scheduling import Booking, SchedulingEngine
+from waitlist import WaitlistEntry, WaitlistMatcher, freed_starts
+
+SLOT_DATE = date(2026, 3, 2)
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime.combine(SLOT_DATE, time(hour, minute))
+
+
+def entry(
+    entry_id: str,
+    requested: Optional[datetime],
+    last: date = SLOT_DATE,
+    opens: Optional[time] = None,
+    closes: Optional[time] = None,
+    duration: int = 30,
+) -> WaitlistEntry:
+    return WaitlistEntry(
+        id=entry_id,
+        contact_number=f"555{entry_id}",
+        user_name=entry_id,
+        earliest_date=SLOT_DATE,
+        latest_date=last,
+        earliest_time=opens,
+        latest_time=closes,
+        duration_minutes=duration,
+        requested_at=requested,
+    )
+
+
+def test_matcher_orders_by_request_day_then_flexibility() -> None:
+    monday, tuesday = datetime(2026, 2, 23, 9), datetime(2026, 2, 24, 9)
+    week = date(2026, 3, 6)
+    entries = [
+        entry("flexible", tuesday, last=week),
+        entry("morning", tuesday.replace(hour=12), opens=time(9), closes=time(11)),
+        entry("early", monday, last=week),
+        entry("long", tuesday, duration=60, opens=time(10), closes=time(10)),
+    ]
+
+    # 10:00 and 10:30 are free; "early" asked a day before everyone else
+    engine = SchedulingEngine()
+    engine.load([Booking("default", at(11), 60, "x")])
+    matcher = WaitlistMatcher(engine)
+    for item in entries:
+        matcher.add(item, [at(10), at(10, 30)])
+    assert [(m.start.time(), m.entry.id) for m in matcher.match()] == [
+        (time(10), "early"),
+        (time(10, 30), "morning"),
+    ]
+
+    # Without "early", the narrow 60-minute entry wins 10:00 and takes 10:30 too
+    matcher = WaitlistMatcher(SchedulingEngine())
+    for item in entries[:2] + entries[3:]:
+        matcher.add(item, [at(10), at(10, 30)])
+    assert [(m.start.time(), m.entry.id) for m in matcher.match()] == [
+        (time(10), "long")
+    ]
+
+    starts = freed_starts(SLOT_DATE, time(10), 60, ["09:30", "10:00", "10:30", "11:00"])
+    assert starts == [at(10), at(10, 30)]
+
+
+@pytest.mark.asyncio
+async def test_cancellation_books_the_best_waiting_caller(db: DatabaseManager):
+    taken = await db.create_appointment("5550001", "Ada", SLOT_DATE, time(10, 0))
+    later = await db.join_waitlist(
+        WaitlistEntry(None, "5550002", "Grace", SLOT_DATE, date(2026, 3, 6))
+    )
+    first = await db.join_waitlist(
+        WaitlistEntry(None, "5550003", "Linus", SLOT_DATE, SLOT_DATE, time(9), time(11))
+    )
+    assert later.status == first.status == "waiting"
+
+    await db.cancel_appointment(taken.id)
+    with query_tracker.scope("cancel_appointment") as stats:
+        booked = await db.fill_from_waitlist(freed_starts(SLOT_DATE, time(10), 30, []))
+
+    # Both asked today; Linus only takes one morning, so he goes first
+    ((matched, appointment),) = booked
+    assert matched.id == first.id and appointment.user_name == "Linus"
+    assert appointment.appointment_time == time(10, 0)
+    # waitlist, booked slots, one claim
+    assert stats.queries == 3
+
+    waiting = await db.backend.list_waitlist(str(SLOT_DATE))
+    assert [row["id"] for row in waiting] == [later.id]
+    assert await db.fill_from_waitlist([at(10)]) == []
+
+
+@pytest.mark.asyncio
+async def test_claims_are_atomic(db: DatabaseManager):
+    waiting = await db.join_waitlist(
+        WaitlistEntry(None, "5550002", "Grace", SLOT_DATE, SLOT_DATE)
+    )
+    data = {
+        "contact_number": "5550002",
+        "user_name": "Grace",
+        "appointment_date": str(SLOT_DATE),
+        "appointment_time": "10:00:00",
+    }
+    await db.create_appointment("5550001", "Ada", SLOT_DATE, time(10, 0))
+
+    # The slot was taken meanwhile: nothing is booked and the entry keeps waiting
+    assert await db.backend.claim_waitlist_entry(waiting.id, data, 1) is None
+    assert len(await db.backend.list_waitlist(str(SLOT_DATE))) == 1
+
+    # A free slot books the entry exactly once
+    data["appointment_time"] = "11:00:00"
+    row = await db.backend.claim_waitlist_entry(waiting.id, data, 1)
+    assert row["appointment_time"].startswith("11:00")
+    data["appointment_time"] = "14:00:00"
+    assert await db.backend.claim_waitlist_entry(waiting.id, data, 1) is None
+    assert await db.backend.list_waitlist(str(SLOT_DATE)) == []
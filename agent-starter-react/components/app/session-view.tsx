@@ -12,6 +12,7 @@ import {
 import { AppointmentList } from '@/components/app/appointment-card';
 import { ChatTranscript } from '@/components/app/chat-transcript';
 import { SummaryModal } from '@/components/app/summary-modal';
+import { TelemetryPanel } from '@/components/app/telemetry-panel';
 import { TileLayout } from '@/components/app/tile-layout';
 import { ToolCallDisplay } from '@/components/app/tool-call-display';
 import { registerRpcHandlers, unregisterRpcHandlers } from '@/lib/rpc-handlers';
@@ -107,6 +108,7 @@ export const SessionView = ({
     addAppointment,
     updateAppointment,
     setSummary,
+    applyTelemetry,
     addToolCall,
     updateToolCall,
   } = useSessionState();
@@ -175,6 +177,9 @@ export const SessionView = ({
         console.log('Tool call update via RPC:', data);
         // You can track tool calls here if needed
       },
+      onTelemetryUpdate: (update) => {
+        applyTelemetry(update);
+      },
     });
 
     return () => {
@@ -182,7 +187,13 @@ export const SessionView = ({
         unregisterRpcHandlers(localParticipant);
       }
     };
-  }, [session.room?.localParticipant, addAppointment, updateAppointment, setSummary]);
+  }, [
+    session.room?.localParticipant,
+    addAppointment,
+    updateAppointment,
+    setSummary,
+    applyTelemetry,
+  ]);
 
   useEffect(() => {
     const lastMessage = messages.at(-1);
@@ -217,6 +228,11 @@ export const SessionView = ({
         <ToolCallDisplay toolCalls={sessionState.toolCalls} />
       </div>
 
+      {/* Live cost and latency */}
+      <div className="fixed bottom-36 left-4 z-40 w-60">
+        <TelemetryPanel telemetry={sessionState.telemetry} />
+      </div>
+
       {/* Transcript */}
       <ChatTranscript
         hidden={!chatOpen}
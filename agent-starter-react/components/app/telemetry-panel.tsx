@@ -0,0 +1,44 @@
+'use client';
+
+import React from 'react';
+import { cn } from '@/lib/shadcn/utils';
+import type { TelemetrySnapshot } from '@/lib/types';
+
+interface TelemetryPanelProps {
+  telemetry: TelemetrySnapshot | null;
+  className?: string;
+}
+
+const formatMs = (value: number | null | undefined) =>
+  value === null || value === undefined ? '—' : `${Math.round(value)} ms`;
+
+const Stat = ({ label, value }: { label: string; value: string }) => (
+  <div className="flex items-center justify-between gap-4">
+    <span className="text-muted-foreground">{label}</span>
+    <span className="font-mono">{value}</span>
+  </div>
+);
+
+export const TelemetryPanel = ({ telemetry, className }: TelemetryPanelProps) => {
+  if (!telemetry) {
+    return null;
+  }
+
+  return (
+    <div className={cn('border-border bg-card rounded-lg border p-3 text-xs', className)}>
+      <h3 className="mb-2 text-sm font-semibold">Live Call Stats</h3>
+      <div className="space-y-1">
+        <Stat label="Cost" value={`$${(telemetry.total_cost ?? 0).toFixed(6)}`} />
+        <Stat
+          label="Turns"
+          value={`${telemetry.turns ?? 0} (${telemetry.slow_turns ?? 0} slow)`}
+        />
+        <Stat label="Last turn" value={formatMs(telemetry.last_turn_ms)} />
+        <Stat
+          label="p50 / p95"
+          value={`${formatMs(telemetry.p50_turn_ms)} / ${formatMs(telemetry.p95_turn_ms)}`}
+        />
+      </div>
+    </div>
+  );
+};
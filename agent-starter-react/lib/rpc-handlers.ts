@@ -1,6 +1,6 @@
 import type { RpcInvocationData } from 'livekit-client';
 import { LocalParticipant } from 'livekit-client';
-import type { Appointment, ConversationSummary } from './types';
+import type { Appointment, ConversationSummary, TelemetryUpdate } from './types';
 
 interface RpcHandlerCallbacks {
   onAppointmentBooked?: (appointment: Appointment) => void;
@@ -22,6 +22,7 @@ interface RpcHandlerCallbacks {
   }) => void;
   onConversationSummary?: (summary: ConversationSummary) => void;
   onToolCallUpdate?: (data: unknown) => void;
+  onTelemetryUpdate?: (update: TelemetryUpdate) => void;
 }
 
 export function registerRpcHandlers(
@@ -124,6 +125,22 @@ export function registerRpcHandlers(
     }
   });
 
+  // Handle live cost/latency telemetry (sent at most every ~2s, delta-encoded)
+  localParticipant.registerRpcMethod('telemetry_update', async (data: RpcInvocationData) => {
+    try {
+      const payload = JSON.parse(data.payload) as TelemetryUpdate;
+
+      if (callbacks.onTelemetryUpdate) {
+        callbacks.onTelemetryUpdate(payload);
+      }
+
+      return JSON.stringify({ status: 'received', success: true });
+    } catch (error) {
+      console.error('Error handling telemetry_update RPC:', error);
+      return JSON.stringify({ status: 'error', message: String(error) });
+    }
+  });
+
   console.log('RPC handlers registered successfully');
 }
 
@@ -134,6 +151,7 @@ export function unregisterRpcHandlers(localParticipant: LocalParticipant) {
     localParticipant.unregisterRpcMethod('appointment_modified');
     localParticipant.unregisterRpcMethod('conversation_summary');
     localParticipant.unregisterRpcMethod('tool_call_update');
+    localParticipant.unregisterRpcMethod('telemetry_update');
     console.log('RPC handlers unregistered');
   } catch (error) {
     console.error('Error unregistering RPC handlers:', error);
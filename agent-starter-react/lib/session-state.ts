@@ -3,6 +3,8 @@ import type {
   Appointment,
   ConversationSummary,
   SessionState,
+  TelemetrySnapshot,
+  TelemetryUpdate,
   ToolCall,
   UserProfile,
 } from './types';
@@ -13,6 +15,7 @@ export function useSessionState() {
     appointments: [],
     toolCalls: [],
     summary: null,
+    telemetry: null,
   });
 
   const setIdentifiedUser = useCallback((user: UserProfile | null) => {
@@ -60,12 +63,22 @@ export function useSessionState() {
     setState((prev) => ({ ...prev, summary }));
   }, []);
 
+  const applyTelemetry = useCallback((update: TelemetryUpdate) => {
+    setState((prev) => ({
+      ...prev,
+      telemetry: update.full
+        ? (update.changes as TelemetrySnapshot)
+        : ({ ...prev.telemetry, ...update.changes } as TelemetrySnapshot),
+    }));
+  }, []);
+
   const reset = useCallback(() => {
     setState({
       identifiedUser: null,
       appointments: [],
       toolCalls: [],
       summary: null,
+      telemetry: null,
     });
   }, []);
 
@@ -78,6 +91,7 @@ export function useSessionState() {
     addToolCall,
     updateToolCall,
     setSummary,
+    applyTelemetry,
     reset,
   };
 }
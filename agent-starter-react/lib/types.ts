@@ -44,6 +44,33 @@ export interface CostBreakdown {
   stt_audio_duration?: number;
 }
 
+// Live cost and latency values pushed by the agent during the call
+export interface TelemetrySnapshot {
+  llm_cost: number;
+  tts_cost: number;
+  stt_cost: number;
+  total_cost: number;
+  prompt_tokens: number;
+  completion_tokens: number;
+  tts_characters: number;
+  stt_audio_duration: number;
+  turns: number;
+  slow_turns: number;
+  last_turn_ms: number | null;
+  p50_turn_ms: number;
+  p95_turn_ms: number;
+  last_eou_ms: number;
+  last_llm_ttft_ms: number;
+  last_tts_ttfb_ms: number;
+}
+
+// Delta-encoded update: only changed fields unless `full` is set
+export interface TelemetryUpdate {
+  seq: number;
+  full: boolean;
+  changes: Partial<TelemetrySnapshot>;
+}
+
 export interface UserProfile {
   contact_number: string;
   name?: string;
@@ -56,6 +83,7 @@ export interface SessionState {
   appointments: Appointment[];
   toolCalls: ToolCall[];
   summary: ConversationSummary | null;
+  telemetry: TelemetrySnapshot | null;
 }
 
 export interface RPCEvent {